@@ -1,18 +1,53 @@
 import tkinter as tk
+import csv
+import os
 import time
+from datetime import datetime
 from typing import List, Callable, Optional
 
-# Centralized timing configuration (preserve current behavior)
-NORMAL_REVEAL_MS = 1000  # per-number duration for Normal/MemoryPattern
-SPEED_SCHEDULE_MS = [1500] * 5 + [1000] * 5 + [500] * 5  # per-number durations per round
+# Keep the per-mode CSV files open and write rows in batches (see Logging/csv_writer.py)
+BUFFERED_LOGGING = False
+# Log attempts to SQLITE_FILE (see Logging/sqlite_store.py) instead of the per-mode CSV files
+SQLITE_LOGGING = False
+SQLITE_FILE = "game_log.sqlite"
+# Also append every attempt to a binary column store (see Logging/columnar.py)
+COLUMNAR_LOGGING = False
+# Measure how long each phase's widget work (show/reset + layout) takes and
+# append one row per round to WIDGET_TIMING_FILE
+WIDGET_TIMING = False
+WIDGET_TIMING_FILE = "widget_timing.csv"
+WIDGET_TIMING_PHASES = ["reveal", "pause", "pattern", "input"]
+# Record every key pressed in the input boxes and append them per attempt to
+# <prefix>_<mode>_keys.bin (see Logging/keystrokes.py)
+KEYSTROKE_LOGGING = True
+# Directory of a prebuilt stimulus bank (see Logic/StimulusBank.py); each GUI
+# run claims the next participant slot and shows its serials and patterns.
+# None draws them live
+STIMULUS_BANK = None
+# Journal every session transition to JOURNAL_FILE (see Logging/journal.py); after
+# a crash the next start offers to resume the interrupted mode at its round
+SESSION_JOURNAL = True
+JOURNAL_FILE = "game_log_journal.log"
 try:
+    from ..Logging.csv_writer import BufferedCSVWriter
+    from ..Logging.journal import SessionJournal
+    from ..Logging.keystrokes import KeystrokeRecorder
     from ..Logging.logger import GameLogger
     from ..Logic.MainLogic import MainLogic
-    from ..MemoryTask.Pattern import PatternGame
+    from ..Logic.Protocol import (FreeRecallProtocol, MODES, NORMAL_REVEAL_MS, PATTERN_REVEAL_MS, PATTERN_GAP_MS,
+                                  PATTERN_ROWS, PATTERN_COLS)
+    from ..Logic.StimulusBank import StimulusBank
+    from ..Logic import Recovery, Session
 except ImportError:
+    from Logging.csv_writer import BufferedCSVWriter
+    from Logging.journal import SessionJournal
+    from Logging.keystrokes import KeystrokeRecorder
     from Logging.logger import GameLogger
     from Logic.MainLogic import MainLogic
-    from MemoryTask.Pattern import PatternGame
+    from Logic.Protocol import (FreeRecallProtocol, MODES, NORMAL_REVEAL_MS, PATTERN_REVEAL_MS, PATTERN_GAP_MS,
+                                PATTERN_ROWS, PATTERN_COLS)
+    from Logic.StimulusBank import StimulusBank
+    from Logic import Recovery, Session
 
 
 class GUIMain():
@@ -22,43 +57,64 @@ class GUIMain():
     - After 5 seconds, swaps to 10 input boxes where each box accepts 0-2 digits (0-99)
     """
 
-    def __init__(self, Seriallist: Optional[List[int]] = None, on_submit: Optional[Callable[[List[int | None]], None]] = None):
+    def __init__(self, Seriallist: Optional[List[int]] = None, on_submit: Optional[Callable[[List[int | None]], None]] = None,
+                 logger: Optional[GameLogger] = None):
         self.root = tk.Tk()
         self.root.title("Free Recall")
         self.root.geometry("1600x900")
         self.root.resizable(False, False)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self.Seriallist = Seriallist or []
         self.on_submit = on_submit
 
         # Internal logic + logger
         self.logic = MainLogic()
-        self.logger = GameLogger()
-        self.attempt = 0
-        # Normal mode rounds
-        self.normal_rounds_done = 0
-        self.normal_rounds_target = 5
-        # Speed mode schedule (per-number ms): 5s x5, 3s x5, 1s x5
-        self.speed_schedule_ms = []
-        self.speed_round_index = 0
-        # Legacy counter removed: self.speed_rounds_done
+        if logger is None:
+            database = None
+            if SQLITE_LOGGING:  # imported here so sqlite3 stays off the startup path
+                try:
+                    from ..Logging.sqlite_store import SQLiteStore
+                except ImportError:
+                    from Logging.sqlite_store import SQLiteStore
+                database = SQLiteStore(SQLITE_FILE)
+            logger = GameLogger(
+                writer=BufferedCSVWriter() if BUFFERED_LOGGING else None,
+                columnar=COLUMNAR_LOGGING,
+                database=database,
+            )
+        self.logger = logger
+        # Mode/round bookkeeping, scoring and logging live in the protocol; the
+        # session engine runs the phases on the Tk clock and this class renders its events
+        self.protocol = FreeRecallProtocol(self.logic, self.logger)
+        self.journal = SessionJournal(JOURNAL_FILE) if SESSION_JOURNAL else None
+        pending = self._pending_session()
+        if STIMULUS_BANK:
+            bank = StimulusBank(STIMULUS_BANK)
+            resumed_slot = pending.get("stimuli") if pending else None
+            self.protocol.stimuli = bank.participant(resumed_slot) if resumed_slot is not None else bank.claim()
+            self.protocol.participant_id = f"B{self.protocol.stimuli.index + 1:05d}"
+        self.session = Session.FreeRecallSession(self.root, self.protocol)
+        self.session.subscribe(self._on_session_event)
+        self.recorder = Recovery.SessionRecorder(self.session, self.journal) if self.journal else None
         self.recall_time_ms = 5000  # default reveal time
         self.speed_mode_active = False
         self.memorypattern_active = False
         self.pause_mode_active = False
         self.recall_start_time = None  # for speed mode adaptation
         self.input_start_time = None
+        self.keystrokes = KeystrokeRecorder()
         # MemoryPattern state
         self.pattern_game = None  # type: ignore[assignment]
         self.pattern_frame = None
         self.pattern_buttons = []
         self.pattern_click_enabled = False
-        self.pattern_reveal_delay_ms = 600  # time each cell is lit
-        self.pattern_gap_ms = 200           # gap between lights
+        self.pattern_reveal_delay_ms = PATTERN_REVEAL_MS  # time each cell is lit
+        self.pattern_gap_ms = PATTERN_GAP_MS              # gap between lights
         self.pattern_entered = []
 
         # Game mode dropdown
-        self.gamemodes = ["Normal", "Speed", "MemoryPattern", "Pause"]
+        self.gamemodes = list(MODES)
         self.selected_gamemode = tk.StringVar(value=self.gamemodes[0])
         self.dropdown_frame = tk.Frame(self.root)
         self.dropdown_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
@@ -78,134 +134,218 @@ class GUIMain():
         self.container = tk.Frame(self.root, padx=10, pady=20)
         self.container.pack(fill=tk.BOTH, expand=True)
 
-        self.placeholder_frame = None
-        self.input_frame = None
-        self.entries = []
-        self.buttons_frame = None
         self.feedback_label = tk.Label(self.root, text="", font=("Segoe UI", 14))
         self.feedback_label.pack(pady=4)
 
-        # Do not show placeholders or start timer until Start is clicked
-        # Sequential reveal state
-        self.reveal_index = 0
-        # Label used for sequential reveal
-        self.reveal_label = None
         # Reveal timing (Normal/Pattern)
         self.reveal_show_ms = NORMAL_REVEAL_MS
         self.reveal_gap_ms = 0
 
-    def _destroy_frames(self, *names: str) -> None:
-        """Utility to destroy and None-out UI frames by attribute name."""
-        for name in names:
-            frame = getattr(self, name, None)
-            if frame is not None:
-                try:
-                    frame.destroy()
-                except Exception:
-                    pass
-                setattr(self, name, None)
+        # Set before a resumed session replays its first round into it
+        self.round_timings = {}  # phase -> ms of widget work in the current round
+
+        # Every round widget is created once here and then only shown, hidden and
+        # reset; nothing is built while stimuli are on screen
+        self._build_widget_pool()
+        if pending:
+            self._resume(pending)
+
+    def _build_widget_pool(self) -> None:
+        # Sequential reveal: a centered big label
+        self.placeholder_frame = tk.Frame(self.container)
+        self.reveal_label = tk.Label(
+            self.placeholder_frame,
+            text="",
+            font=("Segoe UI", 64, "bold"),
+            width=6,
+            anchor="center",
+            bg="#ffffff",
+        )
+        self.reveal_label.pack(pady=20)
+
+        # Pause mode message
+        self.pause_frame = tk.Frame(self.container)
+        tk.Label(
+            self.pause_frame,
+            text="Please wait...",
+            font=("Segoe UI", 32, "bold"),
+            fg="blue"
+        ).pack(pady=20)
+
+        # MemoryPattern grid, PATTERN_ROWS x PATTERN_COLS; large grids get smaller buttons
+        self.pattern_frame = tk.Frame(self.container)
+        self.pattern_buttons = []
+        large = max(PATTERN_ROWS, PATTERN_COLS) > 4
+        for r in range(PATTERN_ROWS):
+            for c in range(PATTERN_COLS):
+                idx = r * PATTERN_COLS + c
+                btn = tk.Button(
+                    self.pattern_frame,
+                    width=3 if large else 6,
+                    height=1 if large else 3,
+                    bg="#d9d9d9",
+                    activebackground="#cccccc",
+                    relief=tk.RAISED,
+                    command=lambda i=idx: self._on_pattern_click(i),
+                )
+                btn.grid(row=r, column=c, padx=3 if large else 6, pady=3 if large else 6)
+                self.pattern_buttons.append(btn)
+
+        # 10 input boxes
+        self.input_frame = tk.Frame(self.container)
+        vcmd = (self.root.register(self._validate_two_digits), "%P")
+        self.entries = []
+        for i in range(10):
+            ent = tk.Entry(
+                self.input_frame,
+                width=3,  # shows up to 2 digits comfortably
+                font=("Segoe UI", 18),
+                justify="center",
+                validate="key",
+                validatecommand=vcmd,
+            )
+            ent.grid(row=0, column=i, padx=6)
+            ent.bind("<KeyPress>", lambda e, i=i: self.keystrokes.record(i, e.keysym_num))
+            self.entries.append(ent)
+        self.entries_shown = len(self.entries)  # Adaptive rounds can be shorter
+
+        # Submit button
+        self.buttons_frame = tk.Frame(self.container)
+        tk.Button(self.buttons_frame, text="Submit", command=self._on_submit).pack()
+
+        # Pool frames in packing order, with their pack options
+        self._pool = [
+            (self.placeholder_frame, {"expand": True}),
+            (self.pause_frame, {"expand": True}),
+            (self.pattern_frame, {"pady": 10}),
+            (self.input_frame, {}),
+            (self.buttons_frame, {"pady": 10}),
+        ]
+        self._visible = ()
+
+    def _show_frames(self, *frames: tk.Frame) -> None:
+        """Show exactly these pool frames (in pool order) and hide the rest."""
+        if frames == self._visible:
+            return
+        for frame, _ in self._pool:
+            frame.pack_forget()
+        for frame, options in self._pool:
+            if frame in frames:
+                frame.pack(**options)
+        self._visible = frames
 
     def _on_start(self):
         if self.game_started:
             return
+        mode = self.selected_gamemode.get()
+        self._lock_controls(mode)
+        self.session.start(mode)
+
+    def _lock_controls(self, mode: str) -> None:
         self.game_started = True
         # Disable dropdown
         self.gamemode_menu.config(state="disabled")
         self.start_button.config(state="disabled")
         # Determine mode specifics
-        mode = self.selected_gamemode.get()
         self.speed_mode_active = mode == "Speed"
         self.memorypattern_active = mode == "MemoryPattern"
         self.pause_mode_active = mode == "Pause"
-        # reset per-start counters
-        self.normal_rounds_done = 0
-        self.speed_round_index = 0
-        if hasattr(self, 'pause_rounds_done'):
-            self.pause_rounds_done = 0
-        if self.memorypattern_active:
-            # MemoryPattern flow: sequentially reveal serial, then pattern grid, then input
-            self.recall_time_ms = 5000
-            self.Seriallist = self.logic.generate_serial()
-            self.recall_start_time = time.perf_counter()
-            self._start_sequential_reveal(self._start_memorypattern)
-        elif self.pause_mode_active:
-            # Pause mode: sequentially reveal serial, then 5-second pause, then input
-            self.recall_time_ms = 5000
-            self.Seriallist = self.logic.generate_serial()
+
+    def _pending_session(self) -> Optional[dict]:
+        """The journal's interrupted session if the experimenter wants it resumed;
+        otherwise the journal is emptied for this run."""
+        if self.journal is None:
+            return None
+        pending = list(self.journal.pending().values())
+        if pending:
+            from tkinter import messagebox
+
+            state = pending[-1]
+            who = f" for {state['participant']}" if state.get("participant") else ""
+            if messagebox.askyesno("Resume session", f"{state['mode']}{who} was interrupted after "
+                                   f"{state.get('rounds_done', 0)} rounds. Resume it?"):
+                return state
+        self.journal.reset()
+        return None
+
+    def _resume(self, state: dict) -> None:
+        self.selected_gamemode.set(state["mode"])
+        self._lock_controls(state["mode"])
+        if not Recovery.resume(self.session, state, self.recorder):
+            self._finish_mode()
+
+    def _on_session_event(self, event: str, data: dict) -> None:
+        """Render session engine events; all timing and transitions happen in the engine."""
+        if event == "round":
+            plan = data["plan"]
+            self.Seriallist = plan.serial
+            self.recall_time_ms = plan.recall_time_ms
+            self.reveal_show_ms = plan.reveal_ms
+            self.reveal_gap_ms = 0
             self.recall_start_time = time.perf_counter()
-            self._start_sequential_reveal(self._start_pause_delay)
-        else:
-            if self.speed_mode_active:
-                # Per-number intervals from centralized schedule
-                self.speed_schedule_ms = SPEED_SCHEDULE_MS.copy()
-                self.recall_time_ms = self.speed_schedule_ms[0]
+            self.round_timings = {}
+        elif event == "state":
+            phase, handler = {
+                Session.REVEAL: ("reveal", self._start_sequential_reveal),
+                Session.PAUSE: ("pause", self._start_pause_delay),
+                Session.PATTERN_REVEAL: ("pattern", self._start_memorypattern),
+                Session.PATTERN_INPUT: (None, self._enable_pattern_clicks),
+                Session.INPUT: ("input", self._swap_to_inputs),
+                Session.DONE: (None, self._finish_mode),
+            }.get(data["new"], (None, None))
+            if handler is None:
+                return
+            if WIDGET_TIMING and phase is not None:
+                t0 = time.perf_counter()
+                handler()
+                self.root.update_idletasks()  # include geometry/layout work
+                self.round_timings[phase] = (time.perf_counter() - t0) * 1000.0
             else:
-                self.recall_time_ms = 5000
-            # Generate first serial (always regenerate at start)
-            self.Seriallist = self.logic.generate_serial()
-            self.recall_start_time = time.perf_counter()
-            # Sequential reveal then swap to inputs
-            self._start_sequential_reveal(self._swap_to_inputs)
+                handler()
+        elif event == "reveal":
+            self.reveal_label.config(text=str(data["value"]))
+            # Draw now, so the engine's measured onset includes the redraw
+            self.reveal_label.update_idletasks()
+        elif event == "pattern_light":
+            self._light_pattern_cell(data["cell"])
+        elif event == "pattern_click":
+            self._flash_pattern_cell(data["cell"], data["correct"])
+        elif event == "pattern_done":
+            self.pattern_click_enabled = False
+            self.feedback_label.config(text=f"Pattern complete (mistakes: {data['mistakes']}). Enter the serial.", fg="blue")
+        elif event == "result":
+            self._show_result(data["result"])
+            if KEYSTROKE_LOGGING:
+                self.logger.log_keystrokes(self.protocol.mode, self.protocol.attempt, self.keystrokes)
+            if WIDGET_TIMING:
+                self._log_widget_timing()
+
+    def _log_widget_timing(self) -> None:
+        """Append this round's per-phase widget times (ms) to WIDGET_TIMING_FILE."""
+        file_exists = os.path.exists(WIDGET_TIMING_FILE) and os.path.getsize(WIDGET_TIMING_FILE) > 0
+        with open(WIDGET_TIMING_FILE, mode="a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(["timestamp", "mode", "attempt"] + [f"{p}_ms" for p in WIDGET_TIMING_PHASES] + ["total_ms"])
+            times = [self.round_timings.get(p) for p in WIDGET_TIMING_PHASES]
+            writer.writerow(
+                [datetime.now().isoformat(), self.protocol.mode, self.protocol.attempt]
+                + ["" if t is None else f"{t:.3f}" for t in times]
+                + [f"{sum(t for t in times if t is not None):.3f}"]
+            )
 
     # _show_placeholders removed; sequential reveal is used instead
 
-    def _start_sequential_reveal(self, on_done: Callable[[], None]) -> None:
+    def _start_sequential_reveal(self) -> None:
         """
-        Show one number at a time with a delay between each.
-        For Normal/MemoryPattern: 3000ms per number.
-        For Speed: derive per-number interval from the schedule (total/len(serial)).
+        Show the reveal label; the engine's "reveal" events then show one number
+        at a time for self.reveal_show_ms each (NORMAL_REVEAL_MS, or the Speed
+        schedule's per-number interval).
         """
-        # Clean other frames
-        self._destroy_frames("input_frame", "pattern_frame", "buttons_frame", "placeholder_frame")
-
-        # Compute per-number interval/timings
-        if self.speed_mode_active:
-            # Use the per-number interval from the speed schedule directly (no gap in Speed mode)
-            self.reveal_show_ms = max(1, int(self.recall_time_ms))
-            self.reveal_gap_ms = 0
-        else:
-            # Normal and MemoryPattern (per-number duration, no gap)
-            self.reveal_show_ms = NORMAL_REVEAL_MS
-            self.reveal_gap_ms = 0
-
-        # Build a centered big label for reveal
-        self.placeholder_frame = tk.Frame(self.container)
-        self.placeholder_frame.pack(expand=True)
-        if self.reveal_label is not None:
-            try:
-                self.reveal_label.destroy()
-            except Exception:
-                pass
-        self.reveal_label = tk.Label(
-            self.placeholder_frame,
-            text="",
-            font=("Segoe UI", 64, "bold"),
-            width=6,
-            anchor="center",
-            bg="#ffffff",
-        )
-        self.reveal_label.pack(pady=20)
+        self.reveal_label.config(text="")
+        self._show_frames(self.placeholder_frame)
         self.feedback_label.config(text="Memorize the numbers...", fg="black")
 
-        # Start reveal loop (show phase then gap phase)
-        self.reveal_index = 0
-        def show_step():
-            if self.reveal_label is None:
-                return
-            if self.reveal_index >= len(self.Seriallist):
-                # No more numbers, finish
-                on_done()
-                return
-            num = self.Seriallist[self.reveal_index]
-            self.reveal_index += 1
-            # Show current number
-            self.reveal_label.config(text=str(num))
-            # After show duration, go to next
-            self.root.after(self.reveal_show_ms, show_step)
-
-        # Kick off immediately
-        show_step()
-
     def _validate_two_digits(self, proposed: str) -> bool:
         """
         Tkinter validatecommand receives the proposed value via %P.
@@ -216,72 +356,37 @@ class GUIMain():
         return proposed.isdigit() and len(proposed) <= 2
 
     def _swap_to_inputs(self) -> None:
-        # Remove placeholders
-        if self.placeholder_frame is not None:
-            self.placeholder_frame.destroy()
-            self.placeholder_frame = None
         self._show_input_fields()
 
     def _start_pause_delay(self) -> None:
-        """Handle the 5-second pause before showing input fields in Pause mode."""
-        # Remove placeholders/reveal elements
-        if self.placeholder_frame is not None:
-            self.placeholder_frame.destroy()
-            self.placeholder_frame = None
-        if self.reveal_label is not None:
-            try:
-                self.reveal_label.destroy()
-            except Exception:
-                pass
-            self.reveal_label = None
-        
-        # Show pause message
-        self.placeholder_frame = tk.Frame(self.container)
-        self.placeholder_frame.pack(expand=True)
-        
-        pause_label = tk.Label(
-            self.placeholder_frame,
-            text="Please wait...",
-            font=("Segoe UI", 32, "bold"),
-            fg="blue"
-        )
-        pause_label.pack(pady=20)
+        """Show the 5-second pause message before the input fields in Pause mode."""
+        self._show_frames(self.pause_frame)
         self.feedback_label.config(text="5 second pause before input", fg="blue")
-        
-        # After 5 seconds, show input fields
-        self.root.after(5000, self._swap_to_inputs)
 
     def _show_input_fields(self) -> None:
-        # Destroy pattern grid if present
-        self._destroy_frames("pattern_frame")
-        # Create inputs
-        self.input_frame = tk.Frame(self.container)
-        self.input_frame.pack()
-
-        vcmd = (self.root.register(self._validate_two_digits), "%P")
-        self.entries = []
-        for i in range(10):
-            ent = tk.Entry(
-                self.input_frame,
-                width=3,  # shows up to 2 digits comfortably
-                font=("Segoe UI", 18),
-                justify="center",
-                validate="key",
-                validatecommand=vcmd,
-            )
-            ent.grid(row=0, column=i, padx=6)
-            self.entries.append(ent)
+        # Reset the pooled boxes from the previous round
+        for ent in self.entries:
+            ent.delete(0, tk.END)
+        shown = min(len(self.Seriallist), len(self.entries)) or len(self.entries)
+        if shown != self.entries_shown:
+            for i, ent in enumerate(self.entries):
+                if i < shown:
+                    ent.grid()
+                else:
+                    ent.grid_remove()
+            self.entries_shown = shown
+        self._show_frames(self.input_frame, self.buttons_frame)
 
         if self.entries:
             self.entries[0].focus_set()
 
-        self.SubmitButton()
         self.input_start_time = time.perf_counter()
+        self.keystrokes.start()
 
     def get_values(self) -> List[int | None]:
-        """Return the 10 entered values as ints (0-99) or None if empty."""
+        """Return the entered values of the shown boxes as ints (0-99) or None if empty."""
         values: List[int | None] = []
-        for ent in self.entries:
+        for ent in self.entries[:self.entries_shown]:
             s = ent.get().strip()
             if s == "":
                 values.append(None)
@@ -292,22 +397,16 @@ class GUIMain():
                     values.append(None)
         return values
     
-    def SubmitButton(self):
-        if self.buttons_frame is not None:
-            self.buttons_frame.destroy()
-
-        self.buttons_frame = tk.Frame(self.container)
-        self.buttons_frame.pack(pady=10)
-
-        submit_btn = tk.Button(self.buttons_frame, text="Submit", command=self._on_submit)
-        submit_btn.pack()
-
     def _on_submit(self) -> None:
-        values = self.get_values()
-        
-        # Calculate correct numbers using proper free recall methodology
-        correct_numbers = self.logger.calculate_correct_numbers(self.Seriallist, values)
-        first_correct, last_correct = self.logger.calculate_first_last_correct(self.Seriallist, values)
+        if self.session.state != Session.INPUT:
+            return
+        self.keystrokes.stop()
+        # Scored and logged by the protocol; the "result" event brings the feedback
+        self.session.submit(self.get_values())
+
+    def _show_result(self, result) -> None:
+        correct_numbers = result.correct_numbers
+        first_correct, last_correct = result.first_correct, result.last_correct
         
         input_time = None
         if self.input_start_time is not None:
@@ -330,175 +429,44 @@ class GUIMain():
             color = "red"    # Poor performance (<40%)
             
         self.feedback_label.config(text=" | ".join(msg), fg=color)
-        
-        # Attempt counter
-        self.attempt += 1
-        
-        # Determine if pattern was correct (for MemoryPattern mode)
-        pattern_correct = None
-        if self.memorypattern_active:
-            # Compare entered pattern to the generated one
-            if hasattr(self, "pattern_game") and self.pattern_game is not None:
-                pattern_correct = self.pattern_entered == self.pattern_game.get_sequence()
-                
-        # Log using the new auto-calculate method (much simpler!)
-        self.logger.log_attempt_auto_calculate(
-            attempt=self.attempt,
-            mode=self.selected_gamemode.get(),
-            serial=self.Seriallist,
-            user_input=values,
-            speed_ms=self.recall_time_ms if self.speed_mode_active else None,
-            pattern_correct=pattern_correct,
-        )
-        # Update round counters and decide next action
-        if self.memorypattern_active:
-            self.memorypattern_rounds_done = getattr(self, 'memorypattern_rounds_done', 0) + 1
-            setattr(self, 'memorypattern_rounds_done', self.memorypattern_rounds_done)
-            if self.memorypattern_rounds_done >= 5:
-                self._finish_mode()
-                return
-        elif self.pause_mode_active:
-            self.pause_rounds_done = getattr(self, 'pause_rounds_done', 0) + 1
-            setattr(self, 'pause_rounds_done', self.pause_rounds_done)
-            if self.pause_rounds_done >= 5:
-                self._finish_mode()
-                return
-        elif self.speed_mode_active:
-            self.speed_round_index += 1
-            if self.speed_round_index >= len(self.speed_schedule_ms):
-                self._finish_mode()
-                return
-        else:
-            self.normal_rounds_done += 1
-            if self.normal_rounds_done >= self.normal_rounds_target:
-                self._finish_mode()
-                return
-        # Prepare next round after delay
-        self.root.after(3000, self._next_round)
-
-    def _next_round(self):
-        # Cleanup existing input frame
-        self._destroy_frames("input_frame")
-        if self.memorypattern_active:
-            # Start another MemoryPattern round: show serial, then pattern
-            if getattr(self, 'memorypattern_rounds_done', 0) >= 5:
-                self._finish_mode()
-                return
-            self.recall_time_ms = 5000
-            self.Seriallist = self.logic.generate_serial()
-            self.recall_start_time = time.perf_counter()
-            self._start_sequential_reveal(self._start_memorypattern)
-        elif self.pause_mode_active:
-            # Start another Pause round: show serial, then pause, then input
-            if getattr(self, 'pause_rounds_done', 0) >= 5:
-                self._finish_mode()
-                return
-            self.recall_time_ms = 5000
-            self.Seriallist = self.logic.generate_serial()
-            self.recall_start_time = time.perf_counter()
-            self._start_sequential_reveal(self._start_pause_delay)
-        else:
-            # Adjust speed mode timing using schedule
-            if self.speed_mode_active:
-                if self.speed_round_index >= len(self.speed_schedule_ms):
-                    self._finish_mode()
-                    return
-                self.recall_time_ms = self.speed_schedule_ms[self.speed_round_index]
-            else:
-                self.recall_time_ms = 5000
-            # Generate new serial
-            self.Seriallist = self.logic.generate_serial()
-            self.recall_start_time = time.perf_counter()
-            # Sequential reveal then inputs
-            self._start_sequential_reveal(self._swap_to_inputs)
 
     def _finish_mode(self):
-        # Clean up UI
-        self._destroy_frames("placeholder_frame")
-        if self.reveal_label is not None:
-            try:
-                self.reveal_label.destroy()
-            except Exception:
-                pass
-            self.reveal_label = None
-        self._destroy_frames("input_frame", "pattern_frame")
+        # Hide the round UI
+        self._show_frames()
         # Feedback and reset controls
-        mode = "MemoryPattern" if self.memorypattern_active else ("Speed" if self.speed_mode_active else ("Pause" if self.pause_mode_active else "Normal"))
+        mode = self.protocol.mode
         self.feedback_label.config(text=f"{mode} completed.", fg="purple")
+        self.logger.flush()
         self.gamemode_menu.config(state="normal")
         self.start_button.config(state="normal")
         self.game_started = False
 
     # ---------- MemoryPattern mode ----------
-    def _build_pattern_grid(self):
-        # Destroy numeric UI frames if present
-        if self.placeholder_frame is not None:
-            self.placeholder_frame.destroy()
-            self.placeholder_frame = None
-        if self.input_frame is not None:
-            self.input_frame.destroy()
-            self.input_frame = None
-        if self.buttons_frame is not None:
-            self.buttons_frame.destroy()
-            self.buttons_frame = None
-
-        if self.pattern_frame is None:
-            self.pattern_frame = tk.Frame(self.container)
-            self.pattern_frame.pack(pady=10)
-
-            self.pattern_buttons = []
-            for r in range(3):
-                for c in range(3):
-                    idx = r * 3 + c
-                    btn = tk.Button(
-                        self.pattern_frame,
-                        width=6,
-                        height=3,
-                        bg="#d9d9d9",
-                        activebackground="#cccccc",
-                        relief=tk.RAISED,
-                        command=lambda i=idx: self._on_pattern_click(i),
-                    )
-                    btn.grid(row=r, column=c, padx=6, pady=6)
-                    self.pattern_buttons.append(btn)
-
     def _start_memorypattern(self):
-        if self.pattern_game is None:
-            self.pattern_game = PatternGame()
-        self._build_pattern_grid()
-        # Generate a new sequence of length 6
-        seq = self.pattern_game.new_round(sequence_len=6)
-        self.pattern_entered = []
-        self.pattern_click_enabled = False
-        # Reveal the sequence
-        self._reveal_sequence(seq, step=0)
-
-    def _reveal_sequence(self, seq: List[int], step: int):
-        # Clear all to default
         for btn in self.pattern_buttons:
             btn.configure(bg="#d9d9d9")
-        if step >= len(seq):
-            # Reveal done, enable clicking
-            self.pattern_click_enabled = True
-            return
-        idx = seq[step]
-        # Highlight this cell
-        self.pattern_buttons[idx].configure(bg="#ffd54f")  # amber
-        # Schedule to unhighlight and move to next
-        self.root.after(self.pattern_reveal_delay_ms, lambda: self._after_reveal_gap(seq, step))
-
-    def _after_reveal_gap(self, seq: List[int], step: int):
-        # Turn all off again for the gap
+        self._show_frames(self.pattern_frame)
+        # The engine generated the sequence (PATTERN_LENGTH cells) and lights it via "pattern_light"
+        self.pattern_game = self.protocol.pattern_game
+        self.pattern_entered = self.protocol.pattern_entered
+        self.pattern_click_enabled = False
+
+    def _light_pattern_cell(self, idx: Optional[int]):
+        # Clear all to default, then highlight the lit cell (None = gap / reveal done)
         for btn in self.pattern_buttons:
             btn.configure(bg="#d9d9d9")
-        self.root.after(self.pattern_gap_ms, lambda: self._reveal_sequence(seq, step + 1))
+        if idx is not None:
+            self.pattern_buttons[idx].configure(bg="#ffd54f")  # amber
 
+    def _enable_pattern_clicks(self):
+        self.pattern_click_enabled = True
 
     def _on_pattern_click(self, idx: int):
         if not self.pattern_click_enabled or self.pattern_game is None:
             return
-        correct, done = self.pattern_game.submit_click(idx)
-        self.pattern_entered.append(idx)
+        self.session.pattern_click(idx)
+
+    def _flash_pattern_cell(self, idx: int, correct: bool):
         if correct:
             # Flash green briefly
             self.pattern_buttons[idx].configure(bg="#a5d6a7")
@@ -508,13 +476,13 @@ class GUIMain():
             self.pattern_buttons[idx].configure(bg="#ef9a9a")
             self.root.after(200, lambda b=self.pattern_buttons[idx]: b.configure(bg="#d9d9d9"))
 
-        # Always proceed after as many clicks as the pattern length, regardless of correctness
-        pattern_length = len(self.pattern_game.get_sequence())
-        if len(self.pattern_entered) >= pattern_length:
-            self.pattern_click_enabled = False
-            self.feedback_label.config(text=f"Pattern complete (mistakes: {self.pattern_game.mistakes}). Enter the serial.", fg="blue")
-            self.root.after(500, self._show_input_fields)
 
+    def _on_close(self) -> None:
+        self.session.cancel()
+        self.logger.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.root.destroy()
 
     def run(self) -> None:
         self.root.mainloop()
@@ -0,0 +1,197 @@
+"""Vectorized scoring of many free-recall attempts at once.
+
+The per-attempt methods on ``GameLogger`` are the reference implementation;
+``score_batch`` returns the same metrics for whole N x W matrices of serials
+and responses, with ``EMPTY`` marking fields the participant left blank.
+
+Run as a script to benchmark attempts/sec against the per-attempt methods:
+
+    python -m FreeRecall.Logging.batch_scoring --attempts 1000000
+"""
+import argparse
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .logger import GameLogger
+except ImportError:
+    from logger import GameLogger
+
+# Sentinel for an empty input field (None in the per-attempt API)
+EMPTY = -1
+# Upper bound on rows x distinct-values cells counted per vectorized step
+DEFAULT_CELL_BUDGET = 1 << 23
+
+
+def to_matrix(rows: Sequence[Sequence[Optional[int]]], width: Optional[int] = None, empty: int = EMPTY) -> np.ndarray:
+    """Pack per-attempt lists (None for empty fields) into an int matrix.
+
+    Shorter rows are padded with ``empty``. ``width`` defaults to the longest row.
+    """
+    if width is None:
+        width = max((len(r) for r in rows), default=0)
+    out = np.full((len(rows), width), empty, dtype=np.int64)
+    for i, row in enumerate(rows):
+        if len(row) > width:
+            raise ValueError(f"Row {i} has {len(row)} values, more than width {width}")
+        out[i, :len(row)] = [empty if v is None else v for v in row]
+    return out
+
+
+def _row_counts(values: np.ndarray, valid: np.ndarray, low: int, span: int) -> np.ndarray:
+    """Per-row histogram of the valid values: an (n_rows, span) count matrix.
+
+    This is the vectorized form of building one Counter per attempt.
+    """
+    n_rows = values.shape[0]
+    codes = (values - low) + (np.arange(n_rows, dtype=np.int64) * span)[:, None]
+    return np.bincount(codes[valid], minlength=n_rows * span).reshape(n_rows, span)
+
+
+def _score_chunk(serials: np.ndarray, responses: np.ndarray, empty: int, low: int, span: int) -> Dict[str, np.ndarray]:
+    n_rows = serials.shape[0]
+    s_valid = serials != empty
+    r_valid = responses != empty
+    serial_len = s_valid.sum(axis=1)
+
+    # Each response value earns credit at most as often as it occurs in the serial
+    correct = np.minimum(
+        _row_counts(serials, s_valid, low, span),
+        _row_counts(responses, r_valid, low, span),
+    ).sum(axis=1)
+
+    has_serial = serial_len > 0
+    if serials.shape[1]:
+        first = serials[:, 0]
+        last = serials[np.arange(n_rows), np.maximum(serial_len - 1, 0)]
+    else:
+        first = last = np.full(n_rows, empty)
+    first_correct = has_serial & ((responses == first[:, None]) & r_valid).any(axis=1)
+    last_correct = has_serial & ((responses == last[:, None]) & r_valid).any(axis=1)
+
+    width = responses.shape[1]
+    filled = r_valid.sum(axis=1)
+    completion = filled / width if width else np.zeros(n_rows)
+
+    return {
+        "correct_numbers": correct,
+        "wrong_numbers": serial_len - correct,
+        "first_correct": first_correct,
+        "last_correct": last_correct,
+        "empty_fields": width - filled,
+        "completion_rate": completion,
+    }
+
+
+def score_batch(
+    serials: np.ndarray,
+    responses: np.ndarray,
+    empty: int = EMPTY,
+    cell_budget: int = DEFAULT_CELL_BUDGET,
+) -> Dict[str, np.ndarray]:
+    """Score N attempts in one pass.
+
+    serials: N x L int matrix; trailing ``empty`` cells pad shorter serials.
+    responses: N x W int matrix, ``empty`` where a field was left blank
+    (W is the number of input fields, so empty_fields/completion_rate match
+    ``GameLogger`` when each row is the full list of fields).
+
+    Returns a dict of length-N arrays keyed by log column name:
+    correct_numbers, wrong_numbers, first_correct, last_correct,
+    empty_fields, completion_rate.
+    """
+    serials = np.asarray(serials, dtype=np.int64)
+    responses = np.asarray(responses, dtype=np.int64)
+    if serials.ndim != 2 or responses.ndim != 2:
+        raise ValueError("serials and responses must be 2-D matrices")
+    if serials.shape[0] != responses.shape[0]:
+        raise ValueError("serials and responses must have the same number of rows")
+
+    # Value range shared by all chunks so the per-row histograms line up
+    valid_values = [m[m != empty] for m in (serials, responses)]
+    low = min((int(v.min()) for v in valid_values if v.size), default=0)
+    high = max((int(v.max()) for v in valid_values if v.size), default=0)
+    span = high - low + 1
+    chunk_rows = max(1, cell_budget // span)
+
+    parts = [
+        _score_chunk(serials[start:start + chunk_rows], responses[start:start + chunk_rows], empty, low, span)
+        for start in range(0, serials.shape[0], chunk_rows)
+    ]
+    if not parts:
+        parts = [_score_chunk(serials, responses, empty, low, span)]
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def _synthetic_attempts(n: int, seed: int):
+    """Random 10-number serials and 10-field responses mixing hits, misses and blanks."""
+    rng = np.random.default_rng(seed)
+    serials = rng.integers(1, 100, size=(n, 10))
+    # Recall some serial items (in any order), invent others, leave some blank
+    picks = np.take_along_axis(serials, rng.integers(0, 10, size=(n, 10)), axis=1)
+    invented = rng.integers(1, 100, size=(n, 10))
+    kind = rng.random((n, 10))
+    responses = np.where(kind < 0.5, picks, np.where(kind < 0.8, invented, EMPTY))
+    return serials, responses
+
+
+def _per_attempt_rows(serials: np.ndarray, responses: np.ndarray) -> List[tuple]:
+    logger = GameLogger()
+    rows = []
+    for serial, resp in zip(serials.tolist(), responses.tolist()):
+        user_input = [None if v == EMPTY else v for v in resp]
+        first, last = logger.calculate_first_last_correct(serial, user_input)
+        rows.append((
+            logger.calculate_correct_numbers(serial, user_input),
+            logger.calculate_wrong_numbers(serial, user_input),
+            first,
+            last,
+            logger.calculate_empty_fields(user_input),
+            logger.calculate_completion_rate(user_input),
+        ))
+    return rows
+
+
+def benchmark(attempts: int = 1_000_000, reference_attempts: int = 20_000, seed: int = 0) -> Dict[str, float]:
+    """Time score_batch against the per-attempt methods and check they agree."""
+    serials, responses = _synthetic_attempts(attempts, seed)
+
+    t0 = time.perf_counter()
+    scores = score_batch(serials, responses)
+    batch_s = time.perf_counter() - t0
+
+    n_ref = min(reference_attempts, attempts)
+    t0 = time.perf_counter()
+    reference = _per_attempt_rows(serials[:n_ref], responses[:n_ref])
+    reference_s = time.perf_counter() - t0
+
+    keys = ["correct_numbers", "wrong_numbers", "first_correct", "last_correct", "empty_fields", "completion_rate"]
+    batch_rows = list(zip(*(scores[k][:n_ref].tolist() for k in keys)))
+    if batch_rows != reference:
+        raise AssertionError("score_batch disagrees with the per-attempt GameLogger methods")
+
+    return {
+        "attempts": attempts,
+        "batch_attempts_per_s": attempts / batch_s if batch_s else float("inf"),
+        "per_attempt_attempts_per_s": n_ref / reference_s if reference_s else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized GameLogger scoring.")
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--reference-attempts", type=int, default=20_000,
+                        help="attempts scored with the per-attempt methods for comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = benchmark(args.attempts, args.reference_attempts, args.seed)
+    print(f"Scored {result['attempts']} attempts (results identical to per-attempt methods)")
+    print(f"  batch:       {result['batch_attempts_per_s']:,.0f} attempts/s")
+    print(f"  per-attempt: {result['per_attempt_attempts_per_s']:,.0f} attempts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Columnar binary session store written next to the game_log CSVs.
+
+A store is a directory (``game_log_<mode>.cols``) holding ``schema.json`` and
+one raw little-endian file per column. Fixed-width columns such as ``serial``
+and ``user_input`` are int8 matrices with ``EMPTY`` (-1) for blank fields, so
+analysis code can memory-map them instead of re-parsing space-joined strings.
+
+Writing only needs the standard library (the GUI does not depend on numpy);
+reading and the CSV converter use numpy:
+
+    python -m FreeRecall.Logging.columnar                 # convert FreeRecall/data/game_log_*.csv
+    python -m FreeRecall.Logging.columnar a.csv b.csv --out-dir /tmp/cols
+"""
+import csv
+import json
+import os
+import struct
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pathlib is only needed by the converter CLI, not on GUI startup
+    from pathlib import Path
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 1
+EMPTY = -1
+SERIAL_WIDTH = 10
+
+# numpy dtype string -> struct code
+_STRUCT_CODES = {"<i1": "b", "<i2": "h", "<i4": "i", "<i8": "q", "<f8": "d"}
+
+# (name, dtype, width); width 0 means a scalar per row
+GAME_LOG_COLUMNS: List[Tuple[str, str, int]] = [
+    ("timestamp", "<f8", 0),             # POSIX seconds, UTC
+    ("attempt", "<i4", 0),
+    ("serial", "<i1", SERIAL_WIDTH),
+    ("user_input", "<i1", SERIAL_WIDTH),
+    ("correct_numbers", "<i1", 0),
+    ("wrong_numbers", "<i1", 0),
+    ("first_correct", "<i1", 0),
+    ("last_correct", "<i1", 0),
+    ("pattern_correct", "<i1", 0),       # -1 when not applicable
+    ("correct_numbers_total", "<i4", 0),
+    ("first_correct_total", "<i4", 0),
+    ("last_correct_total", "<i4", 0),
+    ("speed_ms", "<i4", 0),              # -1 when not applicable
+]
+
+
+def _column_file(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.bin")
+
+
+class ColumnStore:
+    """Append-only writer for one columnar store directory."""
+
+    def __init__(self, path: str, columns: List[Tuple[str, str, int]] = GAME_LOG_COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, SCHEMA_FILE)
+        schema = {
+            "version": FORMAT_VERSION,
+            "columns": [{"name": n, "dtype": d, "width": w} for n, d, w in self.columns],
+        }
+        if os.path.exists(schema_path):
+            with open(schema_path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing.get("columns") != schema["columns"]:
+                raise ValueError(f"Schema of {path} does not match the requested columns")
+        else:
+            with open(schema_path, "w", encoding="utf-8") as f:
+                json.dump(schema, f, indent=1)
+
+        self._packers = []
+        for name, dtype, width in self.columns:
+            self._packers.append(struct.Struct(f"<{max(width, 1)}{_STRUCT_CODES[dtype]}"))
+        self._truncate_partial_rows()
+        self._handles = [open(_column_file(path, name), "ab") for name, _, _ in self.columns]
+
+    def _truncate_partial_rows(self) -> None:
+        """Cut every column back to the last complete row (e.g. after a crash mid-append)."""
+        counts = []
+        for (name, _, _), packer in zip(self.columns, self._packers):
+            file = _column_file(self.path, name)
+            size = os.path.getsize(file) if os.path.exists(file) else 0
+            counts.append(size // packer.size)
+        rows = min(counts)
+        for (name, _, _), packer in zip(self.columns, self._packers):
+            file = _column_file(self.path, name)
+            if os.path.exists(file) and os.path.getsize(file) != rows * packer.size:
+                os.truncate(file, rows * packer.size)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Append one row; matrix columns take a sequence of exactly `width` values."""
+        chunks = []
+        for (name, _, width), packer in zip(self.columns, self._packers):
+            value = row[name]
+            chunks.append(packer.pack(*value) if width else packer.pack(value))
+        for handle, chunk in zip(self._handles, chunks):
+            handle.write(chunk)
+
+    def flush(self) -> None:
+        for handle in self._handles:
+            handle.flush()
+
+    def close(self) -> None:
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+
+
+def read_store(path: str) -> Dict[str, Any]:
+    """Memory-map every column of a store (read-only, zero-copy).
+
+    Returns {name: numpy array}; matrix columns have shape (rows, width).
+    """
+    import numpy as np
+
+    with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    specs = [(c["name"], np.dtype(c["dtype"]), c["width"]) for c in schema["columns"]]
+    rows = min(
+        os.path.getsize(_column_file(path, name)) // (dtype.itemsize * max(width, 1))
+        for name, dtype, width in specs
+    )
+    out = {}
+    for name, dtype, width in specs:
+        shape = (rows, width) if width else (rows,)
+        if rows == 0:
+            out[name] = np.empty(shape, dtype=dtype)
+        else:
+            out[name] = np.memmap(_column_file(path, name), dtype=dtype, mode="r", shape=shape)
+    return out
+
+
+def pad_numbers(values: List[Optional[int]], width: int = SERIAL_WIDTH) -> List[int]:
+    """None -> EMPTY, padded with EMPTY to `width`."""
+    if len(values) > width:
+        raise ValueError(f"{len(values)} values do not fit a width of {width}")
+    return [EMPTY if v is None else v for v in values] + [EMPTY] * (width - len(values))
+
+
+def parse_number_field(text: str) -> List[Optional[int]]:
+    """Inverse of GameLogger's space-joined serial/user_input fields ('' -> None)."""
+    if not text:
+        return []
+    return [int(tok) if tok.strip() else None for tok in text.split(" ")]
+
+
+def utc_seconds(ts: datetime) -> float:
+    """POSIX seconds for the naive UTC datetimes GameLogger writes."""
+    return ts.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _optional_int(text: Optional[str]) -> int:
+    if text is None or text.strip() == "":
+        return EMPTY
+    return int(float(text))
+
+
+def convert_csv(csv_path: "Path", out_dir: "Path") -> Tuple["Path", int]:
+    """Convert one game_log CSV (any historical header) into `<stem>.cols`.
+
+    Metrics and running totals are recomputed from serial/user_input with the
+    batch scorer, since older files logged different metric columns.
+    """
+    import numpy as np
+    try:
+        from .batch_scoring import score_batch
+    except ImportError:
+        from batch_scoring import score_batch
+
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        records = list(csv.DictReader(f))
+
+    serials = np.array([pad_numbers(parse_number_field(r["serial"])) for r in records], dtype=np.int64)
+    responses = np.array([pad_numbers(parse_number_field(r["user_input"])) for r in records], dtype=np.int64)
+    serials = serials.reshape(len(records), SERIAL_WIDTH)
+    responses = responses.reshape(len(records), SERIAL_WIDTH)
+    scores = score_batch(serials, responses)
+    # Running totals restart with each GUI session, i.e. whenever the attempt counter does
+    attempts = np.array([int(r["attempt"]) for r in records], dtype=np.int64)
+    new_session = np.ones(len(records), dtype=bool)
+    new_session[1:] = attempts[1:] <= attempts[:-1]
+    session_start = np.maximum.accumulate(np.where(new_session, np.arange(len(records)), 0))
+    totals = {}
+    for key in ("correct_numbers", "first_correct", "last_correct"):
+        running = np.cumsum(scores[key].astype(np.int64))
+        before = np.concatenate([[0], running])[session_start]
+        totals[f"{key}_total"] = running - before
+
+    target = out_dir / f"{csv_path.stem}.cols"
+    if target.exists():
+        for child in target.iterdir():
+            child.unlink()
+    store = ColumnStore(str(target))
+    try:
+        for i, r in enumerate(records):
+            store.append({
+                "timestamp": utc_seconds(datetime.fromisoformat(r["timestamp"])),
+                "attempt": int(attempts[i]),
+                "serial": serials[i].tolist(),
+                "user_input": responses[i].tolist(),
+                "correct_numbers": int(scores["correct_numbers"][i]),
+                "wrong_numbers": int(scores["wrong_numbers"][i]),
+                "first_correct": int(scores["first_correct"][i]),
+                "last_correct": int(scores["last_correct"][i]),
+                "pattern_correct": _optional_int(r.get("pattern_correct")),
+                "correct_numbers_total": int(totals["correct_numbers_total"][i]),
+                "first_correct_total": int(totals["first_correct_total"][i]),
+                "last_correct_total": int(totals["last_correct_total"][i]),
+                "speed_ms": _optional_int(r.get("speed_ms")),
+            })
+    finally:
+        store.close()
+    return target, len(records)
+
+
+def main():
+    import argparse  # CLI only, like pathlib
+    from pathlib import Path
+
+    default_dir = Path(__file__).resolve().parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Convert game_log CSVs into columnar stores.")
+    parser.add_argument("csv", nargs="*", type=Path, help="CSV files (default: data/game_log_*.csv)")
+    parser.add_argument("--out-dir", type=Path, default=None, help="default: next to each CSV")
+    args = parser.parse_args()
+
+    paths = args.csv or sorted(default_dir.glob("game_log_*.csv"))
+    for csv_path in paths:
+        out_dir = args.out_dir or csv_path.parent
+        out_dir.mkdir(parents=True, exist_ok=True)
+        target, rows = convert_csv(csv_path, out_dir)
+        print(f"{csv_path.name}: {rows} rows -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import atexit
+import csv
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+class _OpenFile:
+    def __init__(self, path: str):
+        self.handle = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.handle)
+        self.pending: List[Sequence[Any]] = []
+
+
+class BufferedCSVWriter:
+    """Append rows to CSV files through handles that stay open between rows.
+
+    Rows are buffered in memory and written when `flush_rows` rows are
+    pending or `flush_interval_s` seconds have passed since the last flush,
+    and on close() (registered with atexit).
+
+    fsync policy:
+    - "never":  flush() hands rows to the OS only; a power loss can drop them.
+    - "flush":  every flush() also fsyncs, so flushed rows survive a crash.
+    - "always": every row is written and fsynced immediately (no batching).
+    """
+
+    def __init__(self, flush_rows: int = 64, flush_interval_s: float = 2.0, fsync: str = "flush"):
+        if flush_rows <= 0:
+            raise ValueError("flush_rows must be > 0")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self._files: Dict[str, _OpenFile] = {}
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Background flusher so a lone row does not wait for the next one
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        atexit.register(self.close)
+
+    def write_row(self, path: str, row: Sequence[Any], header: Optional[Sequence[str]] = None) -> None:
+        """Queue one row; `header` is written first if the file is new or empty."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BufferedCSVWriter is closed")
+            f = self._files.get(path)
+            if f is None:
+                # Checked once per path instead of once per row
+                is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+                f = self._files[path] = _OpenFile(path)
+                if is_new and header is not None:
+                    f.pending.append(list(header))
+                    self._pending_rows += 1
+            f.pending.append(row)
+            self._pending_rows += 1
+            if (
+                self.fsync == "always"
+                or self._pending_rows >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            ):
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval_s > 0:
+                self._timer = threading.Thread(target=self._flush_loop, daemon=True)
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write all pending rows (and fsync unless the policy is "never")."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and close every handle. Safe to call more than once."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            for f in self._files.values():
+                f.handle.close()
+            self._files.clear()
+            self._closed = True
+        self._stop.set()
+        atexit.unregister(self.close)
+
+    def _flush_locked(self) -> None:
+        for f in self._files.values():
+            if not f.pending:
+                continue
+            f.writer.writerows(f.pending)
+            f.pending.clear()
+            f.handle.flush()
+            if self.fsync != "never":
+                os.fsync(f.handle.fileno())
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending_rows and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._flush_locked()
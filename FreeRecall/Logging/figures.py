@@ -0,0 +1,296 @@
+"""Render the report figures (confidence intervals, histograms, speed-up graph) headless, with a cache.
+
+The archive is read once: study_analysis scores every game_log file in worker
+processes and merges the per-file statistics. Each figure is then reduced to
+a small JSON payload holding exactly the numbers it draws:
+
+    ci_modes.png              mean correct numbers per mode, 95% CI
+    first_last.png            first / last number recalled rate per mode, 95% CI
+    speedup.png               mean correct numbers per Speed step (ms per number), 95% CI
+    ci_<mode>.png             per-participant means of a mode, 95% CI over attempts
+    hist_<mode>.png           correct numbers histogram, one series per Speed step
+    spc_<mode>.png            serial-position curve, one series per Speed step
+
+Attempts are clustered within participants, so the mode and step intervals
+are t intervals over participant means (StudyTables.study_rows); only the
+per-participant bars use the participant's own attempts.
+
+A figure's cache key is the SHA1 of its payload and the renderer version;
+the keys of the last render are kept in ``figures.json`` next to the images.
+Only figures whose key changed (or whose image is gone) are rendered again,
+in parallel processes on the non-interactive Agg backend, so adding one
+participant redraws just the figures that participant changes.
+
+matplotlib is only needed once something has to be drawn; ``--dry-run``
+lists the stale figures without it:
+
+    python -m FreeRecall.Logging.figures --out-dir figures
+    python -m FreeRecall.Logging.figures --out-dir figures --dry-run
+    python -m FreeRecall.Logging.figures --out-dir figures --force --workers 4
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .columnar import EMPTY
+    from .recall_analysis import LOG_NAME
+    from .running_stats import ALL_PARTICIPANTS
+    from .study_analysis import ALL_STEPS, StudyTables, analyze_files, t_critical_95
+except ImportError:
+    from columnar import EMPTY
+    from recall_analysis import LOG_NAME
+    from running_stats import ALL_PARTICIPANTS
+    from study_analysis import ALL_STEPS, StudyTables, analyze_files, t_critical_95
+
+RENDER_VERSION = 1  # bump when a renderer changes, so every figure is drawn again
+MANIFEST = "figures.json"
+
+# (file name, renderer, payload)
+FigureSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def _number(x: float) -> Optional[float]:
+    """JSON-safe float: nan becomes None, the rest is rounded so float noise
+    from merge order does not change a figure's key."""
+    return None if x is None or math.isnan(x) else round(float(x), 9)
+
+
+def _ci(moments) -> Dict[str, Any]:
+    """Mean and t margin of one participant's attempts."""
+    margin = t_critical_95(moments.n - 1) * moments.std / math.sqrt(moments.n) if moments.n > 1 else math.nan
+    return {"n": moments.n, "mean": _number(moments.mean), "margin": _number(margin)}
+
+
+def _study_ci(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """(mode, speed_ms cell) -> mean and t margin over participant means, from study_rows()."""
+    return {(r["mode"], r["speed_ms"]): {"n": r["participants"], "mean": _number(r["participant_mean"]),
+                                         "margin": _number(r["ci95_high"] - r["participant_mean"])}
+            for r in rows}
+
+
+def figure_specs(tables: StudyTables) -> List[FigureSpec]:
+    """Every report figure as (file name, renderer, payload)."""
+    modes = sorted({mode for mode, _, _ in tables.stats})
+    correct = _study_ci(tables.study_rows())
+    rates = {name: _study_ci(tables.study_rows(f"{name}_correct")) for name in ("first", "last")}
+    specs: List[FigureSpec] = [
+        ("ci_modes.png", "bars", {
+            "title": "Correct numbers per mode (95% CI over participants)", "ylabel": "correct numbers",
+            "bars": [dict(correct[(m, "")], label=m) for m in modes],
+        }),
+        ("first_last.png", "grouped_bars", {
+            "title": "First and last number recalled (95% CI over participants)", "ylabel": "rate",
+            "labels": modes,
+            "series": {name: [by_mode[(m, "")] for m in modes] for name, by_mode in rates.items()},
+        }),
+    ]
+    steps = sorted(speed for mode, who, speed in tables.stats
+                   if who == ALL_PARTICIPANTS and speed not in (ALL_STEPS, EMPTY) and mode == "speed")
+    if steps:
+        specs.append(("speedup.png", "line_ci", {
+            "title": "Correct numbers over speed-up (95% CI over participants)", "xlabel": "ms per number",
+            "ylabel": "correct numbers",
+            "x": steps,
+            "points": [correct[("speed", str(s))] for s in steps],
+        }))
+    for mode in modes:
+        people = sorted(who for m, who, speed in tables.stats
+                        if m == mode and who != ALL_PARTICIPANTS and speed == ALL_STEPS)
+        specs.append((f"ci_{mode}.png", "bars", {
+            "title": f"{mode}: correct numbers per participant (95% CI)", "ylabel": "correct numbers",
+            "bars": [dict(_ci(tables.stats[(mode, p, ALL_STEPS)].metrics["correct_numbers"].moments), label=p)
+                     for p in people],
+        }))
+        mode_steps = sorted(speed for m, who, speed in tables.stats
+                            if m == mode and who == ALL_PARTICIPANTS and speed != ALL_STEPS) or [ALL_STEPS]
+        specs.append((f"hist_{mode}.png", "histogram", {
+            "title": f"{mode}: correct numbers", "xlabel": "correct numbers", "ylabel": "attempts",
+            "series": {_step_label(s): [[round(v), c] for v, c in
+                                        tables.stats[(mode, ALL_PARTICIPANTS, s)]
+                                        .metrics["correct_numbers"].sketch.histogram()]
+                       for s in mode_steps},
+        }))
+        curves = {s: c for (m, who, s), c in sorted(tables.curves.items()) if m == mode and who == ALL_PARTICIPANTS}
+        if curves:
+            specs.append((f"spc_{mode}.png", "curves", {
+                "title": f"{mode}: serial-position curve", "xlabel": "serial position", "ylabel": "P(recalled)",
+                "series": {_step_label(s): [_number(v) for v in c.spc()] for s, c in curves.items()},
+            }))
+    return specs
+
+
+def _step_label(speed: int) -> str:
+    return "all" if speed in (ALL_STEPS, EMPTY) else f"{speed} ms"
+
+
+def figure_key(spec: FigureSpec) -> str:
+    name, renderer, payload = spec
+    text = json.dumps([RENDER_VERSION, renderer, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # no display: render to files only
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _draw_bars(ax, p: Dict[str, Any]) -> None:
+    bars = p["bars"]
+    ax.bar(range(len(bars)), [b["mean"] or 0 for b in bars],
+           yerr=[b["margin"] or 0 for b in bars], capsize=4)
+    ax.set_xticks(range(len(bars)))
+    ax.set_xticklabels([f"{b['label']}\nn={b['n']}" for b in bars])
+
+
+def _draw_grouped_bars(ax, p: Dict[str, Any]) -> None:
+    width = 0.8 / len(p["series"])
+    for i, (name, points) in enumerate(p["series"].items()):
+        xs = [x + (i - (len(p["series"]) - 1) / 2) * width for x in range(len(p["labels"]))]
+        ax.bar(xs, [q["mean"] or 0 for q in points], width, yerr=[q["margin"] or 0 for q in points],
+               capsize=3, label=name)
+    ax.set_xticks(range(len(p["labels"])))
+    ax.set_xticklabels(p["labels"])
+    ax.legend()
+
+
+def _draw_line_ci(ax, p: Dict[str, Any]) -> None:
+    ax.errorbar(p["x"], [q["mean"] for q in p["points"]], yerr=[q["margin"] or 0 for q in p["points"]],
+                marker="o", capsize=4)
+    ax.invert_xaxis()  # faster presentation to the right
+
+
+def _draw_histogram(ax, p: Dict[str, Any]) -> None:
+    width = 0.8 / len(p["series"])
+    for i, (label, counts) in enumerate(p["series"].items()):
+        ax.bar([v + (i - (len(p["series"]) - 1) / 2) * width for v, _ in counts], [c for _, c in counts],
+               width, label=label)
+    if len(p["series"]) > 1:
+        ax.legend()
+
+
+def _draw_curves(ax, p: Dict[str, Any]) -> None:
+    for label, values in p["series"].items():
+        ax.plot(range(1, len(values) + 1), [math.nan if v is None else v for v in values], marker="o", label=label)
+    ax.set_ylim(0, 1)
+    if len(p["series"]) > 1:
+        ax.legend()
+
+
+RENDERERS = {
+    "bars": _draw_bars,
+    "grouped_bars": _draw_grouped_bars,
+    "line_ci": _draw_line_ci,
+    "histogram": _draw_histogram,
+    "curves": _draw_curves,
+}
+
+
+def render(task: Tuple[FigureSpec, str]) -> str:
+    """Draw one figure into out_dir (written atomically); returns its file name."""
+    (name, renderer, payload), out_dir = task
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(6.4, 4.0))
+    try:
+        RENDERERS[renderer](ax, payload)
+        ax.set_title(payload["title"])
+        ax.set_xlabel(payload.get("xlabel", ""))
+        ax.set_ylabel(payload.get("ylabel", ""))
+        fig.tight_layout()
+        path = os.path.join(out_dir, name)
+        tmp = path + ".tmp.png"
+        fig.savefig(tmp, dpi=120)
+        os.replace(tmp, path)
+    finally:
+        plt.close(fig)
+    return name
+
+
+def _load_manifest(out_dir: Path) -> Dict[str, str]:
+    try:
+        with open(out_dir / MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(out_dir: Path, keys: Dict[str, str]) -> None:
+    tmp = out_dir / (MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(keys, f, indent=1, sort_keys=True)
+    os.replace(tmp, out_dir / MANIFEST)
+
+
+def stale_figures(specs: Sequence[FigureSpec], out_dir: Path, force: bool = False) -> List[FigureSpec]:
+    """The specs whose key differs from the manifest or whose image is missing."""
+    manifest = {} if force else _load_manifest(out_dir)
+    return [spec for spec in specs
+            if manifest.get(spec[0]) != figure_key(spec) or not (out_dir / spec[0]).exists()]
+
+
+def build_figures(specs: Sequence[FigureSpec], out_dir: Path, workers: Optional[int] = None,
+                  force: bool = False) -> Dict[str, int]:
+    """Render the stale figures in parallel and update the manifest; counts of
+    rendered, cached and removed (no longer produced) figures."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stale = stale_figures(specs, out_dir, force)
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    tasks = [(spec, str(out_dir)) for spec in stale]
+    if workers <= 1:
+        list(map(render, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render, tasks))
+    keys = {spec[0]: figure_key(spec) for spec in specs}
+    removed = 0
+    for name in set(_load_manifest(out_dir)) - set(keys):
+        try:
+            os.remove(out_dir / name)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    _save_manifest(out_dir, keys)
+    return {"rendered": len(stale), "cached": len(specs) - len(stale), "removed": removed}
+
+
+def main() -> None:
+    default_dir = Path(__file__).resolve().parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Render the report figures from game_log CSVs, re-drawing only what changed.")
+    parser.add_argument("paths", nargs="*", type=Path, help="game_log CSVs (default: data/game_log_*.csv)")
+    parser.add_argument("--out-dir", type=Path, default=Path("figures"), help="image and manifest directory")
+    parser.add_argument("--workers", type=int, default=None, help="processes for reading and for rendering")
+    parser.add_argument("--force", action="store_true", help="render every figure, ignoring the manifest")
+    parser.add_argument("--dry-run", action="store_true", help="only list the figures that would be rendered")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(p for p in default_dir.glob("game_log_*.csv") if LOG_NAME.match(p.name))
+    t0 = time.perf_counter()
+    specs = figure_specs(StudyTables(analyze_files(paths, args.workers)))
+    t_read = time.perf_counter() - t0
+    stale = stale_figures(specs, args.out_dir, args.force)
+    if args.dry_run:
+        print(f"{len(paths)} files read in {t_read:.2f}s; {len(stale)} of {len(specs)} figures to render")
+        for name, _, _ in stale:
+            print(f"  {name}")
+        return
+    if stale:
+        try:
+            _pyplot()
+        except ImportError:
+            raise SystemExit("Rendering figures needs matplotlib (pip install matplotlib); "
+                             "--dry-run lists them without it.")
+    counts = build_figures(specs, args.out_dir, args.workers, args.force)
+    print(f"{len(paths)} files read in {t_read:.2f}s; rendered {counts['rendered']}, cached {counts['cached']}, "
+          f"removed {counts['removed']} figures in {args.out_dir} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
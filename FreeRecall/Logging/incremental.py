@@ -0,0 +1,381 @@
+"""Incremental analysis of a game_log data folder: only new rows are read.
+
+GameLogger only ever appends to its CSVs, so a nightly analysis does not have
+to re-read the whole history. For every game_log file the state remembers how
+far it was read (byte offset of the last complete row), a hash of the header
+line and a hash of the bytes just before that offset, plus the file's partial
+aggregates:
+
+- running statistics of (mode, participant) (running_stats.GroupStats:
+  Welford moments, quantile sketches, serial-position counts),
+- the SPC / PFR / lag-CRP counts per Speed schedule step
+  (recall_analysis.CurveCounts).
+
+On the next run a file whose header and tail hashes still match is read from
+its offset only, and the new rows' aggregates are merged into the cached
+ones. A file that shrank or whose hashes changed (rewritten, header
+upgraded) is read again from the start, a file that disappeared is dropped.
+A last line without its newline is counted if it has every column (a
+hand-edited file) but not cached, since it may still be being written.
+Study-level tables are then merged from the per-file partials, so a run costs
+the new bytes plus one merge, not the whole archive:
+
+    python -m FreeRecall.Logging.incremental                      # FreeRecall/data, state kept there
+    python -m FreeRecall.Logging.incremental --out-curves curves.csv --out-summary summary.csv
+    python -m FreeRecall.Logging.incremental --rebuild            # ignore the cached state
+    python -m FreeRecall.Logging.incremental --bench 2000         # full vs incremental on a synthetic archive
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .columnar import EMPTY, pad_numbers, parse_number_field
+    from .logger import GameLogger
+    from .recall_analysis import LOG_NAME, CurveCounts, GroupKey, curve_counts, write_curves
+    from .running_stats import ALL_PARTICIPANTS, GroupStats, RunningStats, recalled_positions
+except ImportError:
+    from columnar import EMPTY, pad_numbers, parse_number_field
+    from logger import GameLogger
+    from recall_analysis import LOG_NAME, CurveCounts, GroupKey, curve_counts, write_curves
+    from running_stats import ALL_PARTICIPANTS, GroupStats, RunningStats, recalled_positions
+
+STATE_VERSION = 1
+STATE_FILE = "analysis_state.json"
+TAIL_BYTES = 4096  # hashed just before the offset to notice rewritten files
+
+_scorer = GameLogger(base_prefix=os.devnull, persist_stats=False)
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class FilePartial:
+    """Read position and aggregates of one game_log CSV."""
+
+    def __init__(self, mode: str, participant: str) -> None:
+        self.mode = mode
+        self.participant = participant
+        self.offset = 0
+        self.header: List[str] = []
+        self.header_sha = ""
+        self.tail_sha = ""
+        self.rows = 0
+        self.stats = GroupStats()
+        self.curves: Dict[int, CurveCounts] = {}
+
+    def still_valid(self, f, size: int) -> bool:
+        """Whether the bytes read so far are unchanged, so reading can go on at offset."""
+        if self.offset == 0:
+            return True
+        if size < self.offset:
+            return False
+        f.seek(0)
+        header_line = f.readline()
+        start = max(0, self.offset - TAIL_BYTES)
+        f.seek(start)
+        return _sha1(header_line) == self.header_sha and _sha1(f.read(self.offset - start)) == self.tail_sha
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode, "participant": self.participant, "offset": self.offset, "header": self.header,
+            "header_sha": self.header_sha, "tail_sha": self.tail_sha, "rows": self.rows,
+            "stats": self.stats.to_dict(), "curves": {str(k): c.to_dict() for k, c in self.curves.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "FilePartial":
+        part = cls(d["mode"], d["participant"])
+        part.offset, part.header, part.rows = d["offset"], d["header"], d["rows"]
+        part.header_sha, part.tail_sha = d["header_sha"], d["tail_sha"]
+        part.stats = GroupStats.from_dict(d["stats"])
+        part.curves = {int(k): CurveCounts.from_dict(c) for k, c in d["curves"].items()}
+        return part
+
+
+def _flag(text: Optional[str]) -> Optional[int]:
+    text = (text or "").strip()
+    if not text:
+        return None
+    return 1 if text in ("1", "True", "true") else 0
+
+
+def score_rows(part: FilePartial, rows: List[Dict[str, str]]) -> None:
+    """Fold new CSV rows of one file into its partial, scored like GameLogger
+    (from serial and user_input, so older layouts without the score columns work)."""
+    serials, responses, speeds = [], [], []
+    for r in rows:
+        serial = parse_number_field(r.get("serial", ""))
+        user_input = parse_number_field(r.get("user_input", ""))
+        first, last = _scorer.calculate_first_last_correct(serial, user_input)
+        values = {
+            "correct_numbers": _scorer.calculate_correct_numbers(serial, user_input),
+            "first_correct": int(first),
+            "last_correct": int(last),
+        }
+        pattern = _flag(r.get("pattern_correct"))
+        if pattern is not None:
+            values["pattern_correct"] = pattern
+        speed = (r.get("speed_ms") or "").strip()
+        if speed:
+            values["speed_ms"] = int(float(speed))
+        part.stats.add(values, serial, recalled_positions(serial, user_input))
+        serials.append(pad_numbers(serial))
+        responses.append(pad_numbers(user_input[:len(serials[-1])]))
+        speeds.append(values.get("speed_ms", EMPTY))
+    if not rows:
+        return
+    keys, groups = np.unique(np.array(speeds, dtype=np.int64), return_inverse=True)
+    for speed, counts in zip(keys.tolist(), curve_counts(np.array(serials), np.array(responses), groups, len(keys))):
+        if speed in part.curves:
+            part.curves[speed] += counts
+        else:
+            part.curves[speed] = counts
+    part.rows += len(rows)
+
+
+def _unterminated(part: FilePartial, line: bytes) -> List[Dict[str, str]]:
+    """The last line as a row if it has every column of the header, else nothing."""
+    values = next(csv.reader([line.decode("utf-8", errors="replace")]), []) if line.strip() else []
+    return [dict(zip(part.header, values))] if part.header and len(values) == len(part.header) else []
+
+
+def read_new_rows(path: Path, part: FilePartial
+                  ) -> Tuple[FilePartial, List[Dict[str, str]], List[Dict[str, str]], str, int]:
+    """(partial, new rows, unterminated last row, status, bytes read) for one
+    file. status is "new", "appended", "unchanged" or "reset" (read again from
+    the start, with a new partial). The partial advances past the new rows only."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        status = "new" if part.offset == 0 else "appended"
+        if not part.still_valid(f, size):
+            part, status = FilePartial(part.mode, part.participant), "reset"
+        if size == part.offset:
+            return part, [], [], "unchanged", 0
+        f.seek(part.offset)
+        data = f.read(size - part.offset)
+    end = data.rfind(b"\n") + 1
+    rest = data[end:]
+    if end == 0:
+        return part, [], _unterminated(part, rest), "unchanged" if status == "appended" else status, 0
+    data = data[:end]
+    body = data
+    if part.offset == 0:
+        header_end = data.index(b"\n") + 1
+        part.header = next(csv.reader([data[:header_end].decode("utf-8")]), [])
+        part.header_sha = _sha1(data[:header_end])
+        body = data[header_end:]
+    rows = [dict(zip(part.header, values)) for values in csv.reader(io.StringIO(body.decode("utf-8"))) if values]
+    part.offset += end
+    tail = data[-TAIL_BYTES:]
+    if len(tail) < TAIL_BYTES and part.offset > len(data):
+        with open(path, "rb") as f:  # the tail reaches back into bytes read on an earlier run
+            start = max(0, part.offset - TAIL_BYTES)
+            f.seek(start)
+            tail = f.read(part.offset - start)
+    part.tail_sha = _sha1(tail)
+    return part, rows, _unterminated(part, rest), status, end
+
+
+class IncrementalAnalysis:
+    """Per-file partial aggregates of a data folder, kept in a JSON state file."""
+
+    def __init__(self, data_dir: Path, state_path: Optional[Path] = None, pattern: str = "game_log_*.csv") -> None:
+        self.data_dir = Path(data_dir)
+        self.state_path = Path(state_path) if state_path else self.data_dir / STATE_FILE
+        self.pattern = pattern
+        self.files: Dict[str, FilePartial] = {}
+        # files whose unterminated last row is counted in this run's results but not saved
+        self._with_last: Dict[str, FilePartial] = {}
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                self.files = {name: FilePartial.from_dict(d) for name, d in state["files"].items()}
+
+    def update(self) -> Dict[str, int]:
+        """Read what was appended since the last update; returns counts per status plus rows and bytes read."""
+        report = dict.fromkeys(("new", "appended", "unchanged", "reset", "removed", "rows", "bytes"), 0)
+        present = set()
+        self._with_last = {}
+        for path in sorted(self.data_dir.glob(self.pattern)):
+            m = LOG_NAME.match(path.name)
+            if not m or m.group("ext") != ".csv":
+                continue
+            present.add(path.name)
+            part = self.files.get(path.name) or FilePartial(m.group("mode"), m.group("participant"))
+            part, rows, last, status, read = read_new_rows(path, part)
+            score_rows(part, rows)
+            self.files[path.name] = part
+            if last:
+                self._with_last[path.name] = FilePartial.from_dict(part.to_dict())
+                score_rows(self._with_last[path.name], last)
+            report[status] += 1
+            report["rows"] += len(rows) + len(last)
+            report["bytes"] += read
+        for name in set(self.files) - present:
+            del self.files[name]
+            report["removed"] += 1
+        return report
+
+    def save(self) -> None:
+        """Write the state atomically (temp file + rename)."""
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": STATE_VERSION,
+                                "files": {name: p.to_dict() for name, p in self.files.items()}}))
+        os.replace(tmp, self.state_path)
+
+    def _parts(self) -> List[FilePartial]:
+        return [self._with_last.get(name, part) for name, part in self.files.items()]
+
+    def stats(self) -> RunningStats:
+        """Running statistics per mode and per (mode, participant), merged from the files."""
+        merged = RunningStats()
+        for part in self._parts():
+            merged.group(part.mode).merge(part.stats)
+            if part.participant:
+                merged.group(part.mode, part.participant).merge(part.stats)
+        return merged
+
+    def curves(self) -> Dict[GroupKey, CurveCounts]:
+        """recall_analysis.analyze()'s result, merged from the files."""
+        merged: Dict[GroupKey, CurveCounts] = {}
+        for part in self._parts():
+            for speed, counts in part.curves.items():
+                for key in ((part.mode, part.participant, speed), (part.mode, ALL_PARTICIPANTS, speed)):
+                    if key not in merged:
+                        merged[key] = CurveCounts(counts.width)
+                    merged[key] += counts
+        return merged
+
+
+def write_summary(stats: RunningStats, out_path: str) -> int:
+    """One row per (mode, participant, metric): n, mean, std, min, max and the sketch quantiles."""
+    columns = ["mode", "participant", "metric", "n", "mean", "std", "min", "max", "p10", "p50", "p90"]
+    rows = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for (mode, participant), group in sorted(stats.groups.items()):
+            for metric, values in sorted(group.summary()["metrics"].items()):
+                writer.writerow([mode, participant, metric] + [
+                    "" if isinstance(values.get(c), float) and math.isnan(values[c]) else values.get(c, "")
+                    for c in columns[3:]])
+                rows += 1
+    return rows
+
+
+def _initials(i: int) -> str:
+    """A, B, ..., Z, AA, AB, ...: participant initials for synthetic file names."""
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+
+def synthetic_archive(directory: Path, files: int, rows: int, seed: int = 0,
+                      speed_steps_ms: Tuple[int, ...] = (1500, 1000, 500)) -> None:
+    """Write `files` game_log CSVs of `rows` attempts, cycling through the modes,
+    one participant per file with their own recall rate. Speed files step
+    through `speed_steps_ms` (the Speed schedule's durations) in equal blocks."""
+    rng = np.random.default_rng(seed)
+    header = ["timestamp", "attempt", "serial", "user_input", "correct_numbers", "speed_ms"]
+    modes = ("normal", "speed", "pause", "memorypattern")
+    for i in range(files):
+        mode = modes[i % len(modes)]
+        name = f"game_log_{mode}{_initials(i // len(modes))}.csv"
+        serials = rng.integers(1, 100, size=(rows, 10))
+        keep = rng.random((rows, 10)) < rng.uniform(0.3, 0.7)
+        block = max(1, -(-rows // len(speed_steps_ms)))
+        with open(directory / name, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for r in range(rows):
+                response = " ".join(str(v) if k else "" for v, k in zip(serials[r], keep[r]))
+                speed = speed_steps_ms[min(r // block, len(speed_steps_ms) - 1)] if mode == "speed" else ""
+                writer.writerow(["2025-01-01T00:00:00", r + 1, " ".join(map(str, serials[r])), response,
+                                 int(keep[r].sum()), speed])
+
+
+def bench(files: int, rows: int = 15) -> Dict[str, float]:
+    """Seconds for a first (full) run, an unchanged rerun, and a rerun after one more
+    attempt was appended to one file, on a synthetic archive of `files` files."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="freerecall_incremental_") as tmp:
+        directory = Path(tmp)
+        synthetic_archive(directory, files, rows)
+        timings = {}
+        for label in ("full", "unchanged", "one_appended"):
+            if label == "one_appended":
+                first = sorted(directory.glob("game_log_*.csv"))[0]
+                with open(first, "a", newline="", encoding="utf-8") as f:
+                    csv.writer(f).writerow(["2025-01-02T00:00:00", rows + 1, "1 2 3 4 5 6 7 8 9 10", "1 2 3", 3, ""])
+            t0 = time.perf_counter()
+            analysis = IncrementalAnalysis(directory)
+            report = analysis.update()
+            analysis.stats()
+            analysis.curves()
+            if report["rows"] or report["reset"] or report["removed"]:
+                analysis.save()
+            timings[label] = time.perf_counter() - t0
+            timings[label + "_rows"] = report["rows"]
+    return timings
+
+
+def main() -> None:
+    default_dir = Path(__file__).resolve().parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Analyse only what was appended to the game_log CSVs since the last run.")
+    parser.add_argument("--data-dir", type=Path, default=default_dir)
+    parser.add_argument("--state", type=Path, default=None, help=f"state file (default: DATA_DIR/{STATE_FILE})")
+    parser.add_argument("--rebuild", action="store_true", help="discard the state and read every file again")
+    parser.add_argument("--out-summary", default=None, help="write per-mode/participant statistics to this CSV")
+    parser.add_argument("--out-curves", default=None, help="write SPC/PFR/lag-CRP to this CSV (long format)")
+    parser.add_argument("--bench", type=int, default=None, metavar="FILES",
+                        help="time full vs incremental runs on a synthetic archive of FILES files instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        t = bench(args.bench)
+        print(f"{args.bench} files: full {t['full']:.2f}s ({t['full_rows']:,} rows), "
+              f"unchanged {t['unchanged']:.2f}s, one row appended {t['one_appended']:.2f}s "
+              f"({t['one_appended_rows']} row)")
+        return
+
+    analysis = IncrementalAnalysis(args.data_dir, args.state)
+    if args.rebuild:
+        analysis.files = {}
+    t0 = time.perf_counter()
+    report = analysis.update()
+    if report["rows"] or report["reset"] or report["removed"] or args.rebuild:
+        analysis.save()
+    stats = analysis.stats()
+    print(f"{report['rows']} new rows ({report['bytes']:,} bytes) in {time.perf_counter() - t0:.2f}s: "
+          f"{report['new']} new, {report['appended']} appended, {report['reset']} re-read, "
+          f"{report['unchanged']} unchanged, {report['removed']} removed file(s)")
+    for mode in sorted({m for m, _ in stats.groups}):
+        s = stats.query(mode)
+        cn = s["metrics"]["correct_numbers"]
+        print(f"  {mode}: {s['attempts']} attempts from {len(stats.participants(mode))} participant(s), "
+              f"correct numbers {cn['mean']:.2f} +- {cn['std']:.2f}")
+    if args.out_summary:
+        print(f"Wrote {write_summary(stats, args.out_summary)} rows to {args.out_summary}")
+    if args.out_curves:
+        print(f"Wrote {write_curves(analysis.curves(), args.out_curves)} rows to {args.out_curves}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Append-only, crash-safe journal of session state transitions.
+
+Every record is one line, ``<crc32 as 8 hex digits> <json>``, holding a
+sequence number, the wall time, the session id ("sid"), the event name and
+its data. Records are buffered and written in groups: a commit record (a
+scored round, a finished mode) writes everything pending and, unless fsync is
+"never", fsyncs the file, so after a crash every committed record is on disk
+and at most the uncommitted tail of the current round is lost.
+
+On open the journal is read back. A torn last line (bad checksum or no
+newline) is cut off, and pending_sessions() folds the records into the state
+of every session that was started but never finished, which
+Logic/Recovery.py turns back into a running session.
+
+    python -m FreeRecall.Logging.journal --show game_log_journal.log
+    python -m FreeRecall.Logging.journal --bench 5000
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .csv_writer import FSYNC_POLICIES
+except ImportError:
+    from csv_writer import FSYNC_POLICIES
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def read_journal(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """(records, bytes) of the intact prefix of a journal file. Reading stops at
+    the first torn or corrupt line, since nothing after it can be trusted."""
+    records: List[Dict[str, Any]] = []
+    good = 0
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return records, 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+            break
+        payload = line[9:-1]
+        try:
+            if int(line[:8], 16) != zlib.crc32(payload):
+                break
+            records.append(json.loads(payload))
+        except ValueError:
+            break
+        good += len(line)
+    return records, good
+
+
+def pending_sessions(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """State of every session with a "start" record but no later "done".
+
+    The state is the start record's data updated with every later "result"
+    record's data; "results" lists those records in order.
+    """
+    sessions: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        sid, event = record.get("sid"), record.get("ev")
+        if event == "start":
+            sessions[sid] = dict(record.get("data", {}), results=[])
+        elif event == "done":
+            sessions.pop(sid, None)
+        elif event == "result" and sid in sessions:
+            data = record.get("data", {})
+            sessions[sid].update(data)
+            sessions[sid]["results"].append(data)
+    return sessions
+
+
+class SessionJournal:
+    """Buffered, group-committed writer of journal records.
+
+    fsync policy (as BufferedCSVWriter):
+    - "never":  commits hand records to the OS only; a power loss can drop them.
+    - "flush":  every commit (and every flush_records records) writes and fsyncs.
+    - "always": every record is written and fsynced immediately.
+
+    `recovered` holds the records found on open, after any torn tail was cut.
+    """
+
+    def __init__(self, path: str, fsync: str = "flush", flush_records: int = 256) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync = fsync
+        self.flush_records = flush_records
+        self.recovered, good = read_journal(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size != good:
+            os.ftruncate(self._fd, good)  # drop a torn tail before appending after it
+        os.lseek(self._fd, good, os.SEEK_SET)
+        self._seq = self.recovered[-1]["seq"] if self.recovered else 0
+        self._pending: List[bytes] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.commits = 0
+        self.syncs = 0
+        atexit.register(self.close)
+
+    def append(self, sid: str, event: str, data: Optional[Dict[str, Any]] = None, commit: bool = False) -> int:
+        """Queue one record; with commit=True it and everything before it are made durable. Returns its seq."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SessionJournal is closed")
+            self._seq += 1
+            record = {"seq": self._seq, "t": round(time.time(), 3), "sid": sid, "ev": event}
+            if data:
+                record["data"] = data
+            self._pending.append(encode_record(record))
+            if commit or self.fsync == "always" or len(self._pending) >= self.flush_records:
+                self._flush_locked(commit)
+            return self._seq
+
+    def pending(self) -> Dict[str, Dict[str, Any]]:
+        """pending_sessions() of the records found on open."""
+        return pending_sessions(self.recovered)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked(False)
+
+    def reset(self) -> None:
+        """Empty the journal, e.g. once nothing in it is going to be resumed."""
+        with self._lock:
+            self._pending.clear()
+            os.ftruncate(self._fd, 0)
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            if self.fsync != "never":
+                os.fsync(self._fd)
+            self.recovered = []
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked(False)
+            os.close(self._fd)
+            self._closed = True
+        atexit.unregister(self.close)
+
+    def _flush_locked(self, commit: bool) -> None:
+        if self._pending:
+            os.write(self._fd, b"".join(self._pending))
+            self._pending.clear()
+            if self.fsync != "never":
+                os.fsync(self._fd)
+                self.syncs += 1
+        self.commits += commit
+
+
+def bench(records_per_round: int = 6, rounds: int = 2000, path: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Per fsync policy: microseconds per plain append and per committing append,
+    for rounds of `records_per_round` records ending in a commit."""
+    import statistics
+    import tempfile
+
+    results = {}
+    for policy in FSYNC_POLICIES:
+        with tempfile.TemporaryDirectory(prefix="journal_bench_") as tmp:
+            journal = SessionJournal(path or os.path.join(tmp, "bench.log"), fsync=policy)
+            plain, commit = [], []
+            for r in range(rounds):
+                for i in range(records_per_round - 1):
+                    t0 = time.perf_counter()
+                    journal.append("bench", "state", {"old": "reveal", "new": "input", "round": r})
+                    plain.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                journal.append("bench", "result", {"attempt": r + 1, "correct_numbers": 7}, commit=True)
+                commit.append(time.perf_counter() - t0)
+            journal.close()
+            if path:
+                os.remove(path)
+        commit.sort()
+        results[policy] = {
+            "append_us": statistics.median(plain) * 1e6,
+            "commit_us": statistics.median(commit) * 1e6,
+            "commit_p99_us": commit[int(0.99 * (len(commit) - 1))] * 1e6,
+            "round_us": (sum(plain) + sum(commit)) / rounds * 1e6,
+        }
+    return results
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or benchmark a session journal.")
+    parser.add_argument("--show", default=None, help="print the unfinished sessions of this journal")
+    parser.add_argument("--bench", type=int, default=None, metavar="ROUNDS",
+                        help="time ROUNDS journaled rounds under every fsync policy")
+    parser.add_argument("--dir", default=None, help="with --bench: put the journal in this directory")
+    args = parser.parse_args()
+
+    if args.show:
+        records, good = read_journal(args.show)
+        size = os.path.getsize(args.show) if os.path.exists(args.show) else 0
+        print(f"{len(records)} records, {good} of {size} bytes intact")
+        for sid, state in pending_sessions(records).items():
+            rest = {k: v for k, v in state.items() if k != "results"}
+            print(f"  {sid}: {len(state['results'])} rounds scored, {rest}")
+        return
+    if args.bench:
+        path = os.path.join(args.dir, "journal_bench.log") if args.dir else None
+        print(f"{'fsync':>7} {'append us':>10} {'commit us':>10} {'commit p99':>11} {'per round us':>13}")
+        for policy, r in bench(rounds=args.bench, path=path).items():
+            print(f"{policy:>7} {r['append_us']:10.1f} {r['commit_us']:10.1f} {r['commit_p99_us']:11.1f} "
+                  f"{r['round_us']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Per-keystroke response timing, kept in a preallocated ring buffer.
+
+The GUI calls ``KeystrokeRecorder.record(box, keysym_num)`` from its key
+handler. That call only writes into three preallocated ``array`` columns
+(time, box, key); no list, tuple or dict is created per keystroke. Once per
+attempt the buffer is appended to a binary sidecar
+(``<prefix>_<mode>_keys.bin``, see GameLogger.log_keystrokes) as one block:
+
+    header   <4sdfIIH   magic b"KEY1", input start (POSIX s, UTC), submit
+                        (ms from input start, -1 if unknown), events, events
+                        dropped because the ring wrapped, label length
+    label    utf-8      e.g. the attempt number
+    times    <f4 * n    ms from input start
+    boxes    <i1 * n    entry box index
+    keys     <u4 * n    Tk keysym_num (Latin-1 code point for printable keys)
+
+Reading needs only the standard library:
+
+    python -m FreeRecall.Logging.keystrokes game_log_normal_keys.bin        # per-attempt summary
+    python -m FreeRecall.Logging.keystrokes game_log_normal_keys.bin --csv keys.csv
+    python -m FreeRecall.Logging.keystrokes --bench                         # cost of record()
+"""
+import csv
+import os
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+MAGIC = b"KEY1"
+HEADER = struct.Struct("<4sdfIIH")
+DEFAULT_CAPACITY = 1024
+
+# keysym_num of the editing/navigation keys the entry boxes react to
+KEYSYM_NAMES = {
+    0xFF08: "BackSpace",
+    0xFF09: "Tab",
+    0xFF0D: "Return",
+    0xFF51: "Left",
+    0xFF52: "Up",
+    0xFF53: "Right",
+    0xFF54: "Down",
+    0xFF8D: "KP_Enter",
+    0xFFFF: "Delete",
+}
+
+
+class KeystrokeRecorder:
+    """Fixed-capacity ring buffer of (time, box, key) for the current response.
+
+    start() marks the input start and empties the buffer, record() stores one
+    keystroke, stop() marks the submit. When more than `capacity` keys are
+    pressed the oldest are overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, clock=time.perf_counter):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self.clock = clock
+        self._times = array("d", [0.0]) * capacity
+        self._boxes = array("b", [0]) * capacity
+        self._keys = array("I", [0]) * capacity
+        self._count = 0
+        self.start_time = clock()
+        self.start_utc = time.time()
+        self.submit_time: Optional[float] = None
+
+    def start(self) -> None:
+        self._count = 0
+        self.submit_time = None
+        self.start_utc = time.time()
+        self.start_time = self.clock()
+
+    def record(self, box: int, keysym_num: int) -> None:
+        i = self._count % self.capacity
+        self._times[i] = self.clock()
+        self._boxes[i] = box
+        self._keys[i] = keysym_num & 0xFFFFFFFF
+        self._count += 1
+
+    def stop(self) -> None:
+        self.submit_time = self.clock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self._count - self.capacity)
+
+    def _ordered(self, column: array) -> array:
+        # Oldest first; the ring only wraps after `capacity` keystrokes
+        n = len(self)
+        if self._count <= self.capacity:
+            return column[:n]
+        head = self._count % self.capacity
+        return column[head:] + column[:head]
+
+    def to_bytes(self, label: str = "") -> bytes:
+        """The recorded keystrokes as one sidecar block."""
+        t0 = self.start_time
+        times = array("f", [(t - t0) * 1000.0 for t in self._ordered(self._times)])
+        keys = self._ordered(self._keys)
+        if sys.byteorder != "little":
+            times.byteswap()
+            keys.byteswap()
+        submit_ms = -1.0 if self.submit_time is None else (self.submit_time - t0) * 1000.0
+        name = label.encode("utf-8")
+        header = HEADER.pack(MAGIC, self.start_utc, submit_ms, len(times), self.dropped, len(name))
+        return header + name + times.tobytes() + self._ordered(self._boxes).tobytes() + keys.tobytes()
+
+    def append_to(self, path: str, label: str = "") -> None:
+        """Append the current buffer to the sidecar at `path` as one block."""
+        block = self.to_bytes(label)
+        with open(path, "ab") as f:
+            f.write(block)
+
+
+@dataclass
+class KeystrokeTrial:
+    label: str
+    start_utc: float            # POSIX seconds when the input fields appeared
+    submit_ms: Optional[float]  # None if not recorded
+    dropped: int
+    times_ms: array             # float32, ms from input start
+    boxes: array                # int8
+    keys: array                 # uint32 keysym_num
+
+    def __len__(self) -> int:
+        return len(self.times_ms)
+
+
+def read_keystrokes(path: str) -> Iterator[KeystrokeTrial]:
+    """Yield every block of a sidecar; a truncated last block (crash while writing) is skipped."""
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + HEADER.size <= len(data):
+        magic, start_utc, submit_ms, n, dropped, label_len = HEADER.unpack_from(data, pos)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: bad block at byte {pos}")
+        pos += HEADER.size
+        end = pos + label_len + n * (4 + 1 + 4)
+        if end > len(data):
+            return
+        label = data[pos:pos + label_len].decode("utf-8")
+        pos += label_len
+        times, boxes, keys = array("f"), array("b"), array("I")
+        times.frombytes(data[pos:pos + 4 * n])
+        boxes.frombytes(data[pos + 4 * n:pos + 5 * n])
+        keys.frombytes(data[pos + 5 * n:end])
+        if sys.byteorder != "little":
+            times.byteswap()
+            keys.byteswap()
+        pos = end
+        yield KeystrokeTrial(label, start_utc, None if submit_ms < 0 else submit_ms, dropped, times, boxes, keys)
+
+
+def keysym_name(code: int) -> str:
+    if code in KEYSYM_NAMES:
+        return KEYSYM_NAMES[code]
+    if 0x20 <= code < 0x100:
+        return chr(code)
+    return f"0x{code:x}"
+
+
+def is_entry_key(code: int) -> bool:
+    """True for keys that type a character (digits, letters)."""
+    return 0x20 < code < 0x100
+
+
+def inter_response_times(trial: KeystrokeTrial) -> List[float]:
+    """ms from input start to the first typed character, then between typed characters."""
+    typed = [t for t, k in zip(trial.times_ms, trial.keys) if is_entry_key(k)]
+    return [b - a for a, b in zip([0.0] + typed, typed)]
+
+
+def output_order(trial: KeystrokeTrial) -> List[int]:
+    """Box indices in the order they were first typed into (the recall output order)."""
+    seen = set()
+    order = []
+    for box, key in zip(trial.boxes, trial.keys):
+        if box not in seen and is_entry_key(key):
+            seen.add(box)
+            order.append(box)
+    return order
+
+
+def _export_csv(path: str, out: str) -> int:
+    rows = 0
+    with open(out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["label", "start_utc", "event", "time_ms", "box", "key"])
+        for trial in read_keystrokes(path):
+            start = datetime.fromtimestamp(trial.start_utc, timezone.utc).isoformat()
+            for i, (t, box, key) in enumerate(zip(trial.times_ms, trial.boxes, trial.keys)):
+                writer.writerow([trial.label, start, i, f"{t:.3f}", box, keysym_name(key)])
+                rows += 1
+    return rows
+
+
+def _bench(events: int) -> None:
+    recorder = KeystrokeRecorder()
+    keys = [ord(c) for c in "0123456789"] + [0xFF08]
+    t0 = time.perf_counter()
+    for i in range(events):
+        recorder.record(i % 10, keys[i % len(keys)])
+    per_event = (time.perf_counter() - t0) / events * 1e6
+    t0 = time.perf_counter()
+    block = recorder.to_bytes("1")
+    flush_ms = (time.perf_counter() - t0) * 1000.0
+    print(f"record(): {per_event:.3f} us/keystroke; flush of {len(recorder)} keystrokes: "
+          f"{flush_ms:.3f} ms, {len(block)} bytes")
+
+
+def main() -> None:
+    import argparse  # CLI only; this module is on the GUI startup path
+
+    parser = argparse.ArgumentParser(description="Inspect keystroke sidecar files.")
+    parser.add_argument("path", nargs="?", help="a <prefix>_<mode>_keys.bin file")
+    parser.add_argument("--csv", default=None, help="write one row per keystroke to this CSV")
+    parser.add_argument("--bench", action="store_true", help="time record() and the per-attempt flush")
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.events)
+        return
+    if args.path is None or not os.path.exists(args.path):
+        parser.error("a keystroke file is required")
+    if args.csv:
+        print(f"Wrote {_export_csv(args.path, args.csv)} keystrokes to {args.csv}")
+        return
+    for trial in read_keystrokes(args.path):
+        irts = inter_response_times(trial)
+        mean_irt = sum(irts[1:]) / len(irts[1:]) if len(irts) > 1 else float("nan")
+        submit = "-" if trial.submit_ms is None else f"{trial.submit_ms:.0f}"
+        print(f"{trial.label}: {len(trial)} keys, first {irts[0] if irts else float('nan'):.0f} ms, "
+              f"mean IRT {mean_irt:.0f} ms, submit {submit} ms, order {output_order(trial)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,179 @@
 import csv
 import os
+import queue
+import re
+import threading
+import traceback
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
+
+try:
+    from .columnar import ColumnStore, pad_numbers, utc_seconds, EMPTY
+    from .csv_writer import BufferedCSVWriter
+    from .keystrokes import KeystrokeRecorder
+    from .running_stats import RunningStats
+except ImportError:
+    from columnar import ColumnStore, pad_numbers, utc_seconds, EMPTY
+    from csv_writer import BufferedCSVWriter
+    from keystrokes import KeystrokeRecorder
+    from running_stats import RunningStats
+
+if TYPE_CHECKING:  # sqlite3 is only loaded when a database is configured
+    from .sqlite_store import SQLiteStore
+
+LOG_HEADER = [
+    "timestamp",
+    "attempt",
+    "serial",
+    "user_input",
+    "correct_numbers",
+    "wrong_numbers",
+    "first_correct",
+    "last_correct",
+    "pattern_correct",
+    "correct_numbers_total",
+    "first_correct_total",
+    "last_correct_total",
+    "speed_ms",
+    # Stimulus timing error of the sequential reveal (blank when not measured)
+    "onset_error_mean_ms",
+    "onset_error_max_ms",
+    "offset_error_mean_ms",
+    "drift_ms",
+]
+TIMING_COLUMNS = LOG_HEADER[-4:]
+
+# Per-item sidecar, <prefix>_<mode>_timing.csv: intended vs actual onset/offset
+# of every revealed number, in ms from the first intended onset
+STIMULUS_TIMING_HEADER = [
+    "timestamp",
+    "attempt",
+    "item",
+    "intended_onset_ms",
+    "actual_onset_ms",
+    "intended_offset_ms",
+    "actual_offset_ms",
+]
+
+# Adaptive mode sidecar, <prefix>_<mode>_posterior.csv: the threshold posterior
+# after every round (Logic/Adaptive.py) and where the next round is placed
+POSTERIOR_HEADER = [
+    "timestamp",
+    "attempt",
+    "round",
+    "reveal_ms",
+    "length",
+    "correct_numbers",
+    "threshold_ms",
+    "threshold_sd_log10",
+    "threshold_low_ms",
+    "threshold_high_ms",
+    "span_mean",
+    "span_sd",
+    "entropy_bits",
+    "next_reveal_ms",
+    "next_length",
+]
+# Modes whose rows carry speed_ms (the per-number duration of the round)
+TIMED_MODES = ("speed", "adaptive")
+# Participant ids that can go into a log file name after the mode (see recall_analysis.LOG_NAME)
+PARTICIPANT_NAME = re.compile(r"[A-Z][A-Z0-9]*")
 
 
 class GameLogger:
-    """CSV logger with one file per mode."""
+    """CSV logger with one file per mode.
+
+    By default every row opens, appends to and closes its file. Pass a
+    BufferedCSVWriter to keep the files open and write rows in batches.
+    With columnar=True each row is also appended to a binary column store
+    (``<prefix>_<mode>.cols``, see Logging/columnar.py).
 
-    def __init__(self, base_prefix: str = "game_log"):
+    Every attempt also updates `stats` (Logging/running_stats.py: moments,
+    quantiles and serial-position curves per mode and participant). With
+    persist_stats=True they are loaded from ``<prefix>_stats.json`` at startup
+    and saved there on flush() and close(). The *_total columns still count
+    from the start of this logger (or the last reset_totals()).
+
+    With a `database` (Logging/sqlite_store.py) attempts and their stimulus
+    timing go to SQLite instead of the per-mode CSV files; sqlite_store's
+    exporter writes the CSV layouts back.
+
+    With a `participant` (capital letters and digits) every file carries it
+    after the mode, ``<prefix>_<mode><participant>.csv`` like the study's
+    game_log_speedAS.csv, and the stats snapshot is
+    ``<prefix>_<participant>_stats.json``; see for_participant().
+    """
+
+    def __init__(self, base_prefix: str = "game_log", writer: Optional[BufferedCSVWriter] = None, columnar: bool = False,
+                 persist_stats: bool = True, database: Optional["SQLiteStore"] = None,
+                 participant: Optional[str] = None):
+        if participant is not None and not PARTICIPANT_NAME.fullmatch(participant):
+            raise ValueError(f"Participant {participant!r} must be capital letters and digits, e.g. P001")
         self.base_prefix = base_prefix
-        # Cumulative counters per mode
-        self._correct_numbers_totals: Dict[str, int] = {}
-        self._first_correct_totals: Dict[str, int] = {}
-        self._last_correct_totals: Dict[str, int] = {}
+        self.participant = participant
+        self._suffix = participant or ""
+        self.writer = writer
+        self.database = database
+        self._owns_database = True  # False for for_participant() loggers sharing it
+        self.columnar = columnar
+        self.persist_stats = persist_stats
+        self._stores: Dict[str, ColumnStore] = {}
+        self._checked_paths = set()
+        stats_prefix = f"{base_prefix}_{participant}" if participant else base_prefix
+        self.stats = RunningStats(f"{stats_prefix}_stats.json" if persist_stats else None)
+        # Per mode: the running sums the *_total columns count from
+        self._totals_base: Dict[str, Dict[str, int]] = {}
+
+    def for_participant(self, participant: str) -> "GameLogger":
+        """A logger with this one's settings writing `participant`'s own files,
+        with its own *_total columns and stats. It gets its own writer, so
+        closing it leaves this logger's files alone."""
+        writer = None
+        if self.writer is not None:
+            writer = BufferedCSVWriter(self.writer.flush_rows, self.writer.flush_interval_s, self.writer.fsync)
+        logger = GameLogger(self.base_prefix, writer, self.columnar, self.persist_stats, self.database, participant)
+        logger._owns_database = False
+        return logger
 
     def _file_for_mode(self, mode: str) -> str:
-        return f"{self.base_prefix}_{mode.lower()}.csv"
+        return f"{self.base_prefix}_{mode.lower()}{self._suffix}.csv"
+
+    def _timing_file_for_mode(self, mode: str) -> str:
+        return f"{self.base_prefix}_{mode.lower()}{self._suffix}_timing.csv"
+
+    def _posterior_file_for_mode(self, mode: str) -> str:
+        return f"{self.base_prefix}_{mode.lower()}{self._suffix}_posterior.csv"
+
+    def _keystroke_file_for_mode(self, mode: str) -> str:
+        return f"{self.base_prefix}_{mode.lower()}{self._suffix}_keys.bin"
+
+    def _upgrade_header(self, path: str) -> None:
+        """Once per file: if it was started with an older, shorter LOG_HEADER,
+        rewrite it with the current header and blank cells for the new columns."""
+        if path in self._checked_paths:
+            return
+        self._checked_paths.add(path)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        header = rows[0]
+        if header == LOG_HEADER or header != LOG_HEADER[:len(header)]:
+            return
+        pad = [""] * (len(LOG_HEADER) - len(header))
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(LOG_HEADER)
+            writer.writerows(row + pad for row in rows[1:])
+        os.replace(tmp, path)
+
+    def _store_for_mode(self, mode: str) -> ColumnStore:
+        store = self._stores.get(mode)
+        if store is None:
+            store = self._stores[mode] = ColumnStore(f"{self.base_prefix}_{mode.lower()}{self._suffix}.cols")
+        return store
 
     def calculate_correct_numbers(self, serial: List[int], user_input: List[Optional[int]]) -> int:
         """
@@ -39,7 +197,6 @@ class GameLogger:
         valid_user_input = [num for num in user_input if num is not None]
         
         # Count occurrences in both serial and user input
-        from collections import Counter
         serial_counts = Counter(serial)
         user_counts = Counter(valid_user_input)
         
@@ -113,21 +270,7 @@ class GameLogger:
         if not os.path.exists(path):
             with open(path, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow([
-                    "timestamp",
-                    "attempt",
-                    "serial",
-                    "user_input",
-                    "correct_numbers",
-                    "wrong_numbers",
-                    "first_correct",
-                    "last_correct",
-                    "pattern_correct",
-                    "correct_numbers_total",
-                    "first_correct_total",
-                    "last_correct_total",
-                    "speed_ms",
-                ])
+                writer.writerow(LOG_HEADER)
 
     def log_attempt(
         self,
@@ -141,39 +284,115 @@ class GameLogger:
         last_correct: bool,
         speed_ms: Optional[int] = None,
         pattern_correct: Optional[bool] = None,
+        timing: Optional[Dict[str, float]] = None,
+        stimulus_timing: Optional[List[tuple]] = None,
+        participant: Optional[str] = None,
     ) -> None:
-        # Prepare file and counters
-        self._ensure_header(mode)
-        self._correct_numbers_totals.setdefault(mode, 0)
-        self._first_correct_totals.setdefault(mode, 0)
-        self._last_correct_totals.setdefault(mode, 0)
-
-        # Update cumulative counters
-        self._correct_numbers_totals[mode] += correct_numbers
-        if first_correct:
-            self._first_correct_totals[mode] += 1
-        if last_correct:
-            self._last_correct_totals[mode] += 1
+        """Append one attempt. `timing` holds the TIMING_COLUMNS summary and
+        `stimulus_timing` the per-item (index, intended_on, actual_on,
+        intended_off, actual_off) rows for the timing sidecar. `participant`
+        only groups the running stats."""
+        # Update running stats; the cumulative totals are read back from them
+        if mode not in self._totals_base:
+            self.reset_totals(mode)
+        now = datetime.utcnow()
+        speed = speed_ms if (mode.lower() in TIMED_MODES and speed_ms is not None) else None
+        self.stats.update(mode, serial, user_input, correct_numbers, first_correct, last_correct,
+                          pattern_correct, speed, timing, participant)
+        totals = self.get_totals(mode)
+        row = [
+            now.isoformat(),
+            attempt,
+            " ".join(map(str, serial)),
+            " ".join(str(v) if v is not None else "" for v in user_input),
+            correct_numbers,
+            wrong_numbers,
+            1 if first_correct else 0,
+            1 if last_correct else 0,
+            1 if pattern_correct else (0 if pattern_correct is not None else ""),
+            totals["correct_numbers_total"],
+            totals["first_correct_total"],
+            totals["last_correct_total"],
+            speed if speed is not None else "",
+        ]
+        timing = timing or {}
+        row.extend(f"{timing[c]:.3f}" if c in timing else "" for c in TIMING_COLUMNS)
+
+        if self.columnar:
+            self._store_for_mode(mode).append({
+                "timestamp": utc_seconds(now),
+                "attempt": attempt,
+                "serial": pad_numbers(serial),
+                "user_input": pad_numbers(user_input),
+                "correct_numbers": correct_numbers,
+                "wrong_numbers": wrong_numbers,
+                "first_correct": 1 if first_correct else 0,
+                "last_correct": 1 if last_correct else 0,
+                "pattern_correct": EMPTY if pattern_correct is None else int(bool(pattern_correct)),
+                "correct_numbers_total": totals["correct_numbers_total"],
+                "first_correct_total": totals["first_correct_total"],
+                "last_correct_total": totals["last_correct_total"],
+                "speed_ms": EMPTY if speed is None else speed,
+            })
+
+        if self.database is not None:
+            values = dict(zip(LOG_HEADER, row))
+            del values["serial"], values["user_input"]
+            for c in TIMING_COLUMNS:
+                values[c] = timing.get(c)
+            values["pattern_correct"] = None if pattern_correct is None else int(bool(pattern_correct))
+            values["speed_ms"] = speed
+            self.database.write_attempt(mode, participant, values, serial, user_input, stimulus_timing)
+            return
 
         # Write row
         path = self._file_for_mode(mode)
+        self._upgrade_header(path)
+        if self.writer is not None:
+            self.writer.write_row(path, row, header=LOG_HEADER)
+        else:
+            self._ensure_header(mode)
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(row)
+        if stimulus_timing:
+            self._log_stimulus_timing(mode, now.isoformat(), attempt, stimulus_timing)
+
+    def _log_stimulus_timing(self, mode: str, timestamp: str, attempt: int, items: List[tuple]) -> None:
+        path = self._timing_file_for_mode(mode)
+        rows = [[timestamp, attempt, index] + [f"{v:.3f}" for v in times] for index, *times in items]
+        if self.writer is not None:
+            for row in rows:
+                self.writer.write_row(path, row, header=STIMULUS_TIMING_HEADER)
+            return
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(STIMULUS_TIMING_HEADER)
+            writer.writerows(rows)
+
+    def log_posterior(self, mode: str, attempt: int, round_index: int, reveal_ms: int, length: int,
+                      correct_numbers: int, summary: Dict[str, float]) -> None:
+        """Append one round's posterior summary (QuestPlus.summary()) to the
+        posterior sidecar. It stays a CSV file even when a database is set."""
+        row = [datetime.utcnow().isoformat(), attempt, round_index, reveal_ms, length, correct_numbers]
+        for column in POSTERIOR_HEADER[len(row):]:
+            value = summary[column]
+            row.append(value if isinstance(value, int) else f"{value:.4f}")
+        path = self._posterior_file_for_mode(mode)
+        if self.writer is not None:
+            self.writer.write_row(path, row, header=POSTERIOR_HEADER)
+            return
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
         with open(path, "a", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow([
-                datetime.utcnow().isoformat(),
-                attempt,
-                " ".join(map(str, serial)),
-                " ".join(str(v) if v is not None else "" for v in user_input),
-                correct_numbers,
-                wrong_numbers,
-                1 if first_correct else 0,
-                1 if last_correct else 0,
-                1 if pattern_correct else (0 if pattern_correct is not None else ""),
-                self._correct_numbers_totals[mode],
-                self._first_correct_totals[mode],
-                self._last_correct_totals[mode],
-                speed_ms if ("speed" in mode.lower() and speed_ms is not None) else "",
-            ])
+            if is_new:
+                writer.writerow(POSTERIOR_HEADER)
+            writer.writerow(row)
+
+    def log_keystrokes(self, mode: str, attempt: int, recorder: KeystrokeRecorder) -> None:
+        """Append the attempt's keystrokes to <prefix>_<mode>_keys.bin (see Logging/keystrokes.py)."""
+        recorder.append_to(self._keystroke_file_for_mode(mode), label=str(attempt))
 
     def log_attempt_auto_calculate(
         self,
@@ -188,7 +407,8 @@ class GameLogger:
         Convenience method that automatically calculates all metrics
         """
         correct_numbers = self.calculate_correct_numbers(serial, user_input)
-        wrong_numbers = self.calculate_wrong_numbers(serial, user_input)
+        # Same as calculate_wrong_numbers, without scoring the attempt a second time
+        wrong_numbers = len(serial) - correct_numbers if serial else 0
         first_correct, last_correct = self.calculate_first_last_correct(serial, user_input)
         
         self.log_attempt(
@@ -204,20 +424,129 @@ class GameLogger:
             pattern_correct=pattern_correct,
         )
 
+    def _running_totals(self, mode: str) -> Dict[str, int]:
+        group = self.stats.group(mode)
+        return {
+            "correct_numbers_total": group.total("correct_numbers"),
+            "first_correct_total": group.total("first_correct"),
+            "last_correct_total": group.total("last_correct"),
+        }
+
     def get_totals(self, mode: str) -> Dict[str, int]:
         """
         Get current cumulative totals for a mode
         """
-        return {
-            "correct_numbers_total": self._correct_numbers_totals.get(mode, 0),
-            "first_correct_total": self._first_correct_totals.get(mode, 0),
-            "last_correct_total": self._last_correct_totals.get(mode, 0),
-        }
+        base = self._totals_base.get(mode)
+        running = self._running_totals(mode)
+        if base is None:
+            return {key: 0 for key in running}
+        return {key: value - base[key] for key, value in running.items()}
 
     def reset_totals(self, mode: str) -> None:
         """
         Reset cumulative totals for a mode (useful when starting a new session)
         """
-        self._correct_numbers_totals[mode] = 0
-        self._first_correct_totals[mode] = 0
-        self._last_correct_totals[mode] = 0
+        self._totals_base[mode] = self._running_totals(mode)
+
+    def restore_totals(self, mode: str, totals: Dict[str, int]) -> None:
+        """Continue the *_total columns of a mode from `totals` (e.g. after a
+        crash, from Logging/journal.py) instead of from zero."""
+        running = self._running_totals(mode)
+        self._totals_base[mode] = {key: value - totals.get(key, 0) for key, value in running.items()}
+
+    def flush(self) -> None:
+        """Write any rows buffered by the writer, database or column stores, and the stats snapshot."""
+        if self.writer is not None:
+            self.writer.flush()
+        if self.database is not None:
+            self.database.flush()
+        for store in self._stores.values():
+            store.flush()
+        if self.stats.dirty:
+            self.stats.save()
+
+    def close(self) -> None:
+        """Flush and close the writer's, database's and column stores' file handles."""
+        if self.writer is not None:
+            self.writer.close()
+        if self.database is not None and self._owns_database:
+            self.database.close()
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+        if self.stats.dirty:
+            self.stats.save()
+
+
+class QueuedLogger:
+    """GameLogger front for event-loop hosts (Server/kiosk.py): log_attempt()
+    and log_posterior() only queue the call and one worker thread writes it, so
+    disk latency never stalls the loop that times the sessions. Everything else
+    (the scoring helpers, totals) passes straight through to the wrapped logger.
+
+    bind() gives another logger (e.g. one per participant) a front on the same
+    queue and worker thread, so rows of every session are still written in the
+    order they were logged.
+    """
+
+    def __init__(self, logger: GameLogger, _shared: Optional["QueuedLogger"] = None) -> None:
+        self.logger = logger
+        self._owner = _shared is None
+        if self._owner:
+            self._errors = [0]
+            self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+            self._thread = threading.Thread(target=self._drain, name="QueuedLogger", daemon=True)
+            self._thread.start()
+        else:
+            self._errors, self._queue, self._thread = _shared._errors, _shared._queue, _shared._thread
+
+    def __getattr__(self, name: str):
+        return getattr(self.logger, name)
+
+    def bind(self, logger: GameLogger) -> "QueuedLogger":
+        """A front for `logger` writing through this front's queue and thread."""
+        return QueuedLogger(logger, self)
+
+    @property
+    def errors(self) -> int:
+        return self._errors[0]
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def log_attempt(self, *args, **kwargs) -> None:
+        self._queue.put((self.logger, "log_attempt", args, kwargs))
+
+    def log_posterior(self, *args, **kwargs) -> None:
+        self._queue.put((self.logger, "log_posterior", args, kwargs))
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                logger, method, args, kwargs = item
+                getattr(logger, method)(*args, **kwargs)
+            except Exception:
+                self._errors[0] += 1  # a bad row must not stop the writer for every other session
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued attempt is written, then flush the wrapped logger."""
+        self._queue.join()
+        self.logger.flush()
+
+    def close(self) -> None:
+        """Write what is queued and close the wrapped logger; a bound front
+        queues its close behind its rows and leaves the worker running."""
+        if not self._owner:
+            self._queue.put((self.logger, "close", (), {}))
+            return
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.logger.close()
@@ -0,0 +1,304 @@
+"""Serial-position curves, probability of first recall and lag-CRP over free recall logs.
+
+``calculate_first_last_correct`` only says whether the first and last numbers
+were recalled. This module computes the classic free recall curves for every
+attempt in an archive of game_log files (CSV or columnar ``.cols`` stores),
+grouped by mode, participant and Speed schedule step (``speed_ms``):
+
+- SPC: P(the number at serial position i is recalled anywhere),
+- PFR: P(the first filled input field holds the number from position i),
+- lag-CRP: P(the next correct recall is at lag j | lag j was still available),
+  over the correct recalls in input-field order.
+
+Each file is read once (stores are memory-mapped) and scored in vectorized
+row chunks. The result per group is a set of counts, so files are processed
+in parallel worker processes and the counts are simply added:
+
+    python -m FreeRecall.Logging.recall_analysis                        # FreeRecall/data/game_log_*
+    python -m FreeRecall.Logging.recall_analysis a.cols b.csv --workers 4 --out curves.csv
+    python -m FreeRecall.Logging.recall_analysis --by-participant
+"""
+import argparse
+import csv
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .columnar import EMPTY, SERIAL_WIDTH, pad_numbers, parse_number_field, read_store
+except ImportError:
+    from columnar import EMPTY, SERIAL_WIDTH, pad_numbers, parse_number_field, read_store
+
+# game_log_<mode><participant>.csv / .cols, e.g. game_log_speedAS.csv, game_log_normalK00012.csv
+# (kiosk ids), game_log_normal.cols
+LOG_NAME = re.compile(r"game_log_(?P<mode>[a-z]+)(?P<participant>(?:[A-Z][A-Z0-9]*)?)(?P<ext>\.csv|\.cols)$")
+ALL_PARTICIPANTS = "*"
+# Rows scored per vectorized step (bounds the temporaries to a few MB)
+CHUNK_ROWS = 1 << 16
+
+GroupKey = Tuple[str, str, int]  # (mode, participant, speed_ms or EMPTY)
+
+
+@dataclass
+class CurveCounts:
+    """Sufficient statistics of one group; every curve is a ratio of two of them."""
+    width: int = SERIAL_WIDTH
+    trials: int = 0
+    shown: np.ndarray = None             # [width] serial positions presented
+    recalled: np.ndarray = None          # [width] ...recalled anywhere
+    first_trials: int = 0                # trials with at least one filled field
+    first: np.ndarray = None             # [width] first filled field came from this position
+    crp_actual: np.ndarray = None        # [2 * width - 1] transitions made, lag -(width-1)..width-1
+    crp_possible: np.ndarray = None      # [2 * width - 1] transitions that were available
+
+    def __post_init__(self) -> None:
+        lags = 2 * self.width - 1
+        for name, size in (("shown", self.width), ("recalled", self.width), ("first", self.width),
+                           ("crp_actual", lags), ("crp_possible", lags)):
+            if getattr(self, name) is None:
+                setattr(self, name, np.zeros(size, dtype=np.int64))
+
+    def __iadd__(self, other: "CurveCounts") -> "CurveCounts":
+        self.trials += other.trials
+        self.first_trials += other.first_trials
+        for name in ("shown", "recalled", "first", "crp_actual", "crp_possible"):
+            getattr(self, name).__iadd__(getattr(other, name))
+        return self
+
+    def to_dict(self) -> Dict[str, object]:
+        out: Dict[str, object] = {"width": self.width, "trials": self.trials, "first_trials": self.first_trials}
+        for name in ("shown", "recalled", "first", "crp_actual", "crp_possible"):
+            out[name] = getattr(self, name).tolist()
+        return out
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "CurveCounts":
+        arrays = {name: np.array(d[name], dtype=np.int64)
+                  for name in ("shown", "recalled", "first", "crp_actual", "crp_possible")}
+        return cls(d["width"], d["trials"], first_trials=d["first_trials"], **arrays)
+
+    @property
+    def lags(self) -> np.ndarray:
+        return np.arange(-(self.width - 1), self.width)
+
+    def spc(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.recalled / self.shown
+
+    def pfr(self) -> np.ndarray:
+        return self.first / self.first_trials if self.first_trials else np.full(self.width, np.nan)
+
+    def lag_crp(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.crp_actual / self.crp_possible
+
+
+def _serial_positions(serials: np.ndarray, responses: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Serial position of every response field (-1: blank, intrusion or repeat),
+    and which serial positions were recalled.
+
+    Fields are matched left to right, each serial occurrence at most once, the
+    same credit rule as GameLogger.calculate_correct_numbers.
+    """
+    n, width = serials.shape
+    s_valid = serials != EMPTY
+    used = np.zeros((n, width), dtype=bool)
+    positions = np.full(responses.shape, -1, dtype=np.int64)
+    rows_all = np.arange(n)
+    for j in range(responses.shape[1]):
+        value = responses[:, j:j + 1]
+        match = (serials == value) & s_valid & ~used & (value != EMPTY)
+        hit = match.any(axis=1)
+        rows = rows_all[hit]
+        cols = match.argmax(axis=1)[hit]
+        used[rows, cols] = True
+        positions[rows, j] = cols
+    return positions, used
+
+
+def curve_counts(serials: np.ndarray, responses: np.ndarray, groups: np.ndarray, n_groups: int,
+                 width: int = SERIAL_WIDTH) -> List[CurveCounts]:
+    """Counts for N attempts at once; `groups` gives each row's group index."""
+    serials = np.asarray(serials, dtype=np.int16)
+    responses = np.asarray(responses, dtype=np.int16)
+    groups = np.asarray(groups, dtype=np.int64)
+    n = serials.shape[0]
+    n_lags = 2 * width - 1
+    s_valid = serials != EMPTY
+    positions, recalled = _serial_positions(serials, responses)
+    cell = groups[:, None] * width + np.arange(width)
+
+    def per_group(codes: np.ndarray, size: int) -> np.ndarray:
+        return np.bincount(codes, minlength=n_groups * size).reshape(n_groups, size)
+
+    trials = np.bincount(groups, minlength=n_groups)
+    shown = per_group(cell[s_valid], width)
+    recalled_counts = per_group(cell[recalled], width)
+
+    # First recall: the first filled field, counted when it is a serial number
+    filled = responses != EMPTY
+    any_filled = filled.any(axis=1)
+    first_pos = positions[np.arange(n), filled.argmax(axis=1)]
+    first_trials = np.bincount(groups[any_filled], minlength=n_groups)
+    ok = any_filled & (first_pos >= 0)
+    first = per_group(groups[ok] * width + first_pos[ok], width)
+
+    # Lag-CRP over the correct recalls, packed to the left in output order
+    order = np.argsort(positions < 0, axis=1, kind="stable")
+    packed = np.take_along_axis(positions, order, axis=1)
+    actual = np.zeros(n_groups * n_lags, dtype=np.int64)
+    possible = np.zeros(n_groups * n_lags, dtype=np.int64)
+    seen = np.zeros((n, width), dtype=bool)
+    for t in range(packed.shape[1] - 1):
+        a, b = packed[:, t], packed[:, t + 1]
+        rows = np.nonzero((a >= 0) & (b >= 0))[0]
+        if rows.size == 0:
+            break  # packed: no later transitions either
+        a, b, g = a[rows], b[rows], groups[rows]
+        seen[rows, a] = True
+        actual += np.bincount(g * n_lags + (b - a + width - 1), minlength=n_groups * n_lags)
+        available = ~seen[rows] & s_valid[rows]
+        lag_codes = g[:, None] * n_lags + (np.arange(width)[None, :] - a[:, None] + width - 1)
+        possible += np.bincount(lag_codes[available], minlength=n_groups * n_lags)
+    actual = actual.reshape(n_groups, n_lags)
+    possible = possible.reshape(n_groups, n_lags)
+
+    return [
+        CurveCounts(width, int(trials[i]), shown[i], recalled_counts[i], int(first_trials[i]), first[i],
+                    actual[i], possible[i])
+        for i in range(n_groups)
+    ]
+
+
+def _load_csv(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    serials, responses, speeds = [], [], []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            serials.append(pad_numbers(parse_number_field(r["serial"])))
+            responses.append(pad_numbers(parse_number_field(r["user_input"])))
+            speed = (r.get("speed_ms") or "").strip()
+            speeds.append(int(float(speed)) if speed else EMPTY)
+    shape = (len(serials), SERIAL_WIDTH)
+    return (np.array(serials, dtype=np.int16).reshape(shape), np.array(responses, dtype=np.int16).reshape(shape),
+            np.array(speeds, dtype=np.int64))
+
+
+def _load(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(serial, user_input, speed_ms) of a game_log CSV or a memory-mapped .cols store."""
+    if path.suffix == ".cols":
+        cols = read_store(str(path))
+        return cols["serial"], cols["user_input"], cols["speed_ms"]
+    return _load_csv(path)
+
+
+def file_groups(path: Path) -> Tuple[str, str]:
+    """(mode, participant) from a game_log file name; participant "" if not encoded."""
+    m = LOG_NAME.match(path.name)
+    if not m:
+        raise ValueError(f"Not a game_log file name: {path.name}")
+    return m.group("mode"), m.group("participant")
+
+
+def analyze_file(path: Path) -> Dict[GroupKey, CurveCounts]:
+    """One pass over one file, grouped by Speed schedule step."""
+    path = Path(path)
+    mode, participant = file_groups(path)
+    serials, responses, speeds = _load(path)
+    out: Dict[GroupKey, CurveCounts] = {}
+    for start in range(0, len(speeds), CHUNK_ROWS):
+        chunk_speeds = np.asarray(speeds[start:start + CHUNK_ROWS])
+        keys, groups = np.unique(chunk_speeds, return_inverse=True)
+        counts = curve_counts(serials[start:start + CHUNK_ROWS], responses[start:start + CHUNK_ROWS],
+                              groups, len(keys))
+        for speed, c in zip(keys.tolist(), counts):
+            key = (mode, participant, int(speed))
+            if key in out:
+                out[key] += c
+            else:
+                out[key] = c
+    return out
+
+
+def analyze(paths: Iterable[Path], workers: Optional[int] = None) -> Dict[GroupKey, CurveCounts]:
+    """Counts for every (mode, participant, speed_ms) in `paths`, plus the
+    (mode, ALL_PARTICIPANTS, speed_ms) totals. Files run in parallel."""
+    paths = [Path(p) for p in paths]
+    if workers == 1 or len(paths) <= 1:
+        parts = [analyze_file(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(analyze_file, paths))
+    merged: Dict[GroupKey, CurveCounts] = {}
+    for part in parts:
+        for (mode, participant, speed), counts in part.items():
+            for key in ((mode, participant, speed), (mode, ALL_PARTICIPANTS, speed)):
+                if key not in merged:
+                    merged[key] = CurveCounts(counts.width)
+                merged[key] += counts
+    return merged
+
+
+def write_curves(results: Dict[GroupKey, CurveCounts], out_path: str) -> int:
+    """Long format: mode, participant, speed_ms, measure, index, value, numerator, denominator."""
+    rows = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mode", "participant", "speed_ms", "measure", "index", "value", "numerator", "denominator"])
+        for (mode, participant, speed), c in sorted(results.items()):
+            speed_cell = "" if speed == EMPTY else speed
+            series = [
+                ("spc", range(1, c.width + 1), c.spc(), c.recalled, c.shown),
+                ("pfr", range(1, c.width + 1), c.pfr(), c.first, [c.first_trials] * c.width),
+                ("lag_crp", c.lags, c.lag_crp(), c.crp_actual, c.crp_possible),
+            ]
+            for measure, index, value, num, den in series:
+                for i, v, a, b in zip(index, value, num, den):
+                    if measure == "lag_crp" and i == 0:
+                        continue
+                    writer.writerow([mode, participant, speed_cell, measure, int(i),
+                                     "" if np.isnan(v) else f"{v:.6f}", int(a), int(b)])
+                    rows += 1
+    return rows
+
+
+def _fmt(values: np.ndarray) -> str:
+    return " ".join("  - " if np.isnan(v) else f"{v:.2f}" for v in values)
+
+
+def main():
+    default_dir = Path(__file__).resolve().parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Serial-position curves, PFR and lag-CRP over game_log files.")
+    parser.add_argument("paths", nargs="*", type=Path, help="CSV files or .cols stores (default: data/game_log_*)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--by-participant", action="store_true", help="print every participant, not only totals")
+    parser.add_argument("--out", default=None, help="write all curves to this CSV (long format)")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(p for p in default_dir.glob("game_log_*") if LOG_NAME.match(p.name))
+    t0 = time.perf_counter()
+    results = analyze(paths, args.workers)
+    elapsed = time.perf_counter() - t0
+    trials = sum(c.trials for (_, p, _), c in results.items() if p == ALL_PARTICIPANTS)
+    print(f"{trials} attempts from {len(paths)} files in {elapsed:.2f}s")
+
+    for (mode, participant, speed), c in sorted(results.items()):
+        if participant != ALL_PARTICIPANTS and not args.by_participant:
+            continue
+        label = mode + ("" if participant == ALL_PARTICIPANTS else f" {participant or '-'}")
+        label += "" if speed == EMPTY else f" @{speed}ms"
+        mid = c.width - 1
+        print(f"{label}: {c.trials} attempts")
+        print(f"  SPC      {_fmt(c.spc())}")
+        print(f"  PFR      {_fmt(c.pfr())}")
+        print(f"  lag-CRP  -3..-1 {_fmt(c.lag_crp()[mid - 3:mid])} | +1..+3 {_fmt(c.lag_crp()[mid + 1:mid + 4])}")
+    if args.out:
+        print(f"Wrote {write_curves(results, args.out)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
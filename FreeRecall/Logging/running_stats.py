@@ -0,0 +1,428 @@
+"""Incremental per-mode and per-participant statistics, updated on every logged attempt.
+
+GameLogger feeds each attempt to RunningStats.update(), which is O(1) (a
+fixed amount of work per metric plus one pass over the 10 serial
+positions). Every group keeps:
+
+- Welford running mean/variance of each metric (correct_numbers,
+  first_correct, last_correct, pattern_correct, speed_ms, onset error),
+- a log-bucket quantile sketch (10th/50th/90th percentiles within 1%
+  relative error; not for the 0/1 metrics),
+- the serial-position curve: how often the number shown at each position
+  was recalled anywhere in the response.
+
+The whole state is a small JSON snapshot (``<prefix>_stats.json``) that is
+written atomically and loaded at startup, so nothing has to re-read the CSVs:
+
+    python -m FreeRecall.Logging.running_stats game_log_stats.json
+    python -m FreeRecall.Logging.running_stats game_log_stats.json --participant P001
+"""
+import json
+import math
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+SNAPSHOT_VERSION = 1
+QUANTILES = (0.1, 0.5, 0.9)
+# 0/1 metrics: mean and variance only, their quantiles say nothing
+RATE_METRICS = {"first_correct", "last_correct", "pattern_correct"}
+ALL_PARTICIPANTS = "*"
+
+
+class Welford:
+    """Running count, mean and variance (Welford's algorithm), plus the exact sum
+    (an int for integer metrics) behind GameLogger's *_total columns."""
+
+    __slots__ = ("n", "mean", "m2", "min", "max", "sum")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.sum = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        self.sum += x
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other: "Welford") -> None:
+        """Fold in another stream's moments (Chan et al.'s pairwise update)."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        self.sum += other.sum
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator); nan below two values."""
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+    @property
+    def total(self) -> float:
+        return self.sum
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "sum": self.sum, "mean": self.mean, "m2": self.m2,
+                "min": None if self.n == 0 else self.min, "max": None if self.n == 0 else self.max}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Welford":
+        w = cls()
+        w.n, w.mean, w.m2 = d["n"], d["mean"], d["m2"]
+        # Snapshots written before the sum was kept: the closest integer estimate
+        w.sum = d["sum"] if "sum" in d else round(w.mean * w.n)
+        w.min = math.inf if d["min"] is None else d["min"]
+        w.max = -math.inf if d["max"] is None else d["max"]
+        return w
+
+
+class QuantileSketch:
+    """Streaming quantiles with bounded relative error (a DDSketch-style log histogram).
+
+    Each value goes into bucket ceil(log_gamma |x|) (positives and negatives
+    kept apart, zeros counted on their own), so add() is one log and one dict
+    increment, any quantile is read from the buckets, and every estimate is
+    within `relative_accuracy` of a true value of the stream.
+    """
+
+    __slots__ = ("relative_accuracy", "_log_gamma", "_gamma", "positive", "negative", "zeros", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        if x > 0:
+            k = math.ceil(math.log(x) / self._log_gamma)
+            self.positive[k] = self.positive.get(k, 0) + 1
+        elif x < 0:
+            k = math.ceil(math.log(-x) / self._log_gamma)
+            self.negative[k] = self.negative.get(k, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Add another sketch's buckets; both need the same relative accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches of different relative accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, k: int) -> float:
+        return 2 * self._gamma ** k / (self._gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for k in sorted(self.negative, reverse=True):  # most negative first
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.positive))
+
+    def histogram(self) -> List[Tuple[float, int]]:
+        """(bucket value, count) in ascending order. Small integers (correct
+        numbers) each get a bucket of their own, so rounding the values gives
+        their exact counts."""
+        buckets = [(-self._value(k), c) for k, c in self.negative.items()]
+        if self.zeros:
+            buckets.append((0.0, self.zeros))
+        buckets.extend((self._value(k), c) for k, c in self.positive.items())
+        return sorted(buckets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"relative_accuracy": self.relative_accuracy, "zeros": self.zeros,
+                "positive": self.positive, "negative": self.negative}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(d["relative_accuracy"])
+        sketch.zeros = d["zeros"]
+        sketch.positive = {int(k): c for k, c in d["positive"].items()}
+        sketch.negative = {int(k): c for k, c in d["negative"].items()}
+        sketch.count = sketch.zeros + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class MetricStats:
+    """Welford moments plus (optionally) a quantile sketch of one metric."""
+
+    __slots__ = ("moments", "sketch")
+
+    def __init__(self, quantiles: bool = True) -> None:
+        self.moments = Welford()
+        self.sketch = QuantileSketch() if quantiles else None
+
+    def add(self, x: float) -> None:
+        self.moments.add(x)
+        if self.sketch is not None:
+            self.sketch.add(x)
+
+    def merge(self, other: "MetricStats") -> None:
+        self.moments.merge(other.moments)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def summary(self) -> Dict[str, Any]:
+        m = self.moments
+        out = {"n": m.n, "mean": m.mean if m.n else math.nan, "std": m.std,
+               "min": m.min if m.n else math.nan, "max": m.max if m.n else math.nan}
+        if self.sketch is not None:
+            for q in QUANTILES:
+                # bucket midpoints can lie just outside the data
+                out[f"p{round(q * 100)}"] = min(max(self.sketch.quantile(q), m.min), m.max) if m.n else math.nan
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"moments": self.moments.to_dict(),
+                "sketch": None if self.sketch is None else self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "MetricStats":
+        m = cls(quantiles=d["sketch"] is not None)
+        m.moments = Welford.from_dict(d["moments"])
+        if d["sketch"] is not None:
+            m.sketch = QuantileSketch.from_dict(d["sketch"])
+        return m
+
+
+class GroupStats:
+    """All running statistics of one (mode, participant) group."""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, MetricStats] = {}
+        self.position_shown: List[int] = []
+        self.position_recalled: List[int] = []
+
+    @property
+    def attempts(self) -> int:
+        m = self.metrics.get("correct_numbers")
+        return m.moments.n if m is not None else 0
+
+    def add(self, values: Dict[str, float], serial: List[int], recalled: List[bool]) -> None:
+        for name, x in values.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = MetricStats(quantiles=name not in RATE_METRICS)
+            metric.add(x)
+        missing = len(serial) - len(self.position_shown)
+        if missing > 0:
+            self.position_shown.extend([0] * missing)
+            self.position_recalled.extend([0] * missing)
+        for i, hit in enumerate(recalled):
+            self.position_shown[i] += 1
+            self.position_recalled[i] += hit
+
+    def merge(self, other: "GroupStats") -> None:
+        """Add the statistics of attempts counted in another group (e.g. another file)."""
+        for name, metric in other.metrics.items():
+            mine = self.metrics.get(name)
+            if mine is None:
+                mine = self.metrics[name] = MetricStats(quantiles=name not in RATE_METRICS)
+            mine.merge(metric)
+        missing = len(other.position_shown) - len(self.position_shown)
+        if missing > 0:
+            self.position_shown.extend([0] * missing)
+            self.position_recalled.extend([0] * missing)
+        for i, (shown, recalled) in enumerate(zip(other.position_shown, other.position_recalled)):
+            self.position_shown[i] += shown
+            self.position_recalled[i] += recalled
+
+    def total(self, name: str) -> int:
+        m = self.metrics.get(name)
+        return m.moments.total if m is not None else 0
+
+    def serial_position_curve(self) -> List[float]:
+        """P(recalled) of the number at each serial position."""
+        return [r / s if s else math.nan for r, s in zip(self.position_recalled, self.position_shown)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "metrics": {name: m.summary() for name, m in self.metrics.items()},
+            "serial_position_curve": self.serial_position_curve(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "metrics": {name: m.to_dict() for name, m in self.metrics.items()},
+            "position_shown": self.position_shown,
+            "position_recalled": self.position_recalled,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "GroupStats":
+        g = cls()
+        g.metrics = {name: MetricStats.from_dict(m) for name, m in d["metrics"].items()}
+        g.position_shown = list(d["position_shown"])
+        g.position_recalled = list(d["position_recalled"])
+        return g
+
+
+def recalled_positions(serial: List[int], user_input: List[Optional[int]]) -> List[bool]:
+    """Per serial position, whether that number was recalled anywhere in the
+    response; repeated numbers need as many entries, as in the strict scoring."""
+    available = Counter(v for v in user_input if v is not None)
+    out = []
+    for number in serial:
+        if available[number] > 0:
+            available[number] -= 1
+            out.append(True)
+        else:
+            out.append(False)
+    return out
+
+
+def _key(mode: str, participant: str) -> str:
+    return f"{mode}|{participant}"
+
+
+class RunningStats:
+    """Running statistics per mode (participant ALL_PARTICIPANTS) and per
+    (mode, participant), with an optional JSON snapshot at `path`."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.groups: Dict[Tuple[str, str], GroupStats] = {}
+        self.dirty = False
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def group(self, mode: str, participant: Optional[str] = None) -> GroupStats:
+        key = (mode, participant or ALL_PARTICIPANTS)
+        g = self.groups.get(key)
+        if g is None:
+            g = self.groups[key] = GroupStats()
+        return g
+
+    def update(
+        self,
+        mode: str,
+        serial: List[int],
+        user_input: List[Optional[int]],
+        correct_numbers: int,
+        first_correct: bool,
+        last_correct: bool,
+        pattern_correct: Optional[bool] = None,
+        speed_ms: Optional[int] = None,
+        timing: Optional[Dict[str, float]] = None,
+        participant: Optional[str] = None,
+    ) -> None:
+        values = {
+            "correct_numbers": correct_numbers,
+            "first_correct": 1 if first_correct else 0,
+            "last_correct": 1 if last_correct else 0,
+        }
+        if pattern_correct is not None:
+            values["pattern_correct"] = 1 if pattern_correct else 0
+        if speed_ms is not None:
+            values["speed_ms"] = speed_ms
+        if timing and "onset_error_mean_ms" in timing:
+            values["onset_error_mean_ms"] = timing["onset_error_mean_ms"]
+        recalled = recalled_positions(serial, user_input)
+        self.group(mode).add(values, serial, recalled)
+        if participant:
+            self.group(mode, participant).add(values, serial, recalled)
+        self.dirty = True
+
+    def query(self, mode: str, participant: Optional[str] = None) -> Dict[str, Any]:
+        """Current summary of one group, e.g. for a live dashboard."""
+        g = self.groups.get((mode, participant or ALL_PARTICIPANTS))
+        return g.summary() if g is not None else GroupStats().summary()
+
+    def participants(self, mode: str) -> List[str]:
+        return sorted(p for m, p in self.groups if m == mode and p != ALL_PARTICIPANTS)
+
+    # ---------- snapshot ----------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "groups": {_key(mode, p): g.to_dict() for (mode, p), g in self.groups.items()},
+        }
+
+    def load(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} stats snapshot")
+        self.groups = {}
+        for key, g in data["groups"].items():
+            mode, participant = key.rsplit("|", 1)
+            self.groups[(mode, participant)] = GroupStats.from_dict(g)
+        self.dirty = False
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the snapshot atomically (temp file + rename)."""
+        path = path or self.path
+        if path is None:
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict()))  # dumps() uses the C encoder, dump() does not
+        os.replace(tmp, path)
+        self.dirty = False
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the running statistics stored in a snapshot.")
+    parser.add_argument("snapshot", nargs="?", default="game_log_stats.json")
+    parser.add_argument("--participant", default=None, help="one participant instead of the whole mode")
+    args = parser.parse_args()
+
+    stats = RunningStats()
+    stats.load(args.snapshot)
+    for mode in sorted({m for m, _ in stats.groups}):
+        s = stats.query(mode, args.participant)
+        if not s["attempts"]:
+            continue
+        print(f"{mode}: {s['attempts']} attempts, {len(stats.participants(mode))} participants")
+        for name, m in s["metrics"].items():
+            quantiles = "".join(f"  {k} {m[k]:8.2f}" for k in ("p10", "p50", "p90") if k in m)
+            print(f"  {name:<22} mean {m['mean']:8.3f}  sd {m['std']:8.3f}{quantiles}")
+        print("  serial position curve: " + " ".join(f"{p:.2f}" for p in s["serial_position_curve"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""SQLite storage for game logs: normalized, indexed tables instead of per-mode CSVs.
+
+GameLogger(database=SQLiteStore(path)) writes every attempt here instead of
+``<prefix>_<mode>.csv`` and the timing sidecar. The database is in WAL mode
+and rows are batched into one transaction per flush (same flush_rows /
+flush_interval_s / fsync policy as BufferedCSVWriter). Tables:
+
+- sessions:    one per participant
+- attempts:    one per attempt: mode, speed, scores, running totals, timing
+               summary; indexed by (session, mode, speed_ms), (mode, speed_ms)
+               and timestamp
+- responses:   one per box: the number shown at that position, the number
+               entered there, and whether it counts as correct
+- item_timing: intended/actual onset and offset of every revealed number
+
+export_csv() writes the CSV layouts back (LOG_HEADER / STIMULUS_TIMING_HEADER):
+
+    python -m FreeRecall.Logging.sqlite_store export --db data/game_log.sqlite --prefix data/game_log
+    python -m FreeRecall.Logging.sqlite_store query --db data/game_log.sqlite --mode Speed --speed-ms 500 --participant P007
+"""
+import argparse
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+FSYNC_POLICIES = ("never", "flush", "always")
+SYNCHRONOUS = {"never": "OFF", "flush": "NORMAL", "always": "FULL"}
+
+# attempts columns holding LOG_HEADER values as-is (serial/user_input live in responses)
+ATTEMPT_COLUMNS = [
+    "timestamp", "attempt", "correct_numbers", "wrong_numbers", "first_correct", "last_correct",
+    "pattern_correct", "correct_numbers_total", "first_correct_total", "last_correct_total", "speed_ms",
+    "onset_error_mean_ms", "onset_error_max_ms", "offset_error_mean_ms", "drift_ms",
+]
+TIMING_VALUE_COLUMNS = ["intended_onset_ms", "actual_onset_ms", "intended_offset_ms", "actual_offset_ms"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    participant TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(session_id),
+    mode TEXT NOT NULL,
+    serial_length INTEGER NOT NULL,
+    input_length INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    correct_numbers INTEGER NOT NULL,
+    wrong_numbers INTEGER NOT NULL,
+    first_correct INTEGER NOT NULL,
+    last_correct INTEGER NOT NULL,
+    pattern_correct INTEGER,
+    correct_numbers_total INTEGER NOT NULL,
+    first_correct_total INTEGER NOT NULL,
+    last_correct_total INTEGER NOT NULL,
+    speed_ms INTEGER,
+    onset_error_mean_ms REAL,
+    onset_error_max_ms REAL,
+    offset_error_mean_ms REAL,
+    drift_ms REAL
+);
+CREATE INDEX IF NOT EXISTS attempts_session ON attempts(session_id, mode, speed_ms);
+CREATE INDEX IF NOT EXISTS attempts_mode ON attempts(mode, speed_ms);
+CREATE INDEX IF NOT EXISTS attempts_timestamp ON attempts(timestamp);
+CREATE TABLE IF NOT EXISTS responses (
+    attempt_id INTEGER NOT NULL REFERENCES attempts(attempt_id),
+    position INTEGER NOT NULL,
+    shown INTEGER,
+    entered INTEGER,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (attempt_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS item_timing (
+    attempt_id INTEGER NOT NULL REFERENCES attempts(attempt_id),
+    item INTEGER NOT NULL,
+    intended_onset_ms REAL,
+    actual_onset_ms REAL,
+    intended_offset_ms REAL,
+    actual_offset_ms REAL,
+    PRIMARY KEY (attempt_id, item)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open (and create if needed) a game log database in WAL mode."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def response_credit(serial: Sequence[int], user_input: Sequence[Optional[int]]) -> List[int]:
+    """Per box, 1 if the entry earns credit under GameLogger.calculate_correct_numbers
+    (a number counts up to as many times as it occurs in the serial, earliest boxes first)."""
+    left = Counter(serial)
+    credit = []
+    for value in user_input:
+        ok = value is not None and left[value] > 0
+        if ok:
+            left[value] -= 1
+        credit.append(int(ok))
+    return credit
+
+
+class SQLiteStore:
+    """Batched writer for one game log database; see the module docstring.
+
+    Attempts are buffered in memory and written in one transaction when
+    `flush_rows` are pending or `flush_interval_s` seconds have passed, and
+    on flush()/close() (registered with atexit). The fsync policy maps to
+    SQLite's synchronous setting: "never" -> OFF, "flush" -> NORMAL (a WAL
+    commit survives a crash of the process), "always" -> FULL with one
+    transaction per attempt.
+    """
+
+    def __init__(self, path: str, flush_rows: int = 64, flush_interval_s: float = 2.0, fsync: str = "flush"):
+        if flush_rows <= 0:
+            raise ValueError("flush_rows must be > 0")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.conn = connect(path)
+        self.conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[fsync]}")
+        self._pending: List[tuple] = []
+        self._sessions: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        atexit.register(self.close)
+
+    def write_attempt(self, mode: str, participant: Optional[str], values: Dict[str, Any], serial: List[int],
+                      user_input: List[Optional[int]], stimulus_timing: Optional[List[tuple]] = None) -> None:
+        """Queue one attempt. `values` maps ATTEMPT_COLUMNS to their values (None for blank cells);
+        `stimulus_timing` holds (index, intended_on, actual_on, intended_off, actual_off) rows."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLiteStore is closed")
+            self._pending.append((mode, participant or "", values, list(serial), list(user_input),
+                                  stimulus_timing or []))
+            if (
+                self.fsync == "always"
+                or len(self._pending) >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            ):
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval_s > 0:
+                self._timer = threading.Thread(target=self._flush_loop, daemon=True)
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Commit all pending attempts."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and close the connection. Safe to call more than once."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self.conn.close()
+            self._closed = True
+        self._stop.set()
+        atexit.unregister(self.close)
+
+    def _session_id(self, participant: str) -> int:
+        session_id = self._sessions.get(participant)
+        if session_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO sessions (participant) VALUES (?)", (participant,))
+            session_id = self.conn.execute("SELECT session_id FROM sessions WHERE participant = ?",
+                                           (participant,)).fetchone()[0]
+            self._sessions[participant] = session_id
+        return session_id
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            insert = (f"INSERT INTO attempts (session_id, mode, serial_length, input_length, "
+                      f"{', '.join(ATTEMPT_COLUMNS)}) VALUES (?, ?, ?, ?{', ?' * len(ATTEMPT_COLUMNS)})")
+            with self.conn:  # one transaction per batch
+                responses, timing = [], []
+                for mode, participant, values, serial, user_input, items in self._pending:
+                    cur = self.conn.execute(insert, [self._session_id(participant), mode, len(serial),
+                                                     len(user_input)] + [values[c] for c in ATTEMPT_COLUMNS])
+                    attempt_id = cur.lastrowid
+                    credit = response_credit(serial, user_input)
+                    for i in range(max(len(serial), len(user_input))):
+                        responses.append((attempt_id, i, serial[i] if i < len(serial) else None,
+                                          user_input[i] if i < len(user_input) else None,
+                                          credit[i] if i < len(credit) else 0))
+                    timing.extend((attempt_id, index, *times) for index, *times in items)
+                self.conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?, ?)", responses)
+                self.conn.executemany("INSERT INTO item_timing VALUES (?, ?, ?, ?, ?, ?)", timing)
+            self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._flush_locked()
+
+
+def _cell(value: Any, fmt: Optional[str] = None) -> Any:
+    if value is None:
+        return ""
+    return format(value, fmt) if fmt else value
+
+
+def export_csv(db_path: str, base_prefix: str = "game_log") -> List[str]:
+    """Write ``<prefix>_<mode>.csv`` (and ``_timing.csv`` where recorded) for every
+    mode in the database, in the layout GameLogger writes; returns the paths.
+    SQLite does not keep the sign of zero, so a logged -0.000 comes back as 0.000."""
+    import csv
+    try:
+        from .logger import LOG_HEADER, STIMULUS_TIMING_HEADER, TIMING_COLUMNS
+    except ImportError:
+        from logger import LOG_HEADER, STIMULUS_TIMING_HEADER, TIMING_COLUMNS
+
+    conn = connect(db_path)
+    paths = []
+    modes = [m for (m,) in conn.execute("SELECT DISTINCT mode FROM attempts ORDER BY mode")]
+    for mode in modes:
+        boxes: Dict[int, List[tuple]] = {}
+        for attempt_id, shown, entered in conn.execute(
+                "SELECT r.attempt_id, r.shown, r.entered FROM responses r JOIN attempts a USING (attempt_id) "
+                "WHERE a.mode = ? ORDER BY r.attempt_id, r.position", (mode,)):
+            boxes.setdefault(attempt_id, []).append((shown, entered))
+        path = f"{base_prefix}_{mode.lower()}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(LOG_HEADER)
+            query = (f"SELECT attempt_id, serial_length, input_length, {', '.join(ATTEMPT_COLUMNS)} "
+                     f"FROM attempts WHERE mode = ? ORDER BY attempt_id")
+            for attempt_id, serial_length, input_length, *values in conn.execute(query, (mode,)):
+                row = dict(zip(ATTEMPT_COLUMNS, values))
+                cells = boxes.get(attempt_id, [])
+                row["serial"] = " ".join(str(s) for s, _ in cells[:serial_length])
+                row["user_input"] = " ".join("" if e is None else str(e) for _, e in cells[:input_length])
+                writer.writerow([_cell(row[c], ".3f" if c in TIMING_COLUMNS else None) for c in LOG_HEADER])
+        paths.append(path)
+
+        timing = conn.execute(
+            f"SELECT a.timestamp, a.attempt, i.item, {', '.join('i.' + c for c in TIMING_VALUE_COLUMNS)} "
+            f"FROM item_timing i JOIN attempts a USING (attempt_id) WHERE a.mode = ? "
+            f"ORDER BY i.attempt_id, i.item", (mode,)).fetchall()
+        if timing:
+            path = f"{base_prefix}_{mode.lower()}_timing.csv"
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(STIMULUS_TIMING_HEADER)
+                writer.writerows(list(row[:3]) + [_cell(v, ".3f") for v in row[3:]] for row in timing)
+            paths.append(path)
+    conn.close()
+    return paths
+
+
+def query_attempts(db_path: str, mode: Optional[str] = None, speed_ms: Optional[int] = None,
+                   participant: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Attempts matching the filters (served by the indexes), oldest first."""
+    conn = connect(db_path)
+    where, params = [], []
+    for clause, value in (("s.participant = ?", participant), ("a.mode = ?", mode), ("a.speed_ms = ?", speed_ms)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    columns = ["attempt_id", "participant", "mode", "speed_ms", "attempt", "correct_numbers", "serial_length",
+               "timestamp"]
+    sql = ("SELECT a.attempt_id, s.participant, a.mode, a.speed_ms, a.attempt, a.correct_numbers, "
+           "a.serial_length, a.timestamp FROM attempts a JOIN sessions s USING (session_id)"
+           + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY a.attempt_id")
+    rows = [dict(zip(columns, r)) for r in conn.execute(sql, params)]
+    conn.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or query a SQLite game log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write the per-mode CSV layouts from the database")
+    export.add_argument("--db", default="game_log.sqlite")
+    export.add_argument("--prefix", default="game_log", help="CSV path prefix, as GameLogger's base_prefix")
+    query = sub.add_parser("query", help="list matching attempts")
+    query.add_argument("--db", default="game_log.sqlite")
+    query.add_argument("--mode", default=None)
+    query.add_argument("--speed-ms", type=int, default=None)
+    query.add_argument("--participant", default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for path in export_csv(args.db, args.prefix):
+            print(f"Wrote {path}")
+        return
+    rows = query_attempts(args.db, args.mode, args.speed_ms, args.participant)
+    for r in rows:
+        speed = "" if r["speed_ms"] is None else r["speed_ms"]
+        print(f"{r['participant']:>10} {r['mode']:<13} {speed:>5} {r['attempt']:4d} "
+              f"{r['correct_numbers']:3d}/{r['serial_length']}")
+    if rows:
+        mean = sum(r["correct_numbers"] / max(1, r["serial_length"]) for r in rows) / len(rows)
+        print(f"{len(rows)} attempts, mean proportion correct {mean:.3f}")
+
+
+if __name__ == "__main__":
+    main()
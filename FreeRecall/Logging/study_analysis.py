@@ -0,0 +1,264 @@
+"""Per-participant and study-level tables over a game_log archive, one file per task.
+
+FreeRecall data comes one CSV per mode and participant (game_log_speedAS.csv,
+game_log_normalRA.csv, ...), so every file is an independent unit of work.
+Worker processes each take a file and do everything that needs its rows:
+
+- parse it and score every attempt like GameLogger (incremental.score_rows),
+- split it by Speed schedule step (speed_ms),
+- keep running statistics (running_stats.GroupStats) and SPC / PFR / lag-CRP
+  counts (recall_analysis.CurveCounts) per step.
+
+Only those small aggregates travel back to the parent, which merges them into
+
+    participants.csv  per mode, participant and speed step (and all steps):
+                      attempts, correct numbers mean/sd/median, first/last
+                      and pattern correct rates
+    study.csv         per mode and speed step: participants, attempts, the
+                      mean of the participant means with its between-
+                      participant sd and Student t 95% CI
+    curves.csv        recall_analysis.write_curves() of every group
+
+Files are handed out in chunks so small files do not cost one round trip
+each. Results do not depend on the number of workers (map keeps file order):
+
+    python -m FreeRecall.Logging.study_analysis --out-dir study_tables
+    python -m FreeRecall.Logging.study_analysis a.csv b.csv --workers 4
+    python -m FreeRecall.Logging.study_analysis --bench 4000 --bench-workers 1,2,4,8
+"""
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .columnar import EMPTY
+    from .incremental import FilePartial, read_new_rows, score_rows, synthetic_archive
+    from .recall_analysis import LOG_NAME, CurveCounts, GroupKey, file_groups, write_curves
+    from .running_stats import ALL_PARTICIPANTS, GroupStats
+except ImportError:
+    from columnar import EMPTY
+    from incremental import FilePartial, read_new_rows, score_rows, synthetic_archive
+    from recall_analysis import LOG_NAME, CurveCounts, GroupKey, file_groups, write_curves
+    from running_stats import ALL_PARTICIPANTS, GroupStats
+
+ALL_STEPS = -2  # speed_ms key of a group over every step; EMPTY (-1) marks modes without one
+CHUNKS_PER_WORKER = 8
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom
+T95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+Z975 = 1.959964
+
+FileResult = Tuple[str, str, Dict[int, Tuple[GroupStats, CurveCounts]]]
+
+
+def t_critical_95(dof: int) -> float:
+    """Two-sided 95% t critical value; a table up to 30 degrees of freedom, then
+    the Cornish-Fisher expansion around the normal quantile (error < 1e-4)."""
+    if dof < 1:
+        return math.nan
+    if dof <= len(T95):
+        return T95[dof - 1]
+    z = Z975
+    return z + (z ** 3 + z) / (4 * dof) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+
+
+def _speed(row: Dict[str, str]) -> int:
+    text = (row.get("speed_ms") or "").strip()
+    return int(float(text)) if text else EMPTY
+
+
+def analyze_file(path: Path) -> FileResult:
+    """(mode, participant, {speed_ms: (stats, curve counts)}) of one game_log CSV."""
+    path = Path(path)
+    mode, participant = file_groups(path)
+    _, rows, last, _, _ = read_new_rows(path, FilePartial(mode, participant))
+    by_speed: Dict[int, List[Dict[str, str]]] = {}
+    for row in rows + last:
+        by_speed.setdefault(_speed(row), []).append(row)
+    out = {}
+    for speed, speed_rows in sorted(by_speed.items()):
+        part = FilePartial(mode, participant)
+        score_rows(part, speed_rows)
+        out[speed] = (part.stats, part.curves[speed])
+    return mode, participant, out
+
+
+def analyze_files(paths: Sequence[Path], workers: Optional[int] = None) -> List[FileResult]:
+    """analyze_file() of every path, on `workers` processes (default: one per CPU)."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [analyze_file(p) for p in paths]
+    chunksize = max(1, len(paths) // (workers * CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_file, paths, chunksize=chunksize))
+
+
+class StudyTables:
+    """Merged statistics keyed (mode, participant, speed_ms), with ALL_PARTICIPANTS
+    and ALL_STEPS for the totals."""
+
+    def __init__(self, results: Iterable[FileResult]) -> None:
+        self.stats: Dict[GroupKey, GroupStats] = {}
+        self.curves: Dict[GroupKey, CurveCounts] = {}
+        for mode, participant, by_speed in results:
+            for speed, (stats, counts) in by_speed.items():
+                for who in (participant, ALL_PARTICIPANTS):
+                    # A mode without a schedule only gets its all-steps group
+                    for step in ((ALL_STEPS,) if speed == EMPTY else (speed, ALL_STEPS)):
+                        self._group(mode, who, step).merge(stats)
+                    key = (mode, who, speed)
+                    if key not in self.curves:
+                        self.curves[key] = CurveCounts(counts.width)
+                    self.curves[key] += counts
+
+    def _group(self, mode: str, participant: str, speed: int) -> GroupStats:
+        key = (mode, participant, speed)
+        group = self.stats.get(key)
+        if group is None:
+            group = self.stats[key] = GroupStats()
+        return group
+
+    @property
+    def attempts(self) -> int:
+        return sum(g.attempts for (_, p, s), g in self.stats.items() if p == ALL_PARTICIPANTS and s == ALL_STEPS)
+
+    def participant_rows(self) -> List[Dict[str, object]]:
+        rows = []
+        for (mode, participant, speed), group in sorted(self.stats.items()):
+            if participant == ALL_PARTICIPANTS:
+                continue
+            metrics = group.summary()["metrics"]
+            correct = metrics["correct_numbers"]
+            rows.append({
+                "mode": mode, "participant": participant, "speed_ms": _speed_cell(speed),
+                "attempts": group.attempts,
+                "correct_numbers_mean": correct["mean"], "correct_numbers_sd": correct["std"],
+                "correct_numbers_median": correct["p50"],
+                "first_correct_rate": metrics["first_correct"]["mean"],
+                "last_correct_rate": metrics["last_correct"]["mean"],
+                "pattern_correct_rate": metrics["pattern_correct"]["mean"] if "pattern_correct" in metrics else "",
+            })
+        return rows
+
+    def study_rows(self, metric: str = "correct_numbers") -> List[Dict[str, object]]:
+        """Between-participant summary of the participant means of `metric` per mode and step."""
+        means: Dict[Tuple[str, int], List[float]] = {}
+        for (mode, participant, speed), group in self.stats.items():
+            if participant != ALL_PARTICIPANTS and group.attempts and metric in group.metrics:
+                means.setdefault((mode, speed), []).append(group.metrics[metric].moments.mean)
+        rows = []
+        for (mode, speed), values in sorted(means.items()):
+            k = len(values)
+            mean = sum(values) / k
+            sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (k - 1)) if k > 1 else math.nan
+            margin = t_critical_95(k - 1) * sd / math.sqrt(k) if k > 1 else math.nan
+            pooled = self.stats[(mode, ALL_PARTICIPANTS, speed)]
+            rows.append({
+                "mode": mode, "speed_ms": _speed_cell(speed), "participants": k, "attempts": pooled.attempts,
+                "participant_mean": mean, "participant_sd": sd, "ci95_low": mean - margin, "ci95_high": mean + margin,
+                "pooled_mean": pooled.metrics[metric].moments.mean,
+            })
+        return rows
+
+
+def _speed_cell(speed: int) -> str:
+    return "" if speed == ALL_STEPS else str(speed)
+
+
+def _write(rows: List[Dict[str, object]], path: Path) -> int:
+    if not rows:
+        return 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: "" if isinstance(v, float) and math.isnan(v) else v for k, v in row.items()})
+    return len(rows)
+
+
+def write_tables(tables: StudyTables, out_dir: Path) -> Dict[str, int]:
+    """participants.csv, study.csv and curves.csv in out_dir; rows written per file."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        "participants.csv": _write(tables.participant_rows(), out_dir / "participants.csv"),
+        "study.csv": _write(tables.study_rows(), out_dir / "study.csv"),
+        "curves.csv": write_curves(tables.curves, str(out_dir / "curves.csv")),
+    }
+
+
+def scaling_bench(files: int, worker_counts: Sequence[int], rows: int = 15) -> List[Dict[str, float]]:
+    """Wall time of analyze_files + merge per worker count on a synthetic archive
+    of `files` participant files; also checks every run gives the same tables."""
+    import tempfile
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="freerecall_study_") as tmp:
+        synthetic_archive(Path(tmp), files, rows)
+        paths = sorted(Path(tmp).glob("game_log_*.csv"))
+        reference = None
+        for workers in worker_counts:
+            t0 = time.perf_counter()
+            tables = StudyTables(analyze_files(paths, workers))
+            study = tables.study_rows()
+            elapsed = time.perf_counter() - t0
+            if reference is None:
+                reference = study
+            elif study != reference:
+                raise AssertionError(f"{workers} workers gave different study tables")
+            results.append({"workers": workers, "seconds": elapsed, "attempts": tables.attempts})
+    base = results[0]["seconds"] * results[0]["workers"]
+    for r in results:
+        r["speedup"] = base / r["seconds"]
+        r["efficiency"] = r["speedup"] / r["workers"]
+    return results
+
+
+def main() -> None:
+    default_dir = Path(__file__).resolve().parent.parent / "data"
+    parser = argparse.ArgumentParser(description="Per-participant and study tables from game_log CSVs, in parallel.")
+    parser.add_argument("paths", nargs="*", type=Path, help="game_log CSVs (default: data/game_log_*.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--out-dir", type=Path, default=None, help="write the tables here (default: only print)")
+    parser.add_argument("--bench", type=int, default=None, metavar="FILES",
+                        help="scaling benchmark on a synthetic archive of FILES participant files instead")
+    parser.add_argument("--bench-workers", default=None,
+                        help="comma-separated worker counts for --bench (default: 1, 2, 4, ... up to the CPUs)")
+    args = parser.parse_args()
+
+    if args.bench:
+        if args.bench_workers:
+            counts = [int(w) for w in args.bench_workers.split(",")]
+        else:
+            counts, w = [], 1
+            while w < (os.cpu_count() or 1):
+                counts.append(w)
+                w *= 2
+            counts.append(os.cpu_count() or 1)
+        print(f"{args.bench} files on {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>8} {'speedup':>8} {'efficiency':>10}")
+        for r in scaling_bench(args.bench, counts):
+            print(f"{r['workers']:7d} {r['seconds']:8.2f} {args.bench / r['seconds']:8.0f} "
+                  f"{r['speedup']:8.2f} {r['efficiency']:10.0%}")
+        return
+
+    paths = args.paths or sorted(p for p in default_dir.glob("game_log_*.csv") if LOG_NAME.match(p.name))
+    t0 = time.perf_counter()
+    tables = StudyTables(analyze_files(paths, args.workers))
+    print(f"{tables.attempts} attempts from {len(paths)} files in {time.perf_counter() - t0:.2f}s")
+    for row in tables.study_rows():
+        step = f" @{row['speed_ms']}ms" if row["speed_ms"] else ""
+        print(f"  {row['mode']}{step}: {row['participants']} participant(s), {row['attempts']} attempts, "
+              f"correct numbers {row['participant_mean']:.2f} (95% CI {row['ci95_low']:.2f} to {row['ci95_high']:.2f})")
+    if args.out_dir:
+        for name, n in write_tables(tables, args.out_dir).items():
+            print(f"Wrote {n} rows to {args.out_dir / name}")
+
+
+if __name__ == "__main__":
+    main()
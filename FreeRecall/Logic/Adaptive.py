@@ -0,0 +1,172 @@
+"""Bayesian adaptive placement (QUEST+) for the Adaptive mode.
+
+Speed mode replays SPEED_SCHEDULE_MS whatever the participant does; the
+Adaptive mode instead picks each round's per-number duration and list length
+to learn the participant's threshold as fast as possible.
+
+Model: every shown number is recalled independently with probability
+
+    psi(d, n) = GUESS + (1 - GUESS - LAPSE) * F(SLOPE * (log10 d - theta)) * min(1, span / n)
+
+F is the logistic function, d the per-number duration in ms and n the list
+length, so theta is the log10 duration at which encoding succeeds half the
+time and span caps how many numbers fit at once. correct_numbers (as scored
+by GameLogger.calculate_correct_numbers) is then Binomial(n, psi).
+
+The posterior over a (theta, span) grid starts uniform. After every round it
+is multiplied by the likelihood of the observed correct_numbers, and the next
+(duration, length) is the candidate that minimizes the expected posterior
+entropy (Watson, 2017). Likelihoods for every candidate and outcome are
+tabulated once per process, so choosing a round costs three matrix-vector
+products. The posterior, and so the choice, is a function of the rounds seen,
+so choices are also memoized per process by that history: every session's
+first round, and the early rounds sessions share, cost a dict lookup.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .MainLogic import SERIAL_LENGTH
+except ImportError:
+    from Logic.MainLogic import SERIAL_LENGTH
+
+SLOPE = 5.0              # psychometric slope per log10 unit of duration
+GUESS = 0.01             # chance of entering a shown number without encoding it
+LAPSE = 0.02             # chance of missing a number that was encoded
+THETA_RANGE_MS = (50, 5000)
+THETA_STEP = 0.025       # log10 units
+SPAN_RANGE = (2.0, 11.0)
+SPAN_STEP = 0.5
+DURATIONS_MS = (100, 130, 160, 200, 250, 320, 400, 500, 630, 800, 1000, 1250, 1500, 2000, 2500, 3000)
+LENGTHS = tuple(range(3, SERIAL_LENGTH + 1))
+
+CHOICE_CACHE_SIZE = 100_000  # memoized (history -> next round) entries per process
+
+_TABLES: Dict[tuple, tuple] = {}
+_CHOICES: Dict[tuple, Tuple[int, int]] = {}
+
+
+def recall_probability(duration_ms, length, theta, span, slope=SLOPE, guess=GUESS, lapse=LAPSE):
+    """psi(d, n) of the model; broadcasts over numpy arrays."""
+    encoded = 1.0 / (1.0 + np.exp(-slope * (np.log10(duration_ms) - theta)))
+    return guess + (1.0 - guess - lapse) * encoded * np.minimum(1.0, span / length)
+
+
+def _tables(durations: Tuple[int, ...], lengths: Tuple[int, ...], slope: float, guess: float, lapse: float) -> tuple:
+    """Grid, likelihood table L (params x columns) and L*log(L), cached per configuration.
+
+    Columns run over candidates (length-major, then duration) and, within a
+    candidate, over outcomes k = 0..n.
+    """
+    key = (durations, lengths, slope, guess, lapse)
+    if key not in _TABLES:
+        thetas = np.arange(math.log10(THETA_RANGE_MS[0]), math.log10(THETA_RANGE_MS[1]) + 1e-9, THETA_STEP)
+        spans = np.arange(SPAN_RANGE[0], SPAN_RANGE[1] + 1e-9, SPAN_STEP)
+        theta, span = [a.ravel() for a in np.meshgrid(thetas, spans, indexing="ij")]
+        d = np.asarray(durations, dtype=float)
+        blocks, starts, candidates = [], [], []
+        column = 0
+        for n in lengths:
+            psi = recall_probability(d[None, :], n, theta[:, None], span[:, None], slope, guess, lapse)
+            k = np.arange(n + 1)
+            log_comb = np.array([math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) for i in k])
+            log_l = (log_comb + k * np.log(psi)[..., None] + (n - k) * np.log1p(-psi)[..., None])
+            blocks.append(log_l.reshape(len(theta), -1))
+            for di, duration in enumerate(durations):
+                candidates.append((duration, n))
+                starts.append(column + di * (n + 1))
+            column += len(durations) * (n + 1)
+        log_l = np.concatenate(blocks, axis=1)
+        like = np.exp(log_l)
+        _TABLES[key] = (thetas, spans, like, like * log_l, np.array(starts), candidates)
+    return _TABLES[key]
+
+
+class QuestPlus:
+    """Posterior over (theta, span) and the entropy-minimizing choice of the next round."""
+
+    def __init__(self, durations_ms: Sequence[int] = DURATIONS_MS, lengths: Sequence[int] = LENGTHS,
+                 slope: float = SLOPE, guess: float = GUESS, lapse: float = LAPSE) -> None:
+        self._table_key = (tuple(int(d) for d in durations_ms), tuple(int(n) for n in lengths), slope, guess, lapse)
+        self.thetas, self.spans, self._like, self._like_log_like, self._starts, self.candidates = _tables(
+            *self._table_key)
+        self._column = {c: s for c, s in zip(self.candidates, self._starts)}
+        self.posterior = np.full(self._like.shape[0], 1.0 / self._like.shape[0])
+        self.rounds = 0
+        self._history: Tuple[Tuple[int, int, int], ...] = ()
+        self._next: Optional[Tuple[int, int]] = None
+
+    def next_stimulus(self) -> Tuple[int, int]:
+        """(duration_ms, length) of the next round."""
+        if self._next is None:
+            key = (self._table_key, self._history)
+            self._next = _CHOICES.get(key)
+        if self._next is None:
+            post = self.posterior
+            with np.errstate(divide="ignore", invalid="ignore"):
+                post_log_post = np.where(post > 0, post * np.log(post), 0.0)
+            p_k = post @ self._like
+            # E[H] per candidate = sum_k (p_k log p_k - sum_p joint log joint); see the module docstring
+            terms = p_k * np.log(p_k) - post @ self._like_log_like - post_log_post @ self._like
+            expected_entropy = np.add.reduceat(terms, self._starts)
+            self._next = self.candidates[int(np.argmin(expected_entropy))]
+            if len(_CHOICES) >= CHOICE_CACHE_SIZE:
+                _CHOICES.clear()
+            _CHOICES[key] = self._next
+        return self._next
+
+    def update(self, duration_ms: int, length: int, correct: int) -> None:
+        """Fold in one round: `correct` of `length` numbers recalled at `duration_ms` per number."""
+        start = self._column.get((int(duration_ms), int(length)))
+        if start is None:
+            raise ValueError(f"({duration_ms} ms, {length}) is not one of the candidate rounds")
+        if not 0 <= correct <= length:
+            raise ValueError(f"correct must be within 0..{length}")
+        post = self.posterior * self._like[:, start + int(correct)]
+        self.posterior = post / post.sum()
+        self.rounds += 1
+        self._history += ((int(duration_ms), int(length), int(correct)),)
+        self._next = None
+
+    def _marginals(self) -> Tuple[np.ndarray, np.ndarray]:
+        grid = self.posterior.reshape(len(self.thetas), len(self.spans))
+        return grid.sum(axis=1), grid.sum(axis=0)
+
+    @property
+    def threshold_sd(self) -> float:
+        """Posterior sd of theta, in log10 units (0.1 is about +-26% in duration)."""
+        theta_p, _ = self._marginals()
+        mean = float(theta_p @ self.thetas)
+        return math.sqrt(max(0.0, float(theta_p @ (self.thetas - mean) ** 2)))
+
+    def summary(self) -> Dict[str, float]:
+        """Posterior mean/sd of threshold and span, 95% credible interval, entropy and the next round."""
+        theta_p, span_p = self._marginals()
+        theta_mean = float(theta_p @ self.thetas)
+        cdf = np.cumsum(theta_p)
+        low, high = self.thetas[np.searchsorted(cdf, [0.025, 0.975]).clip(0, len(self.thetas) - 1)]
+        span_mean = float(span_p @ self.spans)
+        post = self.posterior[self.posterior > 0]
+        next_ms, next_length = self.next_stimulus()
+        return {
+            "threshold_ms": 10 ** theta_mean,
+            "threshold_sd_log10": self.threshold_sd,
+            "threshold_low_ms": 10 ** float(low),
+            "threshold_high_ms": 10 ** float(high),
+            "span_mean": span_mean,
+            "span_sd": math.sqrt(max(0.0, float(span_p @ (self.spans - span_mean) ** 2))),
+            "entropy_bits": float(-(post * np.log2(post)).sum()),
+            "next_reveal_ms": next_ms,
+            "next_length": next_length,
+        }
+
+
+def threshold_posterior_mean(rounds: List[Tuple[int, int, int]], durations_ms: Sequence[int] = DURATIONS_MS,
+                             lengths: Sequence[int] = LENGTHS) -> Tuple[float, float]:
+    """(threshold_ms, sd in log10) from (duration_ms, length, correct) rounds placed by any policy."""
+    quest = QuestPlus(durations_ms, lengths)
+    for duration_ms, length, correct in rounds:
+        quest.update(duration_ms, length, correct)
+    return quest.summary()["threshold_ms"], quest.threshold_sd
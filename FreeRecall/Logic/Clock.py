@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import math
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:  # asyncio costs tens of ms at startup and only AsyncioScheduler needs it
+    import asyncio
+
+
+class FakeClock:
+    """Virtual-time scheduler with the same after()/after_cancel() calls as a Tk root.
+
+    Nothing sleeps: run() pops callbacks in deadline order and jumps the clock
+    straight to each deadline, so hours of trial timing replay in milliseconds.
+    Callbacks due at the same time run in the order they were scheduled.
+    """
+
+    realtime = False
+
+    def __init__(self, start_s: float = 0.0) -> None:
+        self._now_ms = start_s * 1000.0
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self._cancelled: set = set()
+
+    def now(self) -> float:
+        """Current virtual time in seconds (the perf_counter equivalent)."""
+        return self._now_ms / 1000.0
+
+    def after(self, ms: int, callback: Callable[[], None]) -> int:
+        token = next(self._seq)
+        heapq.heappush(self._queue, (self._now_ms + max(0, ms), token, callback))
+        return token
+
+    def after_cancel(self, token: int) -> None:
+        self._cancelled.add(token)
+
+    def pending(self) -> int:
+        return len(self._queue) - len(self._cancelled)
+
+    def run(self, until_s: Optional[float] = None) -> int:
+        """Run callbacks until the queue is empty (or virtual time passes until_s).
+
+        Returns the number of callbacks executed.
+        """
+        limit_ms = None if until_s is None else until_s * 1000.0
+        executed = 0
+        while self._queue:
+            due_ms, token, callback = self._queue[0]
+            if limit_ms is not None and due_ms > limit_ms:
+                self._now_ms = limit_ms
+                break
+            heapq.heappop(self._queue)
+            if token in self._cancelled:
+                self._cancelled.discard(token)
+                continue
+            self._now_ms = due_ms
+            callback()
+            executed += 1
+        return executed
+
+
+class AsyncioScheduler:
+    """after()/after_cancel() on an asyncio event loop, so sessions can be driven
+    by asyncio (e.g. next to network clients) instead of Tk.
+
+    Build it inside a coroutine or pass the loop. time_scale multiplies every
+    delay; below 1.0 runs real-time sessions faster than wall time.
+    """
+
+    realtime = True
+
+    def __init__(self, loop: Optional["asyncio.AbstractEventLoop"] = None, time_scale: float = 1.0) -> None:
+        if loop is None:
+            import asyncio
+            loop = asyncio.get_running_loop()
+        self.loop = loop
+        self.time_scale = time_scale
+
+    def now(self) -> float:
+        """Loop time in unscaled (session) seconds."""
+        return self.loop.time() / self.time_scale
+
+    def after(self, ms: int, callback: Callable[[], None]) -> "asyncio.TimerHandle":
+        return self.loop.call_later(max(0, ms) * self.time_scale / 1000.0, callback)
+
+    def after_cancel(self, token: "asyncio.TimerHandle") -> None:
+        token.cancel()
+
+
+class DeadlineScheduler:
+    """Runs callbacks at absolute deadlines on top of an after()-style scheduler.
+
+    Chaining after(ms) adds every step's wake-up latency to all later steps;
+    here each step targets its own deadline on the scheduler's clock, so the
+    error of one item never carries into the next. The wake-up is requested
+    early by a running estimate of the loop's latency, and on real-time clocks
+    the last `spin_ms` are busy-waited.
+
+    at(deadline_s, callback) calls callback(actual_s). after()/after_cancel()
+    pass through (after_cancel also accepts at() handles).
+    """
+
+    def __init__(self, base, now: Optional[Callable[[], float]] = None, spin_ms: Optional[float] = None,
+                 latency_alpha: float = 0.2) -> None:
+        self.base = base
+        self.now = now or getattr(base, "now", None) or time.perf_counter
+        realtime = getattr(base, "realtime", True)  # a Tk root has no such attribute
+        self.spin_s = (spin_ms if spin_ms is not None else (2.0 if realtime else 0.0)) / 1000.0
+        self.latency_alpha = latency_alpha
+        self.latency_s = 0.0  # smoothed lateness of the base scheduler's wake-ups
+
+    def after(self, ms: int, callback: Callable[[], None]):
+        return self.base.after(ms, callback)
+
+    def after_cancel(self, token) -> None:
+        if isinstance(token, _DeadlineHandle):
+            token.cancelled = True
+            token = token.token
+        self.base.after_cancel(token)
+
+    def at(self, deadline_s: float, callback: Callable[[float], None]) -> "_DeadlineHandle":
+        handle = _DeadlineHandle()
+        self._arm(handle, deadline_s, callback)
+        return handle
+
+    def _arm(self, handle: "_DeadlineHandle", deadline_s: float, callback: Callable[[float], None]) -> None:
+        now = self.now()
+        # round() first so float noise like 1000.0000001 ms does not ceil to 1001
+        delay_ms = max(0, math.ceil(round((deadline_s - now - self.latency_s - self.spin_s) * 1000.0, 6)))
+        requested = now + delay_ms / 1000.0
+
+        def wake() -> None:
+            if handle.cancelled:
+                return
+            t = self.now()
+            self.latency_s += self.latency_alpha * (max(0.0, t - requested) - self.latency_s)
+            remaining = deadline_s - t
+            if remaining > self.spin_s + 1e-6:  # tolerance: float noise on a virtual clock is not "early"
+                self._arm(handle, deadline_s, callback)  # woke too early, e.g. coarse timer
+                return
+            while self.spin_s > 0 and remaining > 0:
+                t = self.now()
+                remaining = deadline_s - t
+            callback(t)
+
+        handle.token = self.base.after(delay_ms, wake)
+
+
+class _DeadlineHandle:
+    __slots__ = ("token", "cancelled")
+
+    def __init__(self) -> None:
+        self.token = None
+        self.cancelled = False
+
+
+def timing_summary(items) -> dict:
+    """Per-trial timing error from (index, intended_on, actual_on, intended_off,
+    actual_off) rows in ms: mean/max absolute onset error, mean absolute offset
+    error and the drift of the last offset."""
+    if not items:
+        return {}
+    onset = [abs(a - i) for _, i, a, _, _ in items]
+    offset = [abs(a - i) for _, _, _, i, a in items]
+    return {
+        "onset_error_mean_ms": sum(onset) / len(onset),
+        "onset_error_max_ms": max(onset),
+        "offset_error_mean_ms": sum(offset) / len(offset),
+        "drift_ms": items[-1][4] - items[-1][3],
+    }
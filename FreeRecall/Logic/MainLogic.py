@@ -1,9 +1,15 @@
 import random
 
+NUMBER_RANGE = range(1, 100)
+SERIAL_LENGTH = 10
+
 class MainLogic:
+    def __init__(self, seed: int | None = None):
+        self._rng = random.Random(seed)
+
     def generate_serial(self) -> list[int]:
         """Generate a random serial of 10 numbers between 1 and 99."""
-        return [random.randint(1, 99) for _ in range(10)]
+        return self._rng.choices(NUMBER_RANGE, k=SERIAL_LENGTH)
     
     def check_serial(self, generated: list[int], entered: list[int | None]) -> list[bool]:
         """Check the entered serial against the generated one.
@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+try:
+    from ..Logging.logger import GameLogger
+    from ..MemoryTask.Pattern import PatternGame
+    from .MainLogic import MainLogic
+    from .Clock import timing_summary
+except ImportError:
+    from Logging.logger import GameLogger
+    from MemoryTask.Pattern import PatternGame
+    from Logic.MainLogic import MainLogic
+    from Logic.Clock import timing_summary
+
+if TYPE_CHECKING:
+    from .Adaptive import QuestPlus
+    from .StimulusBank import BankedStimuli
+
+MODES = ["Normal", "Speed", "MemoryPattern", "Pause", "Adaptive"]
+
+# Centralized timing configuration (preserve current behavior)
+NORMAL_REVEAL_MS = 1000  # per-number duration for Normal/MemoryPattern/Pause
+SPEED_SCHEDULE_MS = [1500] * 5 + [1000] * 5 + [500] * 5  # per-number durations per round
+DEFAULT_RECALL_TIME_MS = 5000
+ROUNDS_PER_MODE = 5       # Normal, MemoryPattern and Pause
+PAUSE_MS = 5000           # Pause mode: blank delay between reveal and input
+NEXT_ROUND_DELAY_MS = 3000
+# MemoryPattern grid (PatternGame handles any rows x cols; 5x5 and 8x8 suit longer sequences)
+PATTERN_ROWS = 3
+PATTERN_COLS = 3
+PATTERN_LENGTH = 6
+PATTERN_REVEAL_MS = 600   # time each cell is lit
+PATTERN_GAP_MS = 200      # gap between lights
+PATTERN_DONE_DELAY_MS = 500
+# Adaptive: QUEST+ placement of duration and list length (Logic/Adaptive.py).
+# Runs at most len(SPEED_SCHEDULE_MS) rounds and stops early once the threshold
+# posterior sd drops below ADAPTIVE_STOP_SD_LOG10 (0.1 is about +-26%).
+ADAPTIVE_MIN_ROUNDS = 5
+ADAPTIVE_STOP_SD_LOG10 = 0.1
+
+# What follows the serial reveal in each mode
+AFTER_REVEAL = {"Normal": "input", "Speed": "input", "MemoryPattern": "pattern", "Pause": "pause",
+                "Adaptive": "input"}
+
+
+@dataclass
+class RoundPlan:
+    """Everything a front-end needs to present one round."""
+    serial: List[int]
+    reveal_ms: int        # how long each number is shown
+    recall_time_ms: int   # logged as speed_ms in Speed and Adaptive mode
+    after_reveal: str     # "input", "pause" or "pattern"
+
+
+@dataclass
+class RoundResult:
+    correct_numbers: int
+    first_correct: bool
+    last_correct: bool
+    pattern_correct: Optional[bool]
+    done: bool            # True when this was the mode's last round
+
+
+class FreeRecallProtocol:
+    """UI-independent round bookkeeping, scoring and logging for the free recall modes.
+
+    A front-end calls start(mode), then for every round next_round(), optionally
+    new_pattern()/pattern_click() in MemoryPattern mode, and submit(values).
+    With `stimuli` (a participant read from Logic/StimulusBank.py) serials and
+    patterns come from the bank instead of being drawn by logic/pattern_game.
+    In Adaptive mode `quest` holds the threshold posterior, which picks every
+    round's per-number duration and list length.
+    """
+
+    def __init__(self, logic: Optional[MainLogic] = None, logger: Optional[GameLogger] = None,
+                 pattern_game: Optional[PatternGame] = None, participant_id: Optional[str] = None,
+                 stimuli: Optional["BankedStimuli"] = None) -> None:
+        self.logic = logic or MainLogic()
+        self.logger = logger or GameLogger()
+        self.pattern_game = pattern_game
+        self.participant_id = participant_id  # groups the logger's running stats per participant
+        self.stimuli = stimuli
+        self.mode: Optional[str] = None
+        self.attempt = 0  # kept across modes, like the GUI always did
+        self.rounds_done = 0
+        self.rounds_target = 0
+        self.speed_schedule_ms: List[int] = []
+        self.serial: List[int] = []
+        self.recall_time_ms = DEFAULT_RECALL_TIME_MS
+        self.pattern_entered: List[int] = []
+        self.quest: Optional["QuestPlus"] = None
+
+    def start(self, mode: str) -> None:
+        if mode not in AFTER_REVEAL:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.rounds_done = 0
+        if mode == "Speed":
+            self.speed_schedule_ms = SPEED_SCHEDULE_MS.copy()
+            self.rounds_target = len(self.speed_schedule_ms)
+        elif mode == "Adaptive":
+            try:  # numpy is only loaded for this mode
+                from .Adaptive import QuestPlus
+            except ImportError:
+                from Logic.Adaptive import QuestPlus
+            self.quest = QuestPlus()
+            self.rounds_target = len(SPEED_SCHEDULE_MS)
+        else:
+            self.rounds_target = ROUNDS_PER_MODE
+
+    def resume(self, mode: str, rounds_done: int, attempt: int,
+               adaptive_rounds: Optional[List[Tuple[int, int, int]]] = None) -> None:
+        """Restart `mode` after `rounds_done` scored rounds (see Logic/Recovery.py).
+        adaptive_rounds: (reveal_ms, length, correct_numbers) of those rounds,
+        replayed into the Adaptive posterior."""
+        self.start(mode)
+        self.rounds_done = rounds_done
+        self.attempt = attempt
+        if self.quest is not None and mode == "Adaptive":
+            for reveal_ms, length, correct in adaptive_rounds or ():
+                self.quest.update(reveal_ms, length, correct)
+
+    @property
+    def finished(self) -> bool:
+        if self.mode == "Adaptive" and self.quest is not None and self.rounds_done >= ADAPTIVE_MIN_ROUNDS:
+            if self.quest.threshold_sd <= ADAPTIVE_STOP_SD_LOG10:
+                return True
+        return self.rounds_done >= self.rounds_target
+
+    def next_round(self) -> RoundPlan:
+        if self.mode is None:
+            raise RuntimeError("No active mode. Call start() first.")
+        if self.finished:
+            raise RuntimeError(f"{self.mode} already completed")
+        if self.mode == "Speed":
+            self.recall_time_ms = self.speed_schedule_ms[self.rounds_done]
+            reveal_ms = max(1, int(self.recall_time_ms))
+        elif self.mode == "Adaptive":
+            self.recall_time_ms, length = self.quest.next_stimulus()
+            reveal_ms = self.recall_time_ms
+        else:
+            self.recall_time_ms = DEFAULT_RECALL_TIME_MS
+            reveal_ms = NORMAL_REVEAL_MS
+        if self.stimuli is not None:
+            self.serial = self.stimuli.serial(self.mode, self.rounds_done)
+        else:
+            self.serial = self.logic.generate_serial()
+        if self.mode == "Adaptive":
+            self.serial = self.serial[:length]
+        self.pattern_entered = []
+        return RoundPlan(self.serial, reveal_ms, self.recall_time_ms, AFTER_REVEAL[self.mode])
+
+    # ---------- MemoryPattern mode ----------
+    def new_pattern(self) -> List[int]:
+        if self.pattern_game is None:
+            self.pattern_game = PatternGame(rows=PATTERN_ROWS, cols=PATTERN_COLS)
+        self.pattern_entered = []
+        banked = self.stimuli.pattern(self.rounds_done) if self.stimuli is not None else None
+        return self.pattern_game.new_round(sequence_len=PATTERN_LENGTH, sequence=banked)
+
+    def pattern_click(self, idx: int) -> Tuple[bool, bool]:
+        """Record a grid click. Returns (correct, complete); complete after as many
+        clicks as the pattern length, regardless of correctness."""
+        if self.pattern_game is None:
+            raise RuntimeError("No active pattern. Call new_pattern() first.")
+        correct, _ = self.pattern_game.submit_click(idx)
+        self.pattern_entered.append(idx)
+        return correct, len(self.pattern_entered) >= len(self.pattern_game.get_sequence())
+
+    def submit(self, values: List[Optional[int]], stimulus_timing: Optional[List[tuple]] = None) -> RoundResult:
+        """Score and log the entered values and advance the round counter.
+
+        stimulus_timing: measured reveal timing, (index, intended_on, actual_on,
+        intended_off, actual_off) in ms per number, logged with its summary.
+        """
+        serial = self.serial
+        correct_numbers = self.logger.calculate_correct_numbers(serial, values)
+        first_correct, last_correct = self.logger.calculate_first_last_correct(serial, values)
+        pattern_correct = None
+        if self.mode == "MemoryPattern" and self.pattern_game is not None:
+            pattern_correct = self.pattern_entered == self.pattern_game.get_sequence()
+
+        self.attempt += 1
+        self.logger.log_attempt(
+            attempt=self.attempt,
+            mode=self.mode,
+            serial=serial,
+            user_input=values,
+            correct_numbers=correct_numbers,
+            wrong_numbers=len(serial) - correct_numbers if serial else 0,
+            first_correct=first_correct,
+            last_correct=last_correct,
+            speed_ms=self.recall_time_ms if self.mode in ("Speed", "Adaptive") else None,
+            pattern_correct=pattern_correct,
+            timing=timing_summary(stimulus_timing),
+            stimulus_timing=stimulus_timing,
+            participant=self.participant_id,
+        )
+        self.rounds_done += 1
+        if self.mode == "Adaptive":
+            self.quest.update(self.recall_time_ms, len(serial), correct_numbers)
+            self.logger.log_posterior(self.mode, self.attempt, self.rounds_done, self.recall_time_ms, len(serial),
+                                      correct_numbers, self.quest.summary())
+        return RoundResult(correct_numbers, first_correct, last_correct, pattern_correct, self.finished)
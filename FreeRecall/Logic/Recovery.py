@@ -0,0 +1,113 @@
+"""Journal free recall sessions and resume them after a crash.
+
+SessionRecorder subscribes to a FreeRecallSession and appends its transitions
+to a SessionJournal (Logging/journal.py):
+
+    start   mode, participant, stimulus bank slot, attempt counter   (commit)
+    round   round number, per-number duration and list length
+    state   every state change
+    result  attempt, rounds done, the round's duration, length and scores,
+            and the mode's running totals                           (commit)
+    done    the mode finished                                        (commit)
+
+After a crash, resume() takes a pending session from SessionJournal.pending()
+and restores the protocol's round and attempt counters, the logger's *_total
+columns and the Adaptive posterior. Then it starts the interrupted round again
+with a new serial, or the same one when it comes from a stimulus bank.
+"""
+from typing import Any, Dict, List, Optional
+
+try:
+    from ..Logging.journal import SessionJournal
+    from .Session import FreeRecallSession
+except ImportError:
+    from Logging.journal import SessionJournal
+    from Logic.Session import FreeRecallSession
+
+TOTAL_KEYS = ("correct_numbers_total", "first_correct_total", "last_correct_total")
+
+
+def journal_totals(records: List[Dict[str, Any]], sid: str) -> Dict[str, Dict[str, int]]:
+    """Latest running totals per mode of session `sid`."""
+    totals: Dict[str, Dict[str, int]] = {}
+    for record in records:
+        if record.get("sid") == sid and record.get("ev") == "result":
+            data = record["data"]
+            totals[data["mode"]] = {key: data[key] for key in TOTAL_KEYS}
+    return totals
+
+
+class SessionRecorder:
+    """Writes one session's events to `journal` under session id `sid`."""
+
+    def __init__(self, session: FreeRecallSession, journal: SessionJournal, sid: Optional[str] = None) -> None:
+        self.session = session
+        self.journal = journal
+        self.sid = sid or session.protocol.participant_id or "local"
+        # Carried on from an earlier run of this sid, like GameLogger's totals
+        self.totals = journal_totals(journal.recovered, self.sid)
+        self._resumed = False
+        session.subscribe(self._on_event)
+
+    def resumed(self) -> None:
+        """The next round continues a journaled session rather than starting one."""
+        self._resumed = True
+
+    def _on_event(self, event: str, data: Dict[str, Any]) -> None:
+        protocol = self.session.protocol
+        if event == "round":
+            if protocol.rounds_done == 0 and not self._resumed:
+                stimuli = protocol.stimuli
+                self.journal.append(self.sid, "start", {
+                    "mode": protocol.mode,
+                    "participant": protocol.participant_id,
+                    "stimuli": stimuli.index if stimuli is not None else None,
+                    "attempt": protocol.attempt,
+                    "rounds_done": 0,
+                }, commit=True)
+            self._resumed = False
+            plan = data["plan"]
+            self.journal.append(self.sid, "round", {"round": protocol.rounds_done + 1, "reveal_ms": plan.reveal_ms,
+                                                    "length": len(plan.serial)})
+        elif event == "state":
+            self.journal.append(self.sid, "state", {"old": data["old"], "new": data["new"]})
+        elif event == "result":
+            result = data["result"]
+            totals = self.totals.setdefault(protocol.mode, dict.fromkeys(TOTAL_KEYS, 0))
+            totals["correct_numbers_total"] += result.correct_numbers
+            totals["first_correct_total"] += int(result.first_correct)
+            totals["last_correct_total"] += int(result.last_correct)
+            self.journal.append(self.sid, "result", dict({
+                "mode": protocol.mode,
+                "attempt": protocol.attempt,
+                "rounds_done": protocol.rounds_done,
+                "reveal_ms": self.session.plan.reveal_ms,
+                "length": len(protocol.serial),
+                "correct_numbers": result.correct_numbers,
+            }, **totals), commit=True)
+        elif event == "done":
+            self.journal.append(self.sid, "done", {"mode": data["mode"]}, commit=True)
+
+
+def resume(session: FreeRecallSession, state: Dict[str, Any], recorder: Optional[SessionRecorder] = None) -> bool:
+    """Continue a pending session (one value of SessionJournal.pending()) on `session`.
+
+    The protocol needs the stimuli of state["stimuli"] already set when the
+    session came from a bank. Returns False when every round had been scored
+    and only the "done" record was missing; that record is written then.
+    """
+    protocol = session.protocol
+    if state.get("participant"):
+        protocol.participant_id = state["participant"]
+    results = state.get("results", [])
+    adaptive = [(r["reveal_ms"], r["length"], r["correct_numbers"]) for r in results]
+    protocol.resume(state["mode"], state.get("rounds_done", 0), state["attempt"], adaptive)
+    if recorder is not None:
+        for mode, totals in recorder.totals.items():
+            protocol.logger.restore_totals(mode, totals)
+        recorder.resumed()
+    if session.resume():
+        return True
+    if recorder is not None:
+        recorder.journal.append(recorder.sid, "done", {"mode": state["mode"]}, commit=True)
+    return False
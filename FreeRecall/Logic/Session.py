@@ -0,0 +1,203 @@
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .Clock import DeadlineScheduler
+    from .Protocol import (
+        FreeRecallProtocol, RoundPlan, PAUSE_MS, NEXT_ROUND_DELAY_MS,
+        PATTERN_REVEAL_MS, PATTERN_GAP_MS, PATTERN_DONE_DELAY_MS,
+    )
+except ImportError:
+    from Logic.Clock import DeadlineScheduler
+    from Logic.Protocol import (
+        FreeRecallProtocol, RoundPlan, PAUSE_MS, NEXT_ROUND_DELAY_MS,
+        PATTERN_REVEAL_MS, PATTERN_GAP_MS, PATTERN_DONE_DELAY_MS,
+    )
+
+# Session states
+IDLE = "idle"                      # no mode running (before start / after done)
+REVEAL = "reveal"                  # serial shown one number at a time
+PAUSE = "pause"                    # Pause mode: blank delay before input
+PATTERN_REVEAL = "pattern_reveal"  # MemoryPattern: grid cells lit one by one
+PATTERN_INPUT = "pattern_input"    # MemoryPattern: waiting for grid clicks
+INPUT = "input"                    # waiting for the entered numbers
+FEEDBACK = "feedback"              # result shown, next round after NEXT_ROUND_DELAY_MS
+DONE = "done"                      # mode finished
+
+TRANSITIONS = {
+    IDLE: {REVEAL},
+    REVEAL: {INPUT, PAUSE, PATTERN_REVEAL},
+    PAUSE: {INPUT},
+    PATTERN_REVEAL: {PATTERN_INPUT},
+    PATTERN_INPUT: {INPUT},
+    INPUT: {FEEDBACK, DONE},
+    FEEDBACK: {REVEAL},
+    DONE: {REVEAL},
+}
+
+_AFTER_REVEAL_STATE = {"input": INPUT, "pause": PAUSE, "pattern": PATTERN_REVEAL}
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+
+class FreeRecallSession:
+    """Event-driven state machine for one participant playing the free recall modes.
+
+    Timing runs on `scheduler`, anything with after(ms, callback) -> token and
+    after_cancel(token): a Tk root, Logic.Clock.FakeClock or AsyncioScheduler.
+    Front-ends call start(mode) (or resume() after FreeRecallProtocol.resume()),
+    pattern_click(idx) and submit(values) and subscribe() to what happens:
+
+    - "state"          {"old", "new"}         every transition
+    - "round"          {"plan"}               a round starts (RoundPlan)
+    - "reveal"         {"index", "value"}     a serial number is shown
+    - "pattern_light"  {"cell"}               grid cell lit, None = all off
+    - "pattern_click"  {"cell", "correct"}
+    - "pattern_done"   {"mistakes"}
+    - "result"         {"result"}             submitted round scored (RoundResult)
+    - "done"           {"mode"}
+
+    The sequential reveal runs on absolute deadlines (DeadlineScheduler): item
+    k is due at reveal start + k * reveal_ms however late earlier items fired.
+    Intended and actual onset/offset of every number (measured after the
+    subscribers have rendered it) are kept in reveal_timing and logged with
+    the round. With reveal_steps=False the sequential reveal and pattern
+    lights are one timer each and emit no per-item events (for headless runs).
+    """
+
+    def __init__(self, scheduler, protocol: Optional[FreeRecallProtocol] = None, reveal_steps: bool = True) -> None:
+        self.scheduler = scheduler
+        self.clock = DeadlineScheduler(scheduler)
+        self.protocol = protocol or FreeRecallProtocol()
+        self.reveal_steps = reveal_steps
+        self.state = IDLE
+        self.plan: Optional[RoundPlan] = None
+        self.pattern: List[int] = []
+        self.reveal_timing: List[list] = []  # [index, intended_on, actual_on, intended_off, actual_off] ms
+        self._reveal_t0 = 0.0
+        self._listeners: List[Listener] = []
+        self._timer = None
+        self._clicks_open = False
+
+    # ---------- observers ----------
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        """Register listener(event, data); returns a function that unsubscribes it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _emit(self, event: str, **data: Any) -> None:
+        for listener in list(self._listeners):
+            listener(event, data)
+
+    def _enter(self, new: str) -> None:
+        if new not in TRANSITIONS[self.state]:
+            raise RuntimeError(f"Invalid transition {self.state} -> {new}")
+        old, self.state = self.state, new
+        self._emit("state", old=old, new=new)
+
+    def _after(self, ms: int, callback: Callable[[], None]) -> None:
+        self._timer = self.scheduler.after(ms, callback)
+
+    def cancel(self) -> None:
+        """Stop the pending timer, e.g. when the window closes mid-round."""
+        if self._timer is not None:
+            self.clock.after_cancel(self._timer)
+            self._timer = None
+
+    # ---------- inputs ----------
+    def start(self, mode: str) -> None:
+        if self.state not in (IDLE, DONE):
+            raise RuntimeError(f"Cannot start {mode} while {self.state}")
+        self.protocol.start(mode)
+        self._begin_round()
+
+    def resume(self) -> bool:
+        """Begin the next round of a protocol restored with FreeRecallProtocol.resume().
+        Returns False, leaving the session idle, when the mode has no rounds left."""
+        if self.state not in (IDLE, DONE):
+            raise RuntimeError(f"Cannot resume while {self.state}")
+        if self.protocol.finished:
+            return False
+        self._begin_round()
+        return True
+
+    def pattern_click(self, cell: int) -> None:
+        if self.state != PATTERN_INPUT or not self._clicks_open:
+            return  # clicks outside the input phase are ignored, like the disabled grid
+        correct, complete = self.protocol.pattern_click(cell)
+        self._emit("pattern_click", cell=cell, correct=correct)
+        if complete:
+            # Always proceed after as many clicks as the pattern length, regardless of correctness
+            self._clicks_open = False
+            self._emit("pattern_done", mistakes=self.protocol.pattern_game.mistakes)
+            self._after(PATTERN_DONE_DELAY_MS, lambda: self._enter(INPUT))
+
+    def submit(self, values: List[Optional[int]]) -> None:
+        if self.state != INPUT:
+            raise RuntimeError(f"Cannot submit while {self.state}")
+        result = self.protocol.submit(values, [tuple(t) for t in self.reveal_timing] or None)
+        self._emit("result", result=result)
+        if result.done:
+            self._enter(DONE)
+            self._emit("done", mode=self.protocol.mode)
+            return
+        self._enter(FEEDBACK)
+        self._after(NEXT_ROUND_DELAY_MS, self._begin_round)
+
+    # ---------- phases ----------
+    def _begin_round(self) -> None:
+        self.plan = plan = self.protocol.next_round()
+        self._emit("round", plan=plan)
+        self._enter(REVEAL)
+        self.reveal_timing = []
+        if self.reveal_steps:
+            self._reveal_t0 = self.clock.now()
+            self._reveal_step(0)
+        else:
+            self._after(len(plan.serial) * plan.reveal_ms, self._end_reveal)
+
+    def _elapsed_ms(self) -> float:
+        return (self.clock.now() - self._reveal_t0) * 1000.0
+
+    def _reveal_step(self, index: int) -> None:
+        serial = self.plan.serial
+        if index >= len(serial):
+            self._end_reveal()
+            return
+        self._emit("reveal", index=index, value=serial[index])
+        onset = self._elapsed_ms()
+        if self.reveal_timing:
+            self.reveal_timing[-1][4] = onset  # the previous number stays up until this one is shown
+        reveal_ms = self.plan.reveal_ms
+        self.reveal_timing.append([index, index * reveal_ms, onset, (index + 1) * reveal_ms, None])
+        deadline = self._reveal_t0 + (index + 1) * reveal_ms / 1000.0
+        self._timer = self.clock.at(deadline, lambda _t: self._reveal_step(index + 1))
+
+    def _end_reveal(self) -> None:
+        next_state = _AFTER_REVEAL_STATE[self.plan.after_reveal]
+        self._enter(next_state)
+        if self.reveal_timing:
+            self.reveal_timing[-1][4] = self._elapsed_ms()  # last number replaced by the next screen
+        if next_state == PAUSE:
+            self._after(PAUSE_MS, lambda: self._enter(INPUT))
+        elif next_state == PATTERN_REVEAL:
+            self.pattern = self.protocol.new_pattern()
+            if self.reveal_steps:
+                self._light(0)
+            else:
+                self._after(len(self.pattern) * (PATTERN_REVEAL_MS + PATTERN_GAP_MS), self._end_pattern_reveal)
+
+    def _light(self, step: int) -> None:
+        if step >= len(self.pattern):
+            self._emit("pattern_light", cell=None)
+            self._end_pattern_reveal()
+            return
+        self._emit("pattern_light", cell=self.pattern[step])
+
+        def gap():
+            self._emit("pattern_light", cell=None)
+            self._after(PATTERN_GAP_MS, lambda: self._light(step + 1))
+        self._after(PATTERN_REVEAL_MS, gap)
+
+    def _end_pattern_reveal(self) -> None:
+        self._clicks_open = True
+        self._enter(PATTERN_INPUT)
@@ -0,0 +1,253 @@
+"""Precomputed, seeded stimulus banks for the free recall modes.
+
+Instead of MainLogic/PatternGame drawing every serial and pattern on the fly, a
+bank holds all of them for a whole study, generated in a few vectorized calls
+of one seeded numpy Generator and stored as raw int8 arrays:
+
+    schema.json    seed, participant count, rounds per mode, array shapes
+    serials.bin    participants x rounds x SERIAL_LENGTH numbers, rounds in
+                   MODES order (Normal, then Speed, ...); Adaptive rounds
+                   use the first numbers of theirs
+    patterns.bin   participants x ROUNDS_PER_MODE x PATTERN_LENGTH grid cells
+    mode_order.bin participants x len(MODES) suggested mode order, rows of a
+                   balanced Latin square so mode order is counterbalanced
+    next.txt       next unclaimed participant slot (claim(), under next.txt.lock,
+                   rewritten through a temp file so it is never half-written)
+
+Reading needs only the standard library and seeks to one participant's slice,
+so a session loads its stimuli lazily:
+
+    python -m FreeRecall.Logic.StimulusBank --participants 500 --seed 7 --out bank
+    python -m FreeRecall.Logic.StimulusBank --show 3 --out bank
+"""
+import json
+import os
+import time
+from array import array
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from .MainLogic import SERIAL_LENGTH, NUMBER_RANGE
+    from .Protocol import MODES, ROUNDS_PER_MODE, SPEED_SCHEDULE_MS, PATTERN_LENGTH, PATTERN_ROWS, PATTERN_COLS
+except ImportError:
+    from Logic.MainLogic import SERIAL_LENGTH, NUMBER_RANGE
+    from Logic.Protocol import MODES, ROUNDS_PER_MODE, SPEED_SCHEDULE_MS, PATTERN_LENGTH, PATTERN_ROWS, PATTERN_COLS
+
+FORMAT_VERSION = 1
+SCHEMA_FILE = "schema.json"
+SERIALS_FILE = "serials.bin"
+PATTERNS_FILE = "patterns.bin"
+MODE_ORDER_FILE = "mode_order.bin"
+NEXT_FILE = "next.txt"
+GRID_CELLS = PATTERN_ROWS * PATTERN_COLS  # int8 cells, so grids up to 127 cells
+
+
+class _FileLock:
+    """Exclusive lock on path + ".lock" across processes (flock, or msvcrt on Windows)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path + ".lock"
+        self.handle = None
+
+    def __enter__(self) -> "_FileLock":
+        self.handle = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+                    time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+
+
+def rounds_per_mode() -> Dict[str, int]:
+    return {mode: len(SPEED_SCHEDULE_MS) if mode in ("Speed", "Adaptive") else ROUNDS_PER_MODE for mode in MODES}
+
+
+def balanced_latin_square(n: int) -> List[List[int]]:
+    """Williams design: each mode appears once per position and directly follows
+    every other mode equally often (2n rows when n is odd)."""
+    first, lo, hi = [0], 1, n - 1
+    while len(first) < n:
+        first.append(lo)
+        lo += 1
+        if len(first) < n:
+            first.append(hi)
+            hi -= 1
+    rows = [[(c + r) % n for c in first] for r in range(n)]
+    if n % 2:
+        rows += [list(reversed(row)) for row in rows]
+    return rows
+
+
+def build_bank(path: str, participants: int, seed: int = 0) -> dict:
+    """Draw every serial and pattern of `participants` sessions and write them to `path`."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    rounds = rounds_per_mode()
+    n_rounds = sum(rounds.values())
+    low, high = NUMBER_RANGE.start, NUMBER_RANGE.stop
+    # Same distributions as MainLogic.generate_serial and PatternGame.new_round
+    serials = rng.integers(low, high, size=(participants, n_rounds, SERIAL_LENGTH), dtype=np.int8)
+    patterns = rng.integers(0, GRID_CELLS, size=(participants, rounds["MemoryPattern"], PATTERN_LENGTH),
+                            dtype=np.int8)
+    square = balanced_latin_square(len(MODES))
+    mode_order = np.array([square[p % len(square)] for p in range(participants)], dtype=np.int8)
+
+    os.makedirs(path, exist_ok=True)
+    serials.tofile(os.path.join(path, SERIALS_FILE))
+    patterns.tofile(os.path.join(path, PATTERNS_FILE))
+    mode_order.reshape(participants, len(MODES)).tofile(os.path.join(path, MODE_ORDER_FILE))
+    schema = {
+        "version": FORMAT_VERSION,
+        "seed": seed,
+        "participants": participants,
+        "modes": MODES,
+        "rounds": rounds,
+        "serial_length": SERIAL_LENGTH,
+        "pattern_length": PATTERN_LENGTH,
+        "grid": [PATTERN_ROWS, PATTERN_COLS],
+    }
+    tmp = os.path.join(path, SCHEMA_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1)
+    os.replace(tmp, os.path.join(path, SCHEMA_FILE))
+    return schema
+
+
+class BankedStimuli:
+    """One participant's serials and patterns, as read from a bank."""
+
+    def __init__(self, index: int, serials: Dict[str, List[List[int]]], patterns: List[List[int]],
+                 mode_order: List[str]) -> None:
+        self.index = index
+        self.serials = serials
+        self.patterns = patterns
+        self.mode_order = mode_order  # suggested order; the front-end still picks the mode
+
+    def serial(self, mode: str, round_index: int) -> List[int]:
+        """Serial of the round_index-th (0-based) round of `mode`."""
+        return list(self.serials[mode][round_index])
+
+    def pattern(self, round_index: int) -> List[int]:
+        """Grid pattern of the round_index-th (0-based) MemoryPattern round."""
+        return list(self.patterns[round_index])
+
+
+class StimulusBank:
+    """Read-only view of a bank directory; participant(i) reads only that participant's slice."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            self.schema = json.load(f)
+        if self.schema.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} stimulus bank")
+        if (self.schema["rounds"] != rounds_per_mode() or self.schema["pattern_length"] != PATTERN_LENGTH
+                or self.schema.get("grid", [3, 3]) != [PATTERN_ROWS, PATTERN_COLS]):
+            raise ValueError(f"{path} was built for a different round layout; rebuild it")
+        self.participants: int = self.schema["participants"]
+        self.modes: List[str] = self.schema["modes"]
+        self.rounds: Dict[str, int] = self.schema["rounds"]
+
+    def _read(self, name: str, index: int, size: int) -> array:
+        values = array("b")
+        with open(os.path.join(self.path, name), "rb") as f:
+            f.seek(index * size)
+            values.frombytes(f.read(size))
+        return values
+
+    def participant(self, index: int) -> BankedStimuli:
+        """Stimuli of participant `index` (0-based)."""
+        if not 0 <= index < self.participants:
+            raise ValueError(f"{self.path} has stimuli for {self.participants} participants, not #{index + 1}")
+        length = self.schema["serial_length"]
+        flat = self._read(SERIALS_FILE, index, sum(self.rounds.values()) * length)
+        serials: Dict[str, List[List[int]]] = {}
+        offset = 0
+        for mode in self.modes:
+            serials[mode] = [flat[offset + r * length:offset + (r + 1) * length].tolist()
+                             for r in range(self.rounds[mode])]
+            offset += self.rounds[mode] * length
+        plen = self.schema["pattern_length"]
+        n_patterns = self.rounds["MemoryPattern"]
+        flat = self._read(PATTERNS_FILE, index, n_patterns * plen)
+        patterns = [flat[r * plen:(r + 1) * plen].tolist() for r in range(n_patterns)]
+        order = self._read(MODE_ORDER_FILE, index, len(self.modes))
+        return BankedStimuli(index, serials, patterns, [self.modes[m] for m in order])
+
+    def claim(self) -> BankedStimuli:
+        """Hand out the next unused participant slot, recorded in next.txt.
+
+        Stations sharing a bank take the slot under an exclusive lock, and the
+        counter is replaced atomically, so no two sessions get the same slot
+        and a crash never sends the counter back to 0.
+        """
+        counter = os.path.join(self.path, NEXT_FILE)
+        with _FileLock(counter):
+            try:
+                with open(counter, "r", encoding="utf-8") as f:
+                    text = f.read().strip()
+            except FileNotFoundError:
+                text = "0"
+            try:
+                index = int(text)
+            except ValueError:
+                raise ValueError(f"{counter} is unreadable ({text!r}); fix it by hand rather than "
+                                 f"handing out used stimuli again") from None
+            stimuli = self.participant(index)
+            tmp = f"{counter}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(str(index + 1))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, counter)
+        return stimuli
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect a seeded free recall stimulus bank.")
+    parser.add_argument("--participants", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="stimulus_bank")
+    parser.add_argument("--show", type=int, default=None, help="print this participant's stimuli (1-based) instead")
+    args = parser.parse_args()
+
+    if args.show is not None:
+        stimuli = StimulusBank(args.out).participant(args.show - 1)
+        print("Mode order:", " -> ".join(stimuli.mode_order))
+        for mode, serials in stimuli.serials.items():
+            print(mode)
+            for r, serial in enumerate(serials):
+                line = " ".join(f"{n:2d}" for n in serial)
+                if mode == "MemoryPattern":
+                    line += "   pattern " + " ".join(map(str, stimuli.pattern(r)))
+                print(f"  {r + 1:2d}: {line}")
+        return
+    schema = build_bank(args.out, args.participants, args.seed)
+    per_participant = sum(schema["rounds"].values())
+    print(f"Wrote {per_participant * args.participants} rounds for {args.participants} participants to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
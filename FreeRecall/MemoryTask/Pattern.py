@@ -1,60 +1,244 @@
+import math
 import random
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # numpy is only needed by score_click_streams
+	import numpy as np
+
+DEFAULT_ROWS = 3
+DEFAULT_COLS = 3
+
+# Cached per (rows, cols, min_step, max_step): bitboard of allowed next cells for every cell
+_STEP_MASKS: Dict[Tuple[int, int, int, int], Tuple[int, ...]] = {}
 
 
 @dataclass(frozen=True)
 class GridPos:
-	"""A 0-based position in a 3x3 grid.
+	"""A 0-based position in a rows x cols grid (3x3 unless cols is given).
 
-	row: 0..2, col: 0..2
-	index: 0..8 (derived as row*3 + col)
+	row: 0..rows-1, col: 0..cols-1
+	index: row*cols + col (row-major)
+	bit: 1 << index, the cell's bit in a bitboard
 	"""
 	row: int
 	col: int
+	cols: int = DEFAULT_COLS
 
 	@property
 	def index(self) -> int:
-		return self.row * 3 + self.col
+		return self.row * self.cols + self.col
+
+	@property
+	def bit(self) -> int:
+		return 1 << self.index
+
+	@classmethod
+	def from_index(cls, idx: int, cols: int = DEFAULT_COLS) -> "GridPos":
+		return cls(idx // cols, idx % cols, cols)
+
+
+# ---------- Bitboards: a set of cells is an int with bit i set for cell i ----------
+
+def bits(mask: int) -> List[int]:
+	"""Indices of the set bits of `mask`, lowest first."""
+	out = []
+	while mask:
+		low = mask & -mask
+		out.append(low.bit_length() - 1)
+		mask ^= low
+	return out
+
+
+def sequence_mask(sequence: Sequence[int]) -> int:
+	"""Bitboard of the cells a sequence visits."""
+	mask = 0
+	for idx in sequence:
+		mask |= 1 << idx
+	return mask
+
+
+def cell_bits(cells: int) -> int:
+	"""Bits per step of a packed sequence on a grid of `cells` cells (4 for 3x3, 6 for 8x8)."""
+	return max(1, (cells - 1).bit_length())
+
+
+def pack_sequence(sequence: Sequence[int], cells: int = DEFAULT_ROWS * DEFAULT_COLS) -> int:
+	"""Sequence as one int, cell_bits(cells) bits per step with the first step lowest.
+	Sequences of equal length are equal exactly when their packed ints are."""
+	width = cell_bits(cells)
+	packed = 0
+	for i, idx in enumerate(sequence):
+		packed |= idx << (i * width)
+	return packed
+
+
+def unpack_sequence(packed: int, length: int, cells: int = DEFAULT_ROWS * DEFAULT_COLS) -> List[int]:
+	width = cell_bits(cells)
+	low = (1 << width) - 1
+	return [(packed >> (i * width)) & low for i in range(length)]
+
+
+def step_masks(rows: int, cols: int, min_step: int = 0, max_step: Optional[int] = None) -> Tuple[int, ...]:
+	"""Per cell: bitboard of the cells min_step..max_step moves away, as a king
+	moves (Chebyshev distance), so max_step=1 allows the 8 neighbours and
+	min_step=1 forbids clicking the same cell twice in a row."""
+	if max_step is None:
+		max_step = max(rows, cols)
+	key = (rows, cols, min_step, max_step)
+	if key not in _STEP_MASKS:
+		masks = []
+		for idx in range(rows * cols):
+			r, c = divmod(idx, cols)
+			mask = 0
+			for other in range(rows * cols):
+				r2, c2 = divmod(other, cols)
+				if min_step <= max(abs(r - r2), abs(c - c2)) <= max_step:
+					mask |= 1 << other
+			masks.append(mask)
+		_STEP_MASKS[key] = tuple(masks)
+	return _STEP_MASKS[key]
+
+
+# ---------- Path complexity ----------
+
+def _orientation(a: Tuple[int, int], b: Tuple[int, int], c: Tuple[int, int]) -> int:
+	cross = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+	return (cross > 0) - (cross < 0)
+
+
+def _segments_cross(p1, p2, q1, q2) -> bool:
+	"""True when segments p1-p2 and q1-q2 cross at a point inside both."""
+	return (_orientation(p1, p2, q1) * _orientation(p1, p2, q2) < 0
+			and _orientation(q1, q2, p1) * _orientation(q1, q2, p2) < 0)
+
+
+def _new_crossings(points: List[Tuple[int, int]], nxt: Tuple[int, int]) -> int:
+	"""Crossings of the segment points[-1]-nxt with the earlier, non-adjacent segments."""
+	last = points[-1]
+	return sum(_segments_cross(points[i], points[i + 1], last, nxt) for i in range(len(points) - 2))
+
+
+def path_complexity(sequence: Sequence[int], cols: int = DEFAULT_COLS) -> Dict[str, float]:
+	"""Descriptors of the path a sequence traces through the grid.
+
+	- length: summed Euclidean step length, in cells
+	- turns: changes of direction between consecutive moves
+	- crossings: pairs of moves whose segments cross
+	- revisits: steps onto a cell visited before
+	"""
+	points = [divmod(idx, cols) for idx in sequence]
+	length = 0.0
+	turns = crossings = revisits = 0
+	direction = None
+	seen = 0
+	for i, (idx, point) in enumerate(zip(sequence, points)):
+		revisits += bool(seen & (1 << idx))
+		seen |= 1 << idx
+		if i == 0:
+			continue
+		dr, dc = point[0] - points[i - 1][0], point[1] - points[i - 1][1]
+		if dr == dc == 0:
+			continue
+		length += (dr * dr + dc * dc) ** 0.5
+		g = math.gcd(dr, dc)
+		step_dir = (dr // g, dc // g)
+		turns += direction is not None and step_dir != direction
+		direction = step_dir
+		crossings += _new_crossings(points[:i], point)
+	return {"length": length, "turns": turns, "crossings": crossings, "revisits": revisits}
 
 
 class PatternGame:
-	"""Core logic for a 3x3 pattern memory game.
+	"""Core logic for a rows x cols pattern memory game (3x3 by default).
 
 	Contract:
-	- Board: 3x3 grid, positions 0..8 (row-major).
+	- Board: rows x cols grid, positions 0..cells-1 (row-major).
 	- A random sequence of length `sequence_len` (default 6) is generated.
 	- The GUI can reveal the sequence one-by-one to the user.
 	- Then the user clicks cells; we validate the order.
 
 	Public API:
-	- new_round(sequence_len=6) -> List[int]: generate and return the sequence (list of indices 0..8)
+	- new_round(sequence_len=6, sequence=None, ...) -> List[int]: generate and return the sequence (list of
+	  indices 0..cells-1); a given sequence (e.g. from a stimulus bank) is used instead of drawing one.
+	  Optional path constraints: distinct cells, min_step/max_step moves between consecutive cells and
+	  max_crossings of the traced path (see path_complexity)
 	- expected_index() -> Optional[int]: returns the index expected next, None if round completed
 	- submit_click(idx:int) -> Tuple[bool, bool]: (is_correct, round_done)
 	- progress() -> Tuple[int, int]: (current_step, total)
 	- get_sequence() -> List[int]: returns the current round sequence
 	- mistakes: count of mistakes in current round
 
+	Recorded click streams are re-scored in bulk with score_click_streams().
+
 	Error modes:
 	- submit_click on no active round raises RuntimeError
 	- invalid index raises ValueError
+	- constraints no sequence can meet raise ValueError
 	"""
 
-	def __init__(self, seed: Optional[int] = None) -> None:
+	def __init__(self, seed: Optional[int] = None, rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS) -> None:
+		if rows <= 0 or cols <= 0:
+			raise ValueError("rows and cols must be > 0")
 		self._rng = random.Random(seed)
+		self.rows = rows
+		self.cols = cols
+		self.cells = rows * cols
 		self._sequence: List[int] = []
 		self._cursor: int = 0
 		self.mistakes: int = 0
 
-	def new_round(self, sequence_len: int = 6) -> List[int]:
-		if sequence_len <= 0:
-			raise ValueError("sequence_len must be > 0")
-		# Generate random sequence of 0..8
-		self._sequence = [self._rng.randrange(0, 9) for _ in range(sequence_len)]
+	def new_round(self, sequence_len: int = 6, sequence: Optional[List[int]] = None, distinct: bool = False,
+				  min_step: int = 0, max_step: Optional[int] = None, max_crossings: Optional[int] = None,
+				  max_attempts: int = 1000) -> List[int]:
+		if sequence is not None:
+			if not sequence or not all(0 <= idx < self.cells for idx in sequence):
+				raise ValueError(f"sequence must be non-empty indices in 0..{self.cells - 1}")
+			self._sequence = list(sequence)
+		else:
+			if sequence_len <= 0:
+				raise ValueError("sequence_len must be > 0")
+			if not distinct and min_step == 0 and max_step is None and max_crossings is None:
+				# Unconstrained: every step uniform over the grid
+				self._sequence = [self._rng.randrange(0, self.cells) for _ in range(sequence_len)]
+			else:
+				self._sequence = self._constrained_sequence(sequence_len, distinct, min_step, max_step,
+															max_crossings, max_attempts)
 		self._cursor = 0
 		self.mistakes = 0
 		return list(self._sequence)
 
+	def _constrained_sequence(self, length: int, distinct: bool, min_step: int, max_step: Optional[int],
+							  max_crossings: Optional[int], max_attempts: int) -> List[int]:
+		"""Random walk over the allowed-move bitboards, restarted when it runs into a dead end."""
+		if distinct and length > self.cells:
+			raise ValueError(f"a {self.rows}x{self.cols} grid has only {self.cells} distinct cells")
+		moves = step_masks(self.rows, self.cols, min_step, max_step)
+		everything = (1 << self.cells) - 1
+		for _ in range(max_attempts):
+			cell = self._rng.randrange(0, self.cells)
+			sequence = [cell]
+			points = [divmod(cell, self.cols)]
+			visited = 1 << cell
+			crossings = 0
+			while len(sequence) < length:
+				allowed = moves[cell] & (everything ^ visited if distinct else everything)
+				options = bits(allowed)
+				if max_crossings is not None:
+					options = [o for o in options
+							   if crossings + _new_crossings(points, divmod(o, self.cols)) <= max_crossings]
+				if not options:
+					break
+				cell = self._rng.choice(options)
+				if max_crossings is not None:
+					crossings += _new_crossings(points, divmod(cell, self.cols))
+				sequence.append(cell)
+				points.append(divmod(cell, self.cols))
+				visited |= 1 << cell
+			if len(sequence) == length:
+				return sequence
+		raise ValueError(f"no sequence of {length} cells met the constraints in {max_attempts} attempts")
+
 	def get_sequence(self) -> List[int]:
 		return list(self._sequence)
 
@@ -69,8 +253,8 @@ class PatternGame:
 	def submit_click(self, idx: int) -> Tuple[bool, bool]:
 		if not self._sequence:
 			raise RuntimeError("No active round. Call new_round() first.")
-		if not (0 <= idx <= 8):
-			raise ValueError("Index must be in 0..8 for 3x3 grid")
+		if not (0 <= idx < self.cells):
+			raise ValueError(f"Index must be in 0..{self.cells - 1} for {self.rows}x{self.cols} grid")
 
 		expected = self._sequence[self._cursor]
 		correct = (idx == expected)
@@ -83,3 +267,72 @@ class PatternGame:
 			self.mistakes += 1
 			return False, False
 
+
+def _padded(rows: Sequence[Sequence[int]]) -> "np.ndarray":
+	import numpy as np
+
+	if isinstance(rows, np.ndarray):
+		return rows.astype(np.int16, copy=False).reshape(len(rows), -1)
+	lengths = [len(r) for r in rows]
+	width = max(lengths, default=0)
+	if width and min(lengths) == width:
+		return np.array(rows, dtype=np.int16)
+	out = np.full((len(rows), max(width, 1)), -1, dtype=np.int16)
+	for i, r in enumerate(rows):
+		out[i, :len(r)] = r
+	return out
+
+
+def score_click_streams(sequences: Sequence[Sequence[int]], streams: Sequence[Sequence[int]],
+						cells: int = DEFAULT_ROWS * DEFAULT_COLS) -> Dict[str, "np.ndarray"]:
+	"""Re-score many recorded click streams at once.
+
+	sequences: the shown sequence of every stream, or a single one shared by all
+	streams: the clicks of every stream; lists may be ragged, arrays use -1 as padding
+
+	Returns one array entry per stream:
+	- exact: the first len(sequence) clicks are the sequence (FreeRecallProtocol's pattern_correct)
+	- first_error: position of the first click that differs, -1 if none
+	- matched: clicks equal to the sequence at their position
+	- completed, mistakes: PatternGame.submit_click's rule, where a wrong click
+	  counts a mistake and the same cell is expected again
+	"""
+	import numpy as np
+
+	seq = _padded(sequences)
+	clicks = _padded(streams)
+	if len(seq) == 1 and len(clicks) > 1:
+		seq = np.repeat(seq, len(clicks), axis=0)
+	if len(seq) != len(clicks):
+		raise ValueError(f"{len(seq)} sequences for {len(clicks)} click streams")
+	for name, values in (("sequences", seq), ("streams", clicks)):
+		if ((values < -1) | (values >= cells)).any():
+			raise ValueError(f"{name} hold cells outside 0..{cells - 1}")
+
+	width = max(seq.shape[1], clicks.shape[1])
+	seq = np.pad(seq, ((0, 0), (0, width - seq.shape[1])), constant_values=-1)
+	clicks = np.pad(clicks, ((0, 0), (0, width - clicks.shape[1])), constant_values=-1)
+	seq_len = (seq >= 0).sum(axis=1)
+	in_sequence = np.arange(width) < seq_len[:, None]
+	equal = (clicks == seq) & in_sequence
+	mismatch = in_sequence & ~equal
+	any_mismatch = mismatch.any(axis=1)
+
+	# Retry rule: one vectorized step per click position, each stream keeps its own cursor
+	streams_idx = np.arange(len(seq))
+	cursor = np.zeros(len(seq), dtype=np.int64)
+	mistakes = np.zeros(len(seq), dtype=np.int64)
+	for t in range(width):
+		click = clicks[:, t]
+		active = (click >= 0) & (cursor < seq_len)
+		hit = active & (click == seq[streams_idx, np.minimum(cursor, width - 1)])
+		cursor += hit
+		mistakes += active & ~hit
+
+	return {
+		"exact": ~any_mismatch,
+		"first_error": np.where(any_mismatch, mismatch.argmax(axis=1), -1),
+		"matched": equal.sum(axis=1),
+		"completed": cursor >= seq_len,
+		"mistakes": mistakes,
+	}
@@ -0,0 +1 @@
+# Makes Server a package
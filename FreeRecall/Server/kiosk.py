@@ -0,0 +1,442 @@
+"""Multi-session kiosk server: many free recall stations served by one asyncio process.
+
+Every station is a thin client on one TCP connection speaking newline-delimited
+JSON. The server runs a FreeRecallSession per station on the shared event loop
+(AsyncioScheduler) and forwards every session event; the client only presents
+them and sends the participant's input back:
+
+    client -> server   {"op": "start", "mode": "Normal", "participant": "P001"}
+                       {"op": "submit", "values": [12, null, 40, ...]}
+                       {"op": "click", "cell": 4}
+    server -> client   {"event": "hello", "data": {"station", "modes"}}
+                       {"event": <session event>, "data": {...}}   (see Logic/Session.py)
+                       {"event": "error", "data": {"message"}}
+
+Every session logs through its own GameLogger (GameLogger.for_participant:
+game_log_<mode><participant>.csv, totals and stats of that participant only),
+all bound to one QueuedLogger, so rows are written by a single worker thread
+and never block the loop that times the reveals. Participant ids are capital
+letters and digits (P001); stations without one get K00001, K00002, ...
+Reveal timing is measured when the event is handed to the connection.
+
+    python -m FreeRecall.Server.kiosk --port 8765 --out-dir data       # serve
+    python -m FreeRecall.Server.kiosk --connect localhost:8765         # terminal thin client
+    python -m FreeRecall.Server.kiosk --bench 50,100,200,400           # stations vs timing jitter
+"""
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from ..Logging.csv_writer import BufferedCSVWriter
+    from ..Logging.logger import GameLogger, QueuedLogger
+    from ..Logic.Clock import AsyncioScheduler
+    from ..Logic.MainLogic import MainLogic
+    from ..Logic.Protocol import FreeRecallProtocol, MODES, PATTERN_ROWS, PATTERN_COLS
+    from ..Logic.StimulusBank import StimulusBank
+    from ..Logic import Session
+    from ..MemoryTask.Pattern import PatternGame
+    from ..Simulation.participants import StochasticParticipant
+except ImportError:
+    from Logging.csv_writer import BufferedCSVWriter
+    from Logging.logger import GameLogger, QueuedLogger
+    from Logic.Clock import AsyncioScheduler
+    from Logic.MainLogic import MainLogic
+    from Logic.Protocol import FreeRecallProtocol, MODES, PATTERN_ROWS, PATTERN_COLS
+    from Logic.StimulusBank import StimulusBank
+    from Logic import Session
+    from MemoryTask.Pattern import PatternGame
+    from Simulation.participants import StochasticParticipant
+
+DEFAULT_PORT = 8765
+LAG_PROBE_S = 0.01  # how often the loop-lag monitor samples
+
+
+def _jsonable(value: Any) -> Any:
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(event: str, data: Dict[str, Any]) -> bytes:
+    return (json.dumps({"event": event, "data": data}, default=_jsonable) + "\n").encode()
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+class Station:
+    """One connected thin client and the session it drives."""
+
+    def __init__(self, server: "KioskServer", station_id: int, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self.server = server
+        self.station_id = station_id
+        self.reader = reader
+        self.writer = writer
+        self.session: Optional[Session.FreeRecallSession] = None
+        self.logger: Optional[QueuedLogger] = None
+
+    def send(self, event: str, data: Dict[str, Any]) -> None:
+        # write() only buffers; a slow client never blocks the loop
+        if not self.writer.is_closing():
+            self.writer.write(encode(event, data))
+
+    async def run(self) -> None:
+        self.send("hello", {"station": self.station_id, "modes": MODES})
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    self.handle(json.loads(line))
+                except (ValueError, KeyError, TypeError, RuntimeError) as e:
+                    self.send("error", {"message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            if self.session is not None:
+                self.session.cancel()
+            if self.logger is not None:
+                self.server.release_logger(self.logger)
+            self.writer.close()
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        op = message.get("op")
+        if op == "start":
+            self._session(message.get("participant")).start(message["mode"])
+        elif op == "submit":
+            self._require_session().submit(message["values"])
+        elif op == "click":
+            self._require_session().pattern_click(int(message["cell"]))
+        else:
+            raise ValueError(f"Unknown op: {op!r}")
+
+    def _require_session(self) -> Session.FreeRecallSession:
+        if self.session is None:
+            raise RuntimeError("No session. Send start first.")
+        return self.session
+
+    def _session(self, participant: Optional[str]) -> Session.FreeRecallSession:
+        if self.session is None:
+            server = self.server
+            participant = participant or server.next_participant()
+            logger = server.session_logger(participant)  # rejects ids that cannot name a file
+            self.logger = logger
+            stimuli = server.bank.claim() if server.bank is not None else None
+            protocol = FreeRecallProtocol(MainLogic(), logger,
+                                          PatternGame(rows=PATTERN_ROWS, cols=PATTERN_COLS),
+                                          participant_id=participant, stimuli=stimuli)
+            self.session = Session.FreeRecallSession(server.scheduler, protocol, reveal_steps=True)
+            self.session.clock.spin_s = server.spin_ms / 1000.0
+            self.session.subscribe(lambda event, data: self.send(event, data))
+            self.session.subscribe(server.record_timing(self.session))
+        return self.session
+
+
+class KioskServer:
+    """Hosts a FreeRecallSession per connected station on one event loop.
+
+    spin_ms: busy-wait before each reveal deadline (DeadlineScheduler). The
+    single-window GUI spins 2 ms; with hundreds of sessions on one loop the
+    spins add up, and the client's network hop dominates anyway, so 0 here.
+    """
+
+    def __init__(self, logger: GameLogger, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 time_scale: float = 1.0, spin_ms: float = 0.0, bank: Optional[StimulusBank] = None,
+                 collect_timing: bool = False) -> None:
+        # Session loggers are bound to this front: one queue and writer thread for all
+        self.logger = QueuedLogger(logger)
+        self.session_loggers: List[QueuedLogger] = []
+        self.host = host
+        self.port = port
+        self.time_scale = time_scale
+        self.spin_ms = spin_ms
+        self.bank = bank
+        self.collect_timing = collect_timing
+        self.onset_errors_ms: List[float] = []  # real ms, with collect_timing
+        self.loop_lag_ms: List[float] = []
+        self.stations: Dict[int, Station] = {}
+        self.scheduler: Optional[AsyncioScheduler] = None
+        self._ids = itertools.count(1)
+        self._participants = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor: Optional[asyncio.Task] = None
+
+    def next_participant(self) -> str:
+        return f"K{next(self._participants):05d}"
+
+    def session_logger(self, participant: str) -> QueuedLogger:
+        """A queued logger writing only `participant`'s files and totals."""
+        logger = self.logger.bind(self.logger.logger.for_participant(participant))
+        self.session_loggers.append(logger)
+        return logger
+
+    def release_logger(self, logger: QueuedLogger) -> None:
+        if logger in self.session_loggers:
+            self.session_loggers.remove(logger)
+            logger.close()
+
+    def record_timing(self, session: Session.FreeRecallSession):
+        def on_event(event: str, data: Dict[str, Any]) -> None:
+            if event == "result" and self.collect_timing:
+                scale = self.time_scale
+                self.onset_errors_ms.extend(abs(actual - intended) * scale
+                                            for _, intended, actual, _, _ in session.reveal_timing)
+        return on_event
+
+    async def start(self) -> int:
+        """Start listening; returns the bound port (useful with port=0)."""
+        self.scheduler = AsyncioScheduler(time_scale=self.time_scale)
+        self._server = await asyncio.start_server(self._connected, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.collect_timing:
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_lag())
+        return self.port
+
+    async def _connected(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        station = Station(self, next(self._ids), reader, writer)
+        self.stations[station.station_id] = station
+        try:
+            await station.run()
+        finally:
+            del self.stations[station.station_id]
+
+    async def _monitor_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(LAG_PROBE_S)
+            self.loop_lag_ms.append((loop.time() - t0 - LAG_PROBE_S) * 1000.0)
+
+    async def close(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for station in list(self.stations.values()):
+            station.writer.close()
+        for logger in list(self.session_loggers):
+            self.release_logger(logger)
+        # Drain the queued rows off the loop thread
+        await asyncio.get_running_loop().run_in_executor(None, self.logger.close)
+
+
+# ---------- thin clients ----------
+async def run_terminal_client(host: str, port: int) -> None:
+    """Minimal text front-end: prints the session's events and sends typed commands
+    (start MODE [PARTICIPANT] | submit 12 - 40 ... | click CELL | quit)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+
+    async def show() -> None:
+        while line := await reader.readline():
+            message = json.loads(line)
+            event, data = message["event"], message["data"]
+            if event == "reveal":
+                print(f"  [{data['index'] + 1}] {data['value']}", flush=True)
+            elif event == "pattern_light" and data["cell"] is not None:
+                print(f"  cell {data['cell']}", flush=True)
+            elif event == "state":
+                print(f"-- {data['new']}", flush=True)
+            elif event != "pattern_light":
+                print(f"{event}: {data}", flush=True)
+
+    printer = loop.create_task(show())
+    try:
+        while True:
+            words = (await loop.run_in_executor(None, sys.stdin.readline)).split()
+            if not words:
+                continue
+            op, args = words[0], words[1:]
+            if op == "quit":
+                break
+            if op == "start":
+                message = {"op": "start", "mode": args[0], "participant": args[1] if len(args) > 1 else None}
+            elif op == "submit":
+                message = {"op": "submit", "values": [None if a == "-" else int(a) for a in args]}
+            elif op == "click":
+                message = {"op": "click", "cell": int(args[0])}
+            else:
+                print("commands: start MODE [PARTICIPANT] | submit N N - N ... | click CELL | quit")
+                continue
+            writer.write((json.dumps(message) + "\n").encode())
+    finally:
+        printer.cancel()
+        writer.close()
+
+
+async def _virtual_station(host: str, port: int, mode: str, seed: int, time_scale: float,
+                           arrival_errors_ms: List[float]) -> bool:
+    """A simulated participant behind a socket: answers like Simulation/loadgen.py's
+    VirtualPlayer and measures when each reveal arrives against its schedule."""
+    participant = StochasticParticipant(seed=seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    plan: Dict[str, Any] = {}
+    pattern: List[int] = []
+    first_arrival = 0.0
+    pending = set()
+
+    def send(message: Dict[str, Any], delay_ms: float = 0.0) -> None:
+        async def later() -> None:
+            await asyncio.sleep(delay_ms * time_scale / 1000.0)
+            writer.write((json.dumps(message) + "\n").encode())
+        task = loop.create_task(later())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    send({"op": "start", "mode": mode})
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            event, data = message["event"], message["data"]
+            if event == "round":
+                plan = data["plan"]
+                pattern = []
+            elif event == "reveal":
+                now = loop.time()
+                if data["index"] == 0:
+                    first_arrival = now
+                due = first_arrival + data["index"] * plan["reveal_ms"] * time_scale / 1000.0
+                arrival_errors_ms.append(abs(now - due) * 1000.0)
+            elif event == "pattern_light" and data["cell"] is not None:
+                pattern.append(data["cell"])
+            elif event == "state" and data["new"] == Session.PATTERN_INPUT:
+                delay = 0.0
+                for cell in participant.click_pattern(pattern, PATTERN_ROWS * PATTERN_COLS):
+                    delay += participant.click_interval_ms()
+                    send({"op": "click", "cell": cell}, delay)
+            elif event == "state" and data["new"] == Session.INPUT:
+                values = participant.recall(plan["serial"], plan["reveal_ms"])
+                send({"op": "submit", "values": values},
+                     participant.response_time_ms(plan["serial"], plan["reveal_ms"]))
+            elif event == "done":
+                return True
+            elif event == "error":
+                print(f"station error: {data['message']}", file=sys.stderr)
+        return False
+    finally:
+        writer.close()
+
+
+def _bench_clients(host: str, port: int, stations: int, mode: str, time_scale: float, seed: int,
+                   results: multiprocessing.Queue) -> None:
+    """Child process: run `stations` virtual stations against the server."""
+    async def run() -> None:
+        errors: List[float] = []
+        seeds = random.Random(seed)
+        done = await asyncio.gather(*(
+            _virtual_station(host, port, mode, seeds.getrandbits(32), time_scale, errors)
+            for _ in range(stations)
+        ))
+        results.put((sum(done), errors))
+    asyncio.run(run())
+
+
+async def bench_point(stations: int, mode: str, time_scale: float, out_dir: str, seed: int = 0) -> Dict[str, float]:
+    """Serve `stations` concurrent virtual stations (clients in a child process)
+    until every one has finished `mode`; returns timing jitter figures in real ms."""
+    logger = GameLogger(base_prefix=os.path.join(out_dir, f"game_log_{stations}"), writer=BufferedCSVWriter())
+    server = KioskServer(logger, port=0, time_scale=time_scale, collect_timing=True)
+    port = await server.start()
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    clients = multiprocessing.Process(target=_bench_clients,
+                                      args=(server.host, port, stations, mode, time_scale, seed, results))
+    t0 = time.perf_counter()
+    clients.start()
+    loop = asyncio.get_running_loop()
+    completed, arrival_errors = await loop.run_in_executor(None, results.get)
+    await loop.run_in_executor(None, clients.join)
+    wall_s = time.perf_counter() - t0
+    await server.close()
+    return {
+        "stations": stations,
+        "completed": completed,
+        "wall_s": wall_s,
+        "onset_p50_ms": percentile(server.onset_errors_ms, 50),
+        "onset_p99_ms": percentile(server.onset_errors_ms, 99),
+        "onset_max_ms": max(server.onset_errors_ms, default=float("nan")),
+        "arrival_p99_ms": percentile(arrival_errors, 99),
+        "arrival_max_ms": max(arrival_errors, default=float("nan")),
+        "loop_lag_p99_ms": percentile(server.loop_lag_ms, 99),
+        "log_errors": server.logger.errors,
+    }
+
+
+def run_bench(counts: List[int], mode: str, time_scale: float, jitter_ms: float, out_dir: str) -> int:
+    print(f"{mode}, time scale {time_scale} (items every {1000 * time_scale:.0f} ms real); logs in {out_dir}")
+    print(f"{'stations':>8} {'done':>5} {'wall s':>7} {'onset p50':>10} {'p99':>7} {'max':>7} "
+          f"{'arrival p99':>12} {'max':>7} {'loop lag p99':>13}")
+    sustained = 0
+    for n in counts:
+        r = asyncio.run(bench_point(n, mode, time_scale, out_dir))
+        print(f"{n:8d} {r['completed']:5d} {r['wall_s']:7.1f} {r['onset_p50_ms']:10.2f} {r['onset_p99_ms']:7.2f} "
+              f"{r['onset_max_ms']:7.2f} {r['arrival_p99_ms']:12.2f} {r['arrival_max_ms']:7.2f} "
+              f"{r['loop_lag_p99_ms']:13.2f}")
+        if r["completed"] == n and r["arrival_p99_ms"] <= jitter_ms:
+            sustained = n
+    print(f"Largest tested load with p99 arrival jitter <= {jitter_ms} ms: {sustained or 'none'} stations")
+    return sustained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve free recall sessions to many thin-client stations.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--out-dir", default="data", help="where the per-participant game_log files go")
+    parser.add_argument("--bank", default=None, help="hand each new station the next participant of this stimulus bank")
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT", help="run the terminal thin client instead")
+    parser.add_argument("--bench", default=None, metavar="N,N,...", help="benchmark these station counts instead")
+    parser.add_argument("--mode", choices=MODES, default="Normal", help="with --bench: mode every station plays")
+    parser.add_argument("--time-scale", type=float, default=None,
+                        help="multiply every session delay by this (default 1; 0.05 with --bench)")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="with --bench: p99 arrival jitter bound")
+    args = parser.parse_args()
+
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        asyncio.run(run_terminal_client(host or "127.0.0.1", int(port)))
+        return
+    if args.bench:
+        counts = [int(n) for n in args.bench.split(",")]
+        out_dir = tempfile.mkdtemp(prefix="freerecall_kiosk_")
+        run_bench(counts, args.mode, args.time_scale or 0.05, args.jitter_ms, out_dir)
+        return
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    logger = GameLogger(base_prefix=os.path.join(args.out_dir, "game_log"), writer=BufferedCSVWriter())
+    bank = StimulusBank(args.bank) if args.bank else None
+
+    async def serve() -> None:
+        server = KioskServer(logger, args.host, args.port, args.time_scale or 1.0, bank=bank)
+        port = await server.start()
+        print(f"Serving free recall stations on {args.host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
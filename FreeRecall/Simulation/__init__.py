@@ -0,0 +1 @@
+# Makes Simulation a package
@@ -0,0 +1,157 @@
+"""Headless convergence benchmark for the Adaptive mode.
+
+Simulated participants with a known threshold and span (ThresholdParticipant,
+the Adaptive model itself) are run through three placements of the rounds,
+each scored the way the protocol scores them and estimated with the same
+QUEST+ posterior, so only the placement differs:
+
+- adaptive:  QuestPlus picks duration and list length every round
+- schedule:  Speed mode's SPEED_SCHEDULE_MS at full length
+- staircase: 1-up/1-down on the duration grid at full length, down after at
+             least half the numbers were recalled
+
+For every round it prints the RMS error of the threshold estimate (log10
+units) and how many participants have reached the Adaptive stopping sd. The
+adaptive arm is then rerun through FreeRecallProtocol itself, with its early
+stop, writing real logs to a scratch directory:
+
+    python -m FreeRecall.Simulation.adaptive_sim --participants 200
+    python -m FreeRecall.Simulation.adaptive_sim --true-slope 3   # model misspecified
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+try:
+    from ..Logging.csv_writer import BufferedCSVWriter
+    from ..Logging.logger import GameLogger
+    from ..Logic.Adaptive import QuestPlus, DURATIONS_MS
+    from ..Logic.MainLogic import MainLogic, SERIAL_LENGTH
+    from ..Logic.Protocol import FreeRecallProtocol, SPEED_SCHEDULE_MS, ADAPTIVE_STOP_SD_LOG10
+    from .participants import ThresholdParticipant
+except ImportError:
+    from Logging.csv_writer import BufferedCSVWriter
+    from Logging.logger import GameLogger
+    from Logic.Adaptive import QuestPlus, DURATIONS_MS
+    from Logic.MainLogic import MainLogic, SERIAL_LENGTH
+    from Logic.Protocol import FreeRecallProtocol, SPEED_SCHEDULE_MS, ADAPTIVE_STOP_SD_LOG10
+    from Simulation.participants import ThresholdParticipant
+
+POLICIES = ["adaptive", "schedule", "staircase"]
+THRESHOLD_RANGE_MS = (250, 1200)
+SPAN_RANGE = (4.0, 9.0)
+
+_scorer = GameLogger(base_prefix=os.devnull, persist_stats=False)
+
+
+def draw_participants(n: int, seed: int, slope: float) -> List[ThresholdParticipant]:
+    rng = random.Random(seed)
+    low, high = (math.log10(v) for v in THRESHOLD_RANGE_MS)
+    return [ThresholdParticipant(10 ** rng.uniform(low, high), rng.uniform(*SPAN_RANGE), slope=slope,
+                                 seed=rng.getrandbits(32))
+            for _ in range(n)]
+
+
+def run_policy(policy: str, participant: ThresholdParticipant, rounds: int, logic: MainLogic
+               ) -> Tuple[List[Tuple[float, float]], float]:
+    """(threshold_ms, sd) after every round and the mean seconds of one posterior
+    update plus the choice of the next round."""
+    quest = QuestPlus()
+    step = DURATIONS_MS.index(SPEED_SCHEDULE_MS[0])
+    trace, update_s = [], 0.0
+    for r in range(rounds):
+        if policy == "adaptive":
+            reveal_ms, length = quest.next_stimulus()
+        elif policy == "schedule":
+            reveal_ms, length = SPEED_SCHEDULE_MS[r % len(SPEED_SCHEDULE_MS)], SERIAL_LENGTH
+        else:
+            reveal_ms, length = DURATIONS_MS[step], SERIAL_LENGTH
+        serial = logic.generate_serial()[:length]
+        correct = _scorer.calculate_correct_numbers(serial, participant.recall(serial, reveal_ms))
+        if policy == "staircase":
+            step = max(0, step - 1) if 2 * correct >= length else min(len(DURATIONS_MS) - 1, step + 1)
+        t0 = time.perf_counter()
+        quest.update(reveal_ms, length, correct)
+        summary = quest.summary()  # includes choosing the next round, as Protocol.submit does
+        update_s += time.perf_counter() - t0
+        trace.append((summary["threshold_ms"], summary["threshold_sd_log10"]))
+    return trace, update_s / rounds
+
+
+def convergence(participants: int, rounds: int, seed: int, slope: float) -> Dict[str, Dict[str, list]]:
+    """Per policy: RMS log10 error and share converged after every round."""
+    results = {}
+    for policy in POLICIES:
+        errors = [[] for _ in range(rounds)]
+        converged = [0] * rounds
+        update = []
+        logic = MainLogic(seed=seed)
+        for p in draw_participants(participants, seed, slope):
+            trace, update_s = run_policy(policy, p, rounds, logic)
+            update.append(update_s)
+            for r, (estimate_ms, sd) in enumerate(trace):
+                errors[r].append(math.log10(estimate_ms / p.threshold_ms))
+                converged[r] += sd <= ADAPTIVE_STOP_SD_LOG10
+        results[policy] = {
+            "rmse": [math.sqrt(sum(e * e for e in errs) / len(errs)) for errs in errors],
+            "converged": [c / participants for c in converged],
+            "update_ms": statistics.mean(update) * 1000,
+        }
+    return results
+
+
+def protocol_run(participants: int, seed: int, slope: float) -> Dict[str, float]:
+    """Adaptive mode end to end through FreeRecallProtocol (early stop, posterior logging)."""
+    with tempfile.TemporaryDirectory(prefix="freerecall_adaptive_") as out_dir:
+        logger = GameLogger(os.path.join(out_dir, "game_log"), writer=BufferedCSVWriter(), persist_stats=False)
+        rounds_used, errors = [], []
+        for i, p in enumerate(draw_participants(participants, seed, slope)):
+            protocol = FreeRecallProtocol(MainLogic(seed=seed + i), logger, participant_id=f"S{i + 1:05d}")
+            protocol.start("Adaptive")
+            while not protocol.finished:
+                plan = protocol.next_round()
+                protocol.submit(p.recall(plan.serial, plan.reveal_ms))
+            rounds_used.append(protocol.rounds_done)
+            errors.append(math.log10(protocol.quest.summary()["threshold_ms"] / p.threshold_ms))
+        logger.close()
+    return {
+        "rounds_mean": statistics.mean(rounds_used),
+        "rounds_median": statistics.median(rounds_used),
+        "stopped_early": sum(r < len(SPEED_SCHEDULE_MS) for r in rounds_used) / participants,
+        "rmse": math.sqrt(sum(e * e for e in errors) / participants),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare how fast adaptive and fixed placements find the threshold.")
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=len(SPEED_SCHEDULE_MS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--true-slope", type=float, default=5.0,
+                        help="slope of the simulated participants (the estimator assumes 5)")
+    args = parser.parse_args()
+
+    results = convergence(args.participants, args.rounds, args.seed, args.true_slope)
+    print(f"{args.participants} participants, threshold {THRESHOLD_RANGE_MS[0]}-{THRESHOLD_RANGE_MS[1]} ms, "
+          f"span {SPAN_RANGE[0]:g}-{SPAN_RANGE[1]:g}, slope {args.true_slope:g}")
+    print(f"RMS error of log10 threshold (share with sd <= {ADAPTIVE_STOP_SD_LOG10})")
+    print("round " + "".join(f"{policy:>20}" for policy in POLICIES))
+    for r in range(args.rounds):
+        print(f"{r + 1:5d} " + "".join(f"{results[p]['rmse'][r]:12.3f} ({results[p]['converged'][r]:4.0%})"
+                                       for p in POLICIES))
+    print(f"posterior update and next choice: {results['adaptive']['update_ms']:.2f} ms per round")
+
+    run = protocol_run(args.participants, args.seed, args.true_slope)
+    schedule = results["schedule"]["rmse"]
+    print(f"Adaptive mode with early stop: {run['rounds_mean']:.1f} rounds on average "
+          f"(median {run['rounds_median']:g}, {run['stopped_early']:.0%} stopped early), RMS error {run['rmse']:.3f}; "
+          f"the Speed schedule reaches {schedule[-1]:.3f} after {len(schedule)} rounds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Headless load generator for the free recall session engine.
+
+Runs many virtual participants through the same FreeRecallSession state
+machine the GUI subscribes to, multiplexed on one FakeClock (or on an asyncio
+loop) instead of Tk, writing through the real GameLogger:
+
+    python -m FreeRecall.Simulation.loadgen --sessions 5000 --mode all --buffered
+    python -m FreeRecall.Simulation.loadgen --sessions 5000 --mode Speed --sqlite
+    python -m FreeRecall.Simulation.loadgen --sessions 500 --asyncio --time-scale 0.0001
+    python -m FreeRecall.Simulation.loadgen --sessions 5000 --bank stimulus_bank
+    python -m FreeRecall.Simulation.loadgen --sessions 5000 --journal flush   # crash-resume journal on
+    python -m FreeRecall.Simulation.loadgen --sessions 500 --mode Adaptive
+
+"all" leaves out Adaptive: its QUEST+ placement costs ~2 ms of posterior
+maths per round, which would swamp the logging and scheduling cost this
+benchmark is for. Run it with --mode Adaptive on its own.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from ..Logging.csv_writer import BufferedCSVWriter, FSYNC_POLICIES
+    from ..Logging.journal import SessionJournal
+    from ..Logging.logger import GameLogger
+    from ..Logging.sqlite_store import SQLiteStore
+    from ..Logic.Clock import FakeClock, AsyncioScheduler
+    from ..Logic.MainLogic import MainLogic
+    from ..Logic.Protocol import FreeRecallProtocol, MODES, PATTERN_ROWS, PATTERN_COLS
+    from ..Logic.StimulusBank import StimulusBank
+    from ..Logic.Recovery import SessionRecorder
+    from ..Logic import Session
+    from ..MemoryTask.Pattern import PatternGame
+    from .participants import ScriptedParticipant, StochasticParticipant
+except ImportError:
+    from Logging.csv_writer import BufferedCSVWriter, FSYNC_POLICIES
+    from Logging.journal import SessionJournal
+    from Logging.logger import GameLogger
+    from Logging.sqlite_store import SQLiteStore
+    from Logic.Clock import FakeClock, AsyncioScheduler
+    from Logic.MainLogic import MainLogic
+    from Logic.Protocol import FreeRecallProtocol, MODES, PATTERN_ROWS, PATTERN_COLS
+    from Logic.StimulusBank import StimulusBank
+    from Logic.Recovery import SessionRecorder
+    from Logic import Session
+    from MemoryTask.Pattern import PatternGame
+    from Simulation.participants import ScriptedParticipant, StochasticParticipant
+
+# Modes of --mode all: every mode except the posterior-bound Adaptive (see above)
+LOAD_MODES = [mode for mode in MODES if mode != "Adaptive"]
+
+
+class VirtualPlayer:
+    """Subscribes a virtual participant to a FreeRecallSession, the way GUIMain
+    subscribes its widgets: clicks the grid when the pattern input opens and
+    submits its recall after its response time once the input phase starts.
+    """
+
+    def __init__(self, session: Session.FreeRecallSession, participant, mode: str,
+                 on_done: Optional[Callable[["VirtualPlayer"], None]] = None) -> None:
+        self.session = session
+        self.scheduler = session.scheduler
+        self.participant = participant
+        self.mode = mode
+        self.on_done = on_done
+        self.rounds = 0
+        self.done = False
+        session.subscribe(self._on_event)
+
+    def start(self) -> None:
+        self.session.start(self.mode)
+
+    def _on_event(self, event: str, data: dict) -> None:
+        if event == "state":
+            new = data["new"]
+            if new == Session.PATTERN_INPUT:
+                cells = self.session.protocol.pattern_game.cells
+                self._click(self.participant.click_pattern(self.session.pattern, cells), 0)
+            elif new == Session.INPUT:
+                plan = self.session.plan
+                values = self.participant.recall(plan.serial, plan.reveal_ms)
+                delay = self.participant.response_time_ms(plan.serial, plan.reveal_ms)
+                self.scheduler.after(delay, lambda: self.session.submit(values))
+        elif event == "result":
+            self.rounds += 1
+        elif event == "done":
+            self.done = True
+            if self.on_done is not None:
+                self.on_done(self)
+
+    def _click(self, clicks: List[int], index: int) -> None:
+        def click():
+            self.session.pattern_click(clicks[index])
+            if self.session.state == Session.PATTERN_INPUT and index + 1 < len(clicks):
+                self._click(clicks, index + 1)
+        self.scheduler.after(self.participant.click_interval_ms(), click)
+
+
+def make_participant(kind: str, seed: int):
+    if kind == "stochastic":
+        return StochasticParticipant(seed=seed)
+    if kind == "scripted":
+        return ScriptedParticipant([[None] * 10])
+    raise ValueError(f"Unknown participant kind: {kind}")
+
+
+def start_players(scheduler, sessions: int, modes: List[str], logger: GameLogger, participant: str,
+                  seed: int, reveal_steps: bool, on_done: Callable[[VirtualPlayer], None],
+                  bank: Optional[StimulusBank] = None, journal: Optional[SessionJournal] = None) -> None:
+    """Create `sessions` engines on one scheduler (cycling through `modes`), each
+    with its own seeded logic, pattern game and virtual participant, and start them.
+    With a bank, session i takes its stimuli from the bank's participant i
+    (wrapping around a smaller bank). With a journal every session is recorded
+    in it (Logic/Recovery.py)."""
+    seeds = random.Random(seed)
+    for i in range(sessions):
+        protocol = FreeRecallProtocol(
+            MainLogic(seed=seeds.getrandbits(32)),
+            logger,
+            PatternGame(seed=seeds.getrandbits(32), rows=PATTERN_ROWS, cols=PATTERN_COLS),
+            participant_id=f"V{i + 1:05d}",
+            stimuli=bank.participant(i % bank.participants) if bank is not None else None,
+        )
+        session = Session.FreeRecallSession(scheduler, protocol, reveal_steps=reveal_steps)
+        if journal is not None:
+            SessionRecorder(session, journal, protocol.participant_id)
+        VirtualPlayer(session, make_participant(participant, seeds.getrandbits(32)),
+                      modes[i % len(modes)], on_done=on_done).start()
+
+
+def _result(finished: List[VirtualPlayer], wall_s: float, virtual_s: float) -> Dict[str, float]:
+    attempts = sum(p.rounds for p in finished)
+    return {
+        "sessions": len(finished),
+        "attempts": attempts,
+        "wall_s": wall_s,
+        "virtual_s": virtual_s,
+        "sessions_per_s": len(finished) / wall_s if wall_s else float("inf"),
+        "attempts_per_s": attempts / wall_s if wall_s else float("inf"),
+    }
+
+
+def run_load(sessions: int, modes: List[str], logger: GameLogger, participant: str = "stochastic",
+             seed: int = 0, clock: Optional[FakeClock] = None, reveal_steps: bool = False,
+             bank: Optional[StimulusBank] = None, journal: Optional[SessionJournal] = None) -> Dict[str, float]:
+    """Run `sessions` sessions concurrently on one FakeClock to completion.
+    Returns throughput figures."""
+    clock = clock or FakeClock()
+    finished: List[VirtualPlayer] = []
+    t0 = time.perf_counter()
+    start_players(clock, sessions, modes, logger, participant, seed, reveal_steps, finished.append, bank, journal)
+    clock.run()
+    logger.flush()
+    return _result(finished, time.perf_counter() - t0, clock.now())
+
+
+async def run_load_async(sessions: int, modes: List[str], logger: GameLogger, participant: str = "stochastic",
+                         seed: int = 0, time_scale: float = 0.001, reveal_steps: bool = True,
+                         bank: Optional[StimulusBank] = None, journal: Optional[SessionJournal] = None
+                         ) -> Dict[str, float]:
+    """Same as run_load, but the engines run on the running asyncio loop with
+    every delay multiplied by time_scale."""
+    scheduler = AsyncioScheduler(time_scale=time_scale)
+    finished: List[VirtualPlayer] = []
+    all_done = asyncio.Event()
+
+    def on_done(player: VirtualPlayer) -> None:
+        finished.append(player)
+        if len(finished) == sessions:
+            all_done.set()
+
+    t0 = time.perf_counter()
+    start_players(scheduler, sessions, modes, logger, participant, seed, reveal_steps, on_done, bank, journal)
+    if sessions:
+        await all_done.wait()
+    logger.flush()
+    wall_s = time.perf_counter() - t0
+    return _result(finished, wall_s, wall_s / time_scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run virtual participants through the free recall modes.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--mode", choices=MODES + ["all"], default="all",
+                        help="one mode, or all of them except Adaptive (default)")
+    parser.add_argument("--participant", choices=["stochastic", "scripted"], default="stochastic")
+    parser.add_argument("--out-dir", default=None, help="where the game_log files go (default: a new temp dir)")
+    parser.add_argument("--buffered", action="store_true", help="log through BufferedCSVWriter")
+    parser.add_argument("--sqlite", action="store_true", help="log to out_dir/game_log.sqlite instead of the CSVs")
+    parser.add_argument("--columnar", action="store_true", help="also write the columnar stores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reveal-steps", action="store_true",
+                        help="emit every reveal/pattern-light event like the GUI does (slower)")
+    parser.add_argument("--asyncio", action="store_true", help="drive the sessions on an asyncio loop")
+    parser.add_argument("--time-scale", type=float, default=0.001,
+                        help="with --asyncio: multiply all delays by this")
+    parser.add_argument("--bank", default=None, help="take every session's stimuli from this stimulus bank")
+    parser.add_argument("--journal", choices=FSYNC_POLICIES, default=None,
+                        help="journal every session to out_dir/game_log_journal.log with this fsync policy")
+    parser.add_argument("--min-sessions-per-s", type=float, default=None,
+                        help="exit with status 1 if throughput falls below this (regression check)")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="freerecall_load_")
+    os.makedirs(out_dir, exist_ok=True)
+    logger = GameLogger(
+        base_prefix=os.path.join(out_dir, "game_log"),
+        writer=BufferedCSVWriter() if args.buffered else None,
+        columnar=args.columnar,
+        database=SQLiteStore(os.path.join(out_dir, "game_log.sqlite")) if args.sqlite else None,
+    )
+    modes = LOAD_MODES if args.mode == "all" else [args.mode]
+    bank = StimulusBank(args.bank) if args.bank else None
+    journal = SessionJournal(os.path.join(out_dir, "game_log_journal.log"), args.journal) if args.journal else None
+    try:
+        if args.asyncio:
+            result = asyncio.run(run_load_async(args.sessions, modes, logger, args.participant, args.seed,
+                                                args.time_scale, args.reveal_steps, bank, journal))
+        else:
+            result = run_load(args.sessions, modes, logger, args.participant, args.seed,
+                              reveal_steps=args.reveal_steps, bank=bank, journal=journal)
+    finally:
+        logger.close()
+        if journal is not None:
+            journal.close()
+
+    print(f"{result['sessions']} sessions / {result['attempts']} attempts in {result['wall_s']:.2f}s "
+          f"({result['virtual_s'] / 3600:.1f} h of virtual session time)")
+    print(f"  {result['sessions_per_s']:,.0f} sessions/s, {result['attempts_per_s']:,.0f} attempts/s")
+    if journal is not None:
+        print(f"  journal: {journal.commits:,} commits, {journal.syncs:,} fsyncs "
+              f"({journal.syncs / max(result['attempts'], 1):.2f} per attempt)")
+    print(f"  logs: {out_dir}")
+    if args.min_sessions_per_s is not None and result["sessions_per_s"] < args.min_sessions_per_s:
+        print(f"Throughput below {args.min_sessions_per_s} sessions/s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
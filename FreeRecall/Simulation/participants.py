@@ -0,0 +1,133 @@
+import math
+import random
+from typing import List, Optional, Sequence
+
+FIELDS = 10  # input boxes on the response screen; shorter Adaptive lists show fewer
+
+
+class ScriptedParticipant:
+    """Replays fixed answers, cycling through them round by round.
+
+    responses: per-round values for the 10 input fields (None = left empty).
+    pattern_clicks: per-round grid clicks; by default the shown sequence is
+    clicked back perfectly.
+    """
+
+    def __init__(self, responses: Sequence[Sequence[Optional[int]]], response_ms: int = 4000,
+                 click_ms: int = 400, pattern_clicks: Optional[Sequence[Sequence[int]]] = None) -> None:
+        if not responses:
+            raise ValueError("responses must not be empty")
+        self.responses = [list(r) for r in responses]
+        self.response_ms = response_ms
+        self.click_ms = click_ms
+        self.pattern_clicks = [list(c) for c in pattern_clicks] if pattern_clicks else None
+        self._round = 0
+        self._pattern_round = 0
+
+    def recall(self, serial: List[int], reveal_ms: int) -> List[Optional[int]]:
+        values = self.responses[self._round % len(self.responses)]
+        self._round += 1
+        return list(values)
+
+    def response_time_ms(self, serial: List[int], reveal_ms: int) -> int:
+        return self.response_ms
+
+    def click_pattern(self, sequence: List[int], cells: int = 9) -> List[int]:
+        if self.pattern_clicks is None:
+            return list(sequence)
+        clicks = self.pattern_clicks[self._pattern_round % len(self.pattern_clicks)]
+        self._pattern_round += 1
+        return list(clicks)
+
+    def click_interval_ms(self) -> int:
+        return self.click_ms
+
+
+class StochasticParticipant:
+    """Simulated free-recall participant with a serial position curve.
+
+    Each number is recalled with probability base + primacy/recency boosts that
+    decay with distance from the first/last position, scaled down when numbers
+    are shown faster than `comfortable_ms`. Recalled numbers come out in a
+    loosely recency-first order, some fields are filled with intrusions and the
+    rest are left empty.
+    """
+
+    def __init__(self, seed: Optional[int] = None, base_recall: float = 0.35, primacy: float = 0.45,
+                 recency: float = 0.4, comfortable_ms: int = 1000, intrusion_rate: float = 0.3,
+                 mean_response_ms: float = 8000.0, pattern_accuracy: float = 0.85,
+                 mean_click_ms: float = 450.0) -> None:
+        self._rng = random.Random(seed)
+        self.base_recall = base_recall
+        self.primacy = primacy
+        self.recency = recency
+        self.comfortable_ms = comfortable_ms
+        self.intrusion_rate = intrusion_rate
+        self.mean_response_ms = mean_response_ms
+        self.pattern_accuracy = pattern_accuracy
+        self.mean_click_ms = mean_click_ms
+        self._curves = {}  # (length, reveal_ms) -> recall probability per position
+
+    def recall_probability(self, position: int, length: int, reveal_ms: int) -> float:
+        p = (self.base_recall
+             + self.primacy * math.exp(-position)
+             + self.recency * math.exp(-(length - 1 - position)))
+        speed_factor = min(1.0, reveal_ms / self.comfortable_ms) ** 0.5
+        return max(0.0, min(1.0, p * speed_factor))
+
+    def recall(self, serial: List[int], reveal_ms: int) -> List[Optional[int]]:
+        n = len(serial)
+        curve = self._curves.get((n, reveal_ms))
+        if curve is None:
+            curve = self._curves[(n, reveal_ms)] = [self.recall_probability(i, n, reveal_ms) for i in range(n)]
+        rand = self._rng.random
+        recalled = [(i, v) for i, v in enumerate(serial) if rand() < curve[i]]
+        # Free recall tends to start with the last items: sort by a noisy recency key
+        recalled.sort(key=lambda iv: -iv[0] + self._rng.gauss(0, 3))
+        values: List[Optional[int]] = [v for _, v in recalled]
+        fields = min(FIELDS, n)
+        while len(values) < fields and self._rng.random() < self.intrusion_rate:
+            values.append(self._rng.randint(1, 99))
+        values = values[:fields]
+        return values + [None] * (fields - len(values))
+
+    def response_time_ms(self, serial: List[int], reveal_ms: int) -> int:
+        return int(self._rng.lognormvariate(math.log(self.mean_response_ms), 0.35))
+
+    def click_pattern(self, sequence: List[int], cells: int = 9) -> List[int]:
+        """Clicks the sequence back, each cell wrong (anywhere on the `cells` grid) with 1 - pattern_accuracy."""
+        return [idx if self._rng.random() < self.pattern_accuracy else self._rng.randrange(0, cells)
+                for idx in sequence]
+
+    def click_interval_ms(self) -> int:
+        return int(self._rng.lognormvariate(math.log(self.mean_click_ms), 0.3))
+
+
+class ThresholdParticipant(StochasticParticipant):
+    """Participant that follows the Adaptive mode's model (Logic/Adaptive.py)
+    with a known threshold and span, for checking how fast the threshold is
+    recovered.
+
+    Every shown number is recalled independently with probability
+    guess + (1 - guess - lapse) * logistic(slope * log10(reveal_ms / threshold_ms)) * min(1, span / n).
+    Recalled numbers are entered in shown order and the other fields left empty.
+    """
+
+    def __init__(self, threshold_ms: float, span: float, slope: float = 5.0, guess: float = 0.01,
+                 lapse: float = 0.02, seed: Optional[int] = None, mean_response_ms: float = 8000.0) -> None:
+        super().__init__(seed=seed, mean_response_ms=mean_response_ms)
+        self.threshold_ms = threshold_ms
+        self.span = span
+        self.slope = slope
+        self.guess = guess
+        self.lapse = lapse
+
+    def recall_probability(self, position: int, length: int, reveal_ms: int) -> float:
+        encoded = 1.0 / (1.0 + math.exp(-self.slope * math.log10(reveal_ms / self.threshold_ms)))
+        return self.guess + (1.0 - self.guess - self.lapse) * encoded * min(1.0, self.span / length)
+
+    def recall(self, serial: List[int], reveal_ms: int) -> List[Optional[int]]:
+        p = self.recall_probability(0, len(serial), reveal_ms)
+        values: List[Optional[int]] = [v for v in serial if self._rng.random() < p]
+        fields = min(FIELDS, len(serial))
+        return values + [None] * (fields - len(values))
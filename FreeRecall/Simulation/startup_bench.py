@@ -0,0 +1,163 @@
+"""Cold-start benchmark for the free recall GUI: process start to first frame.
+
+Each run starts a fresh interpreter that imports FreeRecall.GUI.GUIMain,
+builds the window (welcome screen and widget pool) and forces the first
+frame with update(). Times are taken from just before the process is spawned:
+
+- interpreter: spawn until the first line of the child runs
+- imports:     importing GUIMain and everything it pulls in
+- first frame: GUIMain() plus the first update()
+- total:       spawn until the first frame is drawn
+
+Runs happen in a scratch directory, so the stats and log files of the real
+data directory are never touched. Without a display only the import phases
+are measured. Every invocation appends its medians to --history, and
+--budget-ms turns the benchmark into a regression gate:
+
+    python -m FreeRecall.Simulation.startup_bench --runs 10
+    python -m FreeRecall.Simulation.startup_bench --profile          # -X importtime, heaviest modules
+    python -m FreeRecall.Simulation.startup_bench --budget-ms 400
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ENTRY = "FreeRecall.GUI.GUIMain"
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HISTORY_FILE = os.path.join(ROOT_DIR, "FreeRecall", "startup_history.csv")
+HISTORY_HEADER = ["timestamp", "commit", "python", "runs", "display",
+                  "interpreter_ms", "imports_ms", "first_frame_ms", "total_ms"]
+PHASES = ["interpreter_ms", "imports_ms", "first_frame_ms", "total_ms"]
+
+CHILD = """
+import json, sys, time
+t0 = time.time()
+sys.path.insert(0, {root!r})
+import {entry} as entry
+t1 = time.time()
+result = {{"t0": t0, "t1": t1}}
+try:
+    gui = entry.GUIMain()
+except Exception as e:  # tkinter.TclError without a display
+    result["error"] = str(e).splitlines()[0]
+else:
+    gui.root.update()
+    result["t2"] = time.time()
+    gui.logger.close()
+    gui.root.destroy()
+print(json.dumps(result))
+"""
+
+
+def run_once(python: str = sys.executable, extra_args: Optional[List[str]] = None) -> Tuple[Dict, str]:
+    """One cold start; returns (phase -> ms, the child's stderr)."""
+    code = CHILD.format(root=ROOT_DIR, entry=ENTRY)
+    with tempfile.TemporaryDirectory(prefix="freerecall_startup_") as cwd:
+        start = time.time()
+        proc = subprocess.run([python] + (extra_args or []) + ["-c", code], cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{proc.stderr}")
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    phases = {
+        "interpreter_ms": (child["t0"] - start) * 1000,
+        "imports_ms": (child["t1"] - child["t0"]) * 1000,
+    }
+    if "t2" in child:
+        phases["first_frame_ms"] = (child["t2"] - child["t1"]) * 1000
+        phases["total_ms"] = (child["t2"] - start) * 1000
+    else:
+        phases["error"] = child["error"]
+        phases["total_ms"] = (child["t1"] - start) * 1000
+    return phases, proc.stderr
+
+
+def import_profile(top: int = 15) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) of the `top` slowest imports of one cold start."""
+    _, stderr = run_once(extra_args=["-X", "importtime"])
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    rows.sort(key=lambda r: -r[1])
+    return rows[:top]
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or ""
+    except OSError:
+        return ""
+
+
+def _last_history(path: str) -> Optional[Dict[str, str]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return rows[-1] if rows else None
+
+
+def append_history(path: str, runs: int, display: bool, medians: Dict[str, float]) -> None:
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(HISTORY_HEADER)
+        writer.writerow([datetime.utcnow().isoformat(timespec="seconds"), _git_commit(), platform.python_version(),
+                         runs, int(display)] + [f"{medians[p]:.1f}" if p in medians else "" for p in PHASES])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the free recall GUI.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--profile", action="store_true", help="list the slowest imports of one cold start")
+    parser.add_argument("--top", type=int, default=15, help="with --profile: how many modules to list")
+    parser.add_argument("--history", default=HISTORY_FILE, help="CSV the medians are appended to ('' to skip)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit with status 1 if the median total exceeds this")
+    args = parser.parse_args()
+
+    if args.profile:
+        print(f"{'self ms':>8} {'cumul ms':>9}  module")
+        for name, self_us, cumulative_us in import_profile(args.top):
+            print(f"{self_us / 1000:8.2f} {cumulative_us / 1000:9.2f}  {name}")
+        return
+
+    run_once()  # warm the OS file cache and bytecode so every measured run sees the same disk state
+    results = [run_once()[0] for _ in range(args.runs)]
+    display = "error" not in results[0]
+    if not display:
+        print(f"No display ({results[0]['error']}); measuring imports only")
+    medians = {}
+    for phase in PHASES:
+        values = [r[phase] for r in results if phase in r]
+        if values:
+            medians[phase] = statistics.median(values)
+            spread = max(values) - min(values)
+            print(f"  {phase[:-3]:12s} median {medians[phase]:7.1f} ms   (min {min(values):.1f}, range {spread:.1f})")
+
+    if args.history:
+        previous = _last_history(args.history)
+        if previous and previous.get("total_ms") and previous.get("display") == str(int(display)):
+            delta = medians["total_ms"] - float(previous["total_ms"])
+            print(f"  vs {previous['timestamp']} ({previous['commit'] or 'no commit'}): {delta:+.1f} ms total")
+        append_history(args.history, args.runs, display, medians)
+    if args.budget_ms is not None and medians["total_ms"] > args.budget_ms:
+        print(f"Cold start {medians['total_ms']:.1f} ms exceeds the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
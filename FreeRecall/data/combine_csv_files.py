@@ -1,89 +1,136 @@
+import argparse
 import csv
-import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# Define the data directory
-data_dir = Path("FreeRecall/data")
-
-# Define the three categories and their corresponding files
-categories = {
-    "memorypattern": [
-        "game_log_memorypatternRA.csv",
-        "game_log_memorypatternSA.csv", 
-        "game_log_memorypatternSO.csv"
-    ],
-    "normal": [
-        "game_log_normalAS.csv",
-        "game_log_normalRA.csv",
-        "game_log_normalSA.csv",
-        "game_log_normalSO.csv"
-    ],
-    "speed": [
-        "game_log_speedAS.csv",
-        "game_log_speedRA.csv",
-        "game_log_speedSA.csv",
-        "game_log_speedSO.csv"
-    ]
-}
-
-# Function to combine CSV files for each category
-def combine_csv_files(category, file_list):
-    combined_rows = []
-    header = None
+# Default data directory (this file's folder)
+data_dir = Path(__file__).resolve().parent
+
+# game_log_<category><participant>.csv, e.g. game_log_speedAS.csv or a kiosk's game_log_speedK00012.csv
+LOG_NAME = re.compile(r"game_log_(?P<category>[a-z]+)(?P<participant>(?:[A-Z][A-Z0-9]*)?)\.csv$")
+
+# Column order of GameLogger's current header; older logs add or omit columns
+BASE_COLUMNS = [
+    "timestamp",
+    "attempt",
+    "serial",
+    "user_input",
+    "correct_numbers",
+    "wrong_numbers",
+    "first_correct",
+    "last_correct",
+    "pattern_correct",
+    "correct_numbers_total",
+    "first_correct_total",
+    "last_correct_total",
+    "speed_ms",
+]
+
+
+def discover(directory, pattern="game_log_*.csv"):
+    """Group matching files by category, e.g. {"speed": [game_log_speedAS.csv, ...]}."""
+    categories = defaultdict(list)
+    for path in sorted(Path(directory).glob(pattern)):
+        m = LOG_NAME.match(path.name)
+        if m:
+            categories[m.group("category")].append(path)
+    return dict(categories)
+
+
+def read_header(path):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def unified_schema(headers):
+    """Known columns in GameLogger order, then any extra columns in first-seen order."""
+    seen = []
+    for header in headers:
+        for name in header:
+            if name not in seen:
+                seen.append(name)
+    known = [c for c in BASE_COLUMNS if c in seen]
+    extra = [c for c in seen if c not in BASE_COLUMNS]
+    return known + extra + ["source_file"]
+
+
+# Function to combine CSV files for one category
+def combine_csv_files(category, file_list, output_dir=None):
+    """Stream all rows of `file_list` into combined_<category>_data.csv.
+
+    Rows are mapped onto the unified schema by column name (missing columns
+    are left empty) and written as they are read, so memory use does not
+    grow with the number of rows.
+    """
+    output_dir = Path(output_dir or data_dir)
+    headers = {}
+    for path in file_list:
+        path = Path(path)
+        if path.exists():
+            headers[path] = read_header(path)
+        else:
+            print(f"File not found: {path.name}")
+    headers = {p: h for p, h in headers.items() if h}
+    if not headers:
+        print(f"No data found for category: {category}")
+        return 0
+
+    schema = unified_schema(headers.values())
+    output_file = output_dir / f"combined_{category}_data.csv"
     total_rows = 0
-    
-    for filename in file_list:
-        file_path = data_dir / filename
-        if file_path.exists():
+    with open(output_file, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=schema, restval="")
+        writer.writeheader()
+        for path, header in headers.items():
+            missing = [c for c in schema[:-1] if c not in header]
+            if missing:
+                print(f"{path.name}: no {', '.join(missing)} column(s); left empty")
+            file_rows = 0
             try:
-                with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                    reader = csv.reader(csvfile)
-                    file_header = next(reader)
-                    
-                    # Set header from first file or check consistency
-                    if header is None:
-                        header = file_header + ['source_file']  # Add source_file column
-                    elif file_header != header[:-1]:  # Check if headers match (excluding source_file)
-                        print(f"Warning: Header mismatch in {filename}")
-                    
-                    # Read all rows and add source file info
-                    file_rows = 0
-                    for row in reader:
-                        row.append(filename)  # Add source file name
-                        combined_rows.append(row)
+                with open(path, "r", newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        row.pop(None, None)  # values beyond the header
+                        row["source_file"] = path.name
+                        writer.writerow(row)
                         file_rows += 1
-                    
-                    total_rows += file_rows
-                    print(f"Added {filename} with {file_rows} rows")
-                    
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
-        else:
-            print(f"File not found: {filename}")
-    
-    if combined_rows:
-        # Save the combined file
-        output_file = data_dir / f"combined_{category}_data.csv"
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(header)  # Write header
-            writer.writerows(combined_rows)  # Write all data rows
-        
-        print(f"Created {output_file} with {total_rows} total rows")
-        return total_rows
+            except (OSError, csv.Error, UnicodeDecodeError) as e:
+                print(f"Error reading {path.name}: {e}")
+            total_rows += file_rows
+            print(f"Added {path.name} with {file_rows} rows")
+
+    print(f"Created {output_file} with {total_rows} total rows")
+    return total_rows
+
+
+def _combine_job(args):
+    return args[0], combine_csv_files(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine game_log CSVs into one file per category.")
+    parser.add_argument("--data-dir", type=Path, default=data_dir)
+    parser.add_argument("--output-dir", type=Path, default=None, help="default: --data-dir")
+    parser.add_argument("--pattern", default="game_log_*.csv")
+    parser.add_argument("--workers", type=int, default=1, help="categories processed in parallel")
+    args = parser.parse_args()
+
+    categories = discover(args.data_dir, args.pattern)
+    output_dir = args.output_dir or args.data_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(category, files, output_dir) for category, files in categories.items()]
+
+    print("Combining CSV files by category...\n")
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_combine_job, jobs))
     else:
-        print(f"No data found for category: {category}")
-        return 0
+        results = [_combine_job(job) for job in jobs]
 
-# Process each category
-print("Combining CSV files by category...\n")
+    total_files_created = sum(1 for _, rows in results if rows > 0)
+    print(f"\nSuccessfully created {total_files_created} combined data files!")
 
-total_files_created = 0
-for category, files in categories.items():
-    print(f"Processing {category} category:")
-    rows = combine_csv_files(category, files)
-    if rows > 0:
-        total_files_created += 1
-    print(f"")
 
-print(f"Successfully created {total_files_created} combined data files!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
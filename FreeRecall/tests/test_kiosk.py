@@ -0,0 +1,47 @@
+"""Kiosk sessions log per participant: two stations served at once keep separate files and totals."""
+import asyncio
+import csv
+import os
+import tempfile
+import unittest
+
+from FreeRecall.Logging.csv_writer import BufferedCSVWriter
+from FreeRecall.Logging.logger import GameLogger
+from FreeRecall.Logic.Protocol import ROUNDS_PER_MODE
+from FreeRecall.Server.kiosk import KioskServer, _virtual_station
+
+TIME_SCALE = 0.001
+
+
+class ConcurrentStationsTest(unittest.TestCase):
+    def test_each_station_totals_start_from_zero(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            async def run():
+                logger = GameLogger(base_prefix=os.path.join(out_dir, "game_log"), writer=BufferedCSVWriter())
+                server = KioskServer(logger, port=0, time_scale=TIME_SCALE)
+                port = await server.start()
+                errors = []
+                done = await asyncio.gather(*(
+                    _virtual_station(server.host, port, "Normal", seed, TIME_SCALE, errors) for seed in (1, 2)
+                ))
+                await server.close()
+                return done
+
+            self.assertEqual(asyncio.run(run()), [True, True])
+            for participant in ("K00001", "K00002"):
+                with open(os.path.join(out_dir, f"game_log_normal{participant}.csv"), newline="") as f:
+                    rows = list(csv.DictReader(f))
+                self.assertEqual(len(rows), ROUNDS_PER_MODE)
+                correct = first = last = 0
+                for row in rows:
+                    correct += int(row["correct_numbers"])
+                    first += int(row["first_correct"])
+                    last += int(row["last_correct"])
+                    self.assertEqual(int(row["correct_numbers_total"]), correct)
+                    self.assertEqual(int(row["first_correct_total"]), first)
+                    self.assertEqual(int(row["last_correct_total"]), last)
+            self.assertFalse(os.path.exists(os.path.join(out_dir, "game_log_normal.csv")))
+
+
+if __name__ == "__main__":
+    unittest.main()
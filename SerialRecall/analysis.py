@@ -4,18 +4,58 @@ Aggregate serial recall experiment results by condition and compute:
 - mean of n_correct
 - quartiles (Q1, median, Q3)
 - 95% confidence interval for the mean (t-based if SciPy is available; normal 1.96 fallback otherwise)
+- optionally, percentile bootstrap CIs (--bootstrap N) and multi-key grouping (--group-by ...)
+
+With --incremental only the rows appended to the log since the last run are
+read: per-condition score histograms, letter confusion counts and the
+first-seen order of errors are cached in data/analysis_state.json together
+with the byte offset read so far and hashes of the header and of the bytes
+before that offset. A log whose header or tail changed is read again in full.
+A last line without its newline (a row being written, or a hand-edited
+file) is counted in this run's outputs but not cached, so it is read again
+next time. The outputs are the same as a full run's (the per-condition
+summary only).
 
 Input is assumed to be at: data/serial_recall_log.csv
 Outputs:
 - data/analysis.csv (summary stats per condition)
 - data/errors_top10.csv (top-10 letter-substitution errors pooled across all conditions, excluding 'chunking_words')
-"""
+- data/confusions/ (26x26 target-by-response letter confusion matrices, pooled and per condition)
 
+pandas and numpy are imported on first use, so --help, a missing input file
+and tools that only need the constants here do not pay for loading them.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import importlib
+import io
+import json
+import os
 import re
-from collections import Counter
+import string
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import pandas as pd
-import numpy as np
+
+
+class _LazyModule:
+    """Placeholder for a module: the first attribute access imports it and
+    rebinds the global name to the real module, so later calls pay nothing."""
+
+    def __init__(self, name: str, alias: str):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+
+pd = _LazyModule("pandas", "pd")
+np = _LazyModule("numpy", "np")
 
 EXPECTED_LABELS = {
     "baseline_letters",
@@ -50,6 +90,24 @@ def find_score_column(df: pd.DataFrame) -> str:
     raise ValueError("Couldn't find n_correct column.")
 
 
+_T_PPF = None  # cached t.ppf (or the 1.96 fallback), see _t_critical
+
+
+def _t_critical(dof):
+    """
+    Two-sided 95% t critical values for an array of degrees of freedom
+    (normal 1.96 fallback if SciPy is missing). SciPy is imported once.
+    """
+    global _T_PPF
+    if _T_PPF is None:
+        try:
+            from scipy.stats import t
+            _T_PPF = lambda d: t.ppf(0.975, df=d)
+        except Exception:
+            _T_PPF = lambda d: np.full(np.shape(d), 1.96)
+    return np.asarray(_T_PPF(np.asarray(dof, dtype=float)), dtype=float)
+
+
 def mean_ci_95(series: pd.Series):
     x = series.dropna().astype(float).values
     n = len(x)
@@ -61,45 +119,130 @@ def mean_ci_95(series: pd.Series):
 
     sd = float(np.std(x, ddof=1))
     sem = sd / np.sqrt(n)
-
-    try:
-        from scipy.stats import t
-        tcrit = float(t.ppf(0.975, df=n - 1))
-    except Exception:
-        tcrit = 1.96
+    tcrit = float(_t_critical(n - 1))
 
     margin = tcrit * sem
     return (mean, mean - margin, mean + margin)
 
 
-def compute_summary(df: pd.DataFrame, type_col: str, score_col: str) -> pd.DataFrame:
-    df = df.copy()
-    df[score_col] = pd.to_numeric(df[score_col], errors="coerce")
+def _grouped_quantile(sorted_vals: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolation quantile (pandas' default) of every group in one step."""
+    out = np.full(counts.shape, np.nan)
+    has = counts > 0
+    pos = (counts[has] - 1) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    a = sorted_vals[starts[has] + lo]
+    b = sorted_vals[starts[has] + hi]
+    out[has] = a + (b - a) * (pos - lo)
+    return out
 
-    grouped = df.groupby(type_col)[score_col]
 
-    rows = []
-    for gname, s in grouped:
-        q1 = float(s.quantile(0.25)) if s.notna().any() else np.nan
-        q2 = float(s.quantile(0.50)) if s.notna().any() else np.nan
-        q3 = float(s.quantile(0.75)) if s.notna().any() else np.nan
-        mean, ci_low, ci_high = mean_ci_95(s)
-        count = int(s.dropna().shape[0])
-        rows.append({
-            "experiment_type": str(gname),
-            "n": count,
-            "mean_n_correct": mean,
-            "q1": q1,
-            "median": q2,
-            "q3": q3,
-            "ci95_low": ci_low,
-            "ci95_high": ci_high,
-        })
-
-    out = pd.DataFrame(rows).sort_values("experiment_type").reset_index(drop=True)
+def _bootstrap_means(job):
+    """Percentile CIs of the mean for a batch of groups: job = (groups, n_resamples, seeds, level)."""
+    groups, n_resamples, seeds, level = job
+    alpha = (1 - level) / 2
+    out = []
+    for x, seed in zip(groups, seeds):
+        n = x.size
+        if n < 2:
+            out.append((np.nan, np.nan))
+            continue
+        rng = np.random.default_rng(seed)
+        means = np.empty(n_resamples)
+        # Resample in blocks so memory stays around a few million draws
+        block = max(1, 4_000_000 // n)
+        for start in range(0, n_resamples, block):
+            stop = min(start + block, n_resamples)
+            means[start:stop] = x[rng.integers(0, n, size=(stop - start, n))].mean(axis=1)
+        lo, hi = np.quantile(means, [alpha, 1 - alpha])
+        out.append((float(lo), float(hi)))
     return out
 
 
+def grouped_stats(values: np.ndarray, codes: np.ndarray, n_groups: int, bootstrap: int = 0,
+                  seed=None, workers: int = None, level: float = 0.95) -> dict:
+    """
+    Count, mean, quartiles and t-based 95% CI for every group at once.
+
+    values: float scores (NaN rows are ignored); codes: group index 0..n_groups-1 per value.
+    With bootstrap > 0, adds percentile bootstrap CIs from that many resamples per
+    group, spread over `workers` processes (default: all cores). Each group gets its
+    own child seed of `seed`, so results do not depend on the number of workers.
+    """
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.int64)
+    ok = ~np.isnan(values) & (codes >= 0)
+    values, codes = values[ok], codes[ok]
+
+    order = np.lexsort((values, codes))
+    sorted_vals = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        sq_dev = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+        sem = np.sqrt(sq_dev / (counts - 1)) / np.sqrt(counts)
+    margin = np.where(counts > 1, _t_critical(np.maximum(counts - 1, 1)) * sem, np.nan)
+
+    stats = {
+        "n": counts,
+        "mean": mean,
+        "q1": _grouped_quantile(sorted_vals, starts, counts, 0.25),
+        "median": _grouped_quantile(sorted_vals, starts, counts, 0.50),
+        "q3": _grouped_quantile(sorted_vals, starts, counts, 0.75),
+        "ci95_low": mean - margin,
+        "ci95_high": mean + margin,
+    }
+
+    if bootstrap > 0:
+        groups = np.split(sorted_vals, starts[1:]) if n_groups else []
+        seeds = np.random.SeedSequence(seed).spawn(n_groups)
+        workers = workers or os.cpu_count() or 1
+        n_jobs = max(1, min(workers, n_groups))
+        bounds = np.linspace(0, n_groups, n_jobs + 1).astype(int)
+        jobs = [(groups[a:b], bootstrap, seeds[a:b], level) for a, b in zip(bounds[:-1], bounds[1:])]
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                parts = list(pool.map(_bootstrap_means, jobs))
+        else:
+            parts = [_bootstrap_means(job) for job in jobs]
+        cis = np.array([ci for part in parts for ci in part], dtype=float).reshape(n_groups, 2)
+        stats["boot_ci_low"] = cis[:, 0]
+        stats["boot_ci_high"] = cis[:, 1]
+    return stats
+
+
+def compute_summary(df: pd.DataFrame, type_col: str, score_col: str, group_cols=None,
+                    bootstrap: int = 0, seed=None, workers: int = None) -> pd.DataFrame:
+    """
+    Summary of `score_col` per experiment type, or per combination of `group_cols`
+    (e.g. ["participant", "condition", "target_length"]). All groups are computed
+    together with grouped NumPy operations; see grouped_stats for `bootstrap`.
+    """
+    keys = [type_col] if group_cols is None else list(group_cols)
+    scores = pd.to_numeric(df[score_col], errors="coerce").to_numpy(dtype=float)
+
+    grouped = df.groupby(keys, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    index = grouped.size().index
+    stats = grouped_stats(scores, codes, len(index), bootstrap=bootstrap, seed=seed, workers=workers)
+
+    if group_cols is None:
+        out = pd.DataFrame({"experiment_type": [str(g) for g in index]})
+    else:
+        out = index.to_frame(index=False)
+    out["n"] = stats["n"].astype(int)
+    out["mean_n_correct"] = stats["mean"]
+    for name in ("q1", "median", "q3", "ci95_low", "ci95_high", "boot_ci_low", "boot_ci_high"):
+        if name in stats:
+            out[name] = stats[name]
+
+    sort_cols = ["experiment_type"] if group_cols is None else keys
+    return out.sort_values(sort_cols).reset_index(drop=True)
+
+
 def _letters_from_piped_string(s: str):
     if not isinstance(s, str):
         return []
@@ -107,58 +250,368 @@ def _letters_from_piped_string(s: str):
     return [ch.upper() for ch in letters]
 
 
-def compute_top_errors(df: pd.DataFrame) -> pd.DataFrame:
+LETTERS = list(string.ascii_uppercase)
+EXCLUDED_CONDITIONS = ("chunking_words",)
+
+
+def _keep_non_overlapping(cand: np.ndarray) -> np.ndarray:
     """
-    Count letter-substitution errors pooled across all conditions, excluding 'chunking_words'.
+    Drop candidates that a left-to-right regex scan would skip: in "|A|B|" the
+    match "|A|" consumes the pipe "|B|" needs, so in every chain of candidates
+    two bytes apart only every other one is kept.
+    """
+    keep = cand.copy()
+    for parity in (0, 1):
+        sub = cand[parity::2]
+        if not sub.any():
+            continue
+        idx = np.arange(sub.size)
+        # index of the most recent non-candidate before each position
+        last_gap = np.maximum.accumulate(np.where(sub, -1, idx))
+        keep[parity::2] = sub & ((idx - last_gap) % 2 == 1)
+    return keep
+
+
+def letters_matrix(series: pd.Series):
+    """
+    Parse piped strings ("|A||B|") in bulk into an N x W matrix of letter codes
+    (0 = A ... 25 = Z, -1 = padding) plus the number of letters per row.
+
+    Same letters as _letters_from_piped_string on every row, but found with
+    array operations over one joined byte buffer instead of a regex per row.
+    """
+    strings = [v if isinstance(v, str) else "" for v in series.tolist()]
+    n = len(strings)
+    buf = np.frombuffer("\0".join(strings).encode("utf-8"), dtype=np.uint8)
+    if n == 0 or buf.size < 3:
+        return np.full((n, 0), -1, dtype=np.int8), np.zeros(n, dtype=np.int64)
+
+    upper = buf & 0xDF  # ASCII letters to upper case
+    is_letter = (upper >= ord("A")) & (upper <= ord("Z"))
+    pipe = buf == ord("|")
+    cand = np.zeros(buf.size, dtype=bool)
+    cand[1:-1] = is_letter[1:-1] & pipe[:-2] & pipe[2:]
+    pos = np.flatnonzero(_keep_non_overlapping(cand))
+
+    row = np.searchsorted(np.flatnonzero(buf == 0), pos)
+    counts = np.bincount(row, minlength=n)
+    rank = np.arange(pos.size) - np.searchsorted(row, row, side="left")
+    mat = np.full((n, int(counts.max(initial=0))), -1, dtype=np.int8)
+    mat[row, rank] = upper[pos] - ord("A")
+    return mat, counts
+
+
+def _aligned_pairs(df: pd.DataFrame, exclude=EXCLUDED_CONDITIONS):
+    """
+    Target/response letter codes at every position where both exist, in
+    row-major order, with their row and position indices.
     """
     if "condition" not in df.columns:
         raise ValueError("Expected a 'condition' column to filter by experiment type.")
+    sub = df.loc[~df["condition"].astype(str).isin(exclude)]
+    tgt, n_tgt = letters_matrix(sub["target"] if "target" in sub else pd.Series([""] * len(sub)))
+    resp, n_resp = letters_matrix(sub["response"] if "response" in sub else pd.Series([""] * len(sub)))
+    width = min(tgt.shape[1], resp.shape[1])
+    aligned = np.arange(width)[None, :] < np.minimum(n_tgt, n_resp)[:, None]
+    rows, positions = np.nonzero(aligned)
+    t = tgt[rows, positions].astype(np.int64)
+    r = resp[rows, positions].astype(np.int64)
+    return sub, t, r, rows, positions
+
+
+def confusion_matrix(df: pd.DataFrame, by: str = None, exclude=EXCLUDED_CONDITIONS):
+    """
+    Letter confusion counts (target letter x response letter, correct recalls on
+    the diagonal) for position-aligned letters, excluding `exclude` conditions.
+
+    by=None        -> (26, 26) array, labels None
+    by="condition" -> (C, 26, 26) array, labels = condition names
+    by="position"  -> (W, 26, 26) array, labels = 1-based serial positions
+    """
+    sub, t, r, rows, positions = _aligned_pairs(df, exclude)
+    cell = t * 26 + r
+    if by is None:
+        return np.bincount(cell, minlength=676).reshape(26, 26), None
+    if by == "condition":
+        codes, labels = pd.factorize(sub["condition"].astype(str), sort=True)
+        group = codes[rows]
+        labels = list(labels)
+    elif by == "position":
+        group = positions
+        labels = list(range(1, int(positions.max(initial=-1)) + 2))
+    else:
+        raise ValueError(f"Unknown grouping: {by!r}")
+    n_groups = len(labels)
+    counts = np.bincount(group * 676 + cell, minlength=n_groups * 676)
+    return counts.reshape(n_groups, 26, 26), labels
+
 
-    filt = df["condition"].astype(str) != "chunking_words"
-    sub = df.loc[filt].copy()
-
-    counter = Counter()
-    for _, row in sub.iterrows():
-        tgt_letters = _letters_from_piped_string(row.get("target", ""))
-        resp_letters = _letters_from_piped_string(row.get("response", ""))
-        m = min(len(tgt_letters), len(resp_letters))
-        for i in range(m):
-            t, r = tgt_letters[i], resp_letters[i]
-            if r and t and r != t and r.isalpha():
-                key = f"{r} instead of {t}"
-                counter[key] += 1
-
-    top = counter.most_common(10)
-    rows = [{"error": err, "count": cnt, "rank": rank} for rank, (err, cnt) in enumerate(top, start=1)]
+def compute_top_errors(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count letter-substitution errors pooled across all conditions, excluding 'chunking_words'.
+    The top-10 is read off the confusion matrix; ties keep first-seen order.
+    """
+    _, t, r, _, _ = _aligned_pairs(df)
+    wrong = t != r
+    cells = t[wrong] * 26 + r[wrong]
+    counts = np.bincount(cells, minlength=676)
+    seen, first_seen = np.unique(cells, return_index=True)
+    order = np.lexsort((first_seen, -counts[seen]))[:10]
+
+    rows = []
+    for rank, cell in enumerate(seen[order], start=1):
+        tgt, resp = divmod(int(cell), 26)
+        rows.append({"error": f"{LETTERS[resp]} instead of {LETTERS[tgt]}", "count": int(counts[cell]), "rank": rank})
     return pd.DataFrame(rows)
 
 
+def save_confusions(df: pd.DataFrame, out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pooled, _ = confusion_matrix(df)
+    pd.DataFrame(pooled, index=LETTERS, columns=LETTERS).to_csv(out_dir / "confusion_all.csv")
+    per_cond, labels = confusion_matrix(df, by="condition")
+    for label, mat in zip(labels, per_cond):
+        pd.DataFrame(mat, index=LETTERS, columns=LETTERS).to_csv(out_dir / f"confusion_{label}.csv")
+
+
+STATE_VERSION = 1
+TAIL_BYTES = 4096  # hashed just before the read offset to notice a rewritten log
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class IncrementalAnalysis:
+    """
+    Cached aggregates of one log file, updated from the rows appended since the
+    last update. Everything the default outputs need is kept as counts:
+
+    hist        condition -> {score: rows}; exact n, mean, CI and quartiles
+    confusion   condition -> 26*26 target x response letter counts
+    first_seen  676 error cells -> rank of their first occurrence (top-10 ties)
+    """
+
+    def __init__(self, state_path: Path):
+        self.state_path = Path(state_path)
+        state = None
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        if not state or state.get("version") != STATE_VERSION:
+            state = self._empty()
+        self.state = state
+        self.view = state  # state plus an unterminated last row, what the outputs are computed from
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"version": STATE_VERSION, "offset": 0, "header": "", "header_sha": "", "tail_sha": "",
+                "rows": 0, "type_col": None, "score_col": None, "hist": {}, "confusion": {},
+                "first_seen": [None] * 676, "errors_seen": 0}
+
+    def update(self, path: Path):
+        """Read and fold in the complete rows appended to `path`; returns (rows, reset)."""
+        rows, reset, last = self._update(path)
+        self.view = self.state
+        if last is not None and not last.empty:
+            self.view = json.loads(json.dumps(self.state))
+            self._add(last, self.view)
+            rows += len(last)
+        return rows, reset
+
+    def _update(self, path: Path):
+        st = self.state
+        reset = False
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if st["offset"]:
+                header_line = f.readline()
+                start = max(0, st["offset"] - TAIL_BYTES)
+                f.seek(start)
+                tail = f.read(st["offset"] - start) if size >= st["offset"] else b""
+                if size < st["offset"] or _sha1(header_line) != st["header_sha"] or _sha1(tail) != st["tail_sha"]:
+                    self.state = st = self._empty()
+                    reset = True
+            f.seek(st["offset"])
+            data = f.read(size - st["offset"])
+        end = data.rfind(b"\n") + 1
+        rest = data[end:]
+        if end == 0:
+            return 0, reset, self._unterminated(rest)
+        data = data[:end]
+        if st["offset"] == 0:
+            header_end = data.index(b"\n") + 1
+            st["header"] = data[:header_end].decode("utf-8")
+            st["header_sha"] = _sha1(data[:header_end])
+            body = data[header_end:]
+        else:
+            body = data
+        st["offset"] += end
+        start = max(0, st["offset"] - TAIL_BYTES)
+        if st["offset"] - len(data) > start:
+            with open(path, "rb") as f:
+                f.seek(start)
+                tail = f.read(st["offset"] - start)
+        else:
+            tail = data[len(data) - (st["offset"] - start):]
+        st["tail_sha"] = _sha1(tail)
+        if not body.strip():
+            return 0, reset, self._unterminated(rest)
+        df = pd.read_csv(io.BytesIO(st["header"].encode("utf-8") + body))
+        self._add(df, st)
+        return len(df), reset, self._unterminated(rest)
+
+    def _unterminated(self, line: bytes):
+        """The last line as a row if it has every column of the header (else it is still being written)."""
+        header = self.state["header"]
+        if not line.strip() or not header:
+            return None
+        fields = next(csv.reader([line.decode("utf-8", errors="replace")]), [])
+        if len(fields) != len(next(csv.reader([header]))):
+            return None
+        return pd.read_csv(io.BytesIO(header.encode("utf-8") + line))
+
+    def _add(self, df: pd.DataFrame, st: dict):
+        if st["type_col"] is None:
+            st["type_col"] = find_type_column(df)
+            st["score_col"] = find_score_column(df)
+        st["rows"] += len(df)
+        scores = pd.to_numeric(df[st["score_col"]], errors="coerce")
+        for (label, score), count in df.assign(_score=scores).groupby([st["type_col"], "_score"]).size().items():
+            hist = st["hist"].setdefault(str(label), {})
+            hist[repr(float(score))] = hist.get(repr(float(score)), 0) + int(count)
+        for label in df[st["type_col"]].dropna().astype(str).unique():
+            st["hist"].setdefault(label, {})
+
+        per_cond, labels = confusion_matrix(df, by="condition")
+        for label, mat in zip(labels, per_cond):
+            old = st["confusion"].get(label)
+            st["confusion"][label] = (mat.ravel() + (np.array(old) if old is not None else 0)).tolist()
+        _, t, r, _, _ = _aligned_pairs(df)
+        wrong = t != r
+        cells = t[wrong] * 26 + r[wrong]
+        seen, first = np.unique(cells, return_index=True)
+        for cell, idx in zip(seen.tolist(), first.tolist()):
+            if st["first_seen"][cell] is None:
+                st["first_seen"][cell] = st["errors_seen"] + idx
+        st["errors_seen"] += int(cells.size)
+
+    def save(self):
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    def summary(self) -> pd.DataFrame:
+        """compute_summary()'s per-condition table, from the score histograms."""
+        rows = []
+        for label in sorted(self.view["hist"]):
+            hist = self.view["hist"][label]
+            keys = sorted(hist, key=float)
+            values = np.array([float(k) for k in keys], dtype=float)
+            counts = np.array([hist[k] for k in keys], dtype=np.int64)
+            n = int(counts.sum())
+            row = {"experiment_type": label, "n": n}
+            if n == 0:
+                row.update(dict.fromkeys(("mean_n_correct", "q1", "median", "q3", "ci95_low", "ci95_high"), np.nan))
+                rows.append(row)
+                continue
+            mean = float((values * counts).sum() / n)
+            cum = np.cumsum(counts)
+
+            def quantile(q):
+                pos = (n - 1) * q
+                lo, hi = values[np.searchsorted(cum, [np.floor(pos) + 1, np.ceil(pos) + 1])]
+                return lo + (hi - lo) * (pos - np.floor(pos))
+
+            if n > 1:
+                sem = np.sqrt((counts * (values - mean) ** 2).sum() / (n - 1)) / np.sqrt(n)
+                margin = float(_t_critical(n - 1)) * sem
+            else:
+                margin = np.nan
+            row.update({"mean_n_correct": mean, "q1": quantile(0.25), "median": quantile(0.5),
+                        "q3": quantile(0.75), "ci95_low": mean - margin, "ci95_high": mean + margin})
+            rows.append(row)
+        return pd.DataFrame(rows, columns=["experiment_type", "n", "mean_n_correct", "q1", "median", "q3",
+                                           "ci95_low", "ci95_high"])
+
+    def confusions(self):
+        """(pooled 26x26, per-condition (C, 26, 26), condition labels)."""
+        labels = sorted(self.view["confusion"])
+        per_cond = np.array([self.view["confusion"][label] for label in labels], dtype=np.int64).reshape(-1, 26, 26)
+        return per_cond.sum(axis=0) if labels else np.zeros((26, 26), dtype=np.int64), per_cond, labels
+
+    def top_errors(self) -> pd.DataFrame:
+        """compute_top_errors()'s table: off-diagonal counts, ties in first-seen order."""
+        pooled, _, _ = self.confusions()
+        counts = pooled.ravel().copy()
+        counts[np.arange(26) * 27] = 0
+        seen = np.array([c for c in range(676) if counts[c] > 0], dtype=np.int64)
+        first = np.array([self.view["first_seen"][c] for c in seen], dtype=np.int64)
+        order = np.lexsort((first, -counts[seen]))[:10]
+        rows = []
+        for rank, cell in enumerate(seen[order], start=1):
+            tgt, resp = divmod(int(cell), 26)
+            rows.append({"error": f"{LETTERS[resp]} instead of {LETTERS[tgt]}", "count": int(counts[cell]),
+                         "rank": rank})
+        return pd.DataFrame(rows)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Summarize serial recall results.")
+    parser.add_argument("--group-by", nargs="+", default=None,
+                        help="columns to group by instead of the experiment type, e.g. participant condition target_length")
+    parser.add_argument("--bootstrap", type=int, default=0, help="bootstrap resamples per group (0 = off)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="processes for bootstrapping (default: all cores)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="read only rows appended since the last run (state in data/analysis_state.json)")
+    args = parser.parse_args()
+    if args.incremental and (args.group_by or args.bootstrap):
+        parser.error("--incremental keeps per-condition aggregates only; run without it for --group-by/--bootstrap")
+
     input_path = Path("data/serial_recall_log.csv")
     output_path = Path("data/analysis.csv")
 
     if not input_path.exists():
         raise FileNotFoundError(f"Input CSV not found: {input_path}")
 
-    df = pd.read_csv(input_path)
-    type_col = find_type_column(df)
-    score_col = find_score_column(df)
-
-    # Summary stats
-    summary = compute_summary(df, type_col, score_col)
+    errors_path = Path("data/errors_top10.csv")
+    confusions_dir = Path("data/confusions")
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.incremental:
+        cache = IncrementalAnalysis(Path("data/analysis_state.json"))
+        new_rows, reset = cache.update(input_path)
+        cache.save()
+        print(f"{new_rows} new rows{' (log changed, read in full)' if reset else ''}, "
+              f"{cache.view['rows']} in total")
+        type_col, score_col = cache.state["type_col"], cache.state["score_col"]
+        summary = cache.summary()
+        errors_df = cache.top_errors()
+        pooled, per_cond, labels = cache.confusions()
+        confusions_dir.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(pooled, index=LETTERS, columns=LETTERS).to_csv(confusions_dir / "confusion_all.csv")
+        for label, mat in zip(labels, per_cond):
+            pd.DataFrame(mat, index=LETTERS, columns=LETTERS).to_csv(confusions_dir / f"confusion_{label}.csv")
+    else:
+        df = pd.read_csv(input_path)
+        type_col = find_type_column(df)
+        score_col = find_score_column(df)
+        # Summary stats
+        summary = compute_summary(df, type_col, score_col, group_cols=args.group_by,
+                                  bootstrap=args.bootstrap, seed=args.seed, workers=args.workers)
+        # Error analysis (pooled, excluding chunking_words)
+        errors_df = compute_top_errors(df)
+        save_confusions(df, confusions_dir)
     summary.to_csv(output_path, index=False)
-
-    # Error analysis (pooled, excluding chunking_words)
-    errors_df = compute_top_errors(df)
-    errors_path = Path("data/errors_top10.csv")
     errors_df.to_csv(errors_path, index=False)
 
     pd.set_option("display.max_columns", None)
     print(f"\nDetected type column: {type_col}")
     print(f"Detected score column: {score_col}")
     print(f"Saved summary to: {output_path}")
-    print(f"Saved error analysis to: {errors_path}\n")
+    print(f"Saved error analysis to: {errors_path}")
+    print(f"Saved confusion matrices to: {confusions_dir}\n")
     print("Summary (per condition):")
     print(summary.to_string(index=False))
     if not errors_df.empty:
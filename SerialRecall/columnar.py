@@ -0,0 +1,217 @@
+# Columnar binary trial store, written next to serial_recall_log.csv
+#
+# A store is a directory with schema.json plus one raw little-endian file per
+# column. target/response are fixed-width |S3 item matrices (one letter or a
+# 3-letter word per cell, b"" for blanks/padding) and pos_correct is an int8
+# matrix padded with -1, so analysis code can memory-map them instead of
+# parsing "|A||B|" strings and JSON.
+#
+# Writing uses only the standard library; reading and conversion use numpy:
+#   python columnar.py                       # data/serial_recall_log.csv -> data/serial_recall_log.cols
+#   python columnar.py other.csv --out out.cols
+import os
+import re
+import csv
+import json
+import struct
+from datetime import datetime, timezone
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 1
+PAD = -1
+ITEM_BYTES = 3
+
+_STRUCT_CODES = {"<i1": "b", "<i2": "h", "<i4": "i", "<f8": "d", "|S3": "3s"}
+
+
+def trial_columns(width):
+    """(name, dtype, width) for every column; width 0 means one value per row."""
+    return [
+        ("timestamp_utc", "<f8", 0),        # POSIX seconds
+        ("participant", "<i4", 0),          # 9 for "P009"; -1 if not of that form
+        ("condition", "<i1", 0),            # index into schema labels["condition"]
+        ("is_words", "<i1", 0),
+        ("trial_index_in_block", "<i2", 0),
+        ("target_length", "<i2", 0),
+        ("target", "|S3", width),
+        ("response", "|S3", width),
+        ("prop_correct", "<f8", 0),
+        ("n_correct", "<i2", 0),
+        ("all_or_nothing", "<i1", 0),
+        ("pos_correct", "<i1", width),
+        ("item_on_ms", "<i4", 0),
+        ("isi_blank_ms", "<i4", 0),
+        ("retention_ms", "<i4", 0),
+        ("iti_ms", "<i4", 0),
+        ("taps", "<i4", 0),
+    ]
+
+
+def _column_file(path, name):
+    return os.path.join(path, f"{name}.bin")
+
+
+def _write_schema(path, schema):
+    tmp = os.path.join(path, SCHEMA_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1)
+    os.replace(tmp, os.path.join(path, SCHEMA_FILE))
+
+
+def participant_number(pid):
+    m = re.fullmatch(r"P(\d+)", str(pid or ""))
+    return int(m.group(1)) if m else PAD
+
+
+def _items(seq, width):
+    if len(seq) > width:
+        raise ValueError(f"{len(seq)} items do not fit a store width of {width}")
+    out = []
+    for item in seq:
+        b = str(item).encode("ascii", errors="replace")  # non-ASCII letters are stored as "?"
+        if len(b) > ITEM_BYTES:
+            raise ValueError(f"Item {item!r} is longer than {ITEM_BYTES} characters")
+        out.append(b)
+    return out + [b""] * (width - len(seq))
+
+
+class TrialStore:
+    """Append-only writer for one columnar trial store."""
+
+    def __init__(self, path, width):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path, "r", encoding="utf-8") as f:
+                self.schema = json.load(f)
+            self.width = self.schema["width"]
+            if width > self.width:
+                raise ValueError(f"{path} stores up to {self.width} items per trial, {width} requested")
+        else:
+            self.width = width
+            self.schema = {
+                "version": FORMAT_VERSION,
+                "width": width,
+                "columns": [{"name": n, "dtype": d, "width": w} for n, d, w in trial_columns(width)],
+                "labels": {"condition": []},
+            }
+            _write_schema(path, self.schema)
+        self.columns = [(c["name"], c["dtype"], c["width"]) for c in self.schema["columns"]]
+        self._packers = [struct.Struct("<" + _STRUCT_CODES[d] * max(w, 1)) for _, d, w in self.columns]
+        self._truncate_partial_rows()
+        self._handles = [open(_column_file(path, n), "ab") for n, _, _ in self.columns]
+
+    def _truncate_partial_rows(self):
+        # A crash between column writes leaves some columns one row longer
+        sizes = [os.path.getsize(_column_file(self.path, n)) if os.path.exists(_column_file(self.path, n)) else 0
+                 for n, _, _ in self.columns]
+        rows = min(size // p.size for size, p in zip(sizes, self._packers))
+        for (name, _, _), size, p in zip(self.columns, sizes, self._packers):
+            if size != rows * p.size:
+                os.truncate(_column_file(self.path, name), rows * p.size)
+
+    def label_code(self, column, value):
+        labels = self.schema["labels"].setdefault(column, [])
+        if value not in labels:
+            labels.append(value)
+            _write_schema(self.path, self.schema)
+        return labels.index(value)
+
+    def pack_trial(self, row, target, response, pos_correct):
+        """Validate and encode one trial without writing it; raises ValueError for
+        items that do not fit. Pass the result to write_packed()."""
+        values = {
+            "timestamp_utc": datetime.fromisoformat(row["timestamp_utc"]).replace(tzinfo=timezone.utc).timestamp(),
+            "participant": participant_number(row["participant"]),
+            "condition": self.label_code("condition", row["condition"]),
+            "target": _items(target, self.width),
+            "response": _items(response, self.width),
+            "pos_correct": list(pos_correct) + [PAD] * (self.width - len(pos_correct)),
+        }
+        chunks = []
+        for (name, _, width), packer in zip(self.columns, self._packers):
+            value = values[name] if name in values else row[name]
+            chunks.append(packer.pack(*value) if width else packer.pack(value))
+        return chunks
+
+    def write_packed(self, chunks):
+        for handle, chunk in zip(self._handles, chunks):
+            handle.write(chunk)
+
+    def append_trial(self, row, target, response, pos_correct):
+        """Append one trial: `row` is the CSV log row, the lists are the raw items."""
+        self.write_packed(self.pack_trial(row, target, response, pos_correct))
+
+    def flush(self):
+        for handle in self._handles:
+            handle.flush()
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+
+
+def read_store(path):
+    """Memory-map all columns read-only. Returns (columns dict, labels dict)."""
+    import numpy as np
+
+    with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    specs = [(c["name"], np.dtype(c["dtype"]), c["width"]) for c in schema["columns"]]
+    rows = min(os.path.getsize(_column_file(path, n)) // (d.itemsize * max(w, 1)) for n, d, w in specs)
+    cols = {}
+    for name, dtype, width in specs:
+        shape = (rows, width) if width else (rows,)
+        if rows == 0:
+            cols[name] = np.empty(shape, dtype=dtype)
+        else:
+            cols[name] = np.memmap(_column_file(path, name), dtype=dtype, mode="r", shape=shape)
+    return cols, schema["labels"]
+
+
+def split_piped(s):
+    """'|A||B||C|' -> ['A', 'B', 'C'] keeping blank items ('' between pipes)."""
+    if not isinstance(s, str) or len(s) < 2:
+        return []
+    return s[1:-1].split("||")
+
+
+def convert_csv(csv_path, out_path):
+    """Convert serial_recall_log.csv into a fresh store; returns the row count."""
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        records = list(csv.DictReader(f))
+    width = max([1] + [max(len(split_piped(r["target"])), len(split_piped(r["response"]))) for r in records])
+
+    if os.path.isdir(out_path):
+        for name in os.listdir(out_path):
+            os.remove(os.path.join(out_path, name))
+    store = TrialStore(out_path, width)
+    try:
+        for r in records:
+            row = dict(r)
+            for key in ("is_words", "trial_index_in_block", "target_length", "n_correct",
+                        "all_or_nothing", "item_on_ms", "isi_blank_ms", "retention_ms", "iti_ms", "taps"):
+                row[key] = int(r[key])
+            row["prop_correct"] = float(r["prop_correct"])
+            store.append_trial(row, split_piped(r["target"]), split_piped(r["response"]), json.loads(r["pos_correct"]))
+    finally:
+        store.close()
+    return len(records)
+
+
+def main():
+    import argparse  # only the converter CLI needs it; tasks.py imports this module at startup
+
+    parser = argparse.ArgumentParser(description="Convert serial_recall_log.csv into a columnar store.")
+    parser.add_argument("csv", nargs="?", default=os.path.join("data", "serial_recall_log.csv"))
+    parser.add_argument("--out", default=None, help="store directory (default: <csv stem>.cols)")
+    args = parser.parse_args()
+    out = args.out or os.path.splitext(args.csv)[0] + ".cols"
+    rows = convert_csv(args.csv, out)
+    print(f"Converted {rows} trials from {args.csv} to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,29 @@ class Design:
     randomize_block_order: bool = False
     # Item mode for baseline/error/suppression/tapping: "letters" or "digits" (letters match literature here)
     item_mode: str = "letters"
+    # Directory of a prebuilt stimulus bank (stimulus_bank.py); "" draws stimuli live per trial
+    stimulus_bank: str = ""
+
+@dataclass
+class Logging:
+    # "csv": open/append/close the log for every trial; "buffered": keep it open and batch rows;
+    # "sqlite": batch rows into LOG_DIR/SQLITE_FILE (sqlite_log.py exports the CSV layouts)
+    backend: str = "csv"
+    flush_rows: int = 20            # write once this many rows are pending
+    flush_interval_s: float = 2.0   # ...or once this much time has passed
+    fsync: str = "flush"            # "never", "flush" (fsync each flush) or "always" (each row)
+    columnar: bool = False          # also append trials to the binary store at LOG_DIR/COLUMNAR_STORE
+    keystrokes: bool = True         # append every response keystroke to LOG_DIR/KEYSTROKE_FILE
+    journal: bool = True            # journal session progress to LOG_DIR/JOURNAL_FILE; offers to resume after a crash
 
 # Output
 LOG_DIR = "data"
 LOG_FILE = "serial_recall_log.csv"
+COLUMNAR_STORE = "serial_recall_log.cols"
+STIMULUS_TIMING_FILE = "serial_recall_stimulus_timing.csv"  # intended vs actual onset/offset per item
+KEYSTROKE_FILE = "serial_recall_keystrokes.bin"             # time, box and key of every keystroke (keystrokes.py)
+SQLITE_FILE = "serial_recall.sqlite"                         # trials, responses and item timing (sqlite backend)
+JOURNAL_FILE = "session_journal.log"                         # crash-safe block/trial progress (journal.py)
 
 # Keys
 SUBMIT_KEY = "Return"    # ENTER to submit response
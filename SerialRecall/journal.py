@@ -0,0 +1,272 @@
+# Crash-safe session journal: resume an interrupted participant at the exact trial
+#
+# Every record is one line, "<crc32 as 8 hex digits> <json>" with a sequence
+# number, wall time, session id (the participant), event name and data.
+# SessionRecorder appends a session's transitions:
+#   start   participant, stimulus bank index                 (commit)
+#   block   condition, blocks still to come, trials done      (commit)
+#   trial   condition and trial index
+#   state   every state change
+#   result  condition, trial index, score                     (commit)
+#   done    all blocks complete                               (commit)
+# Records are buffered and written in groups; a commit writes everything
+# pending and (fsync "flush"/"always") fsyncs, so a crash loses at most the
+# uncommitted records of the trial on screen. On open a torn last line is cut
+# off, pending() folds the records into the state of every unfinished session,
+# and resume() restarts it at the block and trial where it stopped:
+#   python journal.py --show data/session_journal.log
+#   python journal.py --bench 5000
+import os
+import json
+import time
+import zlib
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+from logger import FSYNC_POLICIES
+import session as sess
+
+
+def encode_record(record):
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def read_journal(path):
+    """(records, bytes) of the intact prefix of the journal; stops at the first
+    torn or corrupt line."""
+    records, good = [], 0
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return records, 0
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+            break
+        payload = line[9:-1]
+        try:
+            if int(line[:8], 16) != zlib.crc32(payload):
+                break
+            records.append(json.loads(payload))
+        except ValueError:
+            break
+        good += len(line)
+    return records, good
+
+
+def pending_sessions(records) -> Dict[str, Dict[str, Any]]:
+    """State of every session started but not done: the start record's data
+    updated by every later "block" and "result" record ("results" counts the
+    scored trials)."""
+    sessions = {}
+    for record in records:
+        sid, event = record.get("sid"), record.get("ev")
+        if event == "start":
+            sessions[sid] = dict(record.get("data", {}), results=0)
+        elif event == "done":
+            sessions.pop(sid, None)
+        elif event in ("block", "result") and sid in sessions:
+            sessions[sid].update(record.get("data", {}))
+            sessions[sid]["results"] += event == "result"
+    return sessions
+
+
+class SessionJournal:
+    """Buffered, group-committed journal writer; fsync policy as BufferedCSVLogger.
+    `recovered` holds the records found on open."""
+
+    def __init__(self, path, fsync="flush", flush_records=256):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.fsync = fsync
+        self.flush_records = flush_records
+        self.recovered, good = read_journal(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size != good:
+            os.ftruncate(self._fd, good)  # a torn tail would hide every record appended after it
+        os.lseek(self._fd, good, os.SEEK_SET)
+        self._seq = self.recovered[-1]["seq"] if self.recovered else 0
+        self._pending: List[bytes] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.commits = 0
+        self.syncs = 0
+        atexit.register(self.close)
+
+    def append(self, sid, event, data=None, commit=False):
+        """Queue a record; commit=True makes it and everything before it durable."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SessionJournal is closed")
+            self._seq += 1
+            record = {"seq": self._seq, "t": round(time.time(), 3), "sid": sid, "ev": event}
+            if data:
+                record["data"] = data
+            self._pending.append(encode_record(record))
+            if commit or self.fsync == "always" or len(self._pending) >= self.flush_records:
+                self._flush_locked(commit)
+            return self._seq
+
+    def pending(self):
+        return pending_sessions(self.recovered)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked(False)
+
+    def reset(self):
+        """Empty the journal once nothing in it will be resumed."""
+        with self._lock:
+            self._pending.clear()
+            os.ftruncate(self._fd, 0)
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            if self.fsync != "never":
+                os.fsync(self._fd)
+            self.recovered = []
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked(False)
+            os.close(self._fd)
+            self._closed = True
+        atexit.unregister(self.close)
+
+    def _flush_locked(self, commit):
+        if self._pending:
+            os.write(self._fd, b"".join(self._pending))
+            self._pending.clear()
+            if self.fsync != "never":
+                os.fsync(self._fd)
+                self.syncs += 1
+        self.commits += commit
+
+
+class SessionRecorder:
+    """Appends one SerialRecallSession's events to a journal under its participant id."""
+
+    def __init__(self, session, journal: SessionJournal, sid: Optional[str] = None):
+        self.session = session
+        self.journal = journal
+        self.sid = sid
+        self._started = False
+        session.subscribe(self._on_event)
+
+    def resumed(self, sid):
+        """The session continues journaled session `sid`; no new start record."""
+        self.sid = sid
+        self._started = True
+
+    def _on_event(self, event, data):
+        protocol = self.session.protocol
+        if self.sid is None:
+            self.sid = protocol.participant_id or "local"
+        if event == "block":
+            if not self._started:
+                self._started = True
+                stimuli = protocol.stimuli
+                self.journal.append(self.sid, "start", {
+                    "participant": protocol.participant_id,
+                    "bank_index": stimuli.index if stimuli is not None else None,
+                }, commit=True)
+            self.journal.append(self.sid, "block", {
+                "condition": data["condition"],
+                "remaining": list(protocol.block_conditions),
+                "trial_index": protocol.trial_index,
+            }, commit=True)
+        elif event == "trial":
+            plan = data["plan"]
+            self.journal.append(self.sid, "trial", {"condition": plan.condition, "trial": plan.trial_index,
+                                                    "length": len(plan.target)})
+        elif event == "state":
+            self.journal.append(self.sid, "state", {"old": data["old"], "new": data["new"]})
+            if data["new"] == sess.DONE:
+                self.journal.append(self.sid, "done", commit=True)
+        elif event == "result":
+            row = data["row"]
+            self.journal.append(self.sid, "result", {
+                "condition": row["condition"],
+                "trial_index": row["trial_index_in_block"],
+                "n_correct": data["score"]["n_correct"],
+            }, commit=True)
+
+
+def resume(session, state, recorder: Optional[SessionRecorder] = None):
+    """Continue a pending session (a value of SessionJournal.pending()) on an idle
+    `session`: same participant, remaining blocks and trial counter, so the next
+    trial is the one that was interrupted. A banked participant's stimuli must
+    already be set (protocol.use_stimuli with state["bank_index"])."""
+    protocol = session.protocol
+    protocol.participant_id = state["participant"]
+    protocol.block_conditions = list(state.get("remaining", []))
+    protocol.current_condition = state.get("condition")
+    protocol.trial_index = state.get("trial_index", 0) if protocol.current_condition else 0
+    protocol.block_trials_remaining = (protocol.design.trials_per_condition - protocol.trial_index
+                                       if protocol.current_condition else 0)
+    if recorder is not None:
+        recorder.resumed(state["participant"])
+    session.resume()
+
+
+def bench(rounds=2000, records_per_trial=12, path=None):
+    """Per fsync policy: microseconds per plain append, per committing append and
+    per trial of `records_per_trial` records ending in a commit."""
+    import statistics
+    import tempfile
+    results = {}
+    for policy in FSYNC_POLICIES:
+        with tempfile.TemporaryDirectory(prefix="journal_bench_") as tmp:
+            journal = SessionJournal(path or os.path.join(tmp, "bench.log"), fsync=policy)
+            plain, commit = [], []
+            for r in range(rounds):
+                for _ in range(records_per_trial - 1):
+                    t0 = time.perf_counter()
+                    journal.append("bench", "state", {"old": "present", "new": "retention"})
+                    plain.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                journal.append("bench", "result", {"condition": "baseline", "trial_index": r, "num_correct": 6},
+                               commit=True)
+                commit.append(time.perf_counter() - t0)
+            journal.close()
+            if path:
+                os.remove(path)
+        commit.sort()
+        results[policy] = {
+            "append_us": statistics.median(plain) * 1e6,
+            "commit_us": statistics.median(commit) * 1e6,
+            "commit_p99_us": commit[int(0.99 * (len(commit) - 1))] * 1e6,
+            "trial_us": (sum(plain) + sum(commit)) / rounds * 1e6,
+        }
+    return results
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect or benchmark the session journal.")
+    parser.add_argument("--show", default=None, help="print the unfinished sessions in this journal")
+    parser.add_argument("--bench", type=int, default=None, metavar="TRIALS",
+                        help="time TRIALS journaled trials under every fsync policy")
+    parser.add_argument("--dir", default=None, help="with --bench: put the journal in this directory")
+    args = parser.parse_args()
+    if args.show:
+        records, good = read_journal(args.show)
+        size = os.path.getsize(args.show) if os.path.exists(args.show) else 0
+        print(f"{len(records)} records, {good} of {size} bytes intact")
+        for sid, state in pending_sessions(records).items():
+            print(f"  {sid}: {state['results']} trials scored, in {state.get('condition')} "
+                  f"after trial {state.get('trial_index', 0)}, then {state.get('remaining', [])}")
+        return
+    if args.bench:
+        path = os.path.join(args.dir, "journal_bench.log") if args.dir else None
+        print(f"{'fsync':>7} {'append us':>10} {'commit us':>10} {'commit p99':>11} {'per trial us':>13}")
+        for policy, r in bench(args.bench, path=path).items():
+            print(f"{policy:>7} {r['append_us']:10.1f} {r['commit_us']:10.1f} {r['commit_p99_us']:11.1f} "
+                  f"{r['trial_us']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
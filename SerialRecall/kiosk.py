@@ -0,0 +1,404 @@
+# Multi-session kiosk server: many serial recall stations served by one asyncio process
+#
+# Every station is a thin client on one TCP connection speaking newline-delimited
+# JSON. The server runs a SerialRecallSession per station on the shared event loop
+# (clock.AsyncioScheduler) and forwards every session event; the client only
+# presents them and sends the participant's input back:
+#   client -> server   {"op": "begin", "participant": "P001"}   (participant optional)
+#                      {"op": "proceed"} | {"op": "tap"} | {"op": "submit", "response": ["F", "", "K", ...]}
+#   server -> client   {"event": "hello", "data": {"station"}}
+#                      {"event": <session event>, "data": {...}}   (see session.py)
+#                      {"event": "error", "data": {"message"}}
+# All stations log through one row logger behind a QueuedRowLogger, so rows are
+# written by a worker thread and never block the loop that times the items.
+# Item timing is measured when the event is handed to the connection.
+#   python kiosk.py                                  # serve on port 8766, logs in data/
+#   python kiosk.py --connect localhost:8766         # terminal thin client
+#   python kiosk.py --bench 25,50,100,200            # stations vs timing jitter
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import tempfile
+import dataclasses
+import multiprocessing
+from typing import Dict, List, Optional
+from experiment_config import Timing, Design, Logging, LOG_DIR, LOG_FILE, STIMULUS_TIMING_FILE
+from logger import make_row_logger, QueuedRowLogger
+from clock import AsyncioScheduler
+from participant_manager import ParticipantIdPool
+from protocol import SerialRecallProtocol, TrialPlan
+from stimulus_bank import StimulusBank
+import session as sess
+
+DEFAULT_PORT = 8766
+LAG_PROBE_S = 0.01  # how often the loop-lag monitor samples
+
+
+def _jsonable(value):
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(event, data):
+    return (json.dumps({"event": event, "data": data}, default=_jsonable) + "\n").encode()
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+class Station:
+    """One connected thin client and the session it drives."""
+
+    def __init__(self, server, station_id, reader, writer):
+        self.server = server
+        self.station_id = station_id
+        self.reader = reader
+        self.writer = writer
+        self.session: Optional[sess.SerialRecallSession] = None
+
+    def send(self, event, data):
+        # write() only buffers; a slow client never blocks the loop
+        if not self.writer.is_closing():
+            self.writer.write(encode(event, data))
+
+    async def run(self):
+        self.send("hello", {"station": self.station_id})
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    self.handle(json.loads(line))
+                except (ValueError, KeyError, TypeError, RuntimeError) as e:
+                    self.send("error", {"message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            if self.session is not None:
+                self.session.cancel()
+            self.writer.close()
+
+    def handle(self, message):
+        op = message.get("op")
+        if op == "begin":
+            if self.session is not None:
+                raise RuntimeError("This station already has a session")
+            self.session = self.server.new_session(message.get("participant"))
+            self.session.subscribe(lambda event, data: self.send(event, data))
+            self.session.begin()
+        elif op in ("proceed", "tap", "submit"):
+            if self.session is None:
+                raise RuntimeError("No session. Send begin first.")
+            if op == "submit":
+                self.session.submit([str(item).upper() for item in message["response"]])
+            else:
+                getattr(self.session, op)()
+        else:
+            raise ValueError(f"Unknown op: {op!r}")
+
+
+class KioskServer:
+    """Hosts a SerialRecallSession per connected station on one event loop.
+
+    spin_ms: busy-wait before each item deadline (DeadlineScheduler). The Tk app
+    spins 2 ms; with hundreds of sessions on one loop the spins add up, and the
+    client's network hop dominates anyway, so 0 here. persist_ids allocates
+    participant numbers through participant_manager in blocks of id_block.
+    """
+
+    def __init__(self, row_logger, log_dir=LOG_DIR, host="127.0.0.1", port=DEFAULT_PORT, time_scale=1.0,
+                 spin_ms=0.0, bank: Optional[StimulusBank] = None, persist_ids=True, id_block=10,
+                 collect_timing=False):
+        self.row_logger = QueuedRowLogger(row_logger)
+        self.log_path = os.path.join(log_dir, LOG_FILE)
+        self.timing_path = os.path.join(log_dir, STIMULUS_TIMING_FILE)
+        self.host = host
+        self.port = port
+        self.time_scale = time_scale
+        self.spin_ms = spin_ms
+        self.bank = bank
+        self.id_pool = ParticipantIdPool(id_block) if persist_ids else None
+        self.collect_timing = collect_timing
+        self.onset_errors_ms: List[float] = []  # real ms, with collect_timing
+        self.loop_lag_ms: List[float] = []
+        self.stations: Dict[int, Station] = {}
+        self.timing, self.design = Timing(), Design()
+        if bank is not None:
+            bank.check_design(self.design)
+        self.scheduler = None
+        self._ids = itertools.count(1)
+        self._participants = itertools.count(1)
+        self._server = None
+        self._monitor = None
+
+    def next_participant(self):
+        """Next participant number; through participant_manager's file when persist_ids."""
+        if self.id_pool is None:
+            return next(self._participants)
+        return self.id_pool.next()
+
+    def new_session(self, participant=None):
+        pid = self.next_participant()
+        stimuli = self.bank.participant(pid - 1) if self.bank is not None else None
+        protocol = SerialRecallProtocol(self.timing, self.design, participant_id=participant or f"P{pid:03d}",
+                                        stimuli=stimuli)
+        session = sess.SerialRecallSession(self.scheduler, protocol, self.row_logger, self.log_path,
+                                           timing_path=self.timing_path)
+        session.clock.spin_s = self.spin_ms / 1000.0
+        if self.collect_timing:
+            def on_event(event, data):
+                if event == "result":
+                    self.onset_errors_ms.extend(abs(actual - intended) * self.time_scale
+                                                for _, intended, actual, _, _ in session.stimulus_timing)
+            session.subscribe(on_event)
+        return session
+
+    async def start(self):
+        """Start listening; returns the bound port (useful with port=0)."""
+        self.scheduler = AsyncioScheduler(time_scale=self.time_scale)
+        self._server = await asyncio.start_server(self._connected, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.collect_timing:
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_lag())
+        return self.port
+
+    async def _connected(self, reader, writer):
+        station = Station(self, next(self._ids), reader, writer)
+        self.stations[station.station_id] = station
+        try:
+            await station.run()
+        finally:
+            del self.stations[station.station_id]
+
+    async def _monitor_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(LAG_PROBE_S)
+            self.loop_lag_ms.append((loop.time() - t0 - LAG_PROBE_S) * 1000.0)
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for station in list(self.stations.values()):
+            station.writer.close()
+        # Drain the queued rows off the loop thread
+        await asyncio.get_running_loop().run_in_executor(None, self.row_logger.close)
+
+
+# Thin clients
+async def run_terminal_client(host, port):
+    """Minimal text front-end: prints the session's events and sends typed commands
+    (begin [PARTICIPANT] | next | tap | submit F - K ... | quit)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+
+    async def show():
+        while line := await reader.readline():
+            message = json.loads(line)
+            event, data = message["event"], message["data"]
+            if event == "item":
+                print(f"  [{data['index'] + 1}] {data['item']}", flush=True)
+            elif event == "state":
+                print(f"-- {data['new']}", flush=True)
+            elif event == "result":
+                print(f"correct positions: {data['score']['n_correct']}", flush=True)
+            elif event != "item_off":
+                print(f"{event}: {data}", flush=True)
+
+    printer = loop.create_task(show())
+    try:
+        while True:
+            words = (await loop.run_in_executor(None, sys.stdin.readline)).split()
+            if not words:
+                continue
+            op, args = words[0], words[1:]
+            if op == "quit":
+                break
+            if op == "begin":
+                message = {"op": "begin", "participant": args[0] if args else None}
+            elif op in ("next", "tap"):
+                message = {"op": "proceed" if op == "next" else "tap"}
+            elif op == "submit":
+                message = {"op": "submit", "response": ["" if a == "-" else a for a in args]}
+            else:
+                print("commands: begin [PARTICIPANT] | next | tap | submit F - K ... | quit")
+                continue
+            writer.write((json.dumps(message) + "\n").encode())
+    finally:
+        printer.cancel()
+        writer.close()
+
+
+async def _virtual_station(host, port, seed, time_scale, arrival_errors_ms):
+    """A simulated participant behind a socket: answers like loadgen.py's
+    VirtualPlayer and measures when each item arrives against its schedule."""
+    from loadgen import VirtualParticipant
+    participant = VirtualParticipant(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    timing = Timing()
+    soa_s = (timing.item_on_ms + timing.isi_blank_ms) * time_scale / 1000.0
+    plan = None
+    state = sess.IDLE
+    first_arrival = 0.0
+    pending = set()
+
+    def send(message, delay_ms=0.0):
+        async def later():
+            await asyncio.sleep(delay_ms * time_scale / 1000.0)
+            writer.write((json.dumps(message) + "\n").encode())
+        task = loop.create_task(later())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    def tap():
+        if state == sess.RETENTION:
+            writer.write(b'{"op": "tap"}\n')
+            loop.call_later(participant.tap_interval_ms() * time_scale / 1000.0, tap)
+
+    send({"op": "begin"})
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            event, data = message["event"], message["data"]
+            if event == "trial":
+                plan = TrialPlan(**data["plan"])
+            elif event == "item":
+                now = loop.time()
+                if data["index"] == 0:
+                    first_arrival = now
+                arrival_errors_ms.append(abs(now - (first_arrival + data["index"] * soa_s)) * 1000.0)
+            elif event == "state":
+                state = data["new"]
+                if state == sess.BLOCK_INTRO:
+                    send({"op": "proceed"}, participant.continue_ms())
+                elif state == sess.FEEDBACK:
+                    send({"op": "proceed"}, timing.iti_ms + participant.continue_ms())
+                elif state == sess.RETENTION and plan.retention_task == "finger_tapping":
+                    loop.call_later(participant.tap_interval_ms() * time_scale / 1000.0, tap)
+                elif state == sess.RESPONSE:
+                    send({"op": "submit", "response": participant.respond(plan)}, participant.response_time_ms(plan))
+                elif state == sess.DONE:
+                    return True
+            elif event == "error":
+                print(f"station error: {data['message']}", file=sys.stderr)
+        return False
+    finally:
+        writer.close()
+
+
+def _bench_clients(host, port, stations, time_scale, seed, results):
+    """Child process: run `stations` virtual stations against the server."""
+    async def run():
+        errors = []
+        seeds = random.Random(seed)
+        done = await asyncio.gather(*(_virtual_station(host, port, seeds.getrandbits(32), time_scale, errors)
+                                      for _ in range(stations)))
+        results.put((sum(done), errors))
+    asyncio.run(run())
+
+
+async def bench_point(stations, time_scale, out_dir, seed=0):
+    """Serve `stations` concurrent virtual stations (clients in a child process)
+    through every block; returns timing jitter figures in real ms."""
+    log_dir = os.path.join(out_dir, f"{stations}_stations")
+    server = KioskServer(make_row_logger(Logging(backend="buffered")), log_dir, port=0, time_scale=time_scale,
+                         persist_ids=False, collect_timing=True)
+    port = await server.start()
+    results = multiprocessing.Queue()
+    clients = multiprocessing.Process(target=_bench_clients,
+                                      args=(server.host, port, stations, time_scale, seed, results))
+    t0 = time.perf_counter()
+    clients.start()
+    loop = asyncio.get_running_loop()
+    completed, arrival_errors = await loop.run_in_executor(None, results.get)
+    await loop.run_in_executor(None, clients.join)
+    wall_s = time.perf_counter() - t0
+    await server.close()
+    return {
+        "stations": stations,
+        "completed": completed,
+        "wall_s": wall_s,
+        "onset_p50_ms": percentile(server.onset_errors_ms, 50),
+        "onset_p99_ms": percentile(server.onset_errors_ms, 99),
+        "onset_max_ms": max(server.onset_errors_ms, default=float("nan")),
+        "arrival_p99_ms": percentile(arrival_errors, 99),
+        "arrival_max_ms": max(arrival_errors, default=float("nan")),
+        "loop_lag_p99_ms": percentile(server.loop_lag_ms, 99),
+        "log_errors": server.row_logger.errors,
+    }
+
+
+def run_bench(counts, time_scale, jitter_ms, out_dir):
+    print(f"All blocks, time scale {time_scale} (items every {Timing().item_on_ms * time_scale:.0f} ms real); "
+          f"logs in {out_dir}")
+    print(f"{'stations':>8} {'done':>5} {'wall s':>7} {'onset p50':>10} {'p99':>7} {'max':>7} "
+          f"{'arrival p99':>12} {'max':>7} {'loop lag p99':>13}")
+    sustained = 0
+    for n in counts:
+        r = asyncio.run(bench_point(n, time_scale, out_dir))
+        print(f"{n:8d} {r['completed']:5d} {r['wall_s']:7.1f} {r['onset_p50_ms']:10.2f} {r['onset_p99_ms']:7.2f} "
+              f"{r['onset_max_ms']:7.2f} {r['arrival_p99_ms']:12.2f} {r['arrival_max_ms']:7.2f} "
+              f"{r['loop_lag_p99_ms']:13.2f}")
+        if r["completed"] == n and r["arrival_p99_ms"] <= jitter_ms:
+            sustained = n
+    print(f"Largest tested load with p99 arrival jitter <= {jitter_ms} ms: {sustained or 'none'} stations")
+    return sustained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve serial recall sessions to many thin-client stations.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--connect", default=None, metavar="HOST:PORT", help="run the terminal thin client instead")
+    parser.add_argument("--bench", default=None, metavar="N,N,...", help="benchmark these station counts instead")
+    parser.add_argument("--time-scale", type=float, default=None,
+                        help="multiply every session delay by this (default 1; 0.01 with --bench)")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="with --bench: p99 arrival jitter bound")
+    args = parser.parse_args()
+
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        asyncio.run(run_terminal_client(host or "127.0.0.1", int(port)))
+        return
+    if args.bench:
+        counts = [int(n) for n in args.bench.split(",")]
+        run_bench(counts, args.time_scale or 0.01, args.jitter_ms, tempfile.mkdtemp(prefix="serial_recall_kiosk_"))
+        return
+
+    design = Design()
+    bank = StimulusBank(design.stimulus_bank) if design.stimulus_bank else None
+
+    async def serve():
+        server = KioskServer(make_row_logger(Logging(backend="buffered")), host=args.host, port=args.port,
+                             time_scale=args.time_scale or 1.0, bank=bank)
+        port = await server.start()
+        print(f"Serving serial recall stations on {args.host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Headless load generator: virtual participants run the full block/trial flow
+#
+# Drives the same SerialRecallSession engine and row loggers as the Tk app,
+# multiplexed on one FakeClock (or an asyncio loop) instead of root.after(),
+# so many concurrent sessions replay their trial timing (blank, items,
+# retention, response, continue) in virtual time and every trial is written
+# through the real logging backend:
+#   python loadgen.py --sessions 2000 --backend buffered
+#   python loadgen.py --sessions 500 --columnar --out-dir /tmp/sr_load
+#   python loadgen.py --sessions 2000 --backend sqlite     # out_dir/serial_recall.sqlite
+#   python loadgen.py --sessions 200 --asyncio --time-scale 0.0001
+#   python loadgen.py --sessions 2000 --bank data/stimulus_bank   # trials from a prebuilt bank
+#   python loadgen.py --sessions 2000 --journal flush   # crash-resume journal in out_dir
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from typing import List, Optional
+from experiment_config import Timing, Design, Logging, LOG_FILE, COLUMNAR_STORE, STIMULUS_TIMING_FILE, JOURNAL_FILE
+from logger import make_row_logger, FSYNC_POLICIES
+from columnar import TrialStore
+from clock import FakeClock, AsyncioScheduler
+from protocol import SerialRecallProtocol, TrialPlan, COND_SUPPRESSION
+from stimulus_bank import StimulusBank
+from journal import SessionJournal, SessionRecorder
+import session as sess
+from stimuli import CONSONANTS, THREE_LETTER_WORDS
+
+
+class VirtualParticipant:
+    """Recalls each position with a primacy/recency curve; misses are left blank
+    or filled with a wrong letter/word. Suppression lowers recall, words are
+    recalled a little better than letters."""
+
+    def __init__(self, seed=None, base_recall=0.45, primacy=0.4, recency=0.25, suppression_cost=0.15,
+                 word_bonus=0.1, blank_rate=0.4, mean_response_ms=9000.0, mean_continue_ms=900.0,
+                 mean_tap_ms=280.0):
+        self._rng = random.Random(seed)
+        self.base_recall = base_recall
+        self.primacy = primacy
+        self.recency = recency
+        self.suppression_cost = suppression_cost
+        self.word_bonus = word_bonus
+        self.blank_rate = blank_rate
+        self.mean_response_ms = mean_response_ms
+        self.mean_continue_ms = mean_continue_ms
+        self.mean_tap_ms = mean_tap_ms
+        self._curves = {}  # (length, condition, is_words) -> probability per position
+
+    def _curve(self, plan: TrialPlan):
+        key = (len(plan.target), plan.condition, plan.is_words)
+        curve = self._curves.get(key)
+        if curve is None:
+            n = len(plan.target)
+            shift = (self.word_bonus if plan.is_words else 0.0) - (self.suppression_cost if plan.condition == COND_SUPPRESSION else 0.0)
+            curve = self._curves[key] = [
+                max(0.0, min(1.0, self.base_recall + shift + self.primacy * math.exp(-i / 1.5)
+                             + self.recency * math.exp(-(n - 1 - i))))
+                for i in range(n)
+            ]
+        return curve
+
+    def respond(self, plan: TrialPlan) -> List[str]:
+        rand = self._rng.random
+        pool = THREE_LETTER_WORDS if plan.is_words else CONSONANTS
+        response = []
+        for item, p in zip(plan.target, self._curve(plan)):
+            if rand() < p:
+                response.append(item)
+            elif rand() < self.blank_rate:
+                response.append("")
+            else:
+                response.append(self._rng.choice(pool))
+        return response
+
+    def response_time_ms(self, plan: TrialPlan) -> int:
+        scale = len(plan.target) / 10
+        return int(self._rng.lognormvariate(math.log(self.mean_response_ms * scale), 0.3))
+
+    def continue_ms(self) -> int:
+        return int(self._rng.lognormvariate(math.log(self.mean_continue_ms), 0.4))
+
+    def tap_interval_ms(self) -> int:
+        return max(50, int(self._rng.gauss(self.mean_tap_ms, 60)))
+
+
+class VirtualPlayer:
+    """Subscribes a VirtualParticipant to a session engine the way SerialRecallApp
+    subscribes its widgets: clicks continue, taps during finger tapping and
+    submits its response after its response time."""
+
+    def __init__(self, session, participant, on_done=None):
+        self.session = session
+        self.scheduler = session.scheduler
+        self.participant = participant
+        self.on_done = on_done
+        self.trials = 0
+        self.done = False
+        session.subscribe(self._on_event)
+
+    def start(self):
+        self.session.begin()
+
+    def _on_event(self, event, data):
+        if event == "result":
+            self.trials += 1
+        if event != "state":
+            return
+        new = data["new"]
+        if new == sess.BLOCK_INTRO:
+            self.scheduler.after(self.participant.continue_ms(), self.session.proceed)
+        elif new == sess.FEEDBACK:
+            # Feedback screen, then a click for the next trial
+            self.scheduler.after(self.session.protocol.timing.iti_ms + self.participant.continue_ms(), self.session.proceed)
+        elif new == sess.RETENTION and self.session.protocol.tapping_active:
+            self._schedule_tap()
+        elif new == sess.RESPONSE:
+            plan = self.session.plan
+            response = self.participant.respond(plan)
+            self.scheduler.after(self.participant.response_time_ms(plan), lambda: self.session.submit(response))
+        elif new == sess.DONE:
+            self.done = True
+            if self.on_done is not None:
+                self.on_done(self)
+
+    def _schedule_tap(self):
+        def tap():
+            if self.session.protocol.tapping_active:
+                self.session.tap()
+                self._schedule_tap()
+        self.scheduler.after(self.participant.tap_interval_ms(), tap)
+
+
+def start_players(scheduler, sessions, row_logger, log_path, trial_store, seed, reveal_steps, on_done,
+                  bank: Optional[StimulusBank] = None, journal: Optional[SessionJournal] = None):
+    """Create and begin `sessions` engines on one scheduler, each with its own
+    seeded protocol and VirtualParticipant. With a bank, session i replays the
+    bank's participant i (wrapping around a smaller bank); with a journal, every
+    session is recorded in it."""
+    seeds = random.Random(seed)
+    timing, design = Timing(), Design()
+    if bank is not None:
+        bank.check_design(design)
+    for i in range(sessions):
+        stimuli = bank.participant(i % bank.participants) if bank is not None else None
+        protocol = SerialRecallProtocol(timing, design, participant_id=f"V{i + 1:05d}",
+                                        rng=random.Random(seeds.getrandbits(32)), stimuli=stimuli)
+        timing_path = os.path.join(os.path.dirname(log_path), STIMULUS_TIMING_FILE) if reveal_steps else None
+        session = sess.SerialRecallSession(scheduler, protocol, row_logger, log_path, trial_store, reveal_steps,
+                                           timing_path)
+        if journal is not None:
+            SessionRecorder(session, journal)
+        VirtualPlayer(session, VirtualParticipant(seeds.getrandbits(32)), on_done).start()
+
+
+def _result(finished, wall_s, virtual_s):
+    trials = sum(p.trials for p in finished)
+    return {
+        "sessions": len(finished),
+        "trials": trials,
+        "wall_s": wall_s,
+        "virtual_s": virtual_s,
+        "sessions_per_s": len(finished) / wall_s if wall_s else float("inf"),
+        "trials_per_s": trials / wall_s if wall_s else float("inf"),
+    }
+
+
+def _flush(row_logger, trial_store):
+    row_logger.flush()
+    if trial_store is not None:
+        trial_store.flush()
+
+
+def run_load(sessions, row_logger, log_path, trial_store=None, seed=0, clock: Optional[FakeClock] = None,
+             reveal_steps=False, bank: Optional[StimulusBank] = None, journal: Optional[SessionJournal] = None):
+    """Run `sessions` concurrent participants to completion on one FakeClock."""
+    clock = clock or FakeClock()
+    finished = []
+    t0 = time.perf_counter()
+    start_players(clock, sessions, row_logger, log_path, trial_store, seed, reveal_steps, finished.append, bank,
+                  journal)
+    clock.run()
+    _flush(row_logger, trial_store)
+    return _result(finished, time.perf_counter() - t0, clock.now())
+
+
+async def run_load_async(sessions, row_logger, log_path, trial_store=None, seed=0, time_scale=0.001,
+                         reveal_steps=True, bank: Optional[StimulusBank] = None,
+                         journal: Optional[SessionJournal] = None):
+    """Same as run_load on the running asyncio loop, every delay scaled by time_scale."""
+    scheduler = AsyncioScheduler(time_scale=time_scale)
+    finished = []
+    all_done = asyncio.Event()
+
+    def on_done(player):
+        finished.append(player)
+        if len(finished) == sessions:
+            all_done.set()
+
+    t0 = time.perf_counter()
+    start_players(scheduler, sessions, row_logger, log_path, trial_store, seed, reveal_steps, on_done, bank,
+                  journal)
+    if sessions:
+        await all_done.wait()
+    _flush(row_logger, trial_store)
+    wall_s = time.perf_counter() - t0
+    return _result(finished, wall_s, wall_s / time_scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run virtual participants through every serial recall block.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--backend", choices=["csv", "buffered", "sqlite"], default="buffered")
+    parser.add_argument("--columnar", action="store_true", help="also append to the columnar trial store")
+    parser.add_argument("--out-dir", default=None, help="where the log goes (default: a new temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reveal-steps", action="store_true",
+                        help="emit every item on/off event like the GUI does (slower)")
+    parser.add_argument("--asyncio", action="store_true", help="drive the sessions on an asyncio loop")
+    parser.add_argument("--time-scale", type=float, default=0.001, help="with --asyncio: multiply all delays by this")
+    parser.add_argument("--bank", default=None, help="take every session's trials from this stimulus bank")
+    parser.add_argument("--journal", choices=FSYNC_POLICIES, default=None,
+                        help="journal every session to out_dir/" + JOURNAL_FILE + " with this fsync policy")
+    parser.add_argument("--min-sessions-per-s", type=float, default=None,
+                        help="exit with status 1 if throughput falls below this (regression check)")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="serial_recall_load_")
+    os.makedirs(out_dir, exist_ok=True)
+    options = Logging(backend=args.backend)
+    row_logger = make_row_logger(options, out_dir)
+    trial_store = TrialStore(os.path.join(out_dir, COLUMNAR_STORE), max(Design.list_lengths)) if args.columnar else None
+    bank = StimulusBank(args.bank) if args.bank else None
+    journal = SessionJournal(os.path.join(out_dir, JOURNAL_FILE), args.journal) if args.journal else None
+    try:
+        log_path = os.path.join(out_dir, LOG_FILE)
+        if args.asyncio:
+            result = asyncio.run(run_load_async(args.sessions, row_logger, log_path, trial_store, args.seed,
+                                                args.time_scale, args.reveal_steps, bank, journal))
+        else:
+            result = run_load(args.sessions, row_logger, log_path, trial_store, args.seed,
+                              reveal_steps=args.reveal_steps, bank=bank, journal=journal)
+    finally:
+        row_logger.close()
+        if trial_store is not None:
+            trial_store.close()
+        if journal is not None:
+            journal.close()
+
+    print(f"{result['sessions']} sessions / {result['trials']} trials in {result['wall_s']:.2f}s "
+          f"({result['virtual_s'] / 3600:.1f} h of virtual session time)")
+    print(f"  {result['sessions_per_s']:,.0f} sessions/s, {result['trials_per_s']:,.0f} trials/s")
+    if journal is not None:
+        print(f"  journal: {journal.commits:,} commits, {journal.syncs:,} fsyncs "
+              f"({journal.syncs / max(result['trials'], 1):.2f} per trial)")
+    print(f"  log: {out_dir}")
+    if args.min_sessions_per_s is not None and result["sessions_per_s"] < args.min_sessions_per_s:
+        print(f"Throughput below {args.min_sessions_per_s} sessions/s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
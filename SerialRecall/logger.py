@@ -1,6 +1,11 @@
 # CSV logger with append and header creation
 import os
 import csv
+import time
+import queue
+import atexit
+import threading
+import traceback
 from datetime import datetime
 from typing import Dict, Any
 
@@ -8,9 +13,28 @@ def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
+def upgrade_header(filepath: str, fieldnames):
+    """If filepath was started with an older header that lacks trailing columns
+    (e.g. the timing-error columns), rewrite it with the new header and blank
+    cells so appended rows line up."""
+    with open(filepath, mode='r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+        if header == list(fieldnames) or header != list(fieldnames)[:len(header)]:
+            return
+        f.seek(0)
+        rows = list(csv.DictReader(f))
+    tmp = filepath + ".tmp"
+    with open(tmp, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(fieldnames), restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, filepath)
+
 def append_row_csv(filepath: str, row: Dict[str, Any]):
     ensure_dir(os.path.dirname(filepath))
     file_exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+    if file_exists:
+        upgrade_header(filepath, row.keys())
     with open(filepath, mode='a', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=list(row.keys()))
         if not file_exists:
@@ -19,3 +43,166 @@ def append_row_csv(filepath: str, row: Dict[str, Any]):
 
 def timestamp():
     return datetime.utcnow().isoformat()
+
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+class BufferedCSVLogger:
+    """Drop-in for append_row_csv that keeps file handles open and batches rows.
+
+    Rows are written when `flush_rows` are pending, when `flush_interval_s`
+    has passed since the last flush, and on close() (also run at exit).
+    fsync: "never" (OS buffers only), "flush" (fsync on every flush) or
+    "always" (write and fsync each row as it arrives).
+    """
+
+    def __init__(self, flush_rows=20, flush_interval_s=2.0, fsync="flush"):
+        if flush_rows <= 0:
+            raise ValueError("flush_rows must be > 0")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self._files = {}  # path -> [handle, DictWriter or None, pending rows]
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._timer = None
+        atexit.register(self.close)
+
+    def append_row(self, filepath: str, row: Dict[str, Any]):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BufferedCSVLogger is closed")
+            entry = self._files.get(filepath)
+            if entry is None:
+                # One exists/size check per file instead of per row
+                ensure_dir(os.path.dirname(filepath))
+                file_exists = os.path.exists(filepath) and os.path.getsize(filepath) > 0
+                if file_exists:
+                    upgrade_header(filepath, row.keys())
+                handle = open(filepath, mode='a', newline='', encoding='utf-8')
+                writer = csv.DictWriter(handle, fieldnames=list(row.keys()))
+                if not file_exists:
+                    writer.writeheader()
+                entry = self._files[filepath] = [handle, writer, []]
+            entry[2].append(row)
+            self._pending_rows += 1
+            if (
+                self.fsync == "always"
+                or self._pending_rows >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            ):
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval_s > 0:
+                self._timer = threading.Thread(target=self._flush_loop, daemon=True)
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            for handle, _, _ in self._files.values():
+                handle.close()
+            self._files.clear()
+            self._closed = True
+        self._stop.set()
+        atexit.unregister(self.close)
+
+    def _flush_locked(self):
+        for handle, writer, pending in self._files.values():
+            if not pending:
+                continue
+            writer.writerows(pending)
+            pending.clear()
+            handle.flush()
+            if self.fsync != "never":
+                os.fsync(handle.fileno())
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval_s):
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending_rows and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._flush_locked()
+
+
+class CSVLogger:
+    """append_row_csv behind the same interface as BufferedCSVLogger."""
+
+    def append_row(self, filepath: str, row: Dict[str, Any]):
+        append_row_csv(filepath, row)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class QueuedRowLogger:
+    """Wraps a row logger for event-loop hosts (kiosk.py): append_row() only queues
+    the row and one worker thread writes it, so disk latency never stalls the
+    loop that times the sessions."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, name="QueuedRowLogger", daemon=True)
+        self._thread.start()
+
+    def append_row(self, filepath: str, row: Dict[str, Any]):
+        self._queue.put((filepath, row))
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.inner.append_row(*item)
+            except Exception:
+                self.errors += 1  # one bad row must not stop the writer for every other session
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued row is written, then flush the inner logger."""
+        self._queue.join()
+        self.inner.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.inner.close()
+
+
+def make_row_logger(options, log_dir=None):
+    """Build the row logger selected by an experiment_config.Logging instance.
+
+    The "sqlite" backend writes to log_dir/SQLITE_FILE (default LOG_DIR) and
+    ignores the CSV paths rows are appended to."""
+    if options.backend == "csv":
+        return CSVLogger()
+    if options.backend == "buffered":
+        return BufferedCSVLogger(options.flush_rows, options.flush_interval_s, options.fsync)
+    if options.backend == "sqlite":
+        from experiment_config import LOG_DIR, SQLITE_FILE
+        from sqlite_log import SQLiteLogger
+        return SQLiteLogger(os.path.join(log_dir or LOG_DIR, SQLITE_FILE), options.flush_rows,
+                            options.flush_interval_s, options.fsync)
+    raise ValueError(f"Unknown log backend: {options.backend!r}")
@@ -1,19 +1,141 @@
-import os, json
+# Participant IDs shared by every station: atomic allocation under an exclusive file lock
+#
+# data/participants.json holds {"last_id": int}; it is only rewritten through a
+# temp file and os.replace, so it is never half-written. Every allocation also
+# appends "first,last,utc,pid" to data/participants.log; if the JSON file is
+# ever unreadable, numbering resumes after the highest ID in that log, and
+# without a log allocation fails instead of starting again at 1.
+import os, json, time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 PARTICIPANT_FILE = os.path.join("data", "participants.json")
 
-def load_next_participant_id():
-    # participants.json structure: {"last_id": int}
-    if not os.path.exists(PARTICIPANT_FILE):
-        return 1  # start at 1
+
+def _log_path(path):
+    return os.path.splitext(path)[0] + ".log"
+
+
+class _FileLock:
+    """Exclusive lock on path + '.lock', held across processes (flock / msvcrt)."""
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.handle = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.handle = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+                    time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+
+
+def _last_from_log(path):
+    last = 0
     try:
-        with open(PARTICIPANT_FILE, "r", encoding="utf-8") as f:
-            obj = json.load(f)
-        return int(obj.get("last_id", 0)) + 1
-    except Exception:
-        return 1
-
-def save_participant_id(pid:int):
-    os.makedirs(os.path.dirname(PARTICIPANT_FILE), exist_ok=True)
-    with open(PARTICIPANT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"last_id": int(pid)}, f)
+        with open(_log_path(path), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    last = max(last, int(line.split(",")[1]))
+                except (IndexError, ValueError):
+                    pass  # a torn last line from a crash
+    except FileNotFoundError:
+        pass
+    return last
+
+
+def _read_last_id(path):
+    if not os.path.exists(path):
+        return _last_from_log(path)
+    logged = _last_from_log(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return max(int(json.load(f).get("last_id", 0)), logged)
+    except (ValueError, AttributeError, TypeError):
+        if logged:
+            return logged  # unreadable, but the log knows every ID handed out
+        raise ValueError(f"{path} is unreadable and {_log_path(path)} has no IDs to resume from; "
+                         f"fix it by hand rather than restarting at P001")
+
+
+def _write_last_id(path, last_id):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last_id": int(last_id)}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _record(path, first, last):
+    # Log first: if we die before the JSON is replaced, the log still covers the block
+    with open(_log_path(path), "a", encoding="utf-8") as f:
+        f.write(f"{first},{last},{datetime.utcnow().isoformat()},{os.getpid()}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    _write_last_id(path, last)
+
+
+def allocate_participant_ids(count=1, path=PARTICIPANT_FILE):
+    """Reserve `count` consecutive IDs; returns them as a list. Atomic across processes."""
+    if count <= 0:
+        raise ValueError("count must be > 0")
+    with _FileLock(path):
+        first = _read_last_id(path) + 1
+        _record(path, first, first + count - 1)
+    return list(range(first, first + count))
+
+
+def allocate_participant_id(path=PARTICIPANT_FILE):
+    return allocate_participant_ids(1, path)[0]
+
+
+class ParticipantIdPool:
+    """Hands out IDs from blocks of `block_size` reserved at once, so a host that
+    starts many sessions (kiosk.py) takes the lock once per block. IDs left in
+    a block when the process stops are skipped, never reused."""
+
+    def __init__(self, block_size=10, path=PARTICIPANT_FILE):
+        self.block_size = block_size
+        self.path = path
+        self._ids = []
+
+    def next(self):
+        if not self._ids:
+            self._ids = allocate_participant_ids(self.block_size, self.path)
+        return self._ids.pop(0)
+
+
+def load_next_participant_id(path=PARTICIPANT_FILE):
+    """The ID the next allocation would return (does not reserve it; use allocate_participant_id)."""
+    with _FileLock(path):
+        return _read_last_id(path) + 1
+
+
+def save_participant_id(pid: int, path=PARTICIPANT_FILE):
+    """Record pid as used; never moves the counter backwards."""
+    with _FileLock(path):
+        if pid > _read_last_id(path):
+            _record(path, pid, pid)
@@ -0,0 +1,158 @@
+# UI-independent trial flow for the serial recall blocks (shared by the Tk app and the load generator)
+import json
+import random
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+from experiment_config import Timing, Design
+from stimuli import sample_letters, sample_from_clusters, sample_words, score_serial_recall, PHONO_CLUSTERS, VISUAL_CLUSTERS
+from logger import timestamp
+from clock import timing_summary
+
+# Conditions
+COND_BASELINE = "baseline_letters"
+COND_ERROR_TYPES = "error_types_letters"
+COND_CHUNKING = "chunking_words"
+COND_SUPPRESSION = "articulatory_suppression"
+COND_TAPPING = "finger_tapping"
+
+# ALL_CONDITIONS = [COND_BASELINE, COND_ERROR_TYPES, COND_CHUNKING, COND_SUPPRESSION, COND_TAPPING]
+ALL_CONDITIONS = [COND_BASELINE, COND_CHUNKING, COND_SUPPRESSION, COND_TAPPING]
+
+# Retention phase
+PRE_SEQUENCE_BLANK_MS = 500     # blank screen before the first item
+SECONDARY_TASK_MS = 10000       # suppression/tapping retention duration
+TAP_CHECK_MS = 500              # tapping: re-check for a first tap this often
+
+# Per-trial stimulus timing error columns (blank when not measured)
+TIMING_COLUMNS = ["onset_error_mean_ms", "onset_error_max_ms", "offset_error_mean_ms", "drift_ms"]
+
+
+@dataclass
+class TrialPlan:
+    condition: str
+    trial_index: int           # 1-based within the block
+    target: List[str]
+    is_words: bool
+    retention_task: str        # "none", "articulatory_suppression" or "finger_tapping"
+    retention_ms: int
+
+
+class SerialRecallProtocol:
+    """Block order, stimulus choice, scoring and log rows for one participant.
+
+    A front-end calls start_next_block() until it returns None, and within a
+    block next_trial() until it returns None; tap() during the retention
+    interval and submit(response) once the response boxes are read.
+
+    stimuli: a participant read from a stimulus bank (stimulus_bank.py); its
+    block order and trial lists replace the ones drawn from rng.
+    """
+
+    def __init__(self, timing: Optional[Timing] = None, design: Optional[Design] = None,
+                 participant_id: Optional[str] = None, rng: Optional[random.Random] = None, stimuli=None):
+        self.timing = timing or Timing()
+        self.design = design or Design()
+        self.participant_id = participant_id
+        self.rng = rng or random.Random()
+        self.stimuli = None
+        self.block_conditions = ALL_CONDITIONS.copy()
+        if self.design.randomize_block_order:
+            self.rng.shuffle(self.block_conditions)
+        if stimuli is not None:
+            self.use_stimuli(stimuli)
+        self.current_condition = None
+        self.trial_index = 0
+        self.block_trials_remaining = 0
+        self.current: Optional[TrialPlan] = None
+        self.tap_count = 0
+        self.tapping_active = False
+
+    def use_stimuli(self, stimuli):
+        """Take block order and trials from a banked participant (before the first block)."""
+        self.stimuli = stimuli
+        self.block_conditions = list(stimuli.block_conditions)
+
+    def start_next_block(self) -> Optional[str]:
+        """Advance to the next condition; None once every block is done."""
+        if not self.block_conditions:
+            self.current_condition = None
+            return None
+        self.current_condition = self.block_conditions.pop(0)
+        self.block_trials_remaining = self.design.trials_per_condition
+        self.trial_index = 0
+        return self.current_condition
+
+    def next_trial(self) -> Optional[TrialPlan]:
+        """Draw the next trial of the current block; None when the block is finished."""
+        if self.block_trials_remaining <= 0:
+            return None
+        self.trial_index += 1
+        self.block_trials_remaining -= 1
+
+        rng = self.rng
+        cond = self.current_condition
+        retention_task = "none"
+        if cond in (COND_SUPPRESSION, COND_TAPPING):
+            retention_task = cond
+        if self.stimuli is not None:
+            target = self.stimuli.target(cond, self.trial_index)
+        elif cond == COND_ERROR_TYPES:
+            L = rng.choice(self.design.list_lengths)
+            clusters = PHONO_CLUSTERS if rng.random() < 0.5 else VISUAL_CLUSTERS
+            target = sample_from_clusters(L, clusters, rng=rng)
+        elif cond == COND_CHUNKING:
+            target = sample_words(rng.choice(self.design.list_lengths), rng=rng)
+        else:
+            target = sample_letters(rng.choice(self.design.list_lengths), rng=rng)
+
+        retention_ms = SECONDARY_TASK_MS if retention_task != "none" else self.timing.retention_ms
+        self.current = TrialPlan(cond, self.trial_index, target, cond == COND_CHUNKING, retention_task, retention_ms)
+        self.tap_count = 0
+        self.tapping_active = False
+        return self.current
+
+    def begin_retention(self):
+        self.tapping_active = self.current is not None and self.current.retention_task == COND_TAPPING
+
+    def tap(self):
+        if self.tapping_active:
+            self.tap_count += 1
+
+    def end_retention(self):
+        self.tapping_active = False  # stop counting taps
+
+    def submit(self, response: List[str], stimulus_timing=None):
+        """Score the response to the current trial; returns (score, log row).
+
+        stimulus_timing: measured presentation, (index, intended_on, actual_on,
+        intended_off, actual_off) in ms per item, summarised into the row.
+        """
+        target = self.current.target
+        score = score_serial_recall(target, response)
+        return score, self.build_log_row(target, response, score, timing_summary(stimulus_timing))
+
+    def build_log_row(self, target, response, score, timing=None) -> Dict[str, Any]:
+        plan = self.current
+        row = {
+            "timestamp_utc": timestamp(),
+            "participant": self.participant_id,
+            "condition": plan.condition,
+            "is_words": int(plan.is_words),
+            "trial_index_in_block": plan.trial_index,
+            "target_length": len(target),
+            "target": "|" + "||".join(target) + "|",
+            "response": "|" + "||".join(response) + "|",
+            "prop_correct": score["prop_correct"],
+            "n_correct": score["n_correct"],
+            "all_or_nothing": score["all_or_nothing"],
+            "pos_correct": json.dumps(score["pos_correct"]),
+            "item_on_ms": self.timing.item_on_ms,
+            "isi_blank_ms": self.timing.isi_blank_ms,
+            "retention_ms": self.timing.retention_ms,
+            "iti_ms": self.timing.iti_ms,
+            "taps": self.tap_count,
+        }
+        timing = timing or {}
+        for col in TIMING_COLUMNS:
+            row[col] = round(timing[col], 3) if col in timing else ""
+        return row
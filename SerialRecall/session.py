@@ -0,0 +1,213 @@
+# Event-driven session engine: explicit states for one participant's run through every block
+#
+# The Tk app (tasks.py), the load generator and any other front-end subscribe
+# to the same engine; timing runs on any scheduler with after(ms, cb) ->
+# token and after_cancel(token): a Tk root, clock.FakeClock or
+# clock.AsyncioScheduler.
+from typing import Any, Callable, Dict, List, Optional
+from clock import DeadlineScheduler
+from protocol import SerialRecallProtocol, TrialPlan, PRE_SEQUENCE_BLANK_MS, TAP_CHECK_MS
+
+STIMULUS_TIMING_FIELDS = ["participant", "condition", "trial_index_in_block", "item",
+                          "intended_onset_ms", "actual_onset_ms", "intended_offset_ms", "actual_offset_ms"]
+
+# States
+IDLE = "idle"                # before begin()
+BLOCK_INTRO = "block_intro"  # block title shown, waiting for proceed()
+PRESENT = "present"          # blank, then items one by one
+RETENTION = "retention"      # retention interval / secondary task
+RESPONSE = "response"        # response boxes shown, waiting for submit()
+FEEDBACK = "feedback"        # score shown, waiting for proceed()
+DONE = "done"                # all blocks complete
+
+TRANSITIONS = {
+    IDLE: {BLOCK_INTRO, DONE},
+    BLOCK_INTRO: {PRESENT},
+    PRESENT: {RETENTION},
+    RETENTION: {RESPONSE},
+    RESPONSE: {FEEDBACK},
+    FEEDBACK: {PRESENT, BLOCK_INTRO, DONE},
+}
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+
+class SerialRecallSession:
+    """State machine over SerialRecallProtocol.
+
+    Inputs: begin() (or resume() once journal.resume() restored the protocol),
+    proceed() (continue on block intro / feedback), tap() and submit(response).
+    Events passed to subscribers as listener(event, data):
+
+    - "state"     {"old", "new"}
+    - "block"     {"condition"}            a block starts
+    - "trial"     {"plan"}                 a trial starts (TrialPlan)
+    - "item"      {"index", "item"}        item shown
+    - "item_off"  {"index"}                item hidden (ISI blank)
+    - "tap_wait"  {}                       tapping time is up but no tap yet
+    - "result"    {"score", "row"}         response scored and logged
+
+    Rows go to row_logger.append_row(log_path, row) (and trial_store when
+    given). With reveal_steps=False the blank and the whole item presentation
+    are one timer and no item events are emitted (for headless runs).
+
+    Item onsets and offsets run on absolute deadlines (DeadlineScheduler), so
+    lateness never accumulates across the list. Intended and actual times of
+    every item, measured after the subscribers have drawn it, are summarised
+    into the trial row and, with timing_path, written one row per item.
+    """
+
+    def __init__(self, scheduler, protocol: SerialRecallProtocol, row_logger=None, log_path: Optional[str] = None,
+                 trial_store=None, reveal_steps: bool = True, timing_path: Optional[str] = None):
+        self.scheduler = scheduler
+        self.clock = DeadlineScheduler(scheduler)
+        self.timing_path = timing_path
+        self.stimulus_timing: List[list] = []  # [index, intended_on, actual_on, intended_off, actual_off] ms
+        self._t0 = 0.0
+        self.protocol = protocol
+        self.row_logger = row_logger
+        self.log_path = log_path
+        self.trial_store = trial_store
+        self.reveal_steps = reveal_steps
+        self.state = IDLE
+        self.plan: Optional[TrialPlan] = None
+        self._listeners: List[Listener] = []
+        self._timer = None
+
+    # Observers
+    def subscribe(self, listener: Listener):
+        """Register listener(event, data); returns a function that unsubscribes it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _emit(self, event: str, **data):
+        for listener in list(self._listeners):
+            listener(event, data)
+
+    def _enter(self, new: str):
+        if new not in TRANSITIONS.get(self.state, ()):
+            raise RuntimeError(f"Invalid transition {self.state} -> {new}")
+        old, self.state = self.state, new
+        self._emit("state", old=old, new=new)
+
+    def _after(self, ms: int, callback):
+        self._timer = self.scheduler.after(ms, callback)
+
+    def cancel(self):
+        """Stop the pending timer, e.g. when the window closes mid-trial."""
+        if self._timer is not None:
+            self.clock.after_cancel(self._timer)
+            self._timer = None
+
+    # Inputs
+    def begin(self):
+        if self.state != IDLE:
+            raise RuntimeError(f"Cannot begin while {self.state}")
+        self._next_block()
+
+    def resume(self):
+        """Start at the protocol's current block, whose trial counter may already be
+        past its first trials, instead of at the next block."""
+        if self.state != IDLE:
+            raise RuntimeError(f"Cannot resume while {self.state}")
+        if self.protocol.current_condition is None or self.protocol.block_trials_remaining <= 0:
+            self._next_block()
+            return
+        self._emit("block", condition=self.protocol.current_condition)
+        self._enter(BLOCK_INTRO)
+
+    def proceed(self):
+        """Continue from the block title or the feedback screen; ignored elsewhere."""
+        if self.state in (BLOCK_INTRO, FEEDBACK):
+            self._next_trial()
+
+    def tap(self):
+        self.protocol.tap()
+
+    def submit(self, response: List[str]):
+        if self.state != RESPONSE:
+            raise RuntimeError(f"Cannot submit while {self.state}")
+        score, row = self.protocol.submit(response, [tuple(t) for t in self.stimulus_timing] or None)
+        # Encode for the store before any sink writes, so a bad response is
+        # rejected whole instead of leaving a CSV row without its store row
+        packed = (self.trial_store.pack_trial(row, self.plan.target, response, score["pos_correct"])
+                  if self.trial_store is not None else None)
+        if self.row_logger is not None:
+            self.row_logger.append_row(self.log_path, row)
+            if self.timing_path is not None:
+                for item in self.stimulus_timing:
+                    self.row_logger.append_row(self.timing_path, dict(zip(STIMULUS_TIMING_FIELDS, [
+                        row["participant"], row["condition"], row["trial_index_in_block"], item[0],
+                    ] + [round(v, 3) for v in item[1:]])))
+        if packed is not None:
+            self.trial_store.write_packed(packed)
+        self._emit("result", score=score, row=row)
+        self._enter(FEEDBACK)
+
+    # Phases
+    def _next_block(self):
+        condition = self.protocol.start_next_block()
+        if condition is None:
+            self._enter(DONE)
+            return
+        self._emit("block", condition=condition)
+        self._enter(BLOCK_INTRO)
+
+    def _next_trial(self):
+        plan = self.protocol.next_trial()
+        if plan is None:
+            self._next_block()
+            return
+        self.plan = plan
+        self._emit("trial", plan=plan)
+        self._enter(PRESENT)
+        self.stimulus_timing = []
+        if self.reveal_steps:
+            # brief blank pause for consistency; item times count from the first intended onset
+            self._t0 = self.clock.now() + PRE_SEQUENCE_BLANK_MS / 1000.0
+            self._timer = self.clock.at(self._t0, lambda _t: self._show_item(0))
+        else:
+            timing = self.protocol.timing
+            present_ms = PRE_SEQUENCE_BLANK_MS + len(plan.target) * (timing.item_on_ms + timing.isi_blank_ms)
+            self._after(present_ms, self._begin_retention)
+
+    def _elapsed_ms(self) -> float:
+        return (self.clock.now() - self._t0) * 1000.0
+
+    def _show_item(self, idx: int):
+        if idx >= len(self.plan.target):
+            self._begin_retention()
+            return
+        timing = self.protocol.timing
+        soa_ms = timing.item_on_ms + timing.isi_blank_ms
+        self._emit("item", index=idx, item=self.plan.target[idx])
+        intended_on = idx * soa_ms
+        self.stimulus_timing.append([idx, intended_on, self._elapsed_ms(), intended_on + timing.item_on_ms, None])
+        self._timer = self.clock.at(self._t0 + (intended_on + timing.item_on_ms) / 1000.0,
+                                    lambda _t: self._hide_item(idx))
+
+    def _hide_item(self, idx: int):
+        self._emit("item_off", index=idx)
+        self.stimulus_timing[-1][4] = self._elapsed_ms()
+        soa_ms = self.protocol.timing.item_on_ms + self.protocol.timing.isi_blank_ms
+        self._timer = self.clock.at(self._t0 + (idx + 1) * soa_ms / 1000.0, lambda _t: self._show_item(idx + 1))
+
+    def _begin_retention(self):
+        self.protocol.begin_retention()
+        self._enter(RETENTION)
+        if self.protocol.tapping_active:
+            self._after(self.plan.retention_ms, self._check_taps)
+        else:
+            self._after(self.plan.retention_ms, self._begin_response)
+
+    def _check_taps(self):
+        # Tapping continues until at least one tap has been made
+        if self.protocol.tap_count > 0:
+            self._begin_response()
+        else:
+            self._emit("tap_wait")
+            self._after(TAP_CHECK_MS, self._check_taps)
+
+    def _begin_response(self):
+        self.protocol.end_retention()
+        self._enter(RESPONSE)
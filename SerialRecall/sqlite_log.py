@@ -0,0 +1,310 @@
+# SQLite logging backend: trials in normalized, indexed tables instead of appended CSV rows
+#
+# Selected with Logging.backend = "sqlite"; rows go to LOG_DIR/SQLITE_FILE in WAL
+# mode, batched into one transaction per flush (same flush_rows /
+# flush_interval_s / fsync knobs as the buffered CSV logger). Tables:
+#   sessions     one per participant
+#   trials       one per trial: condition, scores, timing summary (indexed by
+#                participant session, condition and timestamp)
+#   responses    one per list position: target item, response, correct
+#   item_timing  intended/actual onset and offset of every presented item
+# The exporter writes the CSV layouts the other tools read (serial_recall_log.csv
+# and serial_recall_stimulus_timing.csv):
+#   python sqlite_log.py export --db data/serial_recall.sqlite --out-dir data
+#   python sqlite_log.py query --db data/serial_recall.sqlite --participant P007 --condition chunking_words
+import os
+import csv
+import json
+import time
+import atexit
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+from experiment_config import LOG_DIR, LOG_FILE, STIMULUS_TIMING_FILE, SQLITE_FILE
+
+# Columns of serial_recall_log.csv, in protocol.build_log_row order
+TRIAL_COLUMNS = ["timestamp_utc", "participant", "condition", "is_words", "trial_index_in_block", "target_length",
+                 "target", "response", "prop_correct", "n_correct", "all_or_nothing", "pos_correct",
+                 "item_on_ms", "isi_blank_ms", "retention_ms", "iti_ms", "taps",
+                 "onset_error_mean_ms", "onset_error_max_ms", "offset_error_mean_ms", "drift_ms"]
+TIMING_FIELDS = ["participant", "condition", "trial_index_in_block", "item",
+                 "intended_onset_ms", "actual_onset_ms", "intended_offset_ms", "actual_offset_ms"]
+# Stored on the trials row as-is (everything but participant, target/response and pos_correct)
+TRIAL_VALUE_COLUMNS = [c for c in TRIAL_COLUMNS if c not in ("participant", "target", "response", "pos_correct")]
+SYNCHRONOUS = {"never": "OFF", "flush": "NORMAL", "always": "FULL"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    participant TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS trials (
+    trial_id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(session_id),
+    timestamp_utc TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    is_words INTEGER NOT NULL,
+    trial_index_in_block INTEGER NOT NULL,
+    target_length INTEGER NOT NULL,
+    response_length INTEGER NOT NULL,
+    prop_correct REAL NOT NULL,
+    n_correct INTEGER NOT NULL,
+    all_or_nothing INTEGER NOT NULL,
+    item_on_ms INTEGER,
+    isi_blank_ms INTEGER,
+    retention_ms INTEGER,
+    iti_ms INTEGER,
+    taps INTEGER,
+    onset_error_mean_ms REAL,
+    onset_error_max_ms REAL,
+    offset_error_mean_ms REAL,
+    drift_ms REAL
+);
+CREATE INDEX IF NOT EXISTS trials_session ON trials(session_id, condition, trial_index_in_block);
+CREATE INDEX IF NOT EXISTS trials_condition ON trials(condition);
+CREATE INDEX IF NOT EXISTS trials_timestamp ON trials(timestamp_utc);
+CREATE TABLE IF NOT EXISTS responses (
+    trial_id INTEGER NOT NULL REFERENCES trials(trial_id),
+    position INTEGER NOT NULL,
+    target TEXT,
+    response TEXT,
+    correct INTEGER,
+    PRIMARY KEY (trial_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS item_timing (
+    trial_id INTEGER NOT NULL REFERENCES trials(trial_id),
+    item INTEGER NOT NULL,
+    intended_onset_ms INTEGER,
+    actual_onset_ms REAL,
+    intended_offset_ms INTEGER,
+    actual_offset_ms REAL,
+    PRIMARY KEY (trial_id, item)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _blank_to_none(value):
+    return None if value == "" else value
+
+
+def _split_items(packed):
+    """'|A||B||C|' (the CSV layout) -> ['A', 'B', 'C']"""
+    return packed[1:-1].split("||") if len(packed) >= 2 else []
+
+
+class SQLiteLogger:
+    """Row logger (same interface as BufferedCSVLogger) writing to one SQLite database.
+
+    append_row() ignores its path: trial rows and per-item timing rows are told
+    apart by their columns. Pending rows are written in one transaction when
+    `flush_rows` are pending, after `flush_interval_s`, and on flush()/close().
+    """
+
+    def __init__(self, db_path, flush_rows=20, flush_interval_s=2.0, fsync="flush"):
+        if fsync not in SYNCHRONOUS:
+            raise ValueError(f"fsync must be one of {tuple(SYNCHRONOUS)}")
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.flush_rows = 1 if fsync == "always" else flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.conn = connect(db_path)
+        self.conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[fsync]}")
+        self._pending: List[Dict[str, Any]] = []
+        self._sessions: Dict[str, int] = {}
+        self._trial_ids: Dict[tuple, int] = {}  # (participant, condition, trial index) -> trial_id, for timing rows
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._timer = None
+        atexit.register(self.close)
+
+    def append_row(self, filepath: str, row: Dict[str, Any]):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLiteLogger is closed")
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval_s > 0:
+                self._timer = threading.Thread(target=self._flush_loop, daemon=True)
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self.conn.close()
+            self._closed = True
+        self._stop.set()
+        atexit.unregister(self.close)
+
+    def _session_id(self, participant):
+        session_id = self._sessions.get(participant)
+        if session_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO sessions (participant) VALUES (?)", (participant,))
+            session_id = self.conn.execute("SELECT session_id FROM sessions WHERE participant = ?",
+                                           (participant,)).fetchone()[0]
+            self._sessions[participant] = session_id
+        return session_id
+
+    def _insert_trial(self, row):
+        participant = row["participant"] or ""
+        target, response = _split_items(row["target"]), _split_items(row["response"])
+        values = [_blank_to_none(row.get(c, "")) for c in TRIAL_VALUE_COLUMNS]
+        cur = self.conn.execute(
+            f"INSERT INTO trials (session_id, response_length, {', '.join(TRIAL_VALUE_COLUMNS)}) "
+            f"VALUES (?, ?{', ?' * len(TRIAL_VALUE_COLUMNS)})",
+            [self._session_id(participant), len(response)] + values)
+        trial_id = cur.lastrowid
+        correct = json.loads(row["pos_correct"])
+        length = max(len(target), len(response))
+        self.conn.executemany("INSERT INTO responses VALUES (?, ?, ?, ?, ?)", [
+            (trial_id, i, target[i] if i < len(target) else None, response[i] if i < len(response) else None,
+             correct[i] if i < len(correct) else None)
+            for i in range(length)
+        ])
+        self._trial_ids[(participant, row["condition"], int(row["trial_index_in_block"]))] = trial_id
+
+    def _insert_timing(self, rows):
+        values = []
+        for row in rows:
+            key = (row["participant"] or "", row["condition"], int(row["trial_index_in_block"]))
+            trial_id = self._trial_ids.get(key)
+            if trial_id is None:
+                found = self.conn.execute(
+                    "SELECT MAX(t.trial_id) FROM trials t JOIN sessions s USING (session_id) "
+                    "WHERE s.participant = ? AND t.condition = ? AND t.trial_index_in_block = ?", key).fetchone()
+                if found[0] is None:
+                    raise ValueError(f"Timing row for unknown trial {key}")
+                trial_id = self._trial_ids[key] = found[0]
+            values.append((trial_id, row["item"], row["intended_onset_ms"], row["actual_onset_ms"],
+                           row["intended_offset_ms"], row["actual_offset_ms"]))
+        self.conn.executemany("INSERT INTO item_timing VALUES (?, ?, ?, ?, ?, ?)", values)
+
+    def _flush_locked(self):
+        if self._pending:
+            with self.conn:  # one transaction per batch
+                timing = []
+                for row in self._pending:
+                    if "intended_onset_ms" in row:
+                        timing.append(row)
+                    else:
+                        self._insert_trial(row)
+                if timing:
+                    self._insert_timing(timing)
+            self._pending.clear()
+            if len(self._trial_ids) > 10000:  # cache only; misses are looked up in the trials index
+                self._trial_ids.clear()
+        self._last_flush = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval_s):
+            with self._lock:
+                if self._closed:
+                    return
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._flush_locked()
+
+
+def _fmt(value):
+    return "" if value is None else value
+
+
+def export_csv(db_path, out_dir):
+    """Write serial_recall_log.csv and the stimulus timing CSV from a database; returns their paths.
+    SQLite does not keep the sign of zero, so a logged -0.0 comes back as 0.0."""
+    conn = connect(db_path)
+    os.makedirs(out_dir, exist_ok=True)
+    log_path = os.path.join(out_dir, LOG_FILE)
+    timing_path = os.path.join(out_dir, STIMULUS_TIMING_FILE)
+    items: Dict[int, List[tuple]] = {}
+    for trial_id, target, response, correct in conn.execute(
+            "SELECT trial_id, target, response, correct FROM responses ORDER BY trial_id, position"):
+        items.setdefault(trial_id, []).append((target, response, correct))
+    with open(log_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TRIAL_COLUMNS)
+        query = (f"SELECT t.trial_id, s.participant, t.response_length, "
+                 f"{', '.join('t.' + c for c in TRIAL_VALUE_COLUMNS)} "
+                 f"FROM trials t JOIN sessions s USING (session_id) ORDER BY t.trial_id")
+        for trial_id, participant, response_length, *values in conn.execute(query):
+            row = dict(zip(TRIAL_VALUE_COLUMNS, values), participant=participant)
+            positions = items.get(trial_id, [])
+            row["target"] = "|" + "||".join(t for t, _, _ in positions[:row["target_length"]]) + "|"
+            row["response"] = "|" + "||".join(r for _, r, _ in positions[:response_length]) + "|"
+            row["pos_correct"] = json.dumps([c for _, _, c in positions if c is not None])
+            writer.writerow([_fmt(row[c]) for c in TRIAL_COLUMNS])
+    with open(timing_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TIMING_FIELDS)
+        writer.writerows(conn.execute(
+            "SELECT s.participant, t.condition, t.trial_index_in_block, i.item, i.intended_onset_ms, "
+            "i.actual_onset_ms, i.intended_offset_ms, i.actual_offset_ms "
+            "FROM item_timing i JOIN trials t USING (trial_id) JOIN sessions s USING (session_id) "
+            "ORDER BY i.trial_id, i.item"))
+    conn.close()
+    return log_path, timing_path
+
+
+def query_trials(db_path, participant: Optional[str] = None, condition: Optional[str] = None):
+    """Trials matching the filters (served by the indexes), as dicts with a `correct` list per position."""
+    conn = connect(db_path)
+    where, params = [], []
+    if participant is not None:
+        where.append("s.participant = ?")
+        params.append(participant)
+    if condition is not None:
+        where.append("t.condition = ?")
+        params.append(condition)
+    sql = ("SELECT t.trial_id, s.participant, t.condition, t.trial_index_in_block, t.n_correct, t.prop_correct, "
+           "t.timestamp_utc FROM trials t JOIN sessions s USING (session_id)"
+           + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY t.trial_id")
+    columns = ["trial_id", "participant", "condition", "trial_index_in_block", "n_correct", "prop_correct",
+               "timestamp_utc"]
+    trials = [dict(zip(columns, r)) for r in conn.execute(sql, params)]
+    conn.close()
+    return trials
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or query the SQLite trial log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write the CSV layouts from the database")
+    export.add_argument("--db", default=os.path.join(LOG_DIR, SQLITE_FILE))
+    export.add_argument("--out-dir", default=LOG_DIR)
+    query = sub.add_parser("query", help="list matching trials")
+    query.add_argument("--db", default=os.path.join(LOG_DIR, SQLITE_FILE))
+    query.add_argument("--participant", default=None)
+    query.add_argument("--condition", default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for path in export_csv(args.db, args.out_dir):
+            print(f"Wrote {path}")
+        return
+    trials = query_trials(args.db, args.participant, args.condition)
+    for t in trials:
+        print(f"{t['participant']:>8} {t['condition']:<26} {t['trial_index_in_block']:3d} "
+              f"{t['n_correct']:3d} {t['prop_correct']:.2f}")
+    if trials:
+        mean = sum(t["prop_correct"] for t in trials) / len(trials)
+        print(f"{len(trials)} trials, mean proportion correct {mean:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Cold-start benchmark for run_experiment.py: process start to the first frame of the welcome screen
+#
+# Every run starts a fresh interpreter (in a scratch directory, so no data files
+# are touched) that imports run_experiment, builds SerialRecallApp on a new Tk
+# root and forces the first frame with update(). Phases, from just before spawn:
+#   interpreter  until the child's first line runs
+#   imports      run_experiment and everything it pulls in
+#   first frame  tk.Tk(), SerialRecallApp() (welcome screen) and update()
+#   total        spawn to first frame
+# Without a display only the import phases are measured. Medians are appended to
+# data/startup_history.csv so startup can be tracked across commits; --budget-ms
+# exits with status 1 when the median total is over budget:
+#   python startup_bench.py --runs 10
+#   python startup_bench.py --profile            # slowest imports (-X importtime)
+#   python startup_bench.py --budget-ms 300
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from experiment_config import LOG_DIR
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = os.path.join(LOG_DIR, "startup_history.csv")
+HISTORY_HEADER = ["timestamp", "commit", "python", "runs", "display",
+                  "interpreter_ms", "imports_ms", "first_frame_ms", "total_ms"]
+PHASES = ["interpreter_ms", "imports_ms", "first_frame_ms", "total_ms"]
+
+CHILD = """
+import json, sys, time
+t0 = time.time()
+sys.path.insert(0, {here!r})
+import run_experiment
+t1 = time.time()
+result = {{"t0": t0, "t1": t1}}
+try:
+    root = run_experiment.tk.Tk()
+except Exception as e:  # tkinter.TclError without a display
+    result["error"] = str(e).splitlines()[0]
+else:
+    app = run_experiment.SerialRecallApp(root)
+    root.update()
+    result["t2"] = time.time()
+    app.row_logger.close()
+    root.destroy()
+print(json.dumps(result))
+"""
+
+
+def run_once(extra_args=None):
+    """One cold start; returns (phase -> ms, the child's stderr)."""
+    with tempfile.TemporaryDirectory(prefix="serial_recall_startup_") as cwd:
+        start = time.time()
+        proc = subprocess.run([sys.executable] + (extra_args or []) + ["-c", CHILD.format(here=HERE)],
+                              cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{proc.stderr}")
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    phases = {"interpreter_ms": (child["t0"] - start) * 1000, "imports_ms": (child["t1"] - child["t0"]) * 1000}
+    if "t2" in child:
+        phases["first_frame_ms"] = (child["t2"] - child["t1"]) * 1000
+        phases["total_ms"] = (child["t2"] - start) * 1000
+    else:
+        phases["error"] = child["error"]
+        phases["total_ms"] = (child["t1"] - start) * 1000
+    return phases, proc.stderr
+
+
+def import_profile(top=15):
+    """(module, self us, cumulative us) of the `top` slowest imports of one cold start."""
+    _, stderr = run_once(["-X", "importtime"])
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    rows.sort(key=lambda r: -r[1])
+    return rows[:top]
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def last_history(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return rows[-1] if rows else None
+
+
+def append_history(path, runs, display, medians):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(HISTORY_HEADER)
+        writer.writerow([datetime.utcnow().isoformat(timespec="seconds"), git_commit(), platform.python_version(),
+                         runs, int(display)] + [f"{medians[p]:.1f}" if p in medians else "" for p in PHASES])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the serial recall app.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--profile", action="store_true", help="list the slowest imports of one cold start")
+    parser.add_argument("--top", type=int, default=15, help="with --profile: how many modules to list")
+    parser.add_argument("--history", default=HISTORY_FILE, help="CSV the medians are appended to ('' to skip)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit with status 1 above this median total")
+    args = parser.parse_args()
+
+    if args.profile:
+        print(f"{'self ms':>8} {'cumul ms':>9}  module")
+        for name, self_us, cumulative_us in import_profile(args.top):
+            print(f"{self_us / 1000:8.2f} {cumulative_us / 1000:9.2f}  {name}")
+        return
+
+    run_once()  # warm the file cache and bytecode first
+    results = [run_once()[0] for _ in range(args.runs)]
+    display = "error" not in results[0]
+    if not display:
+        print(f"No display ({results[0]['error']}); measuring imports only")
+    medians = {}
+    for phase in PHASES:
+        values = [r[phase] for r in results if phase in r]
+        if values:
+            medians[phase] = statistics.median(values)
+            print(f"  {phase[:-3]:12s} median {medians[phase]:7.1f} ms   "
+                  f"(min {min(values):.1f}, range {max(values) - min(values):.1f})")
+
+    if args.history:
+        previous = last_history(args.history)
+        if previous and previous.get("total_ms") and previous.get("display") == str(int(display)):
+            print(f"  vs {previous['timestamp']} ({previous['commit'] or 'no commit'}): "
+                  f"{medians['total_ms'] - float(previous['total_ms']):+.1f} ms total")
+        append_history(args.history, args.runs, display, medians)
+    if args.budget_ms is not None and medians["total_ms"] > args.budget_ms:
+        print(f"Cold start {medians['total_ms']:.1f} ms exceeds the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,35 +32,105 @@ THREE_LETTER_WORDS = [
     "ARM","ANT","FOX","OWL","BAG","CAP","HEN","PIG","RAT","JAM",
 ]
 
-def sample_letters(n, avoid_immediate_repeat=True):
+def sample_letters(n, avoid_immediate_repeat=True, rng=random):
     seq = []
-    pool = CONSONANTS.copy()
+    pool = CONSONANTS
     for i in range(n):
-        choices = pool
-        if avoid_immediate_repeat and seq:
-            choices = [c for c in pool if c != seq[-1]]
-        seq.append(random.choice(choices))
+        c = rng.choice(pool)
+        # Redrawing on a repeat is uniform over the other letters, without
+        # rebuilding the filtered pool for every item
+        while avoid_immediate_repeat and seq and c == seq[-1]:
+            c = rng.choice(pool)
+        seq.append(c)
     return seq
 
-def sample_from_clusters(n, clusters):
-    # Combine clusters into a flat pool, but ensure each trial tends to include cluster members
-    # Strategy: select a cluster or two, sample more heavily from them, fill with other consonants
-    seq = []
-    chosen = random.sample(clusters, k=min(2, len(clusters)))
+# Share of items drawn from the chosen clusters in an error-types list (rounded per list)
+CLUSTER_SHARE = 0.6
+CLUSTER_SETS = [PHONO_CLUSTERS, VISUAL_CLUSTERS]
+CLUSTERS_PER_LIST = 2
+
+def _cluster_pools(chosen, clusters):
+    # Chosen clusters' letters, and the consonants outside every cluster of the set
     heavy_pool = [c for cl in chosen for c in cl]
-    base_pool = list(set([c for cl in clusters for c in cl]))
+    base_pool = {c for cl in clusters for c in cl}
     others = [c for c in CONSONANTS if c not in base_pool]
-    while len(seq) < n:
-        if random.random() < 0.6:
-            seq.append(random.choice(heavy_pool))
-        else:
-            seq.append(random.choice(others))
-        if len(seq) >= 2 and seq[-1] == seq[-2]:
-            seq[-1] = random.choice(CONSONANTS)
+    return heavy_pool, others
+
+def sample_from_clusters(n, clusters, rng=random, share=CLUSTER_SHARE):
+    # Pick a couple of clusters; exactly round(share * n) positions (chosen at random)
+    # come from them and the rest from consonants outside all clusters. Each item is
+    # redrawn within its own pool on an immediate repeat, so the share always holds
+    chosen = rng.sample(clusters, k=min(CLUSTERS_PER_LIST, len(clusters)))
+    heavy_pool, others = _cluster_pools(chosen, clusters)
+    heavy = set(rng.sample(range(n), k=round(share * n)))
+    seq = []
+    for i in range(n):
+        pool = heavy_pool if i in heavy else others
+        c = rng.choice(pool)
+        while seq and c == seq[-1]:
+            c = rng.choice(pool)
+        seq.append(c)
     return seq
 
-def sample_words(n, words=THREE_LETTER_WORDS):
-    return random.sample(words, k=n)  # unique words per trial
+def sample_cluster_lists(n_lists, n, rng, cluster_sets=CLUSTER_SETS, share=CLUSTER_SHARE):
+    """Batched sample_from_clusters for stimulus banks: n_lists lists of length n
+    drawn with a numpy Generator in one pass per position.
+
+    Constraints hold exactly for every list: no immediate repeats, round(share * n)
+    cluster items, and the cluster sets are used equally often (to within one list,
+    in random order). Returns (items, set_index): alphabet indices (0 = 'A') as an
+    int8 array of shape (n_lists, n), and which of cluster_sets each list used.
+    """
+    import numpy as np
+
+    n_sets = len(cluster_sets)
+    set_index = rng.permutation(np.arange(n_lists) % n_sets).astype(np.int8)
+    n_heavy = round(share * n)
+    # Heavy positions: the n_heavy smallest of random keys per list
+    heavy = np.zeros((n_lists, n), dtype=bool)
+    if n_heavy:
+        np.put_along_axis(heavy, np.argsort(rng.random((n_lists, n)), axis=1)[:, :n_heavy], True, axis=1)
+
+    # Per list, both pools padded into one table: pools[list, kind, slot] (kind 0 others, 1 heavy),
+    # with sizes[list, kind] and slot_of[list, kind, letter] (-1 if the letter is not in the pool)
+    width = max(len(CONSONANTS), max(sum(sorted(map(len, cs))[-CLUSTERS_PER_LIST:]) for cs in cluster_sets))
+    pools = np.zeros((n_lists, 2, width), dtype=np.int8)
+    sizes = np.zeros((n_lists, 2), dtype=np.int64)
+    slot_of = np.full((n_lists, 2, 26), -1, dtype=np.int64)
+    for s, clusters in enumerate(cluster_sets):
+        rows = np.nonzero(set_index == s)[0]
+        k = min(CLUSTERS_PER_LIST, len(clusters))
+        picks = np.argsort(rng.random((len(rows), len(clusters))), axis=1)[:, :k]
+        # Each distinct cluster combination gets its pools built once
+        combos, inverse = np.unique(np.sort(picks, axis=1), axis=0, return_inverse=True)
+        for c, combo in enumerate(combos):
+            heavy_pool, others = _cluster_pools([clusters[i] for i in combo], clusters)
+            members = rows[inverse.reshape(-1) == c]
+            for kind, pool in enumerate((others, heavy_pool)):
+                letters = [ord(ch) - ord("A") for ch in pool]
+                pools[members, kind, :len(letters)] = letters
+                sizes[members, kind] = len(letters)
+                slot_of[members[:, None], kind, letters] = np.arange(len(letters))
+
+    # Position by position: uniform over the pool, skipping the previous letter's slot
+    items = np.empty((n_lists, n), dtype=np.int8)
+    all_rows = np.arange(n_lists)
+    prev_letter = None
+    for j in range(n):
+        kind = heavy[:, j].astype(np.int64)
+        size = sizes[all_rows, kind]
+        if prev_letter is None:
+            slot = (rng.random(n_lists) * size).astype(np.int64)
+        else:
+            prev_slot = slot_of[all_rows, kind, prev_letter]
+            excluded = prev_slot >= 0
+            slot = (rng.random(n_lists) * (size - excluded)).astype(np.int64)
+            slot += excluded & (slot >= prev_slot)
+        prev_letter = items[:, j] = pools[all_rows, kind, slot]
+    return items, set_index
+
+def sample_words(n, words=THREE_LETTER_WORDS, rng=random):
+    return rng.sample(words, k=n)  # unique words per trial
 
 def stringify(seq):
     if all(len(x) == 1 for x in seq):
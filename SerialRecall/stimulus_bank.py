@@ -0,0 +1,222 @@
+# Precomputed, seeded stimulus banks: every participant's block order and trial lists, built in bulk
+#
+# A bank is a directory with schema.json plus two raw int8 files:
+#   blocks.bin   participants x n_conditions condition codes (block order)
+#   trials.bin   one record per trial, participant-major in block order:
+#                condition code, list length, pool (0 letters, 1 words), then
+#                `width` item indices into that pool (-1 padding)
+# Building uses numpy's Generator (all letter and word lists of the study are
+# drawn in a few vectorized calls); reading uses only the standard library and
+# seeks straight to one participant's records, so a session loads its trials
+# lazily and nothing is generated while stimuli are on screen.
+#   python stimulus_bank.py --participants 200 --seed 7            # -> data/stimulus_bank
+#   python stimulus_bank.py --participants 40 --order random --out /tmp/bank
+#   python stimulus_bank.py --show 3 --out /tmp/bank                # print participant 3's trials
+import os
+import json
+import string
+from array import array
+from typing import Dict, List, Optional
+from experiment_config import Design, LOG_DIR
+from protocol import ALL_CONDITIONS, COND_CHUNKING, COND_ERROR_TYPES
+from stimuli import CONSONANTS, THREE_LETTER_WORDS, sample_cluster_lists
+
+SCHEMA_FILE = "schema.json"
+BLOCKS_FILE = "blocks.bin"
+TRIALS_FILE = "trials.bin"
+FORMAT_VERSION = 1
+DEFAULT_BANK = os.path.join(LOG_DIR, "stimulus_bank")
+PAD = -1
+
+# Item pools; items are stored as indices into these
+LETTERS = list(string.ascii_uppercase)
+POOLS = [LETTERS, THREE_LETTER_WORDS]
+POOL_LETTERS, POOL_WORDS = 0, 1
+RECORD_HEADER = 3  # condition, length, pool
+
+
+def balanced_latin_square(n):
+    """Williams design: every condition appears once per position and directly
+    follows every other condition equally often (2n rows when n is odd)."""
+    first, lo, hi = [0], 1, n - 1
+    while len(first) < n:
+        first.append(lo)
+        lo += 1
+        if len(first) < n:
+            first.append(hi)
+            hi -= 1
+    rows = [[(c + r) % n for c in first] for r in range(n)]
+    if n % 2:
+        rows += [list(reversed(row)) for row in rows]
+    return rows
+
+
+def _letter_lists(rng, n, width):
+    """n lists of consonants (alphabet indices) with no immediate repeats: each
+    position is uniform over the consonants other than the previous one."""
+    import numpy as np
+    consonants = np.array([LETTERS.index(c) for c in CONSONANTS], dtype=np.int8)
+    k = len(consonants)
+    draws = rng.integers(0, k - 1, size=(n, width))
+    draws[:, 0] = rng.integers(0, k, size=n)
+    for j in range(1, width):
+        draws[:, j] += draws[:, j] >= draws[:, j - 1]
+    return consonants[draws]
+
+
+def _word_lists(rng, n, width):
+    """n lists of distinct words (a random permutation prefix per row)."""
+    import numpy as np
+    keys = rng.random((n, len(THREE_LETTER_WORDS)))
+    return np.argsort(keys, axis=1)[:, :width].astype(np.int8)
+
+
+def build_bank(path, participants, seed=0, design: Optional[Design] = None, conditions=None, order="latin"):
+    """Generate every trial of `participants` sessions and write the bank to `path`.
+
+    order: "latin" (balanced Latin square of block orders), "random" (shuffled
+    per participant) or "fixed" (the conditions as given).
+    """
+    import numpy as np
+
+    design = design or Design()
+    conditions = list(conditions or ALL_CONDITIONS)
+    n_cond, per_block = len(conditions), design.trials_per_condition
+    width = max(design.list_lengths)
+    rng = np.random.default_rng(seed)
+
+    if order == "latin":
+        square = balanced_latin_square(n_cond)
+        blocks = np.array([square[p % len(square)] for p in range(participants)], dtype=np.int8)
+    elif order == "random":
+        blocks = np.argsort(rng.random((participants, n_cond)), axis=1).astype(np.int8)
+    elif order == "fixed":
+        blocks = np.tile(np.arange(n_cond, dtype=np.int8), (participants, 1))
+    else:
+        raise ValueError(f"Unknown block order: {order}")
+    blocks = blocks.reshape(participants, n_cond)
+
+    # One row per trial, participant-major in each participant's block order
+    n_trials = participants * n_cond * per_block
+    cond = np.repeat(blocks.reshape(-1), per_block)
+    lengths = rng.choice(np.asarray(design.list_lengths, dtype=np.int8), size=n_trials)
+    is_words = np.array([c == COND_CHUNKING for c in conditions])[cond]
+    items = _letter_lists(rng, n_trials, width)
+    items[is_words] = _word_lists(rng, int(is_words.sum()), width)
+    # Cluster lists (exact cluster share, balanced phonological/visual sets), batched per list length
+    is_clusters = np.array([c == COND_ERROR_TYPES for c in conditions])[cond]
+    for length in np.unique(lengths[is_clusters]):
+        rows = np.nonzero(is_clusters & (lengths == length))[0]
+        items[rows, :length], _ = sample_cluster_lists(len(rows), int(length), rng)
+    items[np.arange(width)[None, :] >= lengths[:, None]] = PAD
+
+    records = np.empty((n_trials, RECORD_HEADER + width), dtype=np.int8)
+    records[:, 0] = cond
+    records[:, 1] = lengths
+    records[:, 2] = np.where(is_words, POOL_WORDS, POOL_LETTERS)
+    records[:, RECORD_HEADER:] = items
+
+    os.makedirs(path, exist_ok=True)
+    blocks.tofile(os.path.join(path, BLOCKS_FILE))
+    records.tofile(os.path.join(path, TRIALS_FILE))
+    schema = {
+        "version": FORMAT_VERSION,
+        "seed": seed,
+        "participants": participants,
+        "conditions": conditions,
+        "trials_per_condition": per_block,
+        "list_lengths": list(design.list_lengths),
+        "width": width,
+        "order": order,
+        "pools": POOLS,
+    }
+    tmp = os.path.join(path, SCHEMA_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1)
+    os.replace(tmp, os.path.join(path, SCHEMA_FILE))
+    return schema
+
+
+class BankedParticipant:
+    """One participant's block order and trial lists, as read from a bank."""
+
+    def __init__(self, index, block_conditions, trials: Dict[str, List[List[str]]]):
+        self.index = index
+        self.block_conditions = block_conditions
+        self.trials = trials
+
+    def target(self, condition, trial_index):
+        """Items of the trial_index-th (1-based) trial of a block."""
+        return list(self.trials[condition][trial_index - 1])
+
+
+class StimulusBank:
+    """Read-only view of a bank directory; participant(i) reads only that participant's records."""
+
+    def __init__(self, path=DEFAULT_BANK):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            self.schema = json.load(f)
+        if self.schema.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} stimulus bank")
+        self.conditions = self.schema["conditions"]
+        self.participants = self.schema["participants"]
+        self.trials_per_condition = self.schema["trials_per_condition"]
+        self.record_size = RECORD_HEADER + self.schema["width"]
+
+    def check_design(self, design: Design):
+        if design.trials_per_condition > self.trials_per_condition:
+            raise ValueError(f"{self.path} holds {self.trials_per_condition} trials per block, "
+                             f"the design asks for {design.trials_per_condition}")
+
+    def participant(self, index) -> BankedParticipant:
+        """Trials of participant `index` (0-based)."""
+        if not 0 <= index < self.participants:
+            raise ValueError(f"{self.path} has stimuli for {self.participants} participants, not #{index + 1}")
+        n_cond = len(self.conditions)
+        blocks = array("b")
+        with open(os.path.join(self.path, BLOCKS_FILE), "rb") as f:
+            f.seek(index * n_cond)
+            blocks.frombytes(f.read(n_cond))
+        per_participant = n_cond * self.trials_per_condition
+        records = array("b")
+        with open(os.path.join(self.path, TRIALS_FILE), "rb") as f:
+            f.seek(index * per_participant * self.record_size)
+            records.frombytes(f.read(per_participant * self.record_size))
+
+        pools = self.schema["pools"]
+        trials: Dict[str, List[List[str]]] = {}
+        for r in range(per_participant):
+            rec = records[r * self.record_size:(r + 1) * self.record_size]
+            condition, length, pool = rec[0], rec[1], rec[2]
+            items = [pools[pool][i] for i in rec[RECORD_HEADER:RECORD_HEADER + length]]
+            trials.setdefault(self.conditions[condition], []).append(items)
+        return BankedParticipant(index, [self.conditions[c] for c in blocks], trials)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect a seeded stimulus bank for a whole study.")
+    parser.add_argument("--participants", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--order", choices=["latin", "random", "fixed"], default="latin",
+                        help="block order across participants (default: balanced Latin square)")
+    parser.add_argument("--out", default=DEFAULT_BANK)
+    parser.add_argument("--show", type=int, default=None, help="print this participant's trials (1-based) instead")
+    args = parser.parse_args()
+
+    if args.show is not None:
+        banked = StimulusBank(args.out).participant(args.show - 1)
+        for condition in banked.block_conditions:
+            print(condition)
+            for i, items in enumerate(banked.trials[condition], 1):
+                print(f"  {i:2d}: {' '.join(items)}")
+        return
+    schema = build_bank(args.out, args.participants, args.seed, order=args.order)
+    n = schema["participants"] * len(schema["conditions"]) * schema["trials_per_condition"]
+    print(f"Wrote {n} trials for {schema['participants']} participants to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Stress test for participant_manager: many processes allocate participant IDs at the same moment
+#
+# Every worker waits on a shared barrier, then allocates single IDs and blocks
+# (ParticipantIdPool) as fast as it can against one participants file. The run
+# fails (exit status 1) unless every ID was handed out exactly once, the IDs
+# are 1..N without gaps other than unused pool leftovers, and the file and its
+# log agree with the highest ID:
+#   python stress_participant_ids.py
+#   python stress_participant_ids.py --processes 64 --allocations 200 --block 5
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from participant_manager import allocate_participant_id, allocate_participant_ids, ParticipantIdPool
+
+
+def _worker(path, allocations, block, barrier, results):
+    barrier.wait()
+    ids = []
+    pool = ParticipantIdPool(block, path)
+    for i in range(allocations):
+        if i % 3 == 0:
+            ids.append(allocate_participant_id(path))
+        elif i % 3 == 1:
+            ids.append(pool.next())
+        else:
+            ids.extend(allocate_participant_ids(2, path))
+    reserved = list(pool._ids)  # reserved by the pool but never handed out
+    results.put((ids, reserved))
+
+
+def run_stress(processes, allocations, block, path):
+    barrier = multiprocessing.Barrier(processes)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker, args=(path, allocations, block, barrier, results))
+               for _ in range(processes)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    handed_out, unused = [], []
+    for _ in workers:
+        ids, reserved = results.get()
+        handed_out.extend(ids)
+        unused.extend(reserved)
+    for w in workers:
+        w.join()
+    wall_s = time.perf_counter() - t0
+
+    problems = []
+    duplicates = len(handed_out) - len(set(handed_out))
+    if duplicates:
+        problems.append(f"{duplicates} IDs handed out more than once")
+    everything = sorted(handed_out + unused)
+    if everything != list(range(1, len(everything) + 1)):
+        problems.append("allocated IDs are not exactly 1..N")
+    with open(path, "r", encoding="utf-8") as f:
+        last_id = json.load(f)["last_id"]
+    if last_id != len(everything):
+        problems.append(f"last_id is {last_id}, expected {len(everything)}")
+    return {"ids": len(handed_out), "unused": len(unused), "last_id": last_id, "wall_s": wall_s,
+            "problems": problems}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocate participant IDs from many processes at once.")
+    parser.add_argument("--processes", type=int, default=32)
+    parser.add_argument("--allocations", type=int, default=100, help="allocation calls per process")
+    parser.add_argument("--block", type=int, default=4, help="ParticipantIdPool block size")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="participant_ids_"), "participants.json")
+    r = run_stress(args.processes, args.allocations, args.block, path)
+    print(f"{args.processes} processes: {r['ids']} IDs handed out ({r['unused']} left unused in pools), "
+          f"last_id {r['last_id']}, {r['ids'] / r['wall_s']:,.0f} IDs/s")
+    for problem in r["problems"]:
+        print(f"FAIL {problem}")
+    if r["problems"]:
+        sys.exit(1)
+    print("ok: every ID handed out exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,20 @@
 # Core GUI tasks (tkinter) for serial recall with per-position input boxes
 import tkinter as tk
 from tkinter import messagebox
-import random
-from typing import List, Dict, Any
-from experiment_config import Timing, Design, TAP_KEY, WINDOW_TITLE, FONT_FAMILY, FONT_SIZE, INSTRUCTION_FONT_SIZE, LOG_DIR, LOG_FILE
-from stimuli import sample_letters, sample_from_clusters, sample_words, score_serial_recall, PHONO_CLUSTERS, VISUAL_CLUSTERS
-from logger import append_row_csv, timestamp
-from participant_manager import load_next_participant_id, save_participant_id
+from typing import List
+from experiment_config import Timing, Design, Logging, TAP_KEY, WINDOW_TITLE, FONT_FAMILY, FONT_SIZE, INSTRUCTION_FONT_SIZE, LOG_DIR, LOG_FILE, COLUMNAR_STORE, STIMULUS_TIMING_FILE, KEYSTROKE_FILE, JOURNAL_FILE
+from logger import make_row_logger
+from columnar import TrialStore
+from keystrokes import KeystrokeRecorder
+from participant_manager import allocate_participant_id
+from protocol import SerialRecallProtocol
+from stimulus_bank import StimulusBank
+from journal import SessionJournal, SessionRecorder, resume as resume_session
+import session as sess
 import os
-import json
+import string
 import traceback
 
-# Conditions
-COND_BASELINE = "baseline_letters"
-COND_ERROR_TYPES = "error_types_letters"
-COND_CHUNKING = "chunking_words"
-COND_SUPPRESSION = "articulatory_suppression"
-COND_TAPPING = "finger_tapping"
-
-# ALL_CONDITIONS = [COND_BASELINE, COND_ERROR_TYPES, COND_CHUNKING, COND_SUPPRESSION, COND_TAPPING]
-ALL_CONDITIONS = [COND_BASELINE, COND_CHUNKING, COND_SUPPRESSION, COND_TAPPING]
-
 def safe_call(func, *args, **kwargs):
     try:
         return func(*args, **kwargs)
@@ -34,6 +28,7 @@ class SerialRecallApp:
     def __init__(self, root):
         self.root = root
         self.root.title(WINDOW_TITLE)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.canvas = tk.Canvas(root, width=1200, height=800, bg="white", highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
 
@@ -62,18 +57,28 @@ class SerialRecallApp:
         # Participant and logging
         self.participant_id = None
         self.log_path = os.path.join(LOG_DIR, LOG_FILE)
-
-        # State
-        self.current_condition = None
-        self.trial_index = 0
-        self.block_conditions = ALL_CONDITIONS.copy()
-        if self.design.randomize_block_order:
-            random.shuffle(self.block_conditions)
-        self.block_trials_remaining = self.design.trials_per_condition
+        log_options = Logging()
+        self.row_logger = make_row_logger(log_options)
+        self.trial_store = None
+        if log_options.columnar:
+            self.trial_store = TrialStore(os.path.join(LOG_DIR, COLUMNAR_STORE), max(Design.list_lengths))
+        self.keystrokes = KeystrokeRecorder() if log_options.keystrokes else None
+
+        # State: block order, stimuli and scoring live in the protocol; the session
+        # engine runs the trial phases on the Tk clock and this class renders its events
+        self.protocol = SerialRecallProtocol(self.timing, self.design)
+        self.session = sess.SerialRecallSession(self.root, self.protocol, self.row_logger, self.log_path, self.trial_store,
+                                                timing_path=os.path.join(LOG_DIR, STIMULUS_TIMING_FILE))
+        self.session.subscribe(lambda event, data: safe_call(self._on_session_event, event, data))
+        # Journal of block/trial progress, so a crashed session can pick up where it stopped
+        self.journal = None
+        self.recorder = None
+        if log_options.journal:
+            self.journal = SessionJournal(os.path.join(LOG_DIR, JOURNAL_FILE), log_options.fsync)
+            self.recorder = SessionRecorder(self.session, self.journal)
+        self.block_name = ""
         self.current_target: List[str] = []
         self.current_is_words = False
-        self.tap_count = 0
-        self.tapping_active = False
 
         # Global key bindings
         self.root.bind_all("<Return>", lambda e: safe_call(self._on_submit_or_continue, e))
@@ -90,11 +95,75 @@ class SerialRecallApp:
         self._show_continue_button(self.start_without_prompt)
 
     def start_without_prompt(self):
-        # Auto increment participant id without prompt
-        pid = load_next_participant_id()
+        pending = self._pending_session()
+        if pending is not None:
+            self._resume(pending)
+            return
+        # Auto increment participant id without prompt (reserved atomically, so stations never share one)
+        pid = allocate_participant_id()
         self.participant_id = f"P{pid:03d}"
-        save_participant_id(pid)
-        self.start_next_block()
+        self.protocol.participant_id = self.participant_id
+        if self.design.stimulus_bank:
+            # Participant N gets the bank's N-th trial lists, read only now
+            bank = StimulusBank(self.design.stimulus_bank)
+            bank.check_design(self.design)
+            self.protocol.use_stimuli(bank.participant(pid - 1))
+        self.session.begin()
+
+    def _pending_session(self):
+        # The most recent unfinished session in the journal, if the experimenter wants it resumed
+        if self.journal is None:
+            return None
+        pending = self.journal.pending()
+        if pending:
+            state = list(pending.values())[-1]
+            where = f"{state.get('condition', '').replace('_', ' ')} block after trial {state.get('trial_index', 0)}"
+            if messagebox.askyesno("Resume session",
+                                   f"Participant {state['participant']} stopped in the {where}.\nResume that session?"):
+                return state
+        self.journal.reset()
+        return None
+
+    def _resume(self, state):
+        # Same participant ID and bank slot; the interrupted trial is run again
+        self.participant_id = state["participant"]
+        if self.design.stimulus_bank and state.get("bank_index") is not None:
+            bank = StimulusBank(self.design.stimulus_bank)
+            bank.check_design(self.design)
+            self.protocol.use_stimuli(bank.participant(state["bank_index"]))
+        resume_session(self.session, state, self.recorder)
+
+    def _on_session_event(self, event, data):
+        if event == "state":
+            handler = {
+                sess.BLOCK_INTRO: self.show_block_intro,
+                sess.PRESENT: self.present_sequence,
+                sess.RETENTION: self.begin_retention,
+                sess.RESPONSE: self.prompt_response,
+                sess.FEEDBACK: lambda: self._show_continue_button(self.session.proceed),
+                sess.DONE: self.end_experiment,
+            }.get(data["new"])
+            if handler is not None:
+                handler()
+        elif event == "block":
+            self.block_name = data["condition"].replace("_", " ").title()
+        elif event == "trial":
+            self.current_target = data["plan"].target
+            self.current_is_words = data["plan"].is_words
+        elif event == "item":
+            self.label.config(text=data["item"])
+            self.root.update_idletasks()
+        elif event == "item_off":
+            self.label.config(text="")
+            self.root.update_idletasks()
+        elif event == "tap_wait":
+            self.instr.config(text="No taps detected yet — press SPACE to continue")
+        elif event == "result":
+            if self.keystrokes is not None:
+                row = data["row"]
+                self.keystrokes.append_to(os.path.join(LOG_DIR, KEYSTROKE_FILE),
+                                          f"{row['participant']}|{row['condition']}|{row['trial_index_in_block']}")
+            self.show_feedback(data["score"])
 
     def _show_continue_button(self, callback):
         self.pending_callback = callback
@@ -124,125 +193,55 @@ class SerialRecallApp:
         if not self.box_mode_active:
             self._trigger_pending_callback()
 
+    def _on_close(self):
+        self.session.cancel()
+        self.row_logger.close()
+        if self.trial_store is not None:
+            self.trial_store.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.root.destroy()
+
     def _on_tap(self, event):
-        if self.tapping_active:
-            self.tap_count += 1
+        self.session.tap()
 
-    def start_next_block(self):
-        if not self.block_conditions:
-            self.end_experiment()
-            return
-        self.current_condition = self.block_conditions.pop(0)
-        self.block_trials_remaining = self.design.trials_per_condition
-        self.trial_index = 0
-        block_name = self.current_condition.replace("_", " ").title()
+    def show_block_intro(self):
         self._destroy_response_boxes()
-        self.label.config(text=f"Starting block:\n{block_name}")
+        self.label.config(text=f"Starting block:\n{self.block_name}")
         self.instr.config(text="Press ENTER, click, or button to continue")
-        self._show_continue_button(self.start_trial)
+        self._show_continue_button(self.session.proceed)
 
     def end_experiment(self):
+        self.row_logger.flush()
+        if self.trial_store is not None:
+            self.trial_store.flush()
         self._destroy_response_boxes()
         self.label.config(text="All blocks complete! 🎉", font=(FONT_FAMILY, 36))
         self.instr.config(text="You may close the window.")
 
-    # Trial flow
-    def start_trial(self):
-        if self.block_trials_remaining <= 0:
-            self.start_next_block()
-            return
-        self.trial_index += 1
-        self.block_trials_remaining -= 1
-
-        # Decide list length
-        L = random.choice(self.design.list_lengths)
-
-        # Build target sequence depending on condition
-        cond = self.current_condition
-        self.current_is_words = (cond == COND_CHUNKING)
-
-        if cond == COND_BASELINE:
-            target = sample_letters(L)
-            retention_task = "none"
-        elif cond == COND_ERROR_TYPES:
-            if random.random() < 0.5:
-                target = sample_from_clusters(L, PHONO_CLUSTERS)
-            else:
-                target = sample_from_clusters(L, VISUAL_CLUSTERS)
-            retention_task = "none"
-        elif cond == COND_CHUNKING:
-            target = sample_words(L)
-            retention_task = "none"
-        elif cond == COND_SUPPRESSION:
-            target = sample_letters(L)
-            retention_task = "articulatory_suppression"
-        elif cond == COND_TAPPING:
-            target = sample_letters(L)
-            retention_task = "finger_tapping"
-        else:
-            target = sample_letters(L)
-            retention_task = "none"
-
-        self.current_target = target
-        self.tap_count = 0
-        self.tapping_active = False
-
-        # Present sequence (no fixation '+')
-        self.present_sequence(target, retention_task)
-
-    def present_sequence(self, target: List[str], retention_task: str):
+    # Trial flow (timing runs in the session engine)
+    def present_sequence(self):
+        # Items follow as "item"/"item_off" events (no fixation '+')
         self._destroy_response_boxes()
         self._hide_continue_button()
         self.instr.config(text="")
         self.label.config(text="")
         self.root.update_idletasks()
-        # brief blank pause for consistency
-        self.root.after(500, lambda: self._present_items(target, retention_task, 0))
-
-    def _present_items(self, target: List[str], retention_task: str, idx: int):
-        if idx >= len(target):
-            self.begin_retention(retention_task)
-            return
-        item = target[idx]
-        self.label.config(text=item)
-        self.root.update_idletasks()
-        self.root.after(self.timing.item_on_ms, lambda: self._blank_then_next(target, retention_task, idx))
 
-    def _blank_then_next(self, target: List[str], retention_task: str, idx: int):
-        self.label.config(text="")
-        self.root.update_idletasks()
-        self.root.after(self.timing.isi_blank_ms, lambda: self._present_items(target, retention_task, idx+1))
-
-    def begin_retention(self, retention_task: str):
-        # Default duration
-        duration_ms = self.timing.retention_ms
+    def begin_retention(self):
+        retention_task = self.session.plan.retention_task
         if retention_task == "articulatory_suppression":
-            duration_ms = 10000
             self.label.config(text="Repeat \"tah-dah\" silently", font=(FONT_FAMILY, 30))
             self.instr.config(text="Keep repeating until the response screen appears")
-            self.tapping_active = False
-            self.root.after(duration_ms, self.prompt_response)
         elif retention_task == "finger_tapping":
-            duration_ms = 10000
             self.label.config(text="Tap SPACE repeatedly", font=(FONT_FAMILY, 30))
             self.instr.config(text="Keep tapping; we'll continue after you've tapped at least once")
-            self.tapping_active = True
-            def check_end():
-                if self.tap_count > 0:
-                    self.prompt_response()
-                else:
-                    self.instr.config(text="No taps detected yet — press SPACE to continue")
-                    self.root.after(500, check_end)
-            self.root.after(duration_ms, check_end)
         else:
             self.label.config(text="", font=(FONT_FAMILY, 30))
             self.instr.config(text="")
-            self.root.after(duration_ms, self.prompt_response)
 
     # ===== Response UI: per-position boxes =====
     def prompt_response(self):
-        self.tapping_active = False  # stop counting taps
-
         n_boxes = len(self.current_target)
         self._destroy_response_boxes()
         self.response_frame = tk.Frame(self.root, bg="white")
@@ -267,11 +266,15 @@ class SerialRecallApp:
             e = tk.Entry(self.response_frame, font=(FONT_FAMILY, 28), width=width, justify="center")
             e.grid(row=0, column=i, padx=6, pady=6)
             e.bind("<KeyRelease>", lambda ev, idx=i: self._on_box_key(ev, idx))
+            if self.keystrokes is not None:
+                e.bind("<KeyPress>", lambda ev, idx=i: self.keystrokes.record(idx, ev.keysym_num))
             e.bind("<FocusIn>", lambda ev, idx=i: ev.widget.select_range(0, 'end'))
             self.response_boxes.append(e)
 
         if self.response_boxes:
             self.response_boxes[0].focus_set()
+        if self.keystrokes is not None:
+            self.keystrokes.start()
         self.submit_button.place(relx=0.5, rely=0.75, anchor="center")
 
     def _destroy_response_boxes(self):
@@ -301,7 +304,7 @@ class SerialRecallApp:
     def _on_box_key(self, event, idx: int):
         w = self.response_boxes[idx]
         text = w.get().upper()
-        filtered = "".join(ch for ch in text if ch.isalpha())
+        filtered = "".join(ch for ch in text if ch in string.ascii_uppercase)  # targets are ASCII letters
         if len(filtered) > self.box_max_chars:
             filtered = filtered[:self.box_max_chars]
         if filtered != text:
@@ -325,6 +328,8 @@ class SerialRecallApp:
             self._next_box(idx)
 
     def collect_response(self):
+        if self.session.state != sess.RESPONSE:
+            return
         # Read response from per-position boxes, preserving blanks for alignment
         if self.box_mode_active and self.response_boxes:
             if self.box_word_mode:
@@ -334,41 +339,14 @@ class SerialRecallApp:
         else:
             # Fallback (shouldn't be used now)
             resp_list = []
+        if self.keystrokes is not None:
+            self.keystrokes.stop()
 
-        target = self.current_target
-        score = score_serial_recall(target, resp_list)
-
-        # Log trial
-        row = self._build_log_row(target, resp_list, score)
-        append_row_csv(self.log_path, row)
+        # Scored and logged by the session; feedback follows from its "result" event
+        self.session.submit(resp_list)
 
-        # Feedback & next
-        feedback = f"Correct positions: {score['n_correct']} / {len(target)}"
+    def show_feedback(self, score):
+        feedback = f"Correct positions: {score['n_correct']} / {len(self.current_target)}"
         self.label.config(text=feedback)
         self.instr.config(text="Press ENTER or click for next trial")
         self._destroy_response_boxes()
-        self._show_continue_button(self.start_trial)
-
-    def _build_log_row(self, target, response, score) -> Dict[str, Any]:
-        cond = self.current_condition
-        is_words = self.current_is_words
-        row = {
-            "timestamp_utc": timestamp(),
-            "participant": self.participant_id,
-            "condition": cond,
-            "is_words": int(is_words),
-            "trial_index_in_block": self.trial_index,
-            "target_length": len(target),
-            "target": "|" + "||".join(target) + "|",
-            "response": "|" + "||".join(response) + "|",
-            "prop_correct": score["prop_correct"],
-            "n_correct": score["n_correct"],
-            "all_or_nothing": score["all_or_nothing"],
-            "pos_correct": json.dumps(score["pos_correct"]),
-            "item_on_ms": self.timing.item_on_ms,
-            "isi_blank_ms": self.timing.isi_blank_ms,
-            "retention_ms": self.timing.retention_ms,
-            "iti_ms": self.timing.iti_ms,
-            "taps": self.tap_count,
-        }
-        return row
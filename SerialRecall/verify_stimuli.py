@@ -0,0 +1,151 @@
+# Statistical checks for the error-types list samplers (stimuli.py)
+#
+# Draws a large batch with sample_cluster_lists (numpy) and a reference batch with
+# the per-list sample_from_clusters, then checks:
+#   - hard constraints on every batched list: no immediate repeats, exactly
+#     round(CLUSTER_SHARE * n) cluster items from at most CLUSTERS_PER_LIST
+#     clusters, phonological/visual sets used equally often
+#   - goodness of fit: cluster positions uniform over list positions; after a
+#     filler item the next filler is uniform over the other fillers
+#   - homogeneity with the reference sampler: letter frequencies per position
+#     and the combination of clusters a list draws from
+# Chi-square p-values use the Wilson-Hilferty approximation (no SciPy needed).
+# Exits with status 1 when any check fails, so it can gate changes to the samplers:
+#   python verify_stimuli.py
+#   python verify_stimuli.py --lists 500000 --length 7 --seed 3
+import sys
+import math
+import random
+import argparse
+import numpy as np
+from stimuli import (CONSONANTS, CLUSTER_SETS, CLUSTER_SHARE, CLUSTERS_PER_LIST, sample_from_clusters,
+                     sample_cluster_lists)
+
+SET_NAMES = ["phonological", "visual"]
+
+
+def chi2_sf(stat, dof):
+    """P(X >= stat) for X ~ chi-square(dof), Wilson-Hilferty normal approximation."""
+    if dof <= 0:
+        return 1.0
+    z = ((stat / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi2_goodness(observed, expected):
+    observed, expected = np.asarray(observed, dtype=float), np.asarray(expected, dtype=float)
+    keep = expected > 0
+    stat = float((((observed - expected) ** 2)[keep] / expected[keep]).sum())
+    return chi2_sf(stat, int(keep.sum()) - 1)
+
+
+def chi2_homogeneity(a, b):
+    """Do two count vectors come from the same distribution?"""
+    table = np.vstack([a, b]).astype(float)
+    table = table[:, table.sum(axis=0) > 0]
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / table.sum()
+    stat = float(((table - expected) ** 2 / expected).sum())
+    return chi2_sf(stat, table.shape[1] - 1)
+
+
+def _cluster_of(clusters):
+    """Letter index -> cluster number within a set (-1 for fillers)."""
+    lookup = np.full(26, -1, dtype=np.int64)
+    for i, cluster in enumerate(clusters):
+        lookup[[ord(c) - ord("A") for c in cluster]] = i
+    return lookup
+
+
+def _combo_counts(items, clusters):
+    """How many lists draw their cluster items from each combination of clusters (bitmask)."""
+    member = _cluster_of(clusters)[items]
+    mask = np.zeros(len(items), dtype=np.int64)
+    for i in range(len(clusters)):
+        mask |= (member == i).any(axis=1).astype(np.int64) << i
+    return np.bincount(mask, minlength=1 << len(clusters)), mask
+
+
+def reference_lists(n_lists, n, seed):
+    """n_lists lists from sample_from_clusters, alternating the cluster sets."""
+    rng = random.Random(seed)
+    items = np.empty((n_lists, n), dtype=np.int8)
+    sets = np.arange(n_lists) % len(CLUSTER_SETS)
+    for i in range(n_lists):
+        items[i] = [ord(c) - ord("A") for c in sample_from_clusters(n, CLUSTER_SETS[sets[i]], rng=rng)]
+    return items, sets
+
+
+def run_checks(n_lists, n, seed, reference_size):
+    rng = np.random.default_rng(seed)
+    items, sets = sample_cluster_lists(n_lists, n, rng)
+    ref_items, ref_sets = reference_lists(reference_size, n, seed)
+    n_heavy = round(CLUSTER_SHARE * n)
+    checks = []  # (name, p-value, violations): distribution checks give a p-value, constraints a count
+
+    checks.append(("no immediate repeats", None, int((items[:, 1:] == items[:, :-1]).sum())))
+    counts = np.bincount(sets, minlength=len(CLUSTER_SETS))
+    checks.append(("cluster sets balanced", None, int(counts.max() - counts.min() > 1)))
+    for s, clusters in enumerate(CLUSTER_SETS):
+        rows, ref_rows = items[sets == s], ref_items[ref_sets == s]
+        member = _cluster_of(clusters)[rows]
+        heavy = member >= 0
+        name = SET_NAMES[s]
+        checks.append((f"{name}: exactly {n_heavy} cluster items per list", None,
+                       int((heavy.sum(axis=1) != n_heavy).sum())))
+        combos, _ = _combo_counts(rows, clusters)
+        too_many = sum(c for m, c in enumerate(combos) if bin(m).count("1") > CLUSTERS_PER_LIST)
+        checks.append((f"{name}: at most {CLUSTERS_PER_LIST} clusters per list", None, int(too_many)))
+        fillers = [ord(c) - ord("A") for c in CONSONANTS if _cluster_of(clusters)[ord(c) - ord("A")] < 0]
+        checks.append((f"{name}: fillers come from outside the clusters", None,
+                       int((~np.isin(rows[~heavy], fillers)).sum())))
+
+        # Cluster positions: each position is a cluster item with probability n_heavy / n
+        per_position = heavy.sum(axis=0)
+        p = chi2_goodness(np.stack([per_position, len(rows) - per_position]).ravel(),
+                          np.repeat([n_heavy / n * len(rows), (1 - n_heavy / n) * len(rows)], n))
+        checks.append((f"{name}: cluster positions uniform", p, None))
+
+        # Filler after filler: uniform over the other fillers
+        prev, nxt = rows[:, :-1][~heavy[:, :-1] & ~heavy[:, 1:]], rows[:, 1:][~heavy[:, :-1] & ~heavy[:, 1:]]
+        pairs = np.zeros((26, 26))
+        np.add.at(pairs, (prev, nxt), 1)
+        sub = pairs[np.ix_(fillers, fillers)]
+        expected = (sub.sum(axis=1, keepdims=True) / (len(fillers) - 1)) * (1 - np.eye(len(fillers)))
+        checks.append((f"{name}: filler transitions uniform", chi2_goodness(sub.ravel(), expected.ravel()), None))
+
+        # Same distribution as the reference sampler
+        for j in range(n):
+            a = np.bincount(rows[:, j], minlength=26)
+            b = np.bincount(ref_rows[:, j], minlength=26)
+            checks.append((f"{name}: letters at position {j + 1} match reference", chi2_homogeneity(a, b), None))
+        ref_combos, _ = _combo_counts(ref_rows, clusters)
+        checks.append((f"{name}: cluster combinations match reference", chi2_homogeneity(combos, ref_combos), None))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the batched cluster sampler's constraints and distribution.")
+    parser.add_argument("--lists", type=int, default=200000, help="lists drawn by the batched sampler")
+    parser.add_argument("--reference", type=int, default=40000, help="lists drawn by sample_from_clusters")
+    parser.add_argument("--length", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--alpha", type=float, default=1e-4,
+                        help="fail a distribution check when p < alpha / number of checks")
+    args = parser.parse_args()
+
+    checks = run_checks(args.lists, args.length, args.seed, args.reference)
+    n_tests = sum(p is not None for _, p, _ in checks)
+    threshold = args.alpha / max(1, n_tests)
+    failed = 0
+    for name, p, violations in checks:
+        ok = violations == 0 if p is None else p >= threshold
+        failed += not ok
+        detail = f"{violations} violations" if p is None else f"p = {p:.4f}"
+        print(f"{'ok  ' if ok else 'FAIL'} {name:55s} {detail}")
+    print(f"{len(checks) - failed}/{len(checks)} checks passed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()